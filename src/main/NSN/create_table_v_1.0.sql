@@ -248,7 +248,8 @@ CREATE TABLE event_comments (
     moderated_at TIMESTAMP NULL DEFAULT NULL, 
     FOREIGN KEY (event_id) REFERENCES events(event_id) ON DELETE CASCADE,
     FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
-    FOREIGN KEY (moderator_id) REFERENCES users(user_id) ON DELETE SET NULL 
+    FOREIGN KEY (moderator_id) REFERENCES users(user_id) ON DELETE SET NULL,
+    INDEX idx_event_comments_page (event_id, created_at, comment_id)
 );
 
 DROP TABLE IF EXISTS comment_reactions;
@@ -691,4 +692,241 @@ CREATE TABLE IF NOT EXISTS help_desk_notifications (
     INDEX idx_notifications_created_at (created_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Notifications for help desk staff';
 
+-- ====================================================================
+-- DEPARTURE BOARD FEED
+-- ====================================================================
+-- events.last_update is the feed order key (COALESCE(updated_at, created_at))
+-- as a stored generated column, so the keyset predicate and ORDER BY of each
+-- feed branch in webapp/departure_board.py read it from an index instead of
+-- sorting every followed event. Created only when missing.
+
+SET @events_last_update_exists = (SELECT COUNT(*) FROM INFORMATION_SCHEMA.COLUMNS
+                                 WHERE TABLE_SCHEMA = DATABASE()
+                                 AND TABLE_NAME = 'events'
+                                 AND COLUMN_NAME = 'last_update');
+
+SET @sql_events_last_update = IF(@events_last_update_exists = 0,
+    'ALTER TABLE events ADD COLUMN last_update TIMESTAMP AS (COALESCE(updated_at, created_at)) STORED COMMENT "Departure board order key"',
+    'SELECT "events.last_update column already exists" as message');
+
+PREPARE stmt FROM @sql_events_last_update;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @idx_events_journey_feed_exists = (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+                                      WHERE TABLE_SCHEMA = DATABASE()
+                                      AND TABLE_NAME = 'events'
+                                      AND INDEX_NAME = 'idx_events_journey_feed');
+
+SET @sql_idx_events_journey_feed = IF(@idx_events_journey_feed_exists = 0,
+    'ALTER TABLE events ADD INDEX idx_events_journey_feed (journey_id, last_update, event_id)',
+    'SELECT "idx_events_journey_feed index already exists" as message');
+
+PREPARE stmt FROM @sql_idx_events_journey_feed;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @idx_events_location_feed_exists = (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+                                       WHERE TABLE_SCHEMA = DATABASE()
+                                       AND TABLE_NAME = 'events'
+                                       AND INDEX_NAME = 'idx_events_location_feed');
+
+SET @sql_idx_events_location_feed = IF(@idx_events_location_feed_exists = 0,
+    'ALTER TABLE events ADD INDEX idx_events_location_feed (location_id, last_update, event_id)',
+    'SELECT "idx_events_location_feed index already exists" as message');
+
+PREPARE stmt FROM @sql_idx_events_location_feed;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- ====================================================================
+-- DEPARTURE BOARD TIMELINE (fan-out on write)
+-- ====================================================================
+-- One row per (follower, event) for events reachable through a followed
+-- journey, user or location. Rebuild with `flask --app webapp rebuild-timeline`.
+
+CREATE TABLE IF NOT EXISTS departure_board_timeline (
+    user_id INT NOT NULL COMMENT 'Follower who sees the event',
+    event_id INT NOT NULL,
+    last_update TIMESTAMP NOT NULL COMMENT 'events.last_update at fan-out time',
+    from_journey BOOLEAN NOT NULL DEFAULT FALSE COMMENT 'Reached through a followed journey',
+    from_user BOOLEAN NOT NULL DEFAULT FALSE COMMENT 'Reached through a followed user',
+    from_location BOOLEAN NOT NULL DEFAULT FALSE COMMENT 'Reached through a followed location',
+
+    PRIMARY KEY (user_id, event_id),
+    FOREIGN KEY (user_id) REFERENCES users(user_id) ON DELETE CASCADE,
+    FOREIGN KEY (event_id) REFERENCES events(event_id) ON DELETE CASCADE,
+
+    -- Departure board page reads: one range scan per user
+    INDEX idx_timeline_feed (user_id, last_update, event_id),
+    INDEX idx_timeline_event (event_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Materialized departure board timelines';
+
+-- ====================================================================
+-- SEARCH INDEXES
+-- ====================================================================
+-- FULLTEXT indexes behind webapp/search.py (journey, location and user
+-- search, location autocomplete). Created only when missing so the script
+-- can be re-run against an existing database.
+
+SET @ft_journeys_exists = (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+                          WHERE TABLE_SCHEMA = DATABASE()
+                          AND TABLE_NAME = 'journeys'
+                          AND INDEX_NAME = 'ft_journeys_text');
+
+SET @sql_ft_journeys = IF(@ft_journeys_exists = 0,
+    'ALTER TABLE journeys ADD FULLTEXT INDEX ft_journeys_text (title, description)',
+    'SELECT "ft_journeys_text index already exists" as message');
+
+PREPARE stmt FROM @sql_ft_journeys;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @ft_locations_exists = (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+                           WHERE TABLE_SCHEMA = DATABASE()
+                           AND TABLE_NAME = 'locations'
+                           AND INDEX_NAME = 'ft_locations_address');
+
+SET @sql_ft_locations = IF(@ft_locations_exists = 0,
+    'ALTER TABLE locations ADD FULLTEXT INDEX ft_locations_address (address)',
+    'SELECT "ft_locations_address index already exists" as message');
+
+PREPARE stmt FROM @sql_ft_locations;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- B-tree index for address lookups and short-keyword prefix autocomplete
+SET @idx_address_exists = (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+                          WHERE TABLE_SCHEMA = DATABASE()
+                          AND TABLE_NAME = 'locations'
+                          AND INDEX_NAME = 'idx_locations_address');
+
+SET @sql_idx_address = IF(@idx_address_exists = 0,
+    'ALTER TABLE locations ADD INDEX idx_locations_address (address)',
+    'SELECT "idx_locations_address index already exists" as message');
+
+PREPARE stmt FROM @sql_idx_address;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @ft_users_exists = (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+                       WHERE TABLE_SCHEMA = DATABASE()
+                       AND TABLE_NAME = 'users'
+                       AND INDEX_NAME = 'ft_users_search');
+
+SET @sql_ft_users = IF(@ft_users_exists = 0,
+    'ALTER TABLE users ADD FULLTEXT INDEX ft_users_search (username, email, first_name, last_name)',
+    'SELECT "ft_users_search index already exists" as message');
+
+PREPARE stmt FROM @sql_ft_users;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- Keyset pagination of the journey lists (newest first)
+SET @idx_journeys_public_exists = (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+                                  WHERE TABLE_SCHEMA = DATABASE()
+                                  AND TABLE_NAME = 'journeys'
+                                  AND INDEX_NAME = 'idx_journeys_public');
+
+SET @sql_idx_journeys_public = IF(@idx_journeys_public_exists = 0,
+    'ALTER TABLE journeys ADD INDEX idx_journeys_public (status, display, created_at, journey_id)',
+    'SELECT "idx_journeys_public index already exists" as message');
+
+PREPARE stmt FROM @sql_idx_journeys_public;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+SET @idx_journeys_user_exists = (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+                                WHERE TABLE_SCHEMA = DATABASE()
+                                AND TABLE_NAME = 'journeys'
+                                AND INDEX_NAME = 'idx_journeys_user_created');
+
+SET @sql_idx_journeys_user = IF(@idx_journeys_user_exists = 0,
+    'ALTER TABLE journeys ADD INDEX idx_journeys_user_created (user_id, created_at, journey_id)',
+    'SELECT "idx_journeys_user_created index already exists" as message');
+
+PREPARE stmt FROM @sql_idx_journeys_user;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- ====================================================================
+-- BATCH JOBS
+-- ====================================================================
+-- Watermark of periodic batch jobs (e.g. subscription_expiry: the time of the
+-- last expiry pass and how many rows it changed).
+
+CREATE TABLE IF NOT EXISTS batch_watermarks (
+    job_name VARCHAR(50) NOT NULL COMMENT 'Name of the batch job',
+    last_run_at TIMESTAMP NULL DEFAULT NULL COMMENT 'Start time of the last completed run',
+    rows_affected INT NOT NULL DEFAULT 0 COMMENT 'Rows changed by the last run',
+    PRIMARY KEY (job_name)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Batch job watermarks';
+
+-- Subscription expiry pass: range scan of subscribed members by end_time
+SET @idx_members_expiry_exists = (SELECT COUNT(*) FROM INFORMATION_SCHEMA.STATISTICS
+                                 WHERE TABLE_SCHEMA = DATABASE()
+                                 AND TABLE_NAME = 'members'
+                                 AND INDEX_NAME = 'idx_members_expiry');
+
+SET @sql_idx_members_expiry = IF(@idx_members_expiry_exists = 0,
+    'ALTER TABLE members ADD INDEX idx_members_expiry (m_status, end_time)',
+    'SELECT "idx_members_expiry index already exists" as message');
+
+PREPARE stmt FROM @sql_idx_members_expiry;
+EXECUTE stmt;
+DEALLOCATE PREPARE stmt;
+
+-- ====================================================================
+-- CONTENT-ADDRESSED IMAGE STORE
+-- ====================================================================
+-- One row per stored image file (static/blobs/<2>/<2>/<sha256>.<ext>), with the
+-- number of event_images / journeys.cover_image / users.profile_image rows that
+-- reference it. Unreferenced blobs are deleted by `flask --app webapp gc-image-blobs`.
+CREATE TABLE IF NOT EXISTS image_blobs (
+    blob_key VARCHAR(80) NOT NULL COMMENT 'SHA-256 hex digest of the uploaded bytes plus extension',
+    ref_count INT NOT NULL DEFAULT 0 COMMENT 'Rows referencing the blob',
+    size_bytes INT NOT NULL DEFAULT 0 COMMENT 'Size of the uploaded file',
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    orphaned_at TIMESTAMP NULL DEFAULT NULL COMMENT 'When ref_count last dropped to 0',
+    PRIMARY KEY (blob_key),
+    KEY idx_image_blobs_orphaned (ref_count, orphaned_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Reference counts of stored image files';
+
+-- ====================================================================
+-- SERVER-SIDE SESSIONS
+-- ====================================================================
+-- Used when SESSION_BACKEND=database (see webapp/sessions.py). The cookie
+-- carries only the signed session_id; expired rows are purged on write.
+CREATE TABLE IF NOT EXISTS web_sessions (
+    session_id VARCHAR(64) NOT NULL COMMENT 'Random session id (signed in the cookie)',
+    data MEDIUMTEXT NOT NULL COMMENT 'Session data as compact tagged JSON',
+    expires_at DATETIME NOT NULL COMMENT 'Sliding expiry',
+    PRIMARY KEY (session_id),
+    KEY idx_web_sessions_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Server-side sessions';
+
+-- ====================================================================
+-- BACKGROUND JOB QUEUE
+-- ====================================================================
+-- Used when JOB_QUEUE_BACKEND=database (see webapp/jobs.py). dedupe_key is
+-- the idempotency key of a queued or running job and is cleared when the job
+-- finishes; finished jobs are purged after a day.
+CREATE TABLE IF NOT EXISTS job_queue (
+    job_id BIGINT NOT NULL AUTO_INCREMENT,
+    name VARCHAR(100) NOT NULL COMMENT 'Registered job handler',
+    args JSON NOT NULL COMMENT 'Positional arguments of the handler',
+    dedupe_key VARCHAR(191) NULL COMMENT 'Idempotency key while queued or running',
+    status ENUM('queued', 'running', 'done', 'failed') NOT NULL DEFAULT 'queued',
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 3,
+    run_at DATETIME NOT NULL COMMENT 'Not run before this time (retry backoff)',
+    locked_at DATETIME NULL COMMENT 'When a worker claimed the job',
+    last_error TEXT NULL,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at DATETIME NULL,
+    PRIMARY KEY (job_id),
+    UNIQUE KEY uq_job_queue_dedupe (dedupe_key),
+    KEY idx_job_queue_due (status, run_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci COMMENT='Background jobs';
+
 SET FOREIGN_KEY_CHECKS=1;
@@ -0,0 +1,160 @@
+"""Benchmark Departure Board read latency: follow-table joins vs materialized timeline.
+
+Seeds a throwaway author, reader, journeys, locations and events (100k by
+default) into the configured database, builds the reader's timeline, then times
+the first page and a deep keyset page through both read paths. All seeded rows
+are removed afterwards unless --keep is given.
+
+Usage:
+    python departure_board_benchmark.py [--events 100000] [--repeat 20] [--keep]
+
+The departure_board_timeline table must exist (see create_table_v_1.0.sql).
+"""
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from webapp import app
+from webapp import db
+from webapp import departure_board
+from webapp import timeline
+
+BATCH_SIZE = 5000
+EVENTS_PER_JOURNEY = 1000
+LOCATIONS = 50
+
+
+def seed(cursor, event_count):
+    """Insert the benchmark data set and return (reader_id, author_id, journey_ids, location_ids)"""
+    tag = uuid.uuid4().hex[:8]
+    user_ids = []
+    for role in ('author', 'reader'):
+        cursor.execute('''
+            INSERT INTO users (username, password_hash, email, role, status)
+            VALUES (%s, %s, %s, 'traveller', 'active')
+        ''', (f"bench_{role}_{tag}", 'x' * 60, f"bench_{role}_{tag}@example.com"))
+        user_ids.append(cursor.lastrowid)
+    author_id, reader_id = user_ids
+
+    location_ids = []
+    for i in range(LOCATIONS):
+        cursor.execute('INSERT INTO locations (address) VALUES (%s)', (f"Bench location {tag}-{i}",))
+        location_ids.append(cursor.lastrowid)
+
+    journey_ids = []
+    for i in range((event_count + EVENTS_PER_JOURNEY - 1) // EVENTS_PER_JOURNEY):
+        cursor.execute('''
+            INSERT INTO journeys (user_id, title, display, status)
+            VALUES (%s, %s, 'public', 'open')
+        ''', (author_id, f"Bench journey {tag}-{i}"))
+        journey_ids.append(cursor.lastrowid)
+
+    base = datetime.now() - timedelta(days=365)
+    rows = []
+    for i in range(event_count):
+        stamp = base + timedelta(seconds=i * 30)
+        rows.append((journey_ids[i // EVENTS_PER_JOURNEY], f"Bench event {i}",
+                     location_ids[i % LOCATIONS], stamp, stamp, stamp, stamp))
+        if len(rows) == BATCH_SIZE or i == event_count - 1:
+            cursor.executemany('''
+                INSERT INTO events (journey_id, title, location_id, start_time, end_time,
+                                    display, status, created_at, updated_at)
+                VALUES (%s, %s, %s, %s, %s, 'public', 'open', %s, %s)
+            ''', rows)
+            rows = []
+
+    # The reader follows the author, half of the journeys and a few locations
+    cursor.execute('INSERT INTO user_follows (follower_id, followed_id) VALUES (%s, %s)', (reader_id, author_id))
+    cursor.executemany('INSERT INTO journey_follows (user_id, journey_id) VALUES (%s, %s)',
+                       [(reader_id, journey_id) for journey_id in journey_ids[::2]])
+    cursor.executemany('INSERT INTO location_follows (user_id, location_id) VALUES (%s, %s)',
+                       [(reader_id, location_id) for location_id in location_ids[:5]])
+
+    return reader_id, author_id, journey_ids, location_ids
+
+
+def cleanup(cursor, reader_id, author_id, journey_ids, location_ids):
+    """Remove everything seed() created"""
+    placeholders = ','.join(['%s'] * len(journey_ids))
+    cursor.execute('DELETE FROM departure_board_timeline WHERE user_id = %s', (reader_id,))
+    cursor.execute('DELETE FROM user_follows WHERE follower_id = %s', (reader_id,))
+    cursor.execute('DELETE FROM journey_follows WHERE user_id = %s', (reader_id,))
+    cursor.execute('DELETE FROM location_follows WHERE user_id = %s', (reader_id,))
+    cursor.execute(f'DELETE FROM events WHERE journey_id IN ({placeholders})', journey_ids)
+    cursor.execute(f'DELETE FROM journeys WHERE journey_id IN ({placeholders})', journey_ids)
+    cursor.execute(f"DELETE FROM locations WHERE location_id IN ({','.join(['%s'] * len(location_ids))})",
+                   location_ids)
+    cursor.execute('DELETE FROM users WHERE user_id IN (%s, %s)', (reader_id, author_id))
+
+
+def time_reads(cursor, reader_id, use_timeline, repeat):
+    """Return (first page timings, deep keyset page timings) in milliseconds"""
+    journeys, users, locations = departure_board.get_followed_sources(cursor, reader_id)
+    followed_ids = {
+        'followed_journey': [journey['journey_id'] for journey in journeys],
+        'followed_user': [user['user_id'] for user in users],
+        'followed_location': [loc['location_id'] for loc in locations],
+    }
+
+    # Walk 50 pages forward to get a cursor deep into the feed
+    after = None
+    for _ in range(50):
+        _, next_cursor = departure_board.fetch_feed_page(
+            cursor, reader_id, followed_ids, after=after, use_timeline=use_timeline)
+        if next_cursor is None:
+            break
+        after = departure_board.decode_feed_cursor(next_cursor)
+
+    first, deep = [], []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        departure_board.fetch_feed_page(cursor, reader_id, followed_ids, use_timeline=use_timeline)
+        first.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        departure_board.fetch_feed_page(cursor, reader_id, followed_ids, after=after, use_timeline=use_timeline)
+        deep.append((time.perf_counter() - started) * 1000)
+    return first, deep
+
+
+def report(label, timings):
+    print(f"  {label:<22} median {statistics.median(timings):8.2f} ms   "
+          f"min {min(timings):8.2f} ms   max {max(timings):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100000, help='number of events to seed')
+    parser.add_argument('--repeat', type=int, default=20, help='timed reads per page and read path')
+    parser.add_argument('--keep', action='store_true', help='keep the seeded rows')
+    args = parser.parse_args()
+
+    with app.app_context():
+        with db.get_cursor() as cursor:
+            print(f"Seeding {args.events} events...")
+            started = time.perf_counter()
+            seeded = seed(cursor, args.events)
+            reader_id = seeded[0]
+            print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+            started = time.perf_counter()
+            rows = timeline.rebuild_user_timeline(cursor, reader_id)
+            print(f"Built reader timeline ({rows} rows) in {time.perf_counter() - started:.1f}s")
+
+            try:
+                for label, use_timeline in (('follow-table joins', False), ('materialized timeline', True)):
+                    first, deep = time_reads(cursor, reader_id, use_timeline, args.repeat)
+                    print(f"{label}:")
+                    report('first page', first)
+                    report('page 51 (keyset)', deep)
+            finally:
+                if not args.keep:
+                    cleanup(cursor, *seeded)
+                    print("Benchmark data removed")
+        db.close_db()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,11 @@
 import socket
 import os
-from flask import Flask, request, make_response
+from flask import Flask, request, make_response, session
 from webapp import app
+from webapp.subscription_expiry import start_expiry_scheduler
+from webapp.blobstore import start_gc_scheduler
+from webapp.jobs import start_workers
+from webapp.assets import is_static_request
 
 # Load environment configuration
 def load_environment_config():
@@ -53,7 +57,7 @@ def handle_preflight():
 
 @app.after_request
 def after_request(response):
-   """Add headers to prevent caching and CORS issues"""
+   """Add CORS headers and the cache policy of dynamic responses"""
    
    # Handle CORS headers
    origin = request.headers.get('Origin')
@@ -67,11 +71,17 @@ def after_request(response):
    response.headers['Access-Control-Allow-Credentials'] = 'true'
    response.headers['Access-Control-Max-Age'] = '0'  # Critical: Don't cache CORS policies
    
-   # Prevent all types of caching that might cause "Access Denied" issues
-   response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, proxy-revalidate'
-   response.headers['Pragma'] = 'no-cache'
-   response.headers['Expires'] = '0'
-   response.headers['Surrogate-Control'] = 'no-store'
+   # Static assets carry their own caching (webapp/assets.py). Pages and API
+   # responses of logged-in users must never be stored, to prevent "Access
+   # Denied" issues and stale personal data; anonymous ones are revalidated.
+   if not is_static_request() and response.mimetype in ('text/html', 'application/json'):
+       if session.get('loggedin'):
+           response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, proxy-revalidate'
+           response.headers['Pragma'] = 'no-cache'
+           response.headers['Expires'] = '0'
+           response.headers['Surrogate-Control'] = 'no-store'
+       else:
+           response.headers['Cache-Control'] = 'no-cache'
    
    # Remove security headers that might cause caching issues
    security_headers_to_remove = [
@@ -85,7 +95,7 @@ def after_request(response):
        response.headers.pop(header, None)
    
    # Tell browser this response varies by origin and request headers
-   response.headers['Vary'] = 'Origin, Access-Control-Request-Method, Access-Control-Request-Headers'
+   response.vary.update(['Origin', 'Access-Control-Request-Method', 'Access-Control-Request-Headers'])
    
    # Add timestamp to prevent browser from using cached responses
    import time
@@ -101,6 +111,15 @@ if __name__ == '__main__':
        print(f"Port {port} is in use, finding available port...")
        port = find_free_port()
    
+   # Expire lapsed subscriptions in the background (SUBSCRIPTION_EXPIRY_INTERVAL)
+   start_expiry_scheduler()
+
+   # Delete unreferenced image blobs in the background (IMAGE_GC_INTERVAL)
+   start_gc_scheduler()
+
+   # Run queued background jobs, including those left in job_queue by a previous run
+   start_workers()
+
    print(f"Starting server on port {port}")
    print(f"Access your app at: http://127.0.0.1:{port}")
    
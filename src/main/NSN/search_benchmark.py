@@ -0,0 +1,141 @@
+"""Benchmark journey and location search: leading-wildcard LIKE vs FULLTEXT.
+
+Seeds a throwaway author, locations and journeys (1M by default) into the
+configured database, then times keyword searches through the old LIKE filters
+and through webapp.search, plus /location/search autocomplete. All seeded rows
+are removed afterwards unless --keep is given.
+
+Usage:
+    python search_benchmark.py [--journeys 1000000] [--repeat 10] [--keep]
+
+The FULLTEXT indexes must exist (see the SEARCH INDEXES section of
+create_table_v_1.0.sql).
+"""
+import argparse
+import random
+import statistics
+import time
+import uuid
+
+from webapp import app
+from webapp import db
+from webapp import search
+
+BATCH_SIZE = 5000
+LOCATIONS = 2000
+WORDS = ('alpine', 'beach', 'canyon', 'desert', 'fjord', 'glacier', 'harbour', 'island', 'jungle',
+         'kayak', 'lagoon', 'mountain', 'nomad', 'ocean', 'prairie', 'rainforest', 'safari',
+         'tundra', 'volcano', 'waterfall', 'queenstown', 'rotorua', 'wanaka', 'kaikoura')
+KEYWORDS = ('glacier', 'queen', 'volcano waterfall', 'kayak lagoon')
+
+
+def sentence(rng, words):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(cursor, journey_count):
+    """Insert the benchmark data set and return (author_id, location_ids)"""
+    tag = uuid.uuid4().hex[:8]
+    rng = random.Random(tag)
+    cursor.execute('''
+        INSERT INTO users (username, password_hash, email, role, status)
+        VALUES (%s, %s, %s, 'traveller', 'active')
+    ''', (f"bench_search_{tag}", 'x' * 60, f"bench_search_{tag}@example.com"))
+    author_id = cursor.lastrowid
+
+    location_ids = []
+    for i in range(LOCATIONS):
+        cursor.execute('INSERT INTO locations (address) VALUES (%s)',
+                       (f"{i} {sentence(rng, 2).title()} Road {tag}",))
+        location_ids.append(cursor.lastrowid)
+
+    rows = []
+    for i in range(journey_count):
+        rows.append((author_id, f"{sentence(rng, 3).title()} {i}", sentence(rng, 20)))
+        if len(rows) == BATCH_SIZE or i == journey_count - 1:
+            cursor.executemany('''
+                INSERT INTO journeys (user_id, title, description, display, status)
+                VALUES (%s, %s, %s, 'public', 'open')
+            ''', rows)
+            rows = []
+    return author_id, location_ids
+
+
+def cleanup(cursor, author_id, location_ids):
+    """Remove everything seed() created"""
+    cursor.execute('DELETE FROM journeys WHERE user_id = %s', (author_id,))
+    cursor.execute(f"DELETE FROM locations WHERE location_id IN ({','.join(['%s'] * len(location_ids))})",
+                   location_ids)
+    cursor.execute('DELETE FROM users WHERE user_id = %s', (author_id,))
+
+
+def like_search(cursor, keyword):
+    cursor.execute('''
+        SELECT journey_id FROM journeys j
+        WHERE j.status = 'open' AND (j.title LIKE %s OR j.description LIKE %s)
+        ORDER BY j.created_at DESC LIMIT 20
+    ''', (f'%{keyword}%', f'%{keyword}%'))
+    return cursor.fetchall()
+
+
+def fulltext_search(cursor, keyword):
+    match = search.match_journeys(keyword)
+    cursor.execute(f'''
+        SELECT journey_id, {match.score} AS relevance FROM journeys j
+        WHERE j.status = 'open' AND {match.condition}
+        ORDER BY relevance DESC, j.created_at DESC LIMIT 20
+    ''', match.score_params + match.params)
+    return cursor.fetchall()
+
+
+def like_autocomplete(cursor, keyword):
+    cursor.execute('SELECT address FROM locations where address like %s limit 0,10;', (f'%{keyword}%',))
+    return cursor.fetchall()
+
+
+def time_calls(func, cursor, keyword, repeat):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func(cursor, keyword)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def report(label, timings):
+    print(f"  {label:<28} median {statistics.median(timings):8.2f} ms   "
+          f"min {min(timings):8.2f} ms   max {max(timings):8.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--journeys', type=int, default=1000000, help='number of journeys to seed')
+    parser.add_argument('--repeat', type=int, default=10, help='timed searches per keyword and method')
+    parser.add_argument('--keep', action='store_true', help='keep the seeded rows')
+    args = parser.parse_args()
+
+    with app.app_context():
+        with db.get_cursor() as cursor:
+            print(f"Seeding {args.journeys} journeys...")
+            started = time.perf_counter()
+            seeded = seed(cursor, args.journeys)
+            print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+            try:
+                for keyword in KEYWORDS:
+                    print(f"journey search '{keyword}':")
+                    report('LIKE %kw%', time_calls(like_search, cursor, keyword, args.repeat))
+                    report('FULLTEXT', time_calls(fulltext_search, cursor, keyword, args.repeat))
+                for keyword in ('gla', 'queenstown ro'):
+                    print(f"location autocomplete '{keyword}':")
+                    report('LIKE %kw%', time_calls(like_autocomplete, cursor, keyword, args.repeat))
+                    report('FULLTEXT prefix', time_calls(search.autocomplete_locations, cursor, keyword, args.repeat))
+            finally:
+                if not args.keep:
+                    cleanup(cursor, *seeded)
+                    print("Benchmark data removed")
+        db.close_db()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,109 @@
+"""Query budget of the event pages.
+
+The event pages load images, likes and comments for all events of a journey
+in batched queries, so the number of queries must not grow with the number
+of events. The views run against a cursor double that counts execute()
+calls; no MySQL server is needed.
+"""
+import os
+import sys
+from unittest import mock
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# webapp opens its connection pool at import time
+with mock.patch('mysql.connector.pooling.MySQLConnectionPool'):
+    from webapp import app, db, event, premium
+
+JOURNEY_OWNER_ID = 2
+VIEWER_ID = 1
+
+
+class CountingCursor:
+    """Dictionary cursor double: records statements and answers the event list query"""
+
+    def __init__(self, events):
+        self.events = events
+        self.statements = []
+        self._rows = []
+        self.rowcount = 0
+        self.lastrowid = None
+
+    def execute(self, operation, params=()):
+        self.statements.append(operation)
+        sql = ' '.join(operation.split())
+        if 'FROM events e' in sql and 'event_likes' in sql:
+            rows = self.events
+        elif sql.startswith('select * from journeys'):
+            rows = [{'journey_id': 1, 'user_id': JOURNEY_OWNER_ID, 'title': 'Journey'}]
+        else:
+            rows = []
+        self._rows = [dict(row) for row in rows]
+        self.rowcount = len(self._rows)
+
+    def fetchall(self):
+        return self._rows
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+def make_events(count):
+    return [{
+        'event_id': event_id, 'journey_id': 1, 'title': f'Event {event_id}', 'description': '',
+        'event_image': None, 'start_time': None, 'end_time': None, 'display': 'public',
+        'address': f'Place {event_id}', 'location_id': event_id, 'like_count': 0, 'user_liked': 0,
+    } for event_id in range(1, count + 1)]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    app.config['TESTING'] = True
+    monkeypatch.setattr(db, 'close_db', lambda exception=None: None)
+    monkeypatch.setattr(event, 'render_template', lambda template, **context: template)
+    with app.test_client() as client:
+        yield client
+
+
+def count_queries(client, monkeypatch, url, event_count):
+    cursor = CountingCursor(make_events(event_count))
+    monkeypatch.setattr(db, 'get_cursor', lambda intent=None: cursor)
+    # Membership is cached per process; every request starts cold
+    premium.invalidateMember(JOURNEY_OWNER_ID)
+    premium.invalidateMember(VIEWER_ID)
+    response = client.get(url)
+    assert response.status_code == 200
+    return len(cursor.statements)
+
+
+def test_public_events_query_count_is_constant(client, monkeypatch):
+    url = '/events/public/view?journey_id=1'
+    assert count_queries(client, monkeypatch, url, 1) == count_queries(client, monkeypatch, url, 50)
+
+
+def test_private_events_query_count_is_constant(client, monkeypatch):
+    with client.session_transaction() as session:
+        session['loggedin'] = True
+        session['user_id'] = VIEWER_ID
+        session['role'] = 'traveller'
+    url = '/events/private/view?journey_id=1'
+    assert count_queries(client, monkeypatch, url, 1) == count_queries(client, monkeypatch, url, 50)
+
+
+def test_load_event_images_uses_one_query():
+    for event_count in (1, 50):
+        cursor = CountingCursor([])
+        images = event.load_event_images(cursor, list(range(1, event_count + 1)))
+        assert len(cursor.statements) == 1
+        assert set(images) == set(range(1, event_count + 1))
@@ -28,6 +28,7 @@ def load_environment_config():
 load_environment_config()
 
 from .config import B_CLIENT_WEBSOCKET_URL, B_CLIENT_API_URL, NSN_URL
+from .config import DB_REPLICA_HOST, DB_REPLICA_USER, DB_REPLICA_PASSWORD, DB_REPLICA_NAME
 
 app = Flask(__name__, template_folder='templates')
 app.register_blueprint(message_bp)
@@ -41,19 +42,20 @@ app.config['SESSION_COOKIE_SECURE'] = False  # Set to True in production with HT
 app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'
 app.config['PERMANENT_SESSION_LIFETIME'] = 3600  # 1 hour
 
-# Configure JSON session serialization to prevent NMP parameter loss
-# This ensures all session data (including NMP parameters) are properly serialized
-app.config['SESSION_SERIALIZATION_FORMAT'] = 'json'
-app.config['SESSION_TYPE'] = 'filesystem'
-app.config['SESSION_FILE_DIR'] = '/tmp/flask_session'
-app.config['SESSION_FILE_THRESHOLD'] = 500
-
-# Additional session security and reliability settings
+# Session data is a signed cookie by default; SESSION_BACKEND=database or
+# memory stores it server-side (see sessions.py)
 app.config['SESSION_COOKIE_MAX_SIZE'] = 4096  # 4KB max cookie size
-app.config['SESSION_USE_SIGNER'] = True  # Sign session cookies for security
 
 
 db.init_db(app, connect.dbuser, connect.dbpass, connect.dbhost, connect.dbname)
+if DB_REPLICA_HOST:
+    db.init_replica(DB_REPLICA_USER or connect.dbuser, DB_REPLICA_PASSWORD or connect.dbpass,
+                    DB_REPLICA_HOST, DB_REPLICA_NAME or connect.dbname)
+from webapp import logs
+from webapp import instrumentation
+from webapp import sessions
+from webapp import uploads
+from webapp import assets
 from webapp import announcement
 from webapp import event
 from webapp import journey
@@ -69,6 +71,11 @@ from webapp import departure_board
 from webapp import appeals
 from webapp import announcement
 from webapp import help_requests
+from webapp import subscription_expiry
+from webapp import metrics
+from webapp import images
+from webapp import blobstore
+from webapp import jobs
 
 # Environment variables API endpoint
 @app.route('/api/nsn_websocket_env')
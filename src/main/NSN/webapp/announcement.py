@@ -1,9 +1,11 @@
 from webapp import app
 from webapp import db
+from webapp import jobs
 from flask import redirect, render_template, request, session, url_for,flash
 from datetime import datetime
 
 @app.route('/announcement/view')
+@db.read_only
 def view_announcement():
 
     #params: user_id, title, content, start_date, end_date
@@ -313,6 +315,7 @@ def get_announcement(userId, start=None):
 
     return announcements,totalAmount['c']
 
+@jobs.task('update_user_login_info')
 def update_user_login_info(user_id):
     clear_user_read_announcements(user_id)
     update_login_info(user_id)
@@ -3,11 +3,14 @@
 此模块处理用户对内容限制的申诉功能
 """
 
+import logging
 from webapp import app, db
 from flask import request, session, jsonify, render_template, redirect, url_for, flash
 from functools import wraps
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 def require_login(f):
 
@@ -84,7 +87,7 @@ def get_user_restrictions(user_id):
             return restrictions
 
     except Exception as e:
-        print(f"Error getting user restrictions: {e}")
+        logger.error("Error getting user restrictions: %s", e)
         return None
 
 
@@ -140,7 +143,7 @@ def submit_appeal():
                         for appeal in pending_appeals
                     )
         except Exception as e:
-            print(f"Error checking pending appeals: {e}")
+            logger.error("Error checking pending appeals: %s", e)
             flash('Error loading appeal status. Please try again.', 'danger')
             return redirect(url_for('dashboard'))
 
@@ -195,7 +198,7 @@ def submit_appeal():
         return redirect(url_for('dashboard'))
 
     except Exception as e:
-        print(f"Error submitting appeal: {e}")
+        logger.error("Error submitting appeal: %s", e)
         message = 'An error occurred while submitting your appeal. Please try again.'
         if request.is_json:
             return jsonify({'error': message}), 500
@@ -239,7 +242,7 @@ def my_appeals():
         return render_template('my_appeals.html', appeals=appeals)
 
     except Exception as e:
-        print(f"Error loading user appeals: {e}")
+        logger.error("Error loading user appeals: %s", e)
         flash('Error loading your appeals. Please try again.', 'danger')
         return redirect(url_for('dashboard'))
 
@@ -294,7 +297,7 @@ def appeals_queue():
                                current_type=type_filter)
 
     except Exception as e:
-        print(f"Error loading appeals queue: {e}")
+        logger.error("Error loading appeals queue: %s", e)
         flash('Error loading appeals queue. Please try again.', 'danger')
         return redirect(url_for('dashboard'))
 
@@ -365,7 +368,7 @@ def review_appeal(appeal_id):
         })
 
     except Exception as e:
-        print(f"Error reviewing appeal: {e}")
+        logger.error("Error reviewing appeal: %s", e)
         return jsonify({'error': 'An error occurred while processing the appeal'}), 500
 
 
@@ -397,7 +400,7 @@ def appeals_stats():
             })
 
     except Exception as e:
-        print(f"Error getting appeals stats: {e}")
+        logger.error("Error getting appeals stats: %s", e)
         return jsonify({'error': 'Error loading statistics'}), 500
 
 
@@ -417,7 +420,7 @@ def can_user_appeal(user_id, appeal_type, reference_id=None):
             return cursor.fetchone() is None
 
     except Exception as e:
-        print(f"Error checking appeal eligibility: {e}")
+        logger.error("Error checking appeal eligibility: %s", e)
         return False
 
 
@@ -496,7 +499,7 @@ def bulk_review_appeals():
         })
 
     except Exception as e:
-        print(f"Error in bulk review: {e}")
+        logger.error("Error in bulk review: %s", e)
         return jsonify({'error': 'An error occurred during bulk processing'}), 500
 
 
@@ -509,7 +512,7 @@ def check_sharing_restrictions(user_id):
             result = cursor.fetchone()
             return result and result.get('sharing_blocked', False)
     except Exception as e:
-        print(f"Error checking sharing restrictions: {e}")
+        logger.error("Error checking sharing restrictions: %s", e)
         return False
 
 
@@ -521,5 +524,5 @@ def check_site_ban(user_id):
             result = cursor.fetchone()
             return result and result.get('status') == 'banned'
     except Exception as e:
-        print(f"Error checking site ban: {e}")
+        logger.error("Error checking site ban: %s", e)
         return False
\ No newline at end of file
@@ -0,0 +1,171 @@
+"""Fingerprinted, long-cached static assets.
+
+At startup every static file outside the upload folders (common.js,
+ui_photos/...) is hashed into a manifest, and text assets are precompressed
+with gzip, and with brotli when the Brotli package is installed, into
+ASSET_CACHE_DIR.
+
+url_for('static', filename=...) then adds the content hash to the URL
+(/static/common.js?v=3b1f0c9a2d4e), so the file can be served with
+`Cache-Control: public, max-age=31536000, immutable`: a changed file gets a
+new URL. Requests without the current hash, and legacy uploads, are served
+with `no-cache` so browsers revalidate them with the ETag. Content-addressed
+blobs (blobstore.py) are immutable as well: a blob is written once, already
+stripped of metadata, under the hash of its bytes, and its variants are
+derived from it.
+
+The static view serves the precompressed file matching the request's
+Accept-Encoding.
+"""
+import gzip
+import hashlib
+import logging
+import mimetypes
+import os
+
+from flask import request, send_from_directory
+from webapp import app
+from webapp.config import ASSET_CACHE_DIR
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, no-cache'
+
+# Static folders holding user uploads: not fingerprinted (see blobstore.py)
+UPLOAD_PREFIXES = ('events/', 'journeys/', 'avatars/', 'blobs/')
+# Final from the first write: metadata is stripped before a blob is stored
+IMMUTABLE_PREFIXES = ('blobs/',)
+
+COMPRESSIBLE_EXTENSIONS = {'.js', '.css', '.svg', '.json', '.txt', '.html', '.map'}
+MIN_COMPRESS_BYTES = 1024
+
+# Encodings in order of preference: (Accept-Encoding token, cache file suffix)
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+CACHE_DIR = ASSET_CACHE_DIR or os.path.join(os.path.dirname(app.root_path), 'asset_cache')
+
+# relative static path -> (mtime, content hash)
+_manifest = {}
+# relative static path -> set of available encodings
+_compressed = {}
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()[:12]
+
+
+def _precompress(relative, path):
+    encodings = set()
+    with open(path, 'rb') as f:
+        data = f.read()
+    target = os.path.join(CACHE_DIR, relative)
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target + '.gz', 'wb') as f:
+        f.write(gzip.compress(data, compresslevel=9, mtime=0))
+    encodings.add('gzip')
+    if brotli is not None:
+        with open(target + '.br', 'wb') as f:
+            f.write(brotli.compress(data))
+        encodings.add('br')
+    return encodings
+
+
+def _add(relative, path):
+    _manifest[relative] = (os.path.getmtime(path), _file_hash(path))
+    extension = os.path.splitext(relative)[1].lower()
+    if extension in COMPRESSIBLE_EXTENSIONS and os.path.getsize(path) >= MIN_COMPRESS_BYTES:
+        _compressed[relative] = _precompress(relative, path)
+    else:
+        _compressed.pop(relative, None)
+
+
+def build_manifest():
+    """Hash and precompress every non-upload static file, returns the number of assets"""
+    _manifest.clear()
+    _compressed.clear()
+    for root, _, files in os.walk(app.static_folder):
+        for name in files:
+            path = os.path.join(root, name)
+            relative = os.path.relpath(path, app.static_folder).replace(os.sep, '/')
+            if relative.startswith(UPLOAD_PREFIXES):
+                continue
+            try:
+                _add(relative, path)
+            except OSError as e:
+                logger.warning(f"Skipping static asset {relative}: {str(e)}")
+    return len(_manifest)
+
+
+def asset_hash(filename):
+    """Content hash of a static asset, or None for uploads and unknown files"""
+    entry = _manifest.get(filename)
+    if entry is None:
+        return None
+    if app.debug:
+        # Files are edited while the development server runs
+        path = os.path.join(app.static_folder, filename)
+        try:
+            if os.path.getmtime(path) != entry[0]:
+                _add(filename, path)
+                entry = _manifest[filename]
+        except OSError:
+            return None
+    return entry[1]
+
+
+@app.url_defaults
+def fingerprint_static_url(endpoint, values):
+    """Append ?v=<content hash> to url_for('static', ...)"""
+    if endpoint == 'static' and 'v' not in values:
+        version = asset_hash(values.get('filename'))
+        if version:
+            values['v'] = version
+
+
+def _preferred_encoding(filename):
+    available = _compressed.get(filename)
+    if not available:
+        return None
+    accepted = request.accept_encodings
+    for encoding, suffix in ENCODINGS:
+        if encoding in available and accepted[encoding]:
+            return encoding, suffix
+    return None
+
+
+def send_static_asset(filename):
+    """Static view: precompressed variant when accepted, cache headers by fingerprint"""
+    encoding = _preferred_encoding(filename)
+    if encoding:
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        response = send_from_directory(CACHE_DIR, filename + encoding[1], mimetype=mimetype)
+        response.headers['Content-Encoding'] = encoding[0]
+    else:
+        response = app.send_static_file(filename)
+    if filename in _compressed:
+        response.vary.add('Accept-Encoding')
+
+    version = request.args.get('v')
+    if filename.startswith(IMMUTABLE_PREFIXES) or (version and version == asset_hash(filename)):
+        response.headers['Cache-Control'] = IMMUTABLE
+    else:
+        response.headers['Cache-Control'] = REVALIDATE
+    return response
+
+
+def is_static_request():
+    return request.endpoint == 'static'
+
+
+app.view_functions['static'] = send_static_asset
+logger.info(f"Fingerprinted {build_manifest()} static assets")
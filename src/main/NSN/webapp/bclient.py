@@ -0,0 +1,185 @@
+"""HTTP client for the B-Client API.
+
+Every NSN -> B-Client call goes through one requests.Session, so connections
+are kept alive and reused (up to B_CLIENT_POOL_SIZE per worker process)
+instead of opening a new TCP connection per call. Calls use a short connect
+timeout and a read timeout per call site.
+
+A circuit breaker guards the API. After B_CLIENT_BREAKER_THRESHOLD
+consecutive failures (connection errors, timeouts, 5xx) the breaker opens
+and calls fail immediately with BClientUnavailable for
+B_CLIENT_BREAKER_RESET seconds, so a down or slow B-Client cannot tie up
+NSN's workers. After that one trial call is let through: it closes the
+breaker on success and reopens it on failure. Callers catch
+BClientUnavailable like any other request error and take their fallback
+path, e.g. the dashboard sends a C-Client to the login page.
+
+Calls whose result the request does not need (logout notification, session
+bind after login) are sent with notify() as background jobs (jobs.py), off
+the request path, and retried while B-Client is unavailable.
+"""
+import logging
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+from webapp import jobs
+from webapp.config import (B_CLIENT_API_URL, B_CLIENT_BREAKER_RESET, B_CLIENT_BREAKER_THRESHOLD,
+                           B_CLIENT_CONNECT_TIMEOUT, B_CLIENT_POOL_SIZE)
+
+logger = logging.getLogger(__name__)
+
+# Default read timeout (seconds) of request-path calls
+READ_TIMEOUT = 5
+# Read timeout of notify() calls, B-Client may push to C-Clients before answering
+NOTIFY_READ_TIMEOUT = 30
+
+
+class BClientUnavailable(requests.RequestException):
+    """The circuit breaker is open, the call was not attempted"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open -> half-open -> closed/open"""
+
+    def __init__(self, threshold=B_CLIENT_BREAKER_THRESHOLD, reset_seconds=B_CLIENT_BREAKER_RESET):
+        self.threshold = threshold
+        self.reset_seconds = reset_seconds
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.rejected = 0
+        self.opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self._opened_at is None:
+            return 'closed'
+        if now - self._opened_at >= self.reset_seconds:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        """Whether a call may be attempted now (one trial call at a time when half-open)"""
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("B-Client circuit breaker closed")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            trial = self._trial_running
+            self._trial_running = False
+            if trial or (self._opened_at is None and self._failures >= self.threshold):
+                if self._opened_at is None:
+                    self.opened += 1
+                    logger.warning(f"B-Client circuit breaker opened after {self._failures} failures")
+                self._opened_at = time.monotonic()
+
+    def stats(self):
+        with self._lock:
+            return {'state': self._state(time.monotonic()), 'consecutive_failures': self._failures,
+                    'times_opened': self.opened, 'rejected_calls': self.rejected}
+
+
+def _create_session(pool_size=B_CLIENT_POOL_SIZE):
+    http = requests.Session()
+    # No transport retries: a failing B-Client should trip the breaker, not be hammered
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+    http.mount('http://', adapter)
+    http.mount('https://', adapter)
+    return http
+
+
+_session = _create_session()
+breaker = CircuitBreaker()
+_notify_stats = {'queued': 0, 'sent': 0, 'failed': 0}
+_notify_stats_lock = threading.Lock()
+
+
+def request(method, path, timeout=READ_TIMEOUT, **kwargs):
+    """
+    Call B-Client at B_CLIENT_API_URL + path and return the Response
+
+    Raises BClientUnavailable while the breaker is open and requests'
+    exceptions on connection errors and timeouts. 5xx responses are
+    returned but count as failures.
+    """
+    if not breaker.allow():
+        raise BClientUnavailable(f"B-Client circuit breaker is open, skipped {method} {path}")
+    try:
+        response = _session.request(method, f"{B_CLIENT_API_URL}{path}",
+                                    timeout=(B_CLIENT_CONNECT_TIMEOUT, timeout), **kwargs)
+    except requests.RequestException:
+        breaker.record_failure()
+        raise
+    if response.status_code >= 500:
+        breaker.record_failure()
+    else:
+        breaker.record_success()
+    return response
+
+
+def get(path, params=None, timeout=READ_TIMEOUT):
+    return request('GET', path, timeout=timeout, params=params)
+
+
+def post(path, json=None, timeout=READ_TIMEOUT):
+    return request('POST', path, timeout=timeout, json=json)
+
+
+def _count(key):
+    with _notify_stats_lock:
+        _notify_stats[key] += 1
+
+
+@jobs.task('bclient_notify')
+def send_notification(path, payload):
+    """Job handler of notify(): raises, so the job is retried, when B-Client is unavailable"""
+    try:
+        response = post(path, json=payload, timeout=NOTIFY_READ_TIMEOUT)
+        if response.status_code >= 500:
+            raise requests.HTTPError(f"B-Client answered {response.status_code}")
+    except requests.RequestException:
+        _count('failed')
+        raise
+    _count('sent')
+    logger.info(f"B-Client notification {path}: {response.status_code} {response.text[:200]}")
+
+
+def notify(path, payload, key=None, local=False):
+    """
+    POST payload to B-Client in a background job, returns the job id
+
+    Payloads holding credentials (session cookies) must pass local=True so
+    they stay in this process's memory (see jobs.enqueue).
+    """
+    _count('queued')
+    return jobs.enqueue('bclient_notify', path, payload, key=key, local=local)
+
+
+def stats():
+    """Breaker and notification counters for /internal/metrics"""
+    with _notify_stats_lock:
+        notifications = dict(_notify_stats)
+    return {'breaker': breaker.stats(), 'notifications': notifications}
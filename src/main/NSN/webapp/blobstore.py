@@ -0,0 +1,369 @@
+"""Content-addressed store for uploaded images.
+
+An upload is stored once under the SHA-256 of its bytes after
+images.strip_upload() has removed their metadata, so a blob file never
+changes once written. Blobs live in sharded folders so no directory grows
+unbounded:
+    static/blobs/3f/a2/3fa2...e9.jpg
+The database columns (event_images.event_image, journeys.cover_image,
+users.profile_image) hold the blob key '3fa2...e9.jpg'. Names uploaded before
+the store existed ('1748428631_photo.png') still resolve to their old folder,
+see static_path().
+
+image_blobs counts the references to each blob. Uploading an image that is
+already stored only increments the count; removing one only decrements it,
+so neither touches the disk on the request path. collect_garbage() (CLI
+`flask --app webapp gc-image-blobs`, or every IMAGE_GC_INTERVAL seconds in a
+thread each process starts with its first request) first recounts the
+references from the three columns, which also catches rows removed by
+ON DELETE CASCADE, then deletes the files of blobs that have been
+unreferenced for longer than IMAGE_GC_GRACE_SECONDS. Files are written before
+the uploading transaction commits, so a rollback leaves a file without a row;
+sweep_orphan_files() removes those once they are older than the grace period.
+
+Writing or collecting a blob that may be unreferenced is serialized with a
+MySQL named lock (GET_LOCK), so a re-upload cannot lose its file to a
+concurrent collection.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from webapp import app
+from webapp import db
+from webapp import images
+from webapp.config import IMAGE_GC_GRACE_SECONDS, IMAGE_GC_INTERVAL
+
+BLOB_FOLDER = 'blobs'
+JOB_NAME = 'image_blob_gc'
+LOCK_TIMEOUT = 10
+HASH_CHUNK_SIZE = 64 * 1024
+SWEEP_BATCH = 200
+
+_BLOB_KEY_RE = re.compile(r'^[0-9a-f]{64}\.(jpg|png|gif|webp)$')
+_BLOB_STEM_RE = re.compile(r'^[0-9a-f]{64}$')
+
+_FORMAT_EXTENSIONS = {'JPEG': 'jpg', 'PNG': 'png', 'GIF': 'gif', 'WEBP': 'webp'}
+
+_scheduler_started = False
+_scheduler_lock = threading.Lock()
+
+
+def is_blob_key(name):
+    return bool(name) and _BLOB_KEY_RE.match(name) is not None
+
+
+def blob_path(key):
+    """'3fa2...e9.jpg' -> 'blobs/3f/a2/3fa2...e9.jpg' (relative to static/)"""
+    return f"{BLOB_FOLDER}/{key[:2]}/{key[2:4]}/{key}"
+
+
+@app.template_filter('upload_path')
+def static_path(name, folder):
+    """Path under static/ of a stored image name: a blob key, or a legacy file in folder"""
+    if not name:
+        return name
+    if is_blob_key(name):
+        return blob_path(name)
+    return f"{folder}/{name}"
+
+
+def avatar_url(filename, variant='thumb'):
+    """URL of a user's avatar variant, '' when the user has none"""
+    if not filename:
+        return ""
+    return '/static/' + images.image_variant(static_path(filename, 'avatars'), variant)
+
+
+def hash_upload(file):
+    """SHA-256 hex digest of an uploaded FileStorage, leaves the stream rewound"""
+    streamed = getattr(file.stream, 'sha256', None)
+    if streamed:
+        # Computed by uploads.UploadSpool while the upload arrived
+        return streamed
+    digest = hashlib.sha256()
+    file.stream.seek(0)
+    for chunk in iter(lambda: file.stream.read(HASH_CHUNK_SIZE), b''):
+        digest.update(chunk)
+    file.stream.seek(0)
+    return digest.hexdigest()
+
+
+def hash_file(path):
+    """SHA-256 hex digest of a file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _lock_name(key):
+    return f"blob:{key[:32]}"
+
+
+def _acquire(cursor, key):
+    cursor.execute('SELECT GET_LOCK(%s, %s) AS acquired', (_lock_name(key), LOCK_TIMEOUT))
+    if not cursor.fetchone()['acquired']:
+        raise TimeoutError(f"Could not lock image blob {key}")
+
+
+def _release_lock(cursor, key):
+    cursor.execute('SELECT RELEASE_LOCK(%s) AS released', (_lock_name(key),))
+    cursor.fetchone()
+
+
+def _write_blob(file, target):
+    """Atomically put the upload at target, hard-linking the spooled temp file when possible"""
+    tmp = f"{target}.tmp"
+    spooled = getattr(file.stream, 'name', None)
+    try:
+        if not isinstance(spooled, str):
+            raise OSError("upload is not spooled to a file")
+        file.stream.flush()
+        os.link(spooled, tmp)
+    except OSError:
+        file.stream.seek(0)
+        file.save(tmp)
+    os.replace(tmp, target)
+
+
+def store_upload(cursor, file, image_format):
+    """
+    Store a validated upload and take a reference to it, returns the blob key
+
+    image_format is what images.validate_upload() returned. Metadata is
+    stripped before hashing, so the key names the bytes that are served.
+    When the same bytes are already stored and referenced, nothing is written.
+    """
+    folder = os.path.join(app.static_folder, BLOB_FOLDER)
+    os.makedirs(folder, exist_ok=True)
+    stripped = images.strip_upload(file, image_format, folder)
+    try:
+        digest = hash_file(stripped) if stripped else hash_upload(file)
+        key = f"{digest}.{_FORMAT_EXTENSIONS[image_format]}"
+
+        # Fast path: a live blob cannot be collected, just count the new reference
+        cursor.execute('''
+            UPDATE image_blobs SET ref_count = ref_count + 1
+            WHERE blob_key = %s AND ref_count > 0
+        ''', (key,))
+        if cursor.rowcount == 1:
+            return key
+
+        _acquire(cursor, key)
+        try:
+            path = blob_path(key)
+            target = os.path.join(app.static_folder, path)
+            if not os.path.exists(target):
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if stripped:
+                    os.replace(stripped, target)
+                    stripped = None
+                else:
+                    _write_blob(file, target)
+                # Generate the thumb/medium variants in the background
+                images.schedule(path)
+            else:
+                # The file may have no row yet (rolled back upload): keep sweep_orphan_files() off it
+                os.utime(target)
+            cursor.execute('''
+                INSERT INTO image_blobs (blob_key, ref_count, size_bytes)
+                VALUES (%s, 1, %s)
+                ON DUPLICATE KEY UPDATE ref_count = GREATEST(ref_count, 0) + 1, orphaned_at = NULL
+            ''', (key, os.path.getsize(target)))
+        finally:
+            _release_lock(cursor, key)
+        return key
+    finally:
+        if stripped:
+            os.remove(stripped)
+
+
+def release(cursor, name, folder):
+    """
+    Drop one reference to a stored image name
+
+    Blob files are removed later by collect_garbage(). A legacy file is not
+    counted, so its static path is returned instead: the caller passes it to
+    delete_released() once the change is committed, because a rollback would
+    restore a row that still points at the file.
+    """
+    if not name:
+        return None
+    if not is_blob_key(name):
+        return f"{folder}/{name}"
+    cursor.execute('''
+        UPDATE image_blobs
+        SET orphaned_at = IF(ref_count <= 1, COALESCE(orphaned_at, NOW()), NULL),
+            ref_count = GREATEST(ref_count - 1, 0)
+        WHERE blob_key = %s
+    ''', (name,))
+    return None
+
+
+def delete_released(paths):
+    """Queue the legacy files returned by release() for deletion in a background job"""
+    for path in paths:
+        if path:
+            images.delete_later(path)
+
+
+def recount_references(cursor):
+    """Recompute every ref_count from the referencing columns, returns the rows changed"""
+    cursor.execute('''
+        UPDATE image_blobs b
+        LEFT JOIN (
+            SELECT blob_key, COUNT(*) AS refs FROM (
+                SELECT event_image AS blob_key FROM event_images
+                UNION ALL SELECT cover_image FROM journeys
+                UNION ALL SELECT profile_image FROM users
+            ) r
+            GROUP BY blob_key
+        ) r ON r.blob_key = b.blob_key
+        SET b.ref_count = COALESCE(r.refs, 0),
+            b.orphaned_at = IF(r.refs IS NULL, COALESCE(b.orphaned_at, NOW()), NULL)
+    ''')
+    return cursor.rowcount
+
+
+def collect_garbage(cursor, grace_seconds=IMAGE_GC_GRACE_SECONDS, now=None):
+    """Delete blobs unreferenced for longer than grace_seconds, returns the counts per step"""
+    now = now or datetime.now()
+    recounted = recount_references(cursor)
+
+    cutoff = now - timedelta(seconds=grace_seconds)
+    cursor.execute('''
+        SELECT blob_key FROM image_blobs
+        WHERE ref_count = 0 AND orphaned_at < %s
+    ''', (cutoff,))
+    candidates = [row['blob_key'] for row in cursor.fetchall()]
+
+    deleted = 0
+    for key in candidates:
+        _acquire(cursor, key)
+        try:
+            cursor.execute('''
+                DELETE FROM image_blobs
+                WHERE blob_key = %s AND ref_count = 0 AND orphaned_at < %s
+            ''', (key, cutoff))
+            if cursor.rowcount == 1:
+                images.delete_image(blob_path(key))
+                deleted += 1
+        finally:
+            _release_lock(cursor, key)
+
+    swept = sweep_orphan_files(cursor, cutoff)
+
+    cursor.execute('''
+        INSERT INTO batch_watermarks (job_name, last_run_at, rows_affected)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_run_at = VALUES(last_run_at), rows_affected = VALUES(rows_affected)
+    ''', (JOB_NAME, now, deleted + swept))
+    return {'recounted': recounted, 'deleted': deleted, 'swept': swept}
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def sweep_orphan_files(cursor, cutoff):
+    """
+    Delete blob files last modified before cutoff that no image_blobs row accounts for
+
+    These are blobs (with their variants) written by an upload whose
+    transaction rolled back, and temp files left by an interrupted write.
+    Returns the number of blobs and temp files removed.
+    """
+    folder = os.path.join(app.static_folder, BLOB_FOLDER)
+    cutoff_ts = cutoff.timestamp()
+    swept = 0
+    # key stem -> paths of the blob file and its variants
+    groups = {}
+    for directory, _, names in os.walk(folder):
+        for name in names:
+            path = os.path.join(directory, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except FileNotFoundError:
+                continue
+            stem = name.split('.', 1)[0]
+            if _BLOB_STEM_RE.match(stem) and not name.endswith('.tmp'):
+                groups.setdefault(stem, []).append((path, mtime))
+            elif mtime < cutoff_ts:
+                _remove_quietly(path)
+                swept += 1
+
+    old_stems = [stem for stem, files in groups.items() if all(mtime < cutoff_ts for _, mtime in files)]
+    for start in range(0, len(old_stems), SWEEP_BATCH):
+        batch = old_stems[start:start + SWEEP_BATCH]
+        keys = [f"{stem}.{extension}" for stem in batch for extension in _FORMAT_EXTENSIONS.values()]
+        cursor.execute(f"SELECT blob_key FROM image_blobs WHERE blob_key IN ({','.join(['%s'] * len(keys))})",
+                       keys)
+        known = {row['blob_key'].split('.', 1)[0] for row in cursor.fetchall()}
+        for stem in batch:
+            if stem in known:
+                continue
+            _acquire(cursor, stem)
+            try:
+                # store_upload() refreshes the mtime of a file it is about to reference again
+                paths = [path for path, _ in groups[stem]]
+                if all(not os.path.exists(path) or os.path.getmtime(path) < cutoff_ts for path in paths):
+                    for path in paths:
+                        _remove_quietly(path)
+                    swept += 1
+            finally:
+                _release_lock(cursor, stem)
+    return swept
+
+
+def start_gc_scheduler(interval=IMAGE_GC_INTERVAL):
+    """Run collect_garbage every `interval` seconds in a daemon thread (idempotent)"""
+    global _scheduler_started
+    if interval <= 0:
+        return False
+    with _scheduler_lock:
+        if _scheduler_started:
+            return False
+        _scheduler_started = True
+
+    def loop():
+        while True:
+            try:
+                with app.app_context():
+                    with db.get_cursor() as cursor:
+                        counts = collect_garbage(cursor)
+                    db.close_db()
+                app.logger.info(f"Image blob collection: {counts}")
+            except Exception as e:
+                app.logger.error(f"Image blob collection failed: {str(e)}")
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name='image-blob-gc', daemon=True).start()
+    return True
+
+
+@app.before_request
+def start_gc_scheduler_on_first_request():
+    # run.py's __main__ block does not run under a WSGI server
+    if not _scheduler_started:
+        start_gc_scheduler()
+
+
+@app.cli.command('gc-image-blobs')
+@click.option('--grace', type=int, default=IMAGE_GC_GRACE_SECONDS,
+              help='Seconds a blob must have been unreferenced before it is deleted.')
+def gc_image_blobs_command(grace):
+    """Recount image references and delete unreferenced image blobs."""
+    with db.get_cursor() as cursor:
+        counts = collect_garbage(cursor, grace)
+    db.close_db()
+    click.echo(f"Image blobs: {counts['recounted']} reference counts corrected, "
+               f"{counts['deleted']} blobs deleted, {counts['swept']} orphaned files swept")
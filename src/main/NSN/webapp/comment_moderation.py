@@ -1,3 +1,4 @@
+import logging
 from webapp import app
 from webapp import db
 from flask import redirect, render_template, request, session, url_for, flash, jsonify
@@ -5,6 +6,8 @@ from datetime import datetime
 from werkzeug.utils import secure_filename
 import os
 
+logger = logging.getLogger(__name__)
+
 
 @app.route('/moderation/comment/dashboard')
 def moderation_comment_dashboard():
@@ -151,7 +154,7 @@ def moderation_comment_action(report_id):
     except Exception as e:
         if conn:
             conn.rollback()
-        print(f"Error in moderation_action: {e}") # For debugging
+        logger.error("Error in moderation_action: %s", e) # For debugging
         return jsonify({'success': False, 'message': f'An error occurred: {str(e)}'}), 500
     finally:
         if conn:
@@ -13,4 +13,112 @@ B_CLIENT_WEBSOCKET_URL = os.getenv('B_CLIENT_WEBSOCKET_URL', 'ws://127.0.0.1:876
 # Local development
 NSN_URL = os.getenv('NSN_URL', 'http://localhost:5000')
 
+# B-Client HTTP client (see bclient.py)
+# B_CLIENT_POOL_SIZE: kept-alive connections per worker process
+# B_CLIENT_CONNECT_TIMEOUT: seconds to establish a connection
+# B_CLIENT_BREAKER_THRESHOLD: consecutive failures that open the circuit breaker
+# B_CLIENT_BREAKER_RESET: seconds the breaker stays open before a trial call
+B_CLIENT_POOL_SIZE = int(os.getenv('B_CLIENT_POOL_SIZE', '10'))
+B_CLIENT_CONNECT_TIMEOUT = float(os.getenv('B_CLIENT_CONNECT_TIMEOUT', '2'))
+B_CLIENT_BREAKER_THRESHOLD = int(os.getenv('B_CLIENT_BREAKER_THRESHOLD', '5'))
+B_CLIENT_BREAKER_RESET = float(os.getenv('B_CLIENT_BREAKER_RESET', '30'))
 
+
+# Departure Board timeline
+# When enabled, events are fanned out to followers' timelines on write and the
+# Departure Board reads from departure_board_timeline.
+# Run `flask --app webapp rebuild-timeline` after enabling it.
+DEPARTURE_BOARD_TIMELINE = os.getenv('DEPARTURE_BOARD_TIMELINE', 'false').lower() == 'true'
+
+# Subscription expiry batch job
+# Seconds between in-process expiry passes, started with the first request (or
+# by run.py); 0 disables the in-process scheduler (run
+# `flask --app webapp expire-subscriptions` from a scheduled task instead).
+SUBSCRIPTION_EXPIRY_INTERVAL = int(os.getenv('SUBSCRIPTION_EXPIRY_INTERVAL', '3600'))
+
+# MySQL connection pool
+# DB_POOL_SIZE: connections in the pool (mysql.connector allows at most 32)
+# DB_POOL_TIMEOUT: seconds a checkout waits for a free connection
+# DB_LEAK_THRESHOLD: seconds a connection may be held before it is logged as a leak
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', '20'))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '5'))
+DB_LEAK_THRESHOLD = float(os.getenv('DB_LEAK_THRESHOLD', '30'))
+
+# Read replica
+# When DB_REPLICA_HOST is set, cursors with READ intent (and views annotated
+# with @db.read_only) use a second pool on the replica. User, password and
+# database default to the primary's (connect.py). After a write a user's reads
+# stay on the primary for DB_REPLICA_STICKY_SECONDS to avoid stale reads.
+DB_REPLICA_HOST = os.getenv('DB_REPLICA_HOST', '')
+DB_REPLICA_USER = os.getenv('DB_REPLICA_USER', '')
+DB_REPLICA_PASSWORD = os.getenv('DB_REPLICA_PASSWORD', '')
+DB_REPLICA_NAME = os.getenv('DB_REPLICA_NAME', '')
+DB_REPLICA_STICKY_SECONDS = float(os.getenv('DB_REPLICA_STICKY_SECONDS', '5'))
+
+# Request instrumentation (see instrumentation.py)
+# REQUEST_METRICS: time requests and count/time their queries per endpoint
+# N_PLUS_ONE_THRESHOLD: runs of one statement in a request that get it logged as a likely N+1
+# SLOW_QUERY_MS: queries at least this slow are logged (0 disables the slow query log)
+# SLOW_QUERY_LOG_FILE: also write the slow query log to this file
+REQUEST_METRICS = os.getenv('REQUEST_METRICS', 'true').lower() == 'true'
+N_PLUS_ONE_THRESHOLD = int(os.getenv('N_PLUS_ONE_THRESHOLD', '10'))
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_LOG_FILE = os.getenv('SLOW_QUERY_LOG_FILE', '')
+
+# /internal/metrics is served to admins and to these client addresses
+INTERNAL_METRICS_ALLOWED_IPS = [ip.strip() for ip in
+                                os.getenv('INTERNAL_METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
+                                if ip.strip()]
+
+# Image upload pipeline (see images.py)
+# IMAGE_WORKERS: background threads that strip metadata and resize uploads
+# IMAGE_VARIANT_FORMAT: WEBP or JPEG for the thumb/medium variants
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', '2'))
+IMAGE_VARIANT_FORMAT = os.getenv('IMAGE_VARIANT_FORMAT', 'WEBP').upper()
+IMAGE_VARIANT_QUALITY = int(os.getenv('IMAGE_VARIANT_QUALITY', '80'))
+
+# Content-addressed image store (see blobstore.py)
+# IMAGE_GC_GRACE_SECONDS: how long an unreferenced blob is kept before deletion
+# IMAGE_GC_INTERVAL: seconds between in-process collections, started with the
+# first request (or by run.py); 0 disables it (run
+# `flask --app webapp gc-image-blobs` from a scheduled task instead)
+IMAGE_GC_GRACE_SECONDS = int(os.getenv('IMAGE_GC_GRACE_SECONDS', '86400'))
+IMAGE_GC_INTERVAL = int(os.getenv('IMAGE_GC_INTERVAL', '3600'))
+
+# Uploads (see uploads.py)
+# MAX_REQUEST_BYTES: Flask MAX_CONTENT_LENGTH, larger request bodies get 413 unread
+# MAX_UPLOAD_FILE_BYTES: limit per uploaded file
+# UPLOAD_TMP_DIR: where uploads are spooled, on the same filesystem as static/
+# so stored blobs can be hard-linked instead of copied (default NSN/upload_tmp)
+MAX_REQUEST_BYTES = int(os.getenv('MAX_REQUEST_BYTES', str(32 * 1024 * 1024)))
+MAX_UPLOAD_FILE_BYTES = int(os.getenv('MAX_UPLOAD_FILE_BYTES', str(5 * 1024 * 1024)))
+UPLOAD_TMP_DIR = os.getenv('UPLOAD_TMP_DIR', '')
+
+# Static assets (see assets.py): where gzip/brotli copies are written at startup
+# (default NSN/asset_cache)
+ASSET_CACHE_DIR = os.getenv('ASSET_CACHE_DIR', '')
+
+# Sessions (see sessions.py)
+# SESSION_BACKEND: cookie (Flask signed cookie, the default), database
+# (server-side, shared by all workers, web_sessions table) or memory
+# (server-side, only for a single process: other workers do not see the
+# session and a restart logs everyone out)
+SESSION_BACKEND = os.getenv('SESSION_BACKEND', 'cookie').lower()
+SESSION_MEMORY_MAX_ENTRIES = int(os.getenv('SESSION_MEMORY_MAX_ENTRIES', '10000'))
+
+# Background jobs (see jobs.py)
+# JOB_QUEUE_BACKEND: memory (this process) or database (job_queue table,
+# survives restarts and is shared by all workers)
+# JOB_WORKERS: worker threads per process
+# JOB_MAX_ATTEMPTS: runs of a failing job before it is marked failed
+# JOB_RETRY_DELAY: seconds before the first retry, doubled for every attempt
+JOB_QUEUE_BACKEND = os.getenv('JOB_QUEUE_BACKEND', 'memory').lower()
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+JOB_MAX_ATTEMPTS = int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_DELAY = float(os.getenv('JOB_RETRY_DELAY', '5'))
+
+# Logging (see logs.py)
+# LOG_LEVEL: DEBUG, INFO, WARNING or ERROR; DEBUG adds per-request traces
+# LOG_FILE: also write the log to this file
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO').upper()
+LOG_FILE = os.getenv('LOG_FILE', '')
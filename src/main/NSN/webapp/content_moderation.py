@@ -1,3 +1,4 @@
+import logging
 from webapp import app
 from webapp import db
 from flask import redirect, render_template, request, session, url_for, flash, jsonify
@@ -5,6 +6,8 @@ from datetime import datetime
 from werkzeug.utils import secure_filename
 import os
 
+logger = logging.getLogger(__name__)
+
 # Modify the moderation_dashboard function to ensure that reports for all states can be seen
 @app.route('/moderation/content/dashboard')
 def moderation_content_dashboard():
@@ -55,7 +58,7 @@ def moderation_content_dashboard():
             db.close_db()
 
     except Exception as e:
-        print(f"Error fetching journey reports: {e}")
+        logger.error("Error fetching journey reports: %s", e)
         flash('Error loading journey reports.', 'danger')
         reported_journeys = []
 
@@ -157,7 +160,7 @@ def moderation_content_action(report_id):
     except Exception as e:
         if conn:
             conn.rollback()
-        print(f"Error in moderation_action: {e}") # For debugging
+        logger.error("Error in moderation_action: %s", e) # For debugging
         return jsonify({'success': False, 'message': f'An error occurred: {str(e)}'}), 500
     finally:
         if conn:
@@ -233,7 +236,7 @@ def journey_batch_moderation_action():
     except Exception as e:
         if conn:
             conn.rollback()
-        print(f"Error in batch journey moderation: {e}")
+        logger.error("Error in batch journey moderation: %s", e)
         return jsonify({'success': False, 'message': f'An error occurred: {str(e)}'}), 500
 
     finally:
@@ -1,45 +1,348 @@
+import functools
+import logging
+import threading
+import time
 
-from flask import Flask, g
+from flask import Flask, g, has_request_context, request, session
+from mysql.connector import errors
 from mysql.connector.pooling import MySQLConnectionPool
 
-connection_pool: MySQLConnectionPool
+from webapp.config import DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_LEAK_THRESHOLD, DB_REPLICA_STICKY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Cursor intents: READ may be served by the replica, WRITE always uses the primary
+READ = 'read'
+WRITE = 'write'
+
+# Requests with these methods are not expected to write
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Session key holding the time of the user's last write (read-your-writes stickiness)
+LAST_WRITE_SESSION_KEY = '_db_last_write'
+
+# Upper bounds (milliseconds) of the checkout latency histogram buckets
+LATENCY_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+
+class PoolTimeout(errors.PoolError):
+    """No connection became available within the checkout timeout"""
+
+
+class PoolMetrics:
+    """Counters and checkout latency histogram of an InstrumentedPool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.waits = 0
+        self.wait_seconds = 0.0
+        self.timeouts = 0
+        self.health_failures = 0
+        self.leaks = 0
+        self.hold_seconds = 0.0
+        self.max_hold_seconds = 0.0
+        self.releases = 0
+        self.latency_buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)  # last bucket is +Inf
+
+    def record_checkout(self, elapsed, waited):
+        elapsed_ms = elapsed * 1000
+        with self._lock:
+            self.checkouts += 1
+            if waited:
+                self.waits += 1
+                self.wait_seconds += elapsed
+            for i, bound in enumerate(LATENCY_BUCKETS_MS):
+                if elapsed_ms <= bound:
+                    self.latency_buckets[i] += 1
+                    break
+            else:
+                self.latency_buckets[-1] += 1
+
+    def record_release(self, held):
+        with self._lock:
+            self.releases += 1
+            self.hold_seconds += held
+            self.max_hold_seconds = max(self.max_hold_seconds, held)
+
+    def increment(self, name):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def snapshot(self):
+        with self._lock:
+            buckets = {}
+            cumulative = 0
+            for bound, count in zip(LATENCY_BUCKETS_MS + ('+Inf',), self.latency_buckets):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            return {
+                'checkouts': self.checkouts,
+                'waits': self.waits,
+                'wait_seconds_total': round(self.wait_seconds, 6),
+                'timeouts': self.timeouts,
+                'health_check_failures': self.health_failures,
+                'leaks_detected': self.leaks,
+                'releases': self.releases,
+                'hold_seconds_total': round(self.hold_seconds, 6),
+                'hold_seconds_max': round(self.max_hold_seconds, 6),
+                'checkout_latency_ms': buckets,
+            }
+
+
+class _Checkout:
+    __slots__ = ('started', 'owner', 'flagged')
+
+    def __init__(self, owner):
+        self.started = time.monotonic()
+        self.owner = owner
+        self.flagged = False
+
+
+class InstrumentedPool:
+    """
+    MySQLConnectionPool with blocking checkout, health checks and leak detection
+
+    mysql.connector raises PoolError as soon as every connection is in use; here
+    a checkout waits up to `timeout` seconds for a free slot instead. Each
+    checked-out connection is pinged before it is handed out, and connections
+    held longer than `leak_threshold` seconds are logged once as suspected leaks.
+    Connections must be given back with release().
+    """
+
+    def __init__(self, size, timeout, leak_threshold, **connect_args):
+        self.size = size
+        self.timeout = timeout
+        self.leak_threshold = leak_threshold
+        self.metrics = PoolMetrics()
+        self._pool = MySQLConnectionPool(pool_size=size, **connect_args)
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._checked_out = {}
+
+    @staticmethod
+    def _owner():
+        if has_request_context():
+            return f"{request.method} {request.path}"
+        return f"thread {threading.current_thread().name}"
+
+    def get_connection(self):
+        started = time.perf_counter()
+        waited = not self._slots.acquire(blocking=False)
+        if waited:
+            self.report_leaks()
+            if not self._slots.acquire(timeout=self.timeout):
+                self.metrics.increment('timeouts')
+                raise PoolTimeout(f"No database connection available within {self.timeout}s "
+                                  f"(pool size {self.size}, {self.in_use()} in use)")
+        try:
+            conn = self._pool.get_connection()
+            self._check_health(conn)
+        except Exception:
+            self._slots.release()
+            raise
+
+        self.metrics.record_checkout(time.perf_counter() - started, waited)
+        with self._lock:
+            self._checked_out[id(conn)] = _Checkout(self._owner())
+        return conn
+
+    def _check_health(self, conn):
+        """Ping the connection (reconnecting once) so callers never get a dead one"""
+        try:
+            conn.ping(reconnect=True, attempts=1, delay=0)
+        except errors.Error:
+            self.metrics.increment('health_failures')
+            try:
+                conn.close()
+            except errors.Error:
+                pass
+            raise
+
+    def release(self, conn):
+        with self._lock:
+            checkout = self._checked_out.pop(id(conn), None)
+        try:
+            conn.close()
+        finally:
+            self._slots.release()
+            if checkout:
+                self.metrics.record_release(time.monotonic() - checkout.started)
+
+    def in_use(self):
+        with self._lock:
+            return len(self._checked_out)
+
+    def report_leaks(self):
+        """Log connections held longer than leak_threshold (once each), returns their owners"""
+        now = time.monotonic()
+        leaked = []
+        with self._lock:
+            for checkout in self._checked_out.values():
+                held = now - checkout.started
+                if held > self.leak_threshold and not checkout.flagged:
+                    checkout.flagged = True
+                    leaked.append((checkout.owner, held))
+        for owner, held in leaked:
+            self.metrics.increment('leaks')
+            logger.warning(f"Database connection held for {held:.1f}s by {owner} (possible leak)")
+        return [owner for owner, _ in leaked]
+
+    def stats(self):
+        snapshot = self.metrics.snapshot()
+        snapshot.update({
+            'pool_size': self.size,
+            'in_use': self.in_use(),
+            'checkout_timeout_seconds': self.timeout,
+            'leak_threshold_seconds': self.leak_threshold,
+        })
+        return snapshot
+
+
+connection_pool: InstrumentedPool
+replica_pool = None
 
 
 def init_db(app: Flask, user: str, password: str, host: str, database: str,
-            pool_name: str = "flask_db_pool", autocommit: bool = True):
+            pool_name: str = "flask_db_pool", autocommit: bool = True,
+            pool_size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT,
+            leak_threshold: float = DB_LEAK_THRESHOLD):
 
 
     global connection_pool
-    connection_pool = MySQLConnectionPool(
+    connection_pool = InstrumentedPool(
+        size=pool_size,
+        timeout=timeout,
+        leak_threshold=leak_threshold,
         user=user,
         password=password,
         host=host,
         database=database,
         pool_name=pool_name,
-        autocommit=autocommit,
-        pool_size=20)
+        autocommit=autocommit)
 
 
-    app.teardown_appcontext(close_db)
+    app.teardown_appcontext(release_db)
+    app.after_request(remember_write)
 
 
-def get_db():
+def init_replica(user: str, password: str, host: str, database: str,
+                 pool_name: str = "flask_db_replica_pool",
+                 pool_size: int = DB_POOL_SIZE, timeout: float = DB_POOL_TIMEOUT,
+                 leak_threshold: float = DB_LEAK_THRESHOLD):
+    """Add a second pool (read replica) that serves READ cursors"""
 
+    global replica_pool
+    replica_pool = InstrumentedPool(
+        size=pool_size,
+        timeout=timeout,
+        leak_threshold=leak_threshold,
+        user=user,
+        password=password,
+        host=host,
+        database=database,
+        pool_name=pool_name,
+        autocommit=True)
+
+
+def read_only(view):
+    """
+    Annotate a read-only view: its cursors default to READ intent
+
+    Only annotate handlers that never write; an explicit get_cursor(WRITE)
+    still goes to the primary.
+    """
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        g.db_intent = READ
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def mark_write():
+    """Record that this request wrote, so the user's next reads stay on the primary"""
+    g.db_wrote = True
+
+
+def _recently_wrote():
+    if g.get('db_wrote'):
+        return True
+    if not has_request_context():
+        return False
+    last_write = session.get(LAST_WRITE_SESSION_KEY)
+    return bool(last_write) and time.time() - last_write < DB_REPLICA_STICKY_SECONDS
+
+
+def _use_replica(intent):
+    return intent == READ and replica_pool is not None and not _recently_wrote()
+
+
+def get_db(intent=None):
+
+    intent = intent or g.get('db_intent', WRITE)
+    if _use_replica(intent):
+        if 'db_replica' not in g:
+            g.db_replica = replica_pool.get_connection()
+        return g.db_replica
+
+    if intent == WRITE and has_request_context() and request.method not in SAFE_METHODS:
+        mark_write()
     if 'db' not in g:
         g.db = connection_pool.get_connection()
 
     return g.db
 
 
-def get_cursor():
-   
-    return get_db().cursor(dictionary=True, buffered=True)
+# Set by instrumentation.py to wrap every cursor (query counting and timing)
+cursor_hook = None
+
+
+def get_cursor(intent=None):
+    """Dictionary cursor; intent READ may be routed to the replica (default WRITE, or READ in read_only views)"""
+
+    cursor = get_db(intent).cursor(dictionary=True, buffered=True)
+    if cursor_hook is not None:
+        return cursor_hook(cursor)
+    return cursor
+
+
+def remember_write(response):
+    """Keep the user's reads on the primary for DB_REPLICA_STICKY_SECONDS after a write"""
+    if g.get('db_wrote') and replica_pool is not None:
+        session[LAST_WRITE_SESSION_KEY] = time.time()
+    return response
 
 
 def close_db(exception=None):
-   
+    """
+    Give the connection back to the pool
+
+    During a request this is deferred to the end of the request: handlers often
+    call close_db() inside a `with get_cursor()` block and keep using the cursor,
+    which must not touch a connection another request has already checked out.
+    """
+    if has_request_context():
+        return
+    release_db(exception)
+
+
+def release_db(exception=None):
+    """Return this context's connections to their pools (app context teardown)"""
 
     db = g.pop('db', None)
 
     if db is not None:
-        db.close()
+        connection_pool.release(db)
+
+    replica = g.pop('db_replica', None)
+
+    if replica is not None:
+        replica_pool.release(replica)
+
+
+def pool_stats():
+    """Metrics of the connection pools (see InstrumentedPool.stats)"""
+    stats = {'primary': connection_pool.stats()}
+    if replica_pool is not None:
+        stats['replica'] = replica_pool.stats()
+    return stats
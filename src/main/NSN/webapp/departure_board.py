@@ -3,7 +3,10 @@ from webapp import connect
 from webapp import db
 from webapp import app
 from webapp import premium
+from webapp import timeline
+from webapp.utils import encode_keyset_cursor, decode_keyset_cursor
 import math
+import time
 
 
 @app.route('/debug_session')
@@ -89,6 +92,7 @@ def follow_source():
                 return jsonify({'success': False, 'message': 'Invalid source type'}), 400
             
             if cursor.rowcount > 0:
+                timeline.refresh_user(cursor, user_id)
                 return jsonify({
                     'success': True, 
                     'message': f'Successfully followed {source_name}',
@@ -158,6 +162,7 @@ def unfollow_source():
                 return jsonify({'success': False, 'message': 'Invalid source type'}), 400
             
             if cursor.rowcount > 0:
+                timeline.refresh_user(cursor, user_id)
                 return jsonify({
                     'success': True, 
                     'message': f'Successfully unfollowed {source_name}',
@@ -172,258 +177,360 @@ def unfollow_source():
     finally:
         db.close_db()
 
+# Departure board feed engine
+# The feed is paged in SQL, ordered by (last_update, event_id). Each followed
+# source contributes one UNION ALL branch of narrow (event_id, last_update, source)
+# rows; GROUP BY collapses events reached through several sources and derives
+# all_sources in the same query. Only the rows of the requested page are joined
+# to their journey/author/location details. With DEPARTURE_BOARD_TIMELINE the
+# page rows come from the materialized timeline instead (see timeline.py).
+
+FEED_PER_PAGE = 6
+FEED_COUNT_TTL = 60  # seconds a cached feed size stays valid
+
+# Only events of open journeys by active authors are shown, whichever source reaches them
+FEED_VISIBLE_JOIN = 'JOIN journeys j ON e.journey_id = j.journey_id JOIN users u ON j.user_id = u.user_id'
+FEED_VISIBLE = "j.status = 'open' AND u.status = 'active'"
+
+# (source, WHERE template taking the followed id placeholders)
+FEED_BRANCHES = [
+    ('followed_journey', 'e.journey_id IN ({placeholders})'),
+    ('followed_user', 'j.user_id IN ({placeholders})'),
+    ('followed_location', 'e.location_id IN ({placeholders})'),
+]
+
+# Stored generated column COALESCE(updated_at, created_at), indexed with journey_id and location_id
+FEED_LAST_UPDATE = 'e.last_update'
+
+# user_id -> (follow set key, expires_at, total_events)
+_feed_count_cache = {}
+
+
+def get_followed_sources(cursor, user_id):
+    """Return the journeys, users and locations a user follows"""
+    cursor.execute('''
+        SELECT jf.journey_id, j.title as journey_title, j.user_id as journey_owner_id,
+               u.username as journey_owner, jf.created_at as followed_since
+        FROM journey_follows jf
+        JOIN journeys j ON jf.journey_id = j.journey_id
+        JOIN users u ON j.user_id = u.user_id
+        WHERE jf.user_id = %s AND j.status = 'open'
+        ORDER BY jf.created_at DESC
+    ''', (user_id,))
+    followed_journeys = cursor.fetchall()
+
+    cursor.execute('''
+        SELECT uf.followed_id as user_id, u.username, u.first_name, u.last_name,
+               uf.created_at as followed_since
+        FROM user_follows uf
+        JOIN users u ON uf.followed_id = u.user_id
+        WHERE uf.follower_id = %s AND u.status = 'active'
+        ORDER BY uf.created_at DESC
+    ''', (user_id,))
+    followed_users = cursor.fetchall()
+
+    cursor.execute('''
+        SELECT lf.location_id, l.address,
+               lf.created_at as followed_since
+        FROM location_follows lf
+        JOIN locations l ON lf.location_id = l.location_id
+        WHERE lf.user_id = %s
+        ORDER BY lf.created_at DESC
+    ''', (user_id,))
+    followed_locations = cursor.fetchall()
+
+    return followed_journeys, followed_users, followed_locations
+
+
+def encode_feed_cursor(event):
+    """Encode the keyset position of an event as '<last_update iso>_<event_id>'"""
+    return encode_keyset_cursor(event['last_update'], event['event_id'])
+
+
+def decode_feed_cursor(value):
+    """Decode a feed cursor, returning (last_update, event_id) or None if invalid"""
+    return decode_keyset_cursor(value)
+
+
+def _feed_branches(followed_ids, columns, after=None, limit=None):
+    """Build the UNION ALL branches for the sources the user follows"""
+    branches = []
+    params = []
+    for source, condition in FEED_BRANCHES:
+        ids = followed_ids.get(source)
+        if not ids:
+            continue
+        where = f"{condition.format(placeholders=','.join(['%s'] * len(ids)))} AND {FEED_VISIBLE}"
+        branch_params = list(ids)
+        if after:
+            where += f' AND ({FEED_LAST_UPDATE} < %s OR ({FEED_LAST_UPDATE} = %s AND e.event_id < %s))'
+            branch_params.extend([after[0], after[0], after[1]])
+        sql = f"SELECT {columns.format(source=source)} FROM events e {FEED_VISIBLE_JOIN} WHERE {where}"
+        if limit is not None:
+            # Each branch only needs its own first rows past the cursor
+            sql = f"({sql} ORDER BY last_update DESC, e.event_id DESC LIMIT %s)"
+            branch_params.append(limit)
+        branches.append(sql)
+        params.extend(branch_params)
+    return branches, params
+
+
+def count_feed_events(cursor, user_id, followed_ids):
+    """Return the number of distinct events in a user's feed (cached briefly)
+
+    The cache entry is keyed by the followed ids too, so following or unfollowing
+    anything (from any page) invalidates it without explicit hooks.
+    """
+    follow_key = tuple(tuple(sorted(ids)) for _, ids in sorted(followed_ids.items()))
+    cached = _feed_count_cache.get(user_id)
+    if cached and cached[0] == follow_key and cached[1] > time.time():
+        return cached[2]
+
+    branches, params = _feed_branches(followed_ids, 'e.event_id')
+    total = 0
+    if branches:
+        cursor.execute(f"SELECT COUNT(*) AS total FROM ({' UNION '.join(branches)}) feed", params)
+        total = cursor.fetchone()['total']
+
+    _feed_count_cache[user_id] = (follow_key, time.time() + FEED_COUNT_TTL, total)
+    return total
+
+
+def _follow_page_query(followed_ids, offset, limit, after=None):
+    """Build the page query over the live follow tables, returns (sql, params) or None"""
+    branches, params = _feed_branches(
+        followed_ids,
+        f"e.event_id, {FEED_LAST_UPDATE} AS last_update, '{{source}}' AS source",
+        after=after,
+        limit=offset + limit
+    )
+    if not branches:
+        return None
+
+    sql = f'''
+        SELECT feed.event_id, feed.last_update,
+               MAX(feed.source = 'followed_journey') AS from_journey,
+               MAX(feed.source = 'followed_user') AS from_user,
+               MAX(feed.source = 'followed_location') AS from_location
+        FROM ({' UNION ALL '.join(branches)}) feed
+        GROUP BY feed.event_id, feed.last_update
+        ORDER BY feed.last_update DESC, feed.event_id DESC
+        LIMIT %s OFFSET %s
+    '''
+    return sql, params + [limit, offset]
+
+
+def fetch_feed_page(cursor, user_id, followed_ids, page=1, per_page=FEED_PER_PAGE, after=None,
+                    use_timeline=None):
+    """
+    Fetch one page of feed events
+
+    With a cursor (the position of the last event on the previous page) the page
+    is read by keyset; otherwise it falls back to OFFSET for direct page jumps.
+    The page comes from the materialized timeline when it is enabled (or
+    use_timeline is True), otherwise from the follow tables.
+    Returns (events, next_cursor).
+    """
+    if use_timeline is None:
+        use_timeline = timeline.timeline_enabled()
+
+    offset = 0 if after else (page - 1) * per_page
+    # One extra row tells us whether there is a next page
+    limit = per_page + 1
+
+    if use_timeline:
+        page_query = timeline.timeline_page_query(user_id, offset, limit, after)
+    else:
+        page_query = _follow_page_query(followed_ids, offset, limit, after)
+    if page_query is None:
+        return [], None
+    page_sql, params = page_query
+
+    cursor.execute(f'''
+        SELECT e.event_id, e.title as event_title, e.description as event_description,
+               e.start_time, e.end_time, e.event_image, e.journey_id, e.location_id,
+               j.title as journey_title, j.user_id as journey_owner_id,
+               u.username as journey_owner, l.address as location_address,
+               feed_page.last_update, e.created_at as event_created,
+               feed_page.from_journey, feed_page.from_user, feed_page.from_location
+        FROM ({page_sql}) feed_page
+        JOIN events e ON e.event_id = feed_page.event_id
+        JOIN journeys j ON e.journey_id = j.journey_id
+        JOIN users u ON j.user_id = u.user_id
+        LEFT JOIN locations l ON e.location_id = l.location_id
+        ORDER BY feed_page.last_update DESC, feed_page.event_id DESC
+    ''', params)
+    events = cursor.fetchall()
+
+    next_cursor = None
+    if len(events) > per_page:
+        events = events[:per_page]
+        next_cursor = encode_feed_cursor(events[-1])
+
+    return [annotate_feed_event(event) for event in events], next_cursor
+
+
+def annotate_feed_event(event):
+    """Attach follow sources and follow recommendations to a feed event"""
+    sources = []
+
+    if event.pop('from_journey', 0):
+        sources.append('followed_journey')
+        event['source_journey_id'] = event['journey_id']
+
+    if event.pop('from_user', 0):
+        sources.append('followed_user')
+        event['source_user_id'] = event['journey_owner_id']
+
+    if event.pop('from_location', 0) and event.get('location_id'):
+        sources.append('followed_location')
+        event['source_location_id'] = event.get('location_id')
+
+    # Set primary source
+    if 'followed_user' in sources:
+        event['follow_source'] = 'followed_user'
+    elif 'followed_journey' in sources:
+        event['follow_source'] = 'followed_journey'
+    elif 'followed_location' in sources:
+        event['follow_source'] = 'followed_location'
+    else:
+        event['follow_source'] = 'unknown'
+
+    event['all_sources'] = sources
+
+    # Generate recommendations
+    recommendations = []
+
+    if 'followed_journey' not in sources:
+        recommendations.append({
+            'type': 'journey',
+            'id': event['journey_id'],
+            'name': event['journey_title'],
+            'reason': 'Follow this journey'
+        })
+
+    if 'followed_user' not in sources:
+        recommendations.append({
+            'type': 'user',
+            'id': event['journey_owner_id'],
+            'name': event['journey_owner'],
+            'reason': 'Follow this author'
+        })
+
+    if 'followed_location' not in sources and event.get('location_id') and event.get('location_address'):
+        recommendations.append({
+            'type': 'location',
+            'id': event.get('location_id'),
+            'name': event.get('location_address'),
+            'reason': 'Follow this location'
+        })
+
+    event['recommendations'] = recommendations
+    return event
+
+
+def get_feed(cursor, user_id, page=1, after=None, per_page=FEED_PER_PAGE):
+    """Load the followed sources, one page of feed events and the feed size for a user"""
+    followed_journeys, followed_users, followed_locations = get_followed_sources(cursor, user_id)
+    followed_ids = {
+        'followed_journey': [journey['journey_id'] for journey in followed_journeys],
+        'followed_user': [user['user_id'] for user in followed_users],
+        'followed_location': [loc['location_id'] for loc in followed_locations],
+    }
+
+    events, next_cursor = fetch_feed_page(cursor, user_id, followed_ids, page, per_page, decode_feed_cursor(after))
+    if not events and page == 1:
+        total_events = 0
+    elif timeline.timeline_enabled():
+        total_events = timeline.count_timeline(cursor, user_id)
+    else:
+        total_events = count_feed_events(cursor, user_id, followed_ids)
+
+    return {
+        'followed_journeys': followed_journeys,
+        'followed_users': followed_users,
+        'followed_locations': followed_locations,
+        'events': events,
+        'next_cursor': next_cursor,
+        'total_events': total_events,
+        'total_pages': math.ceil(total_events / per_page) if total_events > 0 else 1,
+    }
+
+
 @app.route('/departure_board')
 @app.route('/departure_board/<int:page>')
+@db.read_only
 def departure_board(page=1):
     """Departure Board - Show recent events from followed journeys with pagination"""
-    
+
     # Handle page refresh - if it's a POST request (refresh), redirect to page 1
     if request.method == 'POST' or (request.referrer and 'departure_board' in request.referrer and page > 1):
         # Check if this is a refresh by looking at request headers
         if request.headers.get('Cache-Control') == 'no-cache' or request.headers.get('Pragma') == 'no-cache':
             return redirect(url_for('departure_board', page=1))
-    
+
     # Check if user is logged in
     if 'loggedin' not in session:
         return redirect(url_for('login'))
-    
+
     role = session.get('role', '')
     user_id = session.get('user_id')
-    
+
     # Check if user has permission (paid subscriber or staff)
     is_member = premium.checkMember(user_id)
     has_premium = is_member and is_member.get('m_status') != 'expired'
     is_staff = role in ['admin', 'editor']
-    
+
     if not (is_staff or has_premium):
         flash("Access denied. Only premium members and staff can access the Departure Board.", "warning")
         return redirect(url_for('list_premium'))
-    
+
     # Pagination settings
-    per_page = 6  # Number of events per page
-    offset = (page - 1) * per_page
-    
+    per_page = FEED_PER_PAGE  # Number of events per page
+
     followed_events = []
     followed_journeys = []
     followed_users = []
     followed_locations = []
+    next_cursor = None
     total_events = 0
     total_pages = 0
-    
+
     try:
         with db.get_cursor() as cursor:
-            # Get all journeys the user is following
-            cursor.execute('''
-                SELECT jf.journey_id, j.title as journey_title, j.user_id as journey_owner_id,
-                       u.username as journey_owner, jf.created_at as followed_since
-                FROM journey_follows jf
-                JOIN journeys j ON jf.journey_id = j.journey_id
-                JOIN users u ON j.user_id = u.user_id
-                WHERE jf.user_id = %s AND j.status = 'open'
-                ORDER BY jf.created_at DESC
-            ''', (user_id,))
-            followed_journeys = cursor.fetchall()
-            
-            # Get all users the user is following
-            cursor.execute('''
-                SELECT uf.followed_id as user_id, u.username, u.first_name, u.last_name,
-                       uf.created_at as followed_since
-                FROM user_follows uf
-                JOIN users u ON uf.followed_id = u.user_id
-                WHERE uf.follower_id = %s AND u.status = 'active'
-                ORDER BY uf.created_at DESC
-            ''', (user_id,))
-            followed_users = cursor.fetchall()
-            
-            # Get all locations the user is following
-            cursor.execute('''
-                SELECT lf.location_id, l.address,
-                       lf.created_at as followed_since
-                FROM location_follows lf
-                JOIN locations l ON lf.location_id = l.location_id
-                WHERE lf.user_id = %s
-                ORDER BY lf.created_at DESC
-            ''', (user_id,))
-            followed_locations = cursor.fetchall()
-            
-            # Create sets of followed IDs for efficient lookups
-            followed_journey_ids = {journey['journey_id'] for journey in followed_journeys}
-            followed_user_ids = {user['user_id'] for user in followed_users}
-            followed_location_ids = {loc['location_id'] for loc in followed_locations}
-            
-            # Build UNION queries for efficient event retrieval
-            union_queries = []
-            all_params = []
-            
-            # Add followed journeys
-            if followed_journeys:
-                journey_ids = [journey['journey_id'] for journey in followed_journeys]
-                placeholders = ','.join(['%s'] * len(journey_ids))
-                union_queries.append(f'''
-                    SELECT e.event_id, e.title as event_title, e.description as event_description,
-                        e.start_time, e.end_time, e.event_image, e.journey_id, e.location_id,
-                        j.title as journey_title, j.user_id as journey_owner_id,
-                        u.username as journey_owner, l.address as location_address,
-                        COALESCE(e.updated_at, e.created_at) as last_update,
-                        e.created_at as event_created
-                    FROM events e
-                    JOIN journeys j ON e.journey_id = j.journey_id
-                    JOIN users u ON j.user_id = u.user_id
-                    LEFT JOIN locations l ON e.location_id = l.location_id
-                    WHERE e.journey_id IN ({placeholders}) AND j.status = 'open'
-                ''')
-                all_params.extend(journey_ids)
-
-            # Add followed users
-            if followed_users:
-                user_ids = [user['user_id'] for user in followed_users]
-                placeholders = ','.join(['%s'] * len(user_ids))
-                union_queries.append(f'''
-                    SELECT e.event_id, e.title as event_title, e.description as event_description,
-                        e.start_time, e.end_time, e.event_image, e.journey_id, e.location_id,
-                        j.title as journey_title, j.user_id as journey_owner_id,
-                        u.username as journey_owner, l.address as location_address,
-                        COALESCE(e.updated_at, e.created_at) as last_update,
-                        e.created_at as event_created
-                    FROM events e
-                    JOIN journeys j ON e.journey_id = j.journey_id
-                    JOIN users u ON j.user_id = u.user_id
-                    LEFT JOIN locations l ON e.location_id = l.location_id
-                    WHERE j.user_id IN ({placeholders}) AND j.status = 'open'
-                ''')
-                all_params.extend(user_ids)
-
-            # Add followed locations
-            if followed_locations:
-                location_ids = [loc['location_id'] for loc in followed_locations]
-                location_placeholders = ','.join(['%s'] * len(location_ids))
-                union_queries.append(f'''
-                    SELECT e.event_id, e.title as event_title, e.description as event_description,
-                           e.start_time, e.end_time, e.event_image, e.journey_id, e.location_id,
-                           j.title as journey_title, j.user_id as journey_owner_id,
-                           u.username as journey_owner, l.address as location_address,
-                           COALESCE(e.updated_at, e.created_at) as last_update,
-                           e.created_at as event_created
-                    FROM events e
-                    JOIN journeys j ON e.journey_id = j.journey_id
-                    JOIN users u ON j.user_id = u.user_id
-                    LEFT JOIN locations l ON e.location_id = l.location_id
-                    WHERE e.location_id IN ({location_placeholders})
-                ''')
-                all_params.extend(location_ids)
-            
-            if union_queries:
-                # Combine queries with UNION and sort by update time
-                final_query = f'''
-                    SELECT event_id, event_title, event_description, start_time, end_time, 
-                        event_image, journey_id, location_id, journey_title, journey_owner_id,
-                        journey_owner, location_address, last_update, event_created
-                    FROM (
-                        {' UNION '.join(union_queries)}
-                    ) combined_events
-                    ORDER BY last_update DESC, start_time DESC
-                '''
-                
-                cursor.execute(final_query, all_params)
-                followed_events = cursor.fetchall()
-
-                # Process events for source detection and recommendations
-                final_events = []
-                for event in followed_events:
-                    # Determine event source
-                    sources = []
-                    
-                    if event['journey_id'] in followed_journey_ids:
-                        sources.append('followed_journey')
-                        event['source_journey_id'] = event['journey_id']
-                    
-                    if event['journey_owner_id'] in followed_user_ids:
-                        sources.append('followed_user')
-                        event['source_user_id'] = event['journey_owner_id']
-                    
-                    if event.get('location_id') and event.get('location_id') in followed_location_ids:
-                        sources.append('followed_location')
-                        event['source_location_id'] = event.get('location_id')
-                    
-                    # Set primary source
-                    if 'followed_user' in sources:
-                        event['follow_source'] = 'followed_user'
-                    elif 'followed_journey' in sources:
-                        event['follow_source'] = 'followed_journey'
-                    elif 'followed_location' in sources:
-                        event['follow_source'] = 'followed_location'
-                    else:
-                        event['follow_source'] = 'unknown'
-                    
-                    event['all_sources'] = sources
-                    
-                    # Generate recommendations
-                    recommendations = []
-                    
-                    if 'followed_journey' not in sources:
-                        recommendations.append({
-                            'type': 'journey',
-                            'id': event['journey_id'],
-                            'name': event['journey_title'],
-                            'reason': 'Follow this journey'
-                        })
-                    
-                    if 'followed_user' not in sources:
-                        recommendations.append({
-                            'type': 'user',
-                            'id': event['journey_owner_id'],
-                            'name': event['journey_owner'],
-                            'reason': 'Follow this author'
-                        })
-                    
-                    if 'followed_location' not in sources and event.get('location_id') and event.get('location_address'):
-                        recommendations.append({
-                            'type': 'location',
-                            'id': event.get('location_id'),
-                            'name': event.get('location_address'),
-                            'reason': 'Follow this location'
-                        })
-                    
-                    event['recommendations'] = recommendations
-                    
-                    # Always keep events - sources are used for display only
-                    final_events.append(event)
-
-                # Use processed events
-                followed_events = final_events
-
-                # Calculate pagination
-                total_events = len(followed_events)
-                total_pages = math.ceil(total_events / per_page) if total_events > 0 else 1
-
-                # Apply pagination
-                start_index = offset
-                end_index = offset + per_page
-                followed_events = followed_events[start_index:end_index]
-                
+            feed = get_feed(cursor, user_id, page, request.args.get('after'), per_page)
+            followed_events = feed['events']
+            followed_journeys = feed['followed_journeys']
+            followed_users = feed['followed_users']
+            followed_locations = feed['followed_locations']
+            next_cursor = feed['next_cursor']
+            total_events = feed['total_events']
+            total_pages = feed['total_pages']
+
             db.close_db()
-            
+
     except Exception as e:
         flash(f"An error occurred: {str(e)}", "danger")
         followed_events = []
         followed_journeys = []
         followed_users = []
         followed_locations = []
+        next_cursor = None
         total_events = 0
         total_pages = 1
-    
-    # Calculate pagination info 
+
+    # Calculate pagination info
     has_prev = page > 1
     has_next = page < total_pages
     prev_page = page - 1 if has_prev else None
     next_page = page + 1 if has_next else None
-    
+
     # Calculate page range for pagination display
     page_range = []
     start_page = max(1, page - 2)
     end_page = min(total_pages, page + 2)
     page_range = list(range(start_page, end_page + 1))
-    
+
     return render_template('departure_board.html',
                          active_page='departure_board',
                          followed_events=followed_events,
@@ -440,262 +547,71 @@ def departure_board(page=1):
                          has_next=has_next,
                          prev_page=prev_page,
                          next_page=next_page,
+                         next_cursor=next_cursor,
                          page_range=page_range)
 
 @app.route('/get_departure_board_events', methods=['POST'])
+@db.read_only
 def get_departure_board_events():
     """AJAX endpoint to get updated events for departure board"""
     if 'loggedin' not in session:
         return jsonify({'success': False, 'message': 'Not logged in'}), 401
-    
+
     user_id = session.get('user_id')
     page = request.json.get('page', 1)
-    per_page = 6
-    offset = (page - 1) * per_page
-    
+    # Cursor of the last event on the previous page, sent when paging forward
+    after = request.json.get('after')
+
     try:
         with db.get_cursor() as cursor:
-            # Get all journeys the user is following
-            cursor.execute('''
-                SELECT jf.journey_id, j.title as journey_title, j.user_id as journey_owner_id,
-                       u.username as journey_owner, jf.created_at as followed_since
-                FROM journey_follows jf
-                JOIN journeys j ON jf.journey_id = j.journey_id
-                JOIN users u ON j.user_id = u.user_id
-                WHERE jf.user_id = %s AND j.status = 'open'
-                ORDER BY jf.created_at DESC
-            ''', (user_id,))
-            followed_journeys = cursor.fetchall()
-            
-            # Get all users the user is following
-            cursor.execute('''
-                SELECT uf.followed_id as user_id, u.username, u.first_name, u.last_name,
-                       uf.created_at as followed_since
-                FROM user_follows uf
-                JOIN users u ON uf.followed_id = u.user_id
-                WHERE uf.follower_id = %s AND u.status = 'active'
-                ORDER BY uf.created_at DESC
-            ''', (user_id,))
-            followed_users = cursor.fetchall()
-            
-            # Get all locations the user is following
-            cursor.execute('''
-                SELECT lf.location_id, l.address,
-                       lf.created_at as followed_since
-                FROM location_follows lf
-                JOIN locations l ON lf.location_id = l.location_id
-                WHERE lf.user_id = %s
-                ORDER BY lf.created_at DESC
-            ''', (user_id,))
-            followed_locations = cursor.fetchall()
-            
-            # Create sets of followed IDs for efficient lookups
-            followed_journey_ids = {journey['journey_id'] for journey in followed_journeys}
-            followed_user_ids = {user['user_id'] for user in followed_users}
-            followed_location_ids = {loc['location_id'] for loc in followed_locations}
-            
-            # Build UNION queries for efficient event retrieval
-            union_queries = []
-            all_params = []
-            
-            # Add followed journeys
-            if followed_journeys:
-                journey_ids = [journey['journey_id'] for journey in followed_journeys]
-                placeholders = ','.join(['%s'] * len(journey_ids))
-                union_queries.append(f'''
-                    SELECT e.event_id, e.title as event_title, e.description as event_description,
-                        e.start_time, e.end_time, e.event_image, e.journey_id, e.location_id,
-                        j.title as journey_title, j.user_id as journey_owner_id,
-                        u.username as journey_owner, l.address as location_address,
-                        COALESCE(e.updated_at, e.created_at) as last_update,
-                        e.created_at as event_created
-                    FROM events e
-                    JOIN journeys j ON e.journey_id = j.journey_id
-                    JOIN users u ON j.user_id = u.user_id
-                    LEFT JOIN locations l ON e.location_id = l.location_id
-                    WHERE e.journey_id IN ({placeholders}) AND j.status = 'open'
-                ''')
-                all_params.extend(journey_ids)
-
-            # Add followed users
-            if followed_users:
-                user_ids = [user['user_id'] for user in followed_users]
-                placeholders = ','.join(['%s'] * len(user_ids))
-                union_queries.append(f'''
-                    SELECT e.event_id, e.title as event_title, e.description as event_description,
-                        e.start_time, e.end_time, e.event_image, e.journey_id, e.location_id,
-                        j.title as journey_title, j.user_id as journey_owner_id,
-                        u.username as journey_owner, l.address as location_address,
-                        COALESCE(e.updated_at, e.created_at) as last_update,
-                        e.created_at as event_created
-                    FROM events e
-                    JOIN journeys j ON e.journey_id = j.journey_id
-                    JOIN users u ON j.user_id = u.user_id
-                    LEFT JOIN locations l ON e.location_id = l.location_id
-                    WHERE j.user_id IN ({placeholders}) AND j.status = 'open'
-                ''')
-                all_params.extend(user_ids)
-
-            # Add followed locations
-            if followed_locations:
-                location_ids = [loc['location_id'] for loc in followed_locations]
-                location_placeholders = ','.join(['%s'] * len(location_ids))
-                union_queries.append(f'''
-                    SELECT e.event_id, e.title as event_title, e.description as event_description,
-                           e.start_time, e.end_time, e.event_image, e.journey_id, e.location_id,
-                           j.title as journey_title, j.user_id as journey_owner_id,
-                           u.username as journey_owner, l.address as location_address,
-                           COALESCE(e.updated_at, e.created_at) as last_update,
-                           e.created_at as event_created
-                    FROM events e
-                    JOIN journeys j ON e.journey_id = j.journey_id
-                    JOIN users u ON j.user_id = u.user_id
-                    LEFT JOIN locations l ON e.location_id = l.location_id
-                    WHERE e.location_id IN ({location_placeholders})
-                ''')
-                all_params.extend(location_ids)
-            
-            followed_events = []
-            if union_queries:
-                # Combine queries with UNION and sort by update time
-                final_query = f'''
-                    SELECT event_id, event_title, event_description, start_time, end_time, 
-                        event_image, journey_id, location_id, journey_title, journey_owner_id,
-                        journey_owner, location_address, last_update, event_created
-                    FROM (
-                        {' UNION '.join(union_queries)}
-                    ) combined_events
-                    ORDER BY last_update DESC, start_time DESC
-                '''
-                
-                cursor.execute(final_query, all_params)
-                followed_events = cursor.fetchall()
-
-                # Process events for source detection and recommendations
-                final_events = []
-                for event in followed_events:
-                    # Determine event source
-                    sources = []
-                    
-                    if event['journey_id'] in followed_journey_ids:
-                        sources.append('followed_journey')
-                        event['source_journey_id'] = event['journey_id']
-                    
-                    if event['journey_owner_id'] in followed_user_ids:
-                        sources.append('followed_user')
-                        event['source_user_id'] = event['journey_owner_id']
-                    
-                    if event.get('location_id') and event.get('location_id') in followed_location_ids:
-                        sources.append('followed_location')
-                        event['source_location_id'] = event.get('location_id')
-                    
-                    # Set primary source
-                    if 'followed_user' in sources:
-                        event['follow_source'] = 'followed_user'
-                    elif 'followed_journey' in sources:
-                        event['follow_source'] = 'followed_journey'
-                    elif 'followed_location' in sources:
-                        event['follow_source'] = 'followed_location'
-                    else:
-                        event['follow_source'] = 'unknown'
-                    
-                    event['all_sources'] = sources
-                    
-                    # Generate recommendations
-                    recommendations = []
-                    
-                    if 'followed_journey' not in sources:
-                        recommendations.append({
-                            'type': 'journey',
-                            'id': event['journey_id'],
-                            'name': event['journey_title'],
-                            'reason': 'Follow this journey'
-                        })
-                    
-                    if 'followed_user' not in sources:
-                        recommendations.append({
-                            'type': 'user',
-                            'id': event['journey_owner_id'],
-                            'name': event['journey_owner'],
-                            'reason': 'Follow this author'
-                        })
-                    
-                    if 'followed_location' not in sources and event.get('location_id') and event.get('location_address'):
-                        recommendations.append({
-                            'type': 'location',
-                            'id': event.get('location_id'),
-                            'name': event.get('location_address'),
-                            'reason': 'Follow this location'
-                        })
-                    
-                    event['recommendations'] = recommendations
-                    
-                    # Convert datetime objects to strings for JSON serialization
-                    if event.get('start_time'):
-                        event['start_time_str'] = event['start_time'].strftime('%b %d, %Y at %I:%M %p')
-                    if event.get('end_time'):
-                        event['end_time_str'] = event['end_time'].strftime('%I:%M %p')
-                    if event.get('last_update'):
-                        event['last_update_str'] = event['last_update'].strftime('%b %d at %I:%M %p')
-                    
-                    final_events.append(event)
-
-                # Calculate pagination
-                total_events = len(final_events)
-                total_pages = math.ceil(total_events / per_page) if total_events > 0 else 1
-
-                # Apply pagination
-                start_index = offset
-                end_index = offset + per_page
-                paginated_events = final_events[start_index:end_index]
-                
-                # Convert events to JSON-serializable format
-                events_data = []
-                for event in paginated_events:
-                    event_data = {}
-                    for key, value in event.items():
-                        if key in ['start_time', 'end_time', 'last_update', 'event_created']:
-                            # Skip datetime objects as we have string versions
-                            continue
-                        event_data[key] = value
-                    events_data.append(event_data)
-                
-                return jsonify({
-                    'success': True,
-                    'events': events_data,
-                    'total_events': total_events,
-                    'total_pages': total_pages,
-                    'current_page': page,
-                    'has_prev': page > 1,
-                    'has_next': page < total_pages,
-                    'followed_counts': {
-                        'journeys': len(followed_journeys),
-                        'users': len(followed_users),
-                        'locations': len(followed_locations)
-                    }
-                })
-            else:
-                return jsonify({
-                    'success': True,
-                    'events': [],
-                    'total_events': 0,
-                    'total_pages': 1,
-                    'current_page': 1,
-                    'has_prev': False,
-                    'has_next': False,
-                    'followed_counts': {
-                        'journeys': len(followed_journeys),
-                        'users': len(followed_users),
-                        'locations': len(followed_locations)
-                    }
-                })
-            
+            feed = get_feed(cursor, user_id, page, after)
+
+            # Convert events to JSON-serializable format
+            events_data = []
+            for event in feed['events']:
+                # Convert datetime objects to strings for JSON serialization
+                if event.get('start_time'):
+                    event['start_time_str'] = event['start_time'].strftime('%b %d, %Y at %I:%M %p')
+                if event.get('end_time'):
+                    event['end_time_str'] = event['end_time'].strftime('%I:%M %p')
+                if event.get('last_update'):
+                    event['last_update_str'] = event['last_update'].strftime('%b %d at %I:%M %p')
+
+                event_data = {}
+                for key, value in event.items():
+                    if key in ['start_time', 'end_time', 'last_update', 'event_created']:
+                        # Skip datetime objects as we have string versions
+                        continue
+                    event_data[key] = value
+                events_data.append(event_data)
+
+            total_pages = feed['total_pages']
+            if not events_data and feed['total_events'] == 0:
+                page = 1
+
+            return jsonify({
+                'success': True,
+                'events': events_data,
+                'total_events': feed['total_events'],
+                'total_pages': total_pages,
+                'current_page': page,
+                'has_prev': page > 1,
+                'has_next': page < total_pages,
+                'next_cursor': feed['next_cursor'],
+                'followed_counts': {
+                    'journeys': len(feed['followed_journeys']),
+                    'users': len(feed['followed_users']),
+                    'locations': len(feed['followed_locations'])
+                }
+            })
+
     except Exception as e:
         return jsonify({'success': False, 'message': f'Error: {str(e)}'}), 500
     finally:
         db.close_db()
 
 @app.route('/get_followed_content', methods=['POST'])
+@db.read_only
 def get_followed_content():
     """AJAX endpoint to get updated followed content summary"""
     if 'loggedin' not in session:
@@ -705,39 +621,7 @@ def get_followed_content():
     
     try:
         with db.get_cursor() as cursor:
-            # Get all journeys the user is following
-            cursor.execute('''
-                SELECT jf.journey_id, j.title as journey_title, j.user_id as journey_owner_id,
-                       u.username as journey_owner, jf.created_at as followed_since
-                FROM journey_follows jf
-                JOIN journeys j ON jf.journey_id = j.journey_id
-                JOIN users u ON j.user_id = u.user_id
-                WHERE jf.user_id = %s AND j.status = 'open'
-                ORDER BY jf.created_at DESC
-            ''', (user_id,))
-            followed_journeys = cursor.fetchall()
-            
-            # Get all users the user is following
-            cursor.execute('''
-                SELECT uf.followed_id as user_id, u.username, u.first_name, u.last_name,
-                       uf.created_at as followed_since
-                FROM user_follows uf
-                JOIN users u ON uf.followed_id = u.user_id
-                WHERE uf.follower_id = %s AND u.status = 'active'
-                ORDER BY uf.created_at DESC
-            ''', (user_id,))
-            followed_users = cursor.fetchall()
-            
-            # Get all locations the user is following
-            cursor.execute('''
-                SELECT lf.location_id, l.address,
-                       lf.created_at as followed_since
-                FROM location_follows lf
-                JOIN locations l ON lf.location_id = l.location_id
-                WHERE lf.user_id = %s
-                ORDER BY lf.created_at DESC
-            ''', (user_id,))
-            followed_locations = cursor.fetchall()
+            followed_journeys, followed_users, followed_locations = get_followed_sources(cursor, user_id)
             
             # Convert datetime objects to strings for JSON serialization
             for journey in followed_journeys:
@@ -767,6 +651,7 @@ def get_followed_content():
         db.close_db()
 
 @app.route('/manage_followed_content')
+@db.read_only
 def manage_followed_content():
     """Manage Followed Content - Separate page to manage followed journeys, users, and locations"""
     
@@ -792,39 +677,7 @@ def manage_followed_content():
     
     try:
         with db.get_cursor() as cursor:
-            # Get all journeys the user is following
-            cursor.execute('''
-                SELECT jf.journey_id, j.title as journey_title, j.user_id as journey_owner_id,
-                       u.username as journey_owner, jf.created_at as followed_since
-                FROM journey_follows jf
-                JOIN journeys j ON jf.journey_id = j.journey_id
-                JOIN users u ON j.user_id = u.user_id
-                WHERE jf.user_id = %s AND j.status = 'open'
-                ORDER BY jf.created_at DESC
-            ''', (user_id,))
-            followed_journeys = cursor.fetchall()
-            
-            # Get all users the user is following
-            cursor.execute('''
-                SELECT uf.followed_id as user_id, u.username, u.first_name, u.last_name,
-                       uf.created_at as followed_since
-                FROM user_follows uf
-                JOIN users u ON uf.followed_id = u.user_id
-                WHERE uf.follower_id = %s AND u.status = 'active'
-                ORDER BY uf.created_at DESC
-            ''', (user_id,))
-            followed_users = cursor.fetchall()
-            
-            # Get all locations the user is following
-            cursor.execute('''
-                SELECT lf.location_id, l.address,
-                       lf.created_at as followed_since
-                FROM location_follows lf
-                JOIN locations l ON lf.location_id = l.location_id
-                WHERE lf.user_id = %s
-                ORDER BY lf.created_at DESC
-            ''', (user_id,))
-            followed_locations = cursor.fetchall()
+            followed_journeys, followed_users, followed_locations = get_followed_sources(cursor, user_id)
             
         db.close_db()
             
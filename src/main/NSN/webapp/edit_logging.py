@@ -3,11 +3,14 @@ Edit log function module
 This module handles the editing operation records of editors and administrators on journeys and events
 """
 
+import logging
 from webapp import app, db
 from flask import request, session, jsonify
 from functools import wraps
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 
 def require_editor_or_admin(f):
 
@@ -36,7 +39,7 @@ def log_edit(journey_id, event_id, editor_id, edit_type, field_changed, old_valu
             db.close_db()
             return True
     except Exception as e:
-        print(f"Error logging edit: {e}")
+        logger.error("Error logging edit: %s", e)
         return False
 
 
@@ -70,7 +73,7 @@ def check_no_edits_flag(journey_id, event_id=None):
 
             return False
     except Exception as e:
-        print(f"Error checking no_edits_flag: {e}")
+        logger.error("Error checking no_edits_flag: %s", e)
         return False
 
 
@@ -81,7 +84,7 @@ def get_journey_owner(journey_id):
             result = cursor.fetchone()
             return result['user_id'] if result else None
     except Exception as e:
-        print(f"Error getting journey owner: {e}")
+        logger.error("Error getting journey owner: %s", e)
         return None
 
 
@@ -197,7 +200,7 @@ def admin_edit_journey_with_logging(journey_id):
         })
 
     except Exception as e:
-        print(f"Error in admin_edit_journey_with_logging: {e}")
+        logger.error("Error in admin_edit_journey_with_logging: %s", e)
         return jsonify({'error': 'An internal error occurred'}), 500
 
 
@@ -231,7 +234,7 @@ def get_user_subscription_status(user_id):
                 'end_time': result['expiry_date']
             }
     except Exception as e:
-        print(f"Error getting subscription status: {e}")
+        logger.error("Error getting subscription status: %s", e)
         return {'is_staff': False, 'is_active_subscriber': False, 'has_subscription_history': False}
 
 # Editing the API route for an event
@@ -311,7 +314,7 @@ def admin_edit_event_with_logging(event_id):
         })
 
     except Exception as e:
-        print(f"Error in admin_edit_event_with_logging: {e}")
+        logger.error("Error in admin_edit_event_with_logging: %s", e)
         return jsonify({'error': 'An internal error occurred'}), 500
 
 
@@ -386,6 +389,6 @@ def get_journey_edit_logs(journey_id):
             })
 
     except Exception as e:
-        print(f"Error getting edit logs: {e}")
+        logger.error("Error getting edit logs: %s", e)
         return jsonify({'error': 'An internal error occurred'}), 500
 
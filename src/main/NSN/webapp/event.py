@@ -1,20 +1,45 @@
+import logging
 from webapp import app
 from webapp import db
 from webapp import premium
+from webapp import timeline
+from webapp import images
+from webapp import blobstore
 from flask import redirect, render_template, request, session, url_for, flash, jsonify
 from datetime import datetime
-from werkzeug.utils import secure_filename
 import os
 from webapp.login import require_login_with_nmp
+from webapp.uploads import check_upload
+from webapp.utils import encode_keyset_cursor, decode_keyset_cursor
+from webapp.config import MAX_UPLOAD_FILE_BYTES
+
+logger = logging.getLogger(__name__)
 
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png'}
-MAX_CONTENT_LENGTH = 5 * 1024 * 1024
+ALLOWED_IMAGE_FORMATS = {'JPEG', 'PNG'}
+MAX_CONTENT_LENGTH = MAX_UPLOAD_FILE_BYTES
 
 def allowed_file(filename):
     """Check if the filename has a valid extension (JPG/PNG)."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+def load_event_images(cursor, event_ids):
+    """Fetch the images of several events with one query, returns {event_id: [image rows]}"""
+    images = {event_id: [] for event_id in event_ids}
+    if not event_ids:
+        return images
+    placeholders = ','.join(['%s'] * len(event_ids))
+    cursor.execute(f'''
+        SELECT * FROM event_images
+        WHERE event_id IN ({placeholders})
+        ORDER BY event_id, image_id
+    ''', tuple(event_ids))
+    for image in cursor.fetchall():
+        images[image['event_id']].append(image)
+    return images
+
+
 @app.route('/events/private/view')
 @require_login_with_nmp
 def private_events():
@@ -44,27 +69,24 @@ def private_events():
             cursor.execute('''
                     SELECT e.event_id, e.journey_id, e.title, e.description, e.start_time, e.end_time, l.address,
                     l.location_id, e.display,
-                    (SELECT COUNT(*) FROM event_likes el WHERE el.event_id = e.event_id) AS like_count,
-                    (SELECT COUNT(*) FROM event_likes WHERE event_id = e.event_id AND user_id = %s) AS user_liked
+                    COUNT(el.like_id) AS like_count,
+                    COALESCE(SUM(el.user_id = %s), 0) AS user_liked
                     FROM events e inner join locations l on e.location_id=l.location_id
+                    LEFT JOIN event_likes el ON el.event_id = e.event_id
                     WHERE e.journey_id = %s 
+                    GROUP BY e.event_id
                     ORDER BY e.start_time ASC
                 ''', (user_id, journey_id,))
             event_list = cursor.fetchall()
             
+            # Comment related (one query for every event on the page)
+            attach_event_comments(event_list, is_staff)
+
+            # Images for every event on the page in one query
+            images = load_event_images(cursor, [event['event_id'] for event in event_list])
             for event in event_list:
                 event['is_favorite'] = event['address'] in favorite_destinations
-                # Comment related
-                comments = get_event_comments(event['event_id'], is_staff)
-                event['comments'] = comments
-                event['comment_count'] = len([c for c in comments if not c['is_hidden']])
-                cursor.execute('''
-                        SELECT * from event_images where event_id=%s;
-                    ''', (event['event_id'],))
-                images = cursor.fetchall()
-                event['event_images']=[]
-                for i in images:
-                    event['event_images'].append(i)
+                event['event_images'] = images[event['event_id']]
 
             db.close_db()
 
@@ -81,6 +103,7 @@ def get_is_staff():
     return session.get('role') in ('admin', 'editor', 'moderator')
 
 @app.route('/events/public/view')
+@db.read_only
 def public_events():
     
     event_list = []
@@ -109,10 +132,13 @@ def public_events():
         with db.get_cursor() as cursor:
             cursor.execute('''
                 SELECT e.event_id, e.journey_id, e.title, e.description, e.event_image, e.start_time, e.end_time,e.display, l.address,
-                (SELECT COUNT(*) FROM event_likes el WHERE el.event_id = e.event_id) AS like_count,
-                (SELECT COUNT(*) FROM event_likes WHERE event_id = e.event_id AND user_id = %s) AS user_liked
+                l.location_id,
+                COUNT(el.like_id) AS like_count,
+                COALESCE(SUM(el.user_id = %s), 0) AS user_liked
                 FROM events e inner join locations l on e.location_id=l.location_id
+                LEFT JOIN event_likes el ON el.event_id = e.event_id
                 WHERE (e.display='public' or e.display='published') and e.journey_id = %s 
+                GROUP BY e.event_id
                 ORDER BY e.start_time ASC  -- Show events from oldest to most recent
             ''', (user_id, journey_id,))
             event_list = cursor.fetchall()
@@ -125,56 +151,34 @@ def public_events():
             if is_member and 'note_msg' in is_member and is_member['note_msg'] is not None and (is_member['note_msg'].strip() != '') and is_member['note_ignore']==0:
                 flash(is_member['note_msg'],'info')
 
+            event_ids = [event['event_id'] for event in event_list]
+            images = load_event_images(cursor, event_ids)
+
+            # New: Check which of these places the user is following (one query)
+            followed_locations = set()
+            if user_id and event_list:
+                location_ids = list({event['location_id'] for event in event_list})
+                placeholders = ','.join(['%s'] * len(location_ids))
+                cursor.execute(f'''
+                    SELECT location_id FROM location_follows
+                    WHERE user_id = %s AND location_id IN ({placeholders})
+                ''', (user_id, *location_ids))
+                followed_locations = {row['location_id'] for row in cursor.fetchall()}
+
             for event in event_list:
-                cursor.execute('''
-                        SELECT * from event_images where event_id=%s;
-                    ''', (event['event_id'],))
-
-                event['event_images'] = []
-                
-                if is_member:
-                    images = cursor.fetchall()
-                    for i in images:
-                        image_obj = {
-                        'event_image': i,
-                        'event_id': event['event_id']
-                        }
-                        event['event_images'].append(image_obj)
-                else:
-                    i = cursor.fetchone()
-                    if i:
-                        image_obj = {
-                            'event_image': i,
-                            'event_id': event['event_id']
-                            }
-                        event['event_images'].append(image_obj)
-                    
+                # Members show every image, other journeys only the first one
+                event_images = images[event['event_id']]
+                if not is_member:
+                    event_images = event_images[:1]
+                event['event_images'] = [
+                    {'event_image': i, 'event_id': event['event_id']} for i in event_images
+                ]
+
                 event['is_favorite'] = event['address'] in favorite_destinations
-                
-                # New: Check if the user is following this place
-                if user_id:
-                    cursor.execute('''
-                        SELECT COUNT(*) as is_following 
-                        FROM location_follows 
-                        WHERE user_id = %s AND location_id = (
-                            SELECT location_id FROM events WHERE event_id = %s
-                        )
-                    ''', (user_id, event['event_id']))
-                    follow_result = cursor.fetchone()
-                    event['is_location_followed'] = follow_result['is_following'] > 0
-                else:
-                    event['is_location_followed'] = False
-
-                # Get location_id for follow button
-                cursor.execute('SELECT location_id FROM events WHERE event_id = %s', (event['event_id'],))
-                location_result = cursor.fetchone()
-                event['location_id'] = location_result['location_id'] if location_result else None
-                
-                # Comments
-                is_staff = get_is_staff()
-                comments = get_event_comments(event['event_id'], is_staff)
-                event['comments'] = comments
-                event['comment_count'] = len([c for c in comments if not c['is_hidden']])
+                event['is_location_followed'] = event['location_id'] in followed_locations
+
+            # Comments (one query for every event on the page)
+            attach_event_comments(event_list, get_is_staff())
 
             db.close_db()
   
@@ -285,6 +289,7 @@ def add_event():
                     VALUES (%s, %s, %s, %s, %s, %s,%s, 'open');
                 ''', (journey_id, event_title, description, location_id, start_time,end_time, display))
                 event_id = cursor.lastrowid  # Retrieve new location_id
+                timeline.refresh_event(cursor, event_id)  # Push to followers' departure boards
                 db.close_db()
 
             # Ensure event_id is valid
@@ -363,8 +368,8 @@ def upload_event_image():
 def uploadEventImages(user_id,event_id,files):
     """
     Handles event image upload logic:
-      1. Validate the uploaded file (only JPG/PNG, <= 5MB).
-      2. Store file and update the database record.
+      1. Validate every uploaded file (only JPG/PNG, <= 5MB).
+      2. Replace the event's images with the batch, all or nothing.
     """
     if  not event_id or not files:
         flash("Missing required parameters.", "danger")
@@ -389,37 +394,16 @@ def uploadEventImages(user_id,event_id,files):
         flash("Event not found or you lack permission.", "danger")
         return
 
-    # 1. Delete old graphs (database + disk)
-    try:
-        with db.get_cursor() as cursor:
-            cursor.execute('SELECT event_image FROM event_images WHERE event_id = %s', (event_id,))
-            old_images = cursor.fetchall()
-            for img in old_images:
-                img_path = os.path.join(app.root_path, "static", "events", img['event_image'])
-                if os.path.exists(img_path):
-                    os.remove(img_path)
-
-            cursor.execute('DELETE FROM event_images WHERE event_id = %s', (event_id,))
-            db.close_db()
-    except Exception as e:
-        flash("Failed to remove old images: " + str(e), "danger")
-        return
-
-    # 2. Traversing uploaded files
-    upload_folder = os.path.join(app.root_path, "static", "events")
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
-
+    # 1. Validate the whole batch before touching the existing images
+    uploads = []
     for file in files:
         if file.filename == '':
             continue
 
-        # Validate file size (simple check example – can refine as needed)
-        file.seek(0, os.SEEK_END)
-        file_length = file.tell()
-        file.seek(0, 0)  # Reset file pointer
-        if file_length > MAX_CONTENT_LENGTH:
-            flash("File is too large. Maximum allowed size is 5MB.", "danger")
+        # Validate size and magic bytes (checked while the upload was streamed)
+        ok, message = check_upload(file, MAX_CONTENT_LENGTH)
+        if not ok:
+            flash(message, "danger")
             return
 
         # Validate file extension
@@ -427,36 +411,41 @@ def uploadEventImages(user_id,event_id,files):
             flash("Only JPG/PNG image files are allowed.", "danger")
             return
 
-        # Generate a secure filename
-        filename = secure_filename(file.filename)
-
-        # Example storage path: "static/uploads/events"
-        # Ensure the directory exists
-        upload_folder = os.path.join(app.root_path, "static", "events")
-        if not os.path.exists(upload_folder):
-            os.makedirs(upload_folder)
-
-        # To prevent filename collisions, append a timestamp (or a random string)
-        import time
-        unique_filename = f"{int(time.time())}_{filename}"
-        save_path = os.path.join(upload_folder, unique_filename)
-
+        # Validate the content by decoding it
         try:
-            file.save(save_path)
-        except Exception as e:
-            flash("Error saving file: " + str(e), "danger")
+            uploads.append((file, images.validate_upload(file, ALLOWED_IMAGE_FORMATS)))
+        except images.InvalidImage:
+            flash("The uploaded file is not a valid JPG/PNG image.", "danger")
             return
 
-        # 5) Update the database record (event_image field)
-        try:
-            with db.get_cursor() as cursor:
-                cursor.execute('''
-                    INSERT INTO event_images (event_id, event_image)
-                    VALUES (%s, %s)
-                ''', (event_id,unique_filename, ))
-                db.close_db()
-        except Exception as e:
-            flash("Error updating database: " + str(e), "danger")
+    if not uploads:
+        return
+
+    # 2. Replace the old images with the new batch in one transaction
+    try:
+        with db.get_cursor() as cursor:
+            conn = db.get_db()
+            conn.start_transaction()
+            try:
+                cursor.execute('SELECT event_image FROM event_images WHERE event_id = %s', (event_id,))
+                released = [blobstore.release(cursor, img['event_image'], 'events') for img in cursor.fetchall()]
+                cursor.execute('DELETE FROM event_images WHERE event_id = %s', (event_id,))
+
+                # Store each file under its content hash and reference it from event_images
+                for file, image_format in uploads:
+                    blob_key = blobstore.store_upload(cursor, file, image_format)
+                    cursor.execute('''
+                        INSERT INTO event_images (event_id, event_image)
+                        VALUES (%s, %s)
+                    ''', (event_id, blob_key, ))
+                conn.commit()
+                blobstore.delete_released(released)
+            except Exception:
+                conn.rollback()
+                raise
+            db.close_db()
+    except Exception as e:
+        flash("Error updating database: " + str(e), "danger")
 
 
 @app.route('/event/image/delete/traveller', methods=['GET'])
@@ -503,14 +492,12 @@ def traveller_delete_event_image():
                 flash("image is not existed!", "danger")
 
             old_image = image['event_image']
-            if old_image:
-                old_image_path = os.path.join(upload_folder, old_image)
-                if os.path.exists(old_image_path):
-                    os.remove(old_image_path)
+            released = blobstore.release(cursor, old_image, 'events')
 
             cursor.execute('''
                 DELETE from event_images where image_id = %s;
             ''', (image['image_id'],))
+            blobstore.delete_released([released])
 
             db.close_db()
 
@@ -571,14 +558,12 @@ def admin_delete_event_image():
                 flash("image is not existed!", "danger")
             
             old_image = image['event_image']
-            if old_image:
-                old_image_path = os.path.join(upload_folder, old_image)
-                if os.path.exists(old_image_path):
-                    os.remove(old_image_path)
+            released = blobstore.release(cursor, old_image, 'events')
             
             cursor.execute('''
                 DELETE from event_images where image_id = %s;
             ''', (image['image_id'],))
+            blobstore.delete_released([released])
 
         flash("Image deleted successfully!", "dark")
     except Exception as e:
@@ -665,6 +650,7 @@ def traveller_edit_event():
                 cursor.execute('''
                     update events set title=%s, description=%s, location_id=%s, start_time=%s,end_time=%s, display=%s where event_id=%s;
                 ''', ( title, description, location_id, start_time,end_time, display,event_id))
+                timeline.refresh_event(cursor, event_id)  # Re-sync followers' departure boards
                 db.close_db()
             flash("Event updated successfully!", "dark")
 
@@ -708,7 +694,7 @@ def traveller_delete_event(event_id):
     # Ensure user is logged in
     if 'loggedin' not in session:
         return redirect(url_for('login'))
-    print("event_id=",event_id)
+    logger.debug("event_id= %s", event_id)
 
     user_id = session.get("user_id")
     if not user_id:
@@ -738,16 +724,12 @@ def traveller_delete_event(event_id):
                 flash("Event not found or you don't have permission to delete it.", "danger")
                 return redirect(url_for('private_events', journey_id=journey_id, journey_title=journey_title))
             
-            # Check if there's an image to delete
-            if event_record['event_image']:
-                # Delete the image file from storage
-                upload_folder = os.path.join(app.root_path, "static", "events")
-                image_path = os.path.join(upload_folder, event_record['event_image'])
-                if os.path.exists(image_path):
-                    os.remove(image_path)
+            # Drop the image reference; a legacy file is deleted off the request path
+            released = blobstore.release(cursor, event_record['event_image'], 'events')
             
             # Delete the event from the database
             cursor.execute('DELETE FROM events WHERE event_id = %s', (event_id,))
+            blobstore.delete_released([released])
             db.close_db()
             
         flash("Event deleted successfully!", "dark")
@@ -798,16 +780,12 @@ def admin_delete_event(event_id):
                 flash("Event not found.", "danger")
                 return redirect(url_for('public_events', journey_id=journey_id, journey_title=journey_title))
             
-            # Check if there's an image to delete
-            if event_record['event_image']:
-                # Delete the image file from storage
-                upload_folder = os.path.join(app.root_path, "static", "events")
-                image_path = os.path.join(upload_folder, event_record['event_image'])
-                if os.path.exists(image_path):
-                    os.remove(image_path)
+            # Drop the image reference; a legacy file is deleted off the request path
+            released = blobstore.release(cursor, event_record['event_image'], 'events')
             
             # Delete the event from the database
             cursor.execute('DELETE FROM events WHERE event_id = %s', (event_id,))
+            blobstore.delete_released([released])
             db.close_db()
             
         flash("Event deleted successfully by admin.", "dark")
@@ -909,63 +887,140 @@ def react_comment(comment_id):
             cursor.execute('INSERT INTO comment_reactions (comment_id, user_id, reaction) VALUES (%s, %s, %s)', (comment_id, user_id, reaction))
             user_reaction = reaction
         # get the like and dislike counts
-        cursor.execute('SELECT COUNT(*) AS like_count FROM comment_reactions WHERE comment_id=%s AND reaction="like"', (comment_id,))
-        like_count = cursor.fetchone()['like_count']
-        cursor.execute('SELECT COUNT(*) AS dislike_count FROM comment_reactions WHERE comment_id=%s AND reaction="dislike"', (comment_id,))
-        dislike_count = cursor.fetchone()['dislike_count']
+        cursor.execute('''
+            SELECT COALESCE(SUM(reaction = 'like'), 0) AS like_count,
+                   COALESCE(SUM(reaction = 'dislike'), 0) AS dislike_count
+            FROM comment_reactions WHERE comment_id=%s
+        ''', (comment_id,))
+        counts = cursor.fetchone()
+        like_count = int(counts['like_count'])
+        dislike_count = int(counts['dislike_count'])
         db.close_db()
     return jsonify({'success': True, 'user_reaction': user_reaction, 'like_count': like_count, 'dislike_count': dislike_count})
 
-def get_event_comments(event_id, is_staff=False):
+COMMENTS_PER_PAGE = 20
+
+# One row per visible comment with its reaction counts (conditional SUM over
+# comment_reactions) and the viewer's own reaction (LEFT JOIN), so a page of
+# comments costs a single query instead of three extra queries per comment.
+_COMMENTS_SQL = '''
+    SELECT c.comment_id, c.event_id, c.content, c.created_at, c.is_hidden, c.moderation_reason,
+           c.user_id, c.user_id AS comment_author_id, u.username, u.profile_image as avatar,
+           COALESCE(SUM(r.reaction = 'like'), 0) AS like_count,
+           COALESCE(SUM(r.reaction = 'dislike'), 0) AS dislike_count,
+           MAX(mine.reaction) AS user_reaction,
+           ROW_NUMBER() OVER (PARTITION BY c.event_id ORDER BY c.created_at DESC, c.comment_id DESC) AS comment_rank,
+           SUM(c.is_hidden = 0) OVER (PARTITION BY c.event_id) AS visible_count
+    FROM event_comments c
+    JOIN users u ON c.user_id = u.user_id
+    LEFT JOIN comment_reactions r ON r.comment_id = c.comment_id
+    LEFT JOIN comment_reactions mine ON mine.comment_id = c.comment_id AND mine.user_id = %s
+    WHERE c.event_id IN ({placeholders}) {visibility} {keyset}
+    GROUP BY c.comment_id
+'''
+
+
+def load_event_comments(event_ids, is_staff=False, before=None, limit=COMMENTS_PER_PAGE):
+    """Load the newest page of comments for several events with one query.
+
+    Returns {event_id: {'comments', 'next_cursor', 'comment_count'}}. `before`
+    is a keyset cursor (created_at, comment_id) to continue a single event's
+    comments after the last one shown; comment_count is then the number of
+    visible comments older than the cursor.
+    """
     user_id = session.get('user_id')
+    results = {event_id: {'comments': [], 'next_cursor': None, 'comment_count': 0} for event_id in event_ids}
+    if not event_ids:
+        return results
+
+    params = [user_id if user_id else -1]  # Use -1 if user_id is None to prevent SQL error
+    params.extend(event_ids)
+    visibility = ''
+    if not is_staff: # Regular user: hidden comments only for their author
+        visibility = 'AND (c.is_hidden = 0 OR (c.is_hidden = 1 AND c.user_id = %s))'
+        params.append(user_id if user_id else -1)
+    keyset = ''
+    if before:
+        keyset = 'AND (c.created_at < %s OR (c.created_at = %s AND c.comment_id < %s))'
+        params.extend([before[0], before[0], before[1]])
+
+    query = _COMMENTS_SQL.format(placeholders=','.join(['%s'] * len(event_ids)),
+                                 visibility=visibility, keyset=keyset)
     with db.get_cursor() as cursor:
-        if is_staff: # Admin, Editor, or Moderator
-            cursor.execute('''
-                SELECT c.comment_id, c.content, c.created_at, c.is_hidden, c.moderation_reason, 
-                       c.user_id AS comment_author_id, u.username, u.profile_image as avatar
-                FROM event_comments c
-                JOIN users u ON c.user_id = u.user_id
-                WHERE c.event_id = %s
-                ORDER BY c.created_at DESC
-            ''', (event_id,))
-        else: # Regular user
-            cursor.execute('''
-                SELECT c.comment_id, c.content, c.created_at, c.is_hidden, c.moderation_reason,
-                       c.user_id AS comment_author_id, u.username, u.profile_image as avatar
-                FROM event_comments c
-                JOIN users u ON c.user_id = u.user_id
-                WHERE c.event_id = %s AND (c.is_hidden = 0 OR (c.is_hidden = 1 AND c.user_id = %s))
-                ORDER BY c.created_at DESC
-            ''', (event_id, user_id if user_id else -1)) # Use -1 if user_id is None to prevent SQL error
-
-        comments = cursor.fetchall()
-        processed_comments = []
-        for comment in comments:
-            # Like/dislike counts (ensure this part is still present and correct)
-            cursor.execute('SELECT COUNT(*) AS like_count FROM comment_reactions WHERE comment_id=%s AND reaction="like"', (comment['comment_id'],))
-            comment['like_count'] = cursor.fetchone()['like_count']
-            cursor.execute('SELECT COUNT(*) AS dislike_count FROM comment_reactions WHERE comment_id=%s AND reaction="dislike"', (comment['comment_id'],))
-            comment['dislike_count'] = cursor.fetchone()['dislike_count']
-            
-            if user_id:
-                cursor.execute('SELECT reaction FROM comment_reactions WHERE comment_id=%s AND user_id=%s', (comment['comment_id'], user_id))
-                r = cursor.fetchone()
-                comment['user_reaction'] = r['reaction'] if r else None
-            else:
-                comment['user_reaction'] = None
-
-            comment['removal_notice'] = None
-            if comment['is_hidden']:
-                if user_id == comment['comment_author_id']:
-                    reason = comment.get('moderation_reason') or "No reason provided."
-                    comment['removal_notice'] = f"Your comment was removed. Reason: {reason}"
-                    # The content itself will be replaced in the template or here if preferred
-                elif not is_staff: 
-                    continue # Skip hidden comments for non-staff, non-authors
-            
-            processed_comments.append(comment)
+        # One extra row per event tells us whether there is an older page
+        cursor.execute(f'''
+            SELECT * FROM ({query}) ranked
+            WHERE ranked.comment_rank <= %s
+            ORDER BY ranked.event_id, ranked.comment_rank
+        ''', params + [limit + 1])
+        rows = cursor.fetchall()
+        db.close_db()
+
+    for comment in rows:
+        page = results[comment['event_id']]
+        page['comment_count'] = int(comment.pop('visible_count') or 0)
+        if comment.pop('comment_rank') > limit:
+            last = page['comments'][-1]
+            page['next_cursor'] = encode_keyset_cursor(last['created_at'], last['comment_id'])
+            continue
+
+        comment['removal_notice'] = None
+        if comment['is_hidden']:
+            if user_id == comment['comment_author_id']:
+                reason = comment.get('moderation_reason') or "No reason provided."
+                comment['removal_notice'] = f"Your comment was removed. Reason: {reason}"
+                # The content itself will be replaced in the template or here if preferred
+            elif not is_staff:
+                continue # Skip hidden comments for non-staff, non-authors
+
+        page['comments'].append(comment)
+    return results
+
+
+def get_event_comments(event_id, is_staff=False, before=None):
+    """Return (comments, next_cursor) for one page of an event's comments, newest first"""
+    page = load_event_comments([event_id], is_staff, before)[event_id]
+    return page['comments'], page['next_cursor']
+
+
+def attach_event_comments(event_list, is_staff=False):
+    """Attach the first page of comments and the comment count to every event in a list"""
+    pages = load_event_comments([event['event_id'] for event in event_list], is_staff)
+    for event in event_list:
+        page = pages[event['event_id']]
+        event['comments'] = page['comments']
+        event['comments_next_cursor'] = page['next_cursor']
+        event['comment_count'] = page['comment_count']
+
+
+@app.route('/event/<int:event_id>/comments')
+def event_comments_page(event_id):
+    """AJAX endpoint returning the next page of an event's comments as rendered HTML"""
+    before = decode_keyset_cursor(request.args.get('before'))
+    if not before:
+        return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+
+    with db.get_cursor() as cursor:
+        cursor.execute('''
+            SELECT e.display, j.status AS journey_status, j.user_id AS journey_owner_id
+            FROM events e JOIN journeys j ON e.journey_id = j.journey_id
+            WHERE e.event_id = %s
+        ''', (event_id,))
+        event = cursor.fetchone()
         db.close_db()
-    return processed_comments
+
+    is_staff = get_is_staff()
+    # Events of hidden or moderated journeys are only visible to their owner and staff
+    is_public = event and event['display'] in ('public', 'published') and event['journey_status'] == 'open'
+    if not event or not (is_public or is_staff or event['journey_owner_id'] == session.get('user_id')):
+        return jsonify({'success': False, 'message': 'Event not found'}), 404
+
+    comments, next_cursor = get_event_comments(event_id, is_staff, before)
+    return jsonify({
+        'success': True,
+        'html': render_template('event_comments_list.html', comments=comments),
+        'next_cursor': next_cursor
+    })
 
 @app.route('/comment/report/<int:comment_id>', methods=['POST'])
 def report_comment(comment_id):
@@ -1183,6 +1238,7 @@ def follow_location(location_id):
                     INSERT INTO location_follows (user_id, location_id) 
                     VALUES (%s, %s) 
                 ''', (user_id, location_id))
+                timeline.refresh_user(cursor, user_id)
                 flash(f"Now following location: {location['address']}, the journey events will appear on your Departure Board.", "success")
             
             db.close_db()
@@ -1214,6 +1270,7 @@ def unfollow_location(location_id):
                          (user_id, location_id))
             
             if cursor.rowcount > 0:
+                timeline.refresh_user(cursor, user_id)
                 location_name = location['address'] if location else f"Location #{location_id}"
                 flash(f"Unfollowed location: {location_name}. The related journey events will be removed from your Departure Board.", "success")
             else:
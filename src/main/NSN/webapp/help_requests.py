@@ -1,5 +1,9 @@
+import logging
 from flask import redirect, render_template, request, session, url_for, flash, jsonify
 from webapp import app, db
+from webapp import jobs
+
+logger = logging.getLogger(__name__)
 
 def is_logged_in():
     """Check if user is logged in"""
@@ -49,7 +53,7 @@ def submit_help_request():
             
         except Exception as e:
             flash("An error occurred while submitting your request. Please try again later.", "danger")
-            print(f"Error submitting help request: {e}")
+            logger.error("Error submitting help request: %s", e)
             return render_template('help_request_form.html')
     
     # GET request - show the form
@@ -80,7 +84,7 @@ def my_requests():
         
     except Exception as e:
         flash("An error occurred while fetching your requests.", "danger")
-        print(f"Error fetching user requests: {e}")
+        logger.error("Error fetching user requests: %s", e)
         return redirect(url_for('dashboard'))
 
 @app.route('/help/manage')
@@ -177,7 +181,7 @@ def manage_requests():
         
     except Exception as e:
         flash("An error occurred while fetching help requests.", "danger")
-        print(f"Error fetching help requests for management: {e}")
+        logger.error("Error fetching help requests for management: %s", e)
         return redirect(url_for('dashboard'))
 
 @app.route('/help/manage/<int:request_id>', methods=['GET', 'POST'])
@@ -264,26 +268,13 @@ def manage_single_request(request_id):
                     """
                     cursor.execute(update_query, (new_priority, assigned_to, admin_notes, request_id))
                 
-                # Send notification if assignment changed and someone was assigned
-                if assignment_changed and assigned_to is not None:
-                    # Get request details for notification
-                    cursor.execute("SELECT subject FROM help_requests WHERE request_id = %s", (request_id,))
-                    request_info = cursor.fetchone()
-                    
-                    # Get assigner name
-                    cursor.execute("SELECT username FROM users WHERE user_id = %s", (session['user_id'],))
-                    assigner_info = cursor.fetchone()
-                    
-                    if request_info and assigner_info:
-                        notification_message = f"You have been assigned to Help Request #{request_id}: {request_info['subject']} (assigned by {assigner_info['username']})"
-                        
-                        cursor.execute("""
-                            INSERT INTO help_desk_notifications (user_id, request_id, message, assigned_by)
-                            VALUES (%s, %s, %s, %s)
-                        """, (assigned_to, request_id, notification_message, session['user_id']))
-                
                 db.close_db()
             
+            # Send notification if assignment changed and someone was assigned
+            if assignment_changed and assigned_to is not None:
+                jobs.enqueue('notify_help_assignment', request_id, assigned_to, session['user_id'],
+                             key=f"help-assignment:{request_id}:{assigned_to}")
+            
             if status_changed:
                 flash(f"Request status updated to '{new_status.title()}' successfully.", "success")
             else:
@@ -292,7 +283,7 @@ def manage_single_request(request_id):
             
         except Exception as e:
             flash("An error occurred while updating the request.", "danger")
-            print(f"Error updating help request: {e}")
+            logger.error("Error updating help request: %s", e)
     
     # GET request - show request details
     try:
@@ -339,7 +330,7 @@ def manage_single_request(request_id):
         
     except Exception as e:
         flash("An error occurred while fetching request details.", "danger")
-        print(f"Error fetching help request details: {e}")
+        logger.error("Error fetching help request details: %s", e)
         return redirect(url_for('manage_requests'))
 
 @app.route('/help/manage/<int:request_id>/reply', methods=['POST'])
@@ -384,7 +375,7 @@ def add_reply(request_id):
         
     except Exception as e:
         flash("An error occurred while posting the reply.", "danger")
-        print(f"Error adding reply: {e}")
+        logger.error("Error adding reply: %s", e)
     
     return redirect(url_for('manage_single_request', request_id=request_id))
 
@@ -419,19 +410,12 @@ def add_user_reply(request_id):
                 VALUES (%s, %s, %s, %s)
             """, (request_id, session['user_id'], message, False))
             
+            reply_id = cursor.lastrowid
+            
             # Send notification to assigned staff if any
             if help_request['assigned_to']:
-                # Get user name for notification
-                cursor.execute("SELECT username FROM users WHERE user_id = %s", (session['user_id'],))
-                user_info = cursor.fetchone()
-                
-                if user_info:
-                    notification_message = f"New reply from {user_info['username']} on Help Request #{request_id}: {help_request['subject']}"
-                    
-                    cursor.execute("""
-                        INSERT INTO help_desk_notifications (user_id, request_id, message, assigned_by)
-                        VALUES (%s, %s, %s, %s)
-                    """, (help_request['assigned_to'], request_id, notification_message, session['user_id']))
+                jobs.enqueue('notify_help_reply', request_id, help_request['assigned_to'], session['user_id'],
+                             key=f"help-reply:{reply_id}")
             
             # Reopen the request if it was resolved
             if help_request['status'] == 'resolved':
@@ -448,7 +432,7 @@ def add_user_reply(request_id):
         
     except Exception as e:
         flash("An error occurred while posting the reply.", "danger")
-        print(f"Error adding user reply: {e}")
+        logger.error("Error adding user reply: %s", e)
     
     return redirect(url_for('view_request_detail', request_id=request_id))
 
@@ -496,7 +480,7 @@ def view_request_detail(request_id):
         
     except Exception as e:
         flash("An error occurred while fetching request details.", "danger")
-        print(f"Error fetching request details: {e}")
+        logger.error("Error fetching request details: %s", e)
         return redirect(url_for('my_requests'))
 
 @app.route('/api/help/stats')
@@ -548,7 +532,7 @@ def get_help_stats():
         })
         
     except Exception as e:
-        print(f"Error fetching help stats: {e}")
+        logger.error("Error fetching help stats: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 @app.route('/api/help/notifications')
@@ -594,7 +578,7 @@ def get_notifications():
         })
         
     except Exception as e:
-        print(f"Error fetching notifications: {e}")
+        logger.error("Error fetching notifications: %s", e)
         return jsonify({'error': 'Failed to fetch notifications'}), 500
 
 @app.route('/api/help/notifications/<int:notification_id>/mark-read', methods=['POST'])
@@ -616,5 +600,44 @@ def mark_notification_read(notification_id):
         return jsonify({'success': True})
         
     except Exception as e:
-        print(f"Error marking notification as read: {e}")
-        return jsonify({'error': 'Failed to mark notification as read'}), 500 
\ No newline at end of file
+        logger.error("Error marking notification as read: %s", e)
+        return jsonify({'error': 'Failed to mark notification as read'}), 500 
+
+@jobs.task('notify_help_assignment')
+def notify_help_assignment(request_id, assigned_to, assigned_by):
+    """Background job: tell a staff member they were assigned to a help request"""
+    with db.get_cursor() as cursor:
+        # Get request details for notification
+        cursor.execute("SELECT subject FROM help_requests WHERE request_id = %s", (request_id,))
+        request_info = cursor.fetchone()
+        
+        # Get assigner name
+        cursor.execute("SELECT username FROM users WHERE user_id = %s", (assigned_by,))
+        assigner_info = cursor.fetchone()
+        
+        if request_info and assigner_info:
+            notification_message = f"You have been assigned to Help Request #{request_id}: {request_info['subject']} (assigned by {assigner_info['username']})"
+            
+            cursor.execute("""
+                INSERT INTO help_desk_notifications (user_id, request_id, message, assigned_by)
+                VALUES (%s, %s, %s, %s)
+            """, (assigned_to, request_id, notification_message, assigned_by))
+
+
+@jobs.task('notify_help_reply')
+def notify_help_reply(request_id, assigned_to, replied_by):
+    """Background job: tell the assigned staff member about a user's reply"""
+    with db.get_cursor() as cursor:
+        cursor.execute("""
+            SELECT h.subject, u.username FROM help_requests h, users u
+            WHERE h.request_id = %s AND u.user_id = %s
+        """, (request_id, replied_by))
+        info = cursor.fetchone()
+        
+        if info:
+            notification_message = f"New reply from {info['username']} on Help Request #{request_id}: {info['subject']}"
+            
+            cursor.execute("""
+                INSERT INTO help_desk_notifications (user_id, request_id, message, assigned_by)
+                VALUES (%s, %s, %s, %s)
+            """, (assigned_to, request_id, notification_message, replied_by))
@@ -0,0 +1,246 @@
+"""Upload pipeline for event images, journey covers and avatars.
+
+Uploads are validated by actually decoding them (a renamed text file or a
+truncated JPEG is rejected). Before blobstore.py stores one, strip_upload()
+re-encodes it without EXIF/XMP metadata (GPS position, camera serial),
+applying the EXIF orientation first so the picture stays upright; no file
+carrying metadata is ever served. A background worker pool then writes
+resized variants next to the stored image, e.g. <key>.jpg gets
+<key>.thumb.webp and <key>.medium.webp.
+
+Templates ask for a variant with the image_variant filter, which falls back
+to the original until the worker has produced it:
+    url_for('static', filename=journey.cover_image|upload_path('journeys')|image_variant('thumb'))
+
+Images uploaded before the pipeline existed are processed by
+`flask --app webapp generate-image-variants`.
+"""
+import logging
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import click
+from PIL import Image, ImageOps, UnidentifiedImageError
+from webapp import app
+from webapp import jobs
+from webapp.config import IMAGE_WORKERS, IMAGE_VARIANT_FORMAT, IMAGE_VARIANT_QUALITY
+
+logger = logging.getLogger(__name__)
+
+# Longest side in pixels of each variant
+VARIANT_SIZES = {
+    'thumb': 400,
+    'medium': 1200,
+}
+
+# Folders under static/ that hold uploads
+UPLOAD_FOLDERS = ('events', 'journeys', 'avatars')
+
+# Decoded formats accepted for upload
+ALLOWED_FORMATS = {'JPEG', 'PNG', 'GIF', 'WEBP'}
+
+_VARIANT_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+# Image.info entries that describe the picture rather than hold it
+METADATA_KEYS = ('exif', 'xmp', 'XML:com.adobe.xmp', 'comment')
+
+_executor = ThreadPoolExecutor(max_workers=IMAGE_WORKERS, thread_name_prefix='image-worker')
+
+# Static paths of variants known to exist, so templates skip the stat() call
+_ready = set()
+
+
+class InvalidImage(ValueError):
+    """The upload could not be decoded as an allowed image"""
+
+
+def validate_upload(file, allowed_formats=ALLOWED_FORMATS):
+    """
+    Decode an uploaded FileStorage and return its format (e.g. 'JPEG')
+
+    JPEGs are decoded at reduced scale (draft mode), which still reads the
+    whole stream but keeps the check cheap on the request path.
+    Raises InvalidImage, leaves the stream rewound.
+    """
+    try:
+        with Image.open(file.stream) as img:
+            image_format = img.format
+            if image_format not in allowed_formats:
+                raise InvalidImage(f"Unsupported image format: {image_format}")
+            img.draft('RGB', (VARIANT_SIZES['thumb'], VARIANT_SIZES['thumb']))
+            img.load()
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError, SyntaxError) as e:
+        raise InvalidImage(f"Not a valid image: {str(e)}") from e
+    finally:
+        file.stream.seek(0)
+    return image_format
+
+
+def variant_path(path, variant):
+    """'journeys/x.jpg' -> 'journeys/x.thumb.webp'"""
+    stem = os.path.splitext(path)[0]
+    return f"{stem}.{variant}.{_VARIANT_EXTENSIONS[IMAGE_VARIANT_FORMAT]}"
+
+
+def _static_file(path):
+    return os.path.join(app.static_folder, path)
+
+
+def _save_atomic(img, target, image_format, **options):
+    tmp = f"{target}.tmp"
+    img.save(tmp, format=image_format, **options)
+    os.replace(tmp, target)
+
+
+def _has_metadata(img):
+    return any(key in img.info for key in METADATA_KEYS) or bool(getattr(img, 'text', None))
+
+
+def _without_metadata(original):
+    """Upright copy of an opened image with its metadata dropped"""
+    img = ImageOps.exif_transpose(original)
+    for key in METADATA_KEYS:
+        img.info.pop(key, None)
+    return img
+
+
+def _save_original(img, fp, image_format):
+    if image_format == 'JPEG':
+        img.save(fp, format='JPEG', quality=90, optimize=True)
+    else:
+        img.save(fp, format=image_format)
+
+
+def strip_upload(file, image_format, directory):
+    """
+    Re-encode an uploaded FileStorage without metadata into a temp file in directory
+
+    Returns the temp file path, or None when there is nothing to strip: the
+    upload has no metadata, or is a GIF (re-encoding would drop its frames).
+    Leaves the stream rewound.
+    """
+    if image_format == 'GIF':
+        return None
+    try:
+        with Image.open(file.stream) as original:
+            if not _has_metadata(original):
+                return None
+            img = _without_metadata(original)
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix='.strip-')
+            try:
+                with os.fdopen(fd, 'wb') as out:
+                    _save_original(img, out, image_format)
+            except Exception:
+                os.remove(tmp)
+                raise
+            return tmp
+    finally:
+        file.stream.seek(0)
+
+
+def _strip_metadata(img, path, image_format):
+    """Re-encode a legacy upload in place without metadata (GIFs are left alone)"""
+    if image_format == 'GIF':
+        return
+    tmp = f"{_static_file(path)}.tmp"
+    _save_original(img, tmp, image_format)
+    os.replace(tmp, _static_file(path))
+
+
+def process_image(path, strip=False):
+    """Write the variants of static/<path>, first stripping its metadata in place when strip is set"""
+    with Image.open(_static_file(path)) as original:
+        image_format = original.format
+        img = _without_metadata(original)
+        if strip:
+            _strip_metadata(img, path, image_format)
+
+        if img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+        if IMAGE_VARIANT_FORMAT == 'JPEG' and img.mode == 'RGBA':
+            background = Image.new('RGB', img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel('A'))
+            img = background
+
+        for variant, size in VARIANT_SIZES.items():
+            resized = img.copy()
+            resized.thumbnail((size, size), Image.LANCZOS)
+            target = variant_path(path, variant)
+            _save_atomic(resized, _static_file(target), IMAGE_VARIANT_FORMAT,
+                         quality=IMAGE_VARIANT_QUALITY, optimize=True)
+            _ready.add(target)
+
+
+def _process_logged(path):
+    try:
+        process_image(path)
+    except Exception as e:
+        logger.error(f"Image processing failed for {path}: {str(e)}")
+
+
+def schedule(path):
+    """Queue static/<path> for variant generation"""
+    return _executor.submit(_process_logged, path)
+
+
+@jobs.task('delete_image')
+def delete_image(path):
+    """Remove static/<path> and its variants, ignoring files that are missing"""
+    for target in [path] + [variant_path(path, variant) for variant in VARIANT_SIZES]:
+        _ready.discard(target)
+        try:
+            os.remove(_static_file(target))
+        except FileNotFoundError:
+            pass
+
+
+def delete_later(path):
+    """Queue static/<path> and its variants for deletion in a background job"""
+    return jobs.enqueue('delete_image', path, key=f"delete-image:{path}")
+
+
+def _is_original(name):
+    stem, extension = os.path.splitext(name)
+    return (extension.lower() in ('.jpg', '.jpeg', '.png', '.gif', '.webp') and name != 'default.png'
+            and os.path.splitext(stem)[1][1:] not in VARIANT_SIZES)
+
+
+@app.template_filter('image_variant')
+def image_variant(path, variant='thumb'):
+    """Static path of the variant of an uploaded image, or the original while it is not ready"""
+    if not path:
+        return path
+    target = variant_path(path, variant)
+    if target in _ready:
+        return target
+    if os.path.exists(_static_file(target)):
+        _ready.add(target)
+        return target
+    return path
+
+
+@app.cli.command('generate-image-variants')
+@click.option('--force', is_flag=True, help='Regenerate variants that already exist.')
+def generate_image_variants_command(force):
+    """Strip metadata from existing uploads and generate their variants."""
+    processed = failed = 0
+    for folder in UPLOAD_FOLDERS:
+        directory = _static_file(folder)
+        if not os.path.isdir(directory):
+            continue
+        for name in sorted(os.listdir(directory)):
+            path = f"{folder}/{name}"
+            if not _is_original(name):
+                continue
+            if not force and all(os.path.exists(_static_file(variant_path(path, variant)))
+                                 for variant in VARIANT_SIZES):
+                continue
+            try:
+                # Files uploaded before strip_upload() existed may still carry metadata
+                process_image(path, strip=True)
+                processed += 1
+            except Exception as e:
+                failed += 1
+                click.echo(f"Skipped {path}: {str(e)}")
+    click.echo(f"Generated variants for {processed} images ({failed} failed)")
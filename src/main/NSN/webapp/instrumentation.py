@@ -0,0 +1,316 @@
+"""Per-route latency and query instrumentation.
+
+Every request is timed, and every query run through db.get_cursor() is
+counted and timed. The numbers are kept per endpoint and method:
+- requests by status and a latency histogram
+- queries and time spent in them
+- N+1 detection: a request that runs the same statement
+  N_PLUS_ONE_THRESHOLD times or more is logged with the statement and
+  counted against the endpoint (e.g. one reaction query per comment).
+  Literals are normalized, so `... WHERE id = 3` and `... WHERE id = 4`
+  count as the same statement.
+- slow query log: statements slower than SLOW_QUERY_MS are written to the
+  webapp.slow_queries logger, and to SLOW_QUERY_LOG_FILE when it is set
+
+GET /internal/metrics/prometheus (metrics.py) exports these counters, along
+with the connection pool metrics, in the Prometheus text format.
+REQUEST_METRICS=false turns the instrumentation off.
+"""
+import bisect
+import logging
+import re
+import threading
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from webapp import app
+from webapp import db
+from webapp.config import N_PLUS_ONE_THRESHOLD, REQUEST_METRICS, SLOW_QUERY_LOG_FILE, SLOW_QUERY_MS
+
+logger = logging.getLogger(__name__)
+slow_query_logger = logging.getLogger('webapp.slow_queries')
+
+# Upper bounds (seconds) of the histogram buckets
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5)
+
+# Statements are truncated to this many characters in logs
+MAX_STATEMENT_LENGTH = 300
+
+_LITERAL_RE = re.compile(r"'(?:[^'\\]|\\.|'')*'|\"(?:[^\"\\]|\\.|\"\")*\"|\b\d+(?:\.\d+)?\b")
+_SPACE_RE = re.compile(r'\s+')
+
+
+def statement_shape(operation):
+    """SQL with literals replaced by ? and whitespace collapsed"""
+    if isinstance(operation, (bytes, bytearray)):
+        operation = operation.decode('utf-8', 'replace')
+    return _SPACE_RE.sub(' ', _LITERAL_RE.sub('?', operation)).strip()
+
+
+class Histogram:
+    """Fixed-bucket histogram; callers serialize access"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # last bucket is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """[(upper bound, observations <= bound)], ending with '+Inf'"""
+        total = 0
+        buckets = []
+        for bound, count in zip(self.bounds + ('+Inf',), self.counts):
+            total += count
+            buckets.append((bound, total))
+        return buckets
+
+
+class EndpointMetrics:
+    def __init__(self):
+        self.latency = Histogram(REQUEST_BUCKETS)
+        self.statuses = Counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.n_plus_one = 0
+
+
+class RequestMetrics:
+    """Process-wide request and query counters"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+        self.query_latency = Histogram(QUERY_BUCKETS)
+        self.slow_queries = 0
+
+    def record_request(self, endpoint, method, status, seconds, queries, query_seconds, n_plus_one):
+        with self._lock:
+            metrics = self._endpoints.get((endpoint, method))
+            if metrics is None:
+                metrics = self._endpoints[(endpoint, method)] = EndpointMetrics()
+            metrics.latency.observe(seconds)
+            metrics.statuses[status] += 1
+            metrics.queries += queries
+            metrics.query_seconds += query_seconds
+            if n_plus_one:
+                metrics.n_plus_one += 1
+
+    def record_query(self, seconds, slow):
+        with self._lock:
+            self.query_latency.observe(seconds)
+            if slow:
+                self.slow_queries += 1
+
+    def snapshot(self):
+        """Summary per endpoint for /internal/metrics"""
+        with self._lock:
+            endpoints = {}
+            for (endpoint, method), metrics in sorted(self._endpoints.items()):
+                count = metrics.latency.count
+                endpoints[f"{method} {endpoint}"] = {
+                    'requests': count,
+                    'statuses': {str(status): n for status, n in metrics.statuses.items()},
+                    'latency_seconds_avg': round(metrics.latency.sum / count, 6) if count else 0,
+                    'queries_per_request_avg': round(metrics.queries / count, 2) if count else 0,
+                    'query_seconds_total': round(metrics.query_seconds, 6),
+                    'n_plus_one_requests': metrics.n_plus_one,
+                }
+            return {'endpoints': endpoints, 'queries': self.query_latency.count,
+                    'slow_queries': self.slow_queries}
+
+    def prometheus_lines(self):
+        with self._lock:
+            lines = [
+                '# HELP nsn_http_request_duration_seconds Request latency by endpoint.',
+                '# TYPE nsn_http_request_duration_seconds histogram',
+            ]
+            for (endpoint, method), metrics in sorted(self._endpoints.items()):
+                lines += _histogram_lines('nsn_http_request_duration_seconds', metrics.latency,
+                                          endpoint=endpoint, method=method)
+            lines += ['# HELP nsn_http_requests_total Requests by endpoint and status.',
+                      '# TYPE nsn_http_requests_total counter']
+            for (endpoint, method), metrics in sorted(self._endpoints.items()):
+                for status, count in sorted(metrics.statuses.items()):
+                    lines.append(_sample('nsn_http_requests_total', count,
+                                         endpoint=endpoint, method=method, status=status))
+            lines += ['# HELP nsn_db_queries_total Queries run by requests to an endpoint.',
+                      '# TYPE nsn_db_queries_total counter']
+            for (endpoint, method), metrics in sorted(self._endpoints.items()):
+                lines.append(_sample('nsn_db_queries_total', metrics.queries, endpoint=endpoint, method=method))
+            lines += ['# HELP nsn_db_query_seconds_total Time spent in queries by requests to an endpoint.',
+                      '# TYPE nsn_db_query_seconds_total counter']
+            for (endpoint, method), metrics in sorted(self._endpoints.items()):
+                lines.append(_sample('nsn_db_query_seconds_total', round(metrics.query_seconds, 6),
+                                     endpoint=endpoint, method=method))
+            lines += ['# HELP nsn_db_n_plus_one_requests_total Requests that repeated a statement '
+                      'N_PLUS_ONE_THRESHOLD times or more.',
+                      '# TYPE nsn_db_n_plus_one_requests_total counter']
+            for (endpoint, method), metrics in sorted(self._endpoints.items()):
+                lines.append(_sample('nsn_db_n_plus_one_requests_total', metrics.n_plus_one,
+                                     endpoint=endpoint, method=method))
+            lines += ['# HELP nsn_db_query_duration_seconds Latency of every query.',
+                      '# TYPE nsn_db_query_duration_seconds histogram']
+            lines += _histogram_lines('nsn_db_query_duration_seconds', self.query_latency)
+            lines += ['# HELP nsn_db_slow_queries_total Queries slower than SLOW_QUERY_MS.',
+                      '# TYPE nsn_db_slow_queries_total counter',
+                      _sample('nsn_db_slow_queries_total', self.slow_queries)]
+            return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _sample(name, value, **labels):
+    if labels:
+        label_text = ','.join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+        return f"{name}{{{label_text}}} {value}"
+    return f"{name} {value}"
+
+
+def _histogram_lines(name, histogram, **labels):
+    lines = [_sample(f"{name}_bucket", count, **labels, le=bound) for bound, count in histogram.cumulative()]
+    lines.append(_sample(f"{name}_sum", round(histogram.sum, 6), **labels))
+    lines.append(_sample(f"{name}_count", histogram.count, **labels))
+    return lines
+
+
+def _pool_lines():
+    """Connection pool metrics (db.pool_stats) in the text format"""
+    pools = db.pool_stats()
+    gauges = (('in_use', 'nsn_db_pool_in_use', 'gauge', 'Connections checked out.'),
+              ('pool_size', 'nsn_db_pool_size', 'gauge', 'Connections in the pool.'),
+              ('checkouts', 'nsn_db_pool_checkouts_total', 'counter', 'Connection checkouts.'),
+              ('waits', 'nsn_db_pool_waits_total', 'counter', 'Checkouts that waited for a connection.'),
+              ('timeouts', 'nsn_db_pool_timeouts_total', 'counter', 'Checkouts that timed out.'),
+              ('leaks_detected', 'nsn_db_pool_leaks_total', 'counter', 'Connections held past the leak threshold.'))
+    lines = []
+    for key, name, kind, description in gauges:
+        lines += [f"# HELP {name} {description}", f"# TYPE {name} {kind}"]
+        for pool, stats in pools.items():
+            lines.append(_sample(name, stats[key], pool=pool))
+    return lines
+
+
+class RequestTiming:
+    __slots__ = ('started', 'queries', 'query_seconds', 'statements', 'status')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.statements = Counter()
+        self.status = None
+
+
+class InstrumentedCursor:
+    """Proxy of a mysql.connector cursor that counts and times execute()/executemany()"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, operation, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.execute(operation, *args, **kwargs)
+        finally:
+            record_query(operation, time.perf_counter() - started)
+
+    def executemany(self, operation, *args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return self._cursor.executemany(operation, *args, **kwargs)
+        finally:
+            record_query(operation, time.perf_counter() - started)
+
+    def __getattr__(self, attribute):
+        # fetchone/fetchall/rowcount/lastrowid/... of the real cursor
+        return getattr(self._cursor, attribute)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        self._cursor.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        return self._cursor.__exit__(*exc_info)
+
+
+metrics = RequestMetrics()
+
+
+def record_query(operation, seconds):
+    slow = SLOW_QUERY_MS > 0 and seconds * 1000 >= SLOW_QUERY_MS
+    metrics.record_query(seconds, slow)
+    timing = g.get('request_timing') if has_request_context() else None
+    if timing is not None:
+        timing.queries += 1
+        timing.query_seconds += seconds
+        timing.statements[statement_shape(operation)] += 1
+    if slow:
+        owner = f"{request.method} {request.path}" if has_request_context() else threading.current_thread().name
+        slow_query_logger.warning(f"{seconds * 1000:.1f} ms ({owner}): "
+                                  f"{statement_shape(operation)[:MAX_STATEMENT_LENGTH]}")
+
+
+def start_request_timing():
+    g.request_timing = RequestTiming()
+
+
+def remember_status(response):
+    timing = g.get('request_timing')
+    if timing is not None:
+        timing.status = response.status_code
+    return response
+
+
+def record_request(exception=None):
+    """Teardown hook: runs for every request, including those ended by an unhandled exception"""
+    timing = g.pop('request_timing', None)
+    if timing is None:
+        return
+    seconds = time.perf_counter() - timing.started
+    # No response was finalized when the exception propagated
+    status = timing.status if timing.status is not None else 500
+    endpoint = request.endpoint or 'unmatched'
+
+    repeated = [(statement, count) for statement, count in timing.statements.items()
+                if count >= N_PLUS_ONE_THRESHOLD]
+    for statement, count in repeated:
+        logger.warning(f"Possible N+1 query in {request.method} {endpoint}: {count} x "
+                       f"{statement[:MAX_STATEMENT_LENGTH]}")
+
+    metrics.record_request(endpoint, request.method, status, seconds,
+                           timing.queries, timing.query_seconds, bool(repeated))
+
+
+def stats():
+    """Per-endpoint summary for /internal/metrics"""
+    return metrics.snapshot()
+
+
+def prometheus_text():
+    """Request, query and connection pool metrics in the Prometheus text exposition format"""
+    return '\n'.join(metrics.prometheus_lines() + _pool_lines()) + '\n'
+
+
+if SLOW_QUERY_LOG_FILE:
+    _handler = logging.FileHandler(SLOW_QUERY_LOG_FILE)
+    _handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    slow_query_logger.addHandler(_handler)
+
+if REQUEST_METRICS:
+    db.cursor_hook = InstrumentedCursor
+    app.before_request(start_request_timing)
+    app.after_request(remember_status)
+    app.teardown_request(record_request)
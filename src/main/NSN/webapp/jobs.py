@@ -0,0 +1,353 @@
+"""Background jobs.
+
+Side-effects a request does not have to wait for (moderator and help desk
+notifications, login bookkeeping, image deletion, B-Client notifications)
+are queued and run by JOB_WORKERS worker threads:
+
+    @jobs.task('notify_help_reply')
+    def notify_help_reply(request_id, user_id): ...
+
+    jobs.enqueue('notify_help_reply', request_id, user_id, key=f"help-reply:{reply_id}")
+
+- a job that raises is retried, up to max_attempts runs in total, after
+  JOB_RETRY_DELAY seconds doubled for every failed attempt
+- idempotency keys: while a job with the same key is queued or running,
+  enqueueing it again returns the existing job instead of adding a second one
+- JOB_QUEUE_BACKEND=database keeps the jobs in the job_queue table, so they
+  survive a restart and any NSN process (or `flask --app webapp run-jobs`)
+  can run them; the default 'memory' keeps them in this process. A finished
+  job's arguments are cleared from the table
+- local=True keeps a job in this process's memory queue whatever the
+  backend, for arguments that must never be written to the database
+  (session cookies)
+
+Job arguments must be JSON serializable. Handlers run in an app context.
+Workers start with the first enqueued job (and in run.py). The queue is
+reported at GET /internal/jobs (see metrics.py).
+"""
+import heapq
+import itertools
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import click
+from webapp import app
+from webapp import db
+from webapp.config import JOB_MAX_ATTEMPTS, JOB_QUEUE_BACKEND, JOB_RETRY_DELAY, JOB_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Seconds an idle worker waits before polling the job_queue table again
+POLL_INTERVAL = 1
+# A database job still 'running' after this many seconds is assumed lost
+# with its process and is run again
+RUNNING_TIMEOUT = 300
+# Finished jobs kept for status lookups
+HISTORY_SIZE = 1000
+HISTORY_SECONDS = 86400
+PURGE_PROBABILITY = 0.01
+RECENT_FAILURES = 10
+
+# name -> handler
+_tasks = {}
+
+_workers_started = False
+_workers_lock = threading.Lock()
+
+
+def task(name):
+    """Register a function as the handler of jobs called name"""
+    def register(func):
+        _tasks[name] = func
+        return func
+    return register
+
+
+def retry_delay(attempts):
+    return JOB_RETRY_DELAY * 2 ** (attempts - 1)
+
+
+class Job:
+    def __init__(self, job_id, name, args, key=None, max_attempts=JOB_MAX_ATTEMPTS, attempts=0):
+        self.job_id = job_id
+        self.name = name
+        self.args = args
+        self.key = key
+        self.max_attempts = max_attempts
+        self.attempts = attempts
+        self.status = 'queued'
+        self.run_at = time.time()
+        self.created_at = datetime.now()
+        self.finished_at = None
+        self.last_error = None
+
+    def to_dict(self):
+        return {'job_id': self.job_id, 'name': self.name, 'key': self.key, 'status': self.status,
+                'attempts': self.attempts, 'max_attempts': self.max_attempts, 'last_error': self.last_error,
+                'created_at': self.created_at, 'finished_at': self.finished_at}
+
+
+class MemoryQueue:
+    """Jobs in this process: a heap ordered by due time, plus recent history"""
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._heap = []
+        self._by_key = {}
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+
+    def put(self, name, args, key, max_attempts):
+        with self._cond:
+            if key and key in self._by_key:
+                return self._by_key[key].job_id
+            job = Job(next(self._ids), name, args, key, max_attempts)
+            self._jobs[job.job_id] = job
+            while len(self._jobs) > HISTORY_SIZE:
+                self._jobs.popitem(last=False)
+            if key:
+                self._by_key[key] = job
+            heapq.heappush(self._heap, (job.run_at, job.job_id, job))
+            self._cond.notify()
+            return job.job_id
+
+    def take(self, timeout):
+        """The next due job (marked running), or None after timeout seconds"""
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                now = time.time()
+                if self._heap and self._heap[0][0] <= now:
+                    job = heapq.heappop(self._heap)[2]
+                    job.status = 'running'
+                    job.attempts += 1
+                    return job
+                wait = deadline - now
+                if self._heap:
+                    wait = min(wait, self._heap[0][0] - now)
+                if wait <= 0:
+                    return None
+                self._cond.wait(wait)
+
+    def finish(self, job, error=None):
+        with self._cond:
+            job.last_error = error
+            if error is not None and job.attempts < job.max_attempts:
+                job.status = 'queued'
+                job.run_at = time.time() + retry_delay(job.attempts)
+                heapq.heappush(self._heap, (job.run_at, job.job_id, job))
+                self._cond.notify()
+                return
+            job.status = 'failed' if error is not None else 'done'
+            job.finished_at = datetime.now()
+            if job.key:
+                self._by_key.pop(job.key, None)
+
+    def get(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            return job.to_dict() if job else None
+
+    def stats(self):
+        with self._cond:
+            counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+            for job in self._jobs.values():
+                counts[job.status] += 1
+            failures = [job.to_dict() for job in reversed(self._jobs.values()) if job.status == 'failed']
+        return {'backend': 'memory', 'counts': counts, 'recent_failures': failures[:RECENT_FAILURES]}
+
+
+class DatabaseQueue:
+    """Jobs in the job_queue table, claimed with SELECT ... FOR UPDATE SKIP LOCKED"""
+
+    def __init__(self):
+        self._wake = threading.Event()
+
+    def put(self, name, args, key, max_attempts):
+        with db.get_cursor(db.WRITE) as cursor:
+            # An existing queued/running job with the same key is returned instead
+            cursor.execute('''
+                INSERT INTO job_queue (name, args, dedupe_key, max_attempts, run_at)
+                VALUES (%s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE job_id = LAST_INSERT_ID(job_id)
+            ''', (name, json.dumps(args), key, max_attempts, datetime.now()))
+            job_id = cursor.lastrowid
+        self._wake.set()
+        return job_id
+
+    def _claim(self):
+        conn = db.get_db(db.WRITE)
+        conn.start_transaction()
+        try:
+            with db.get_cursor(db.WRITE) as cursor:
+                now = datetime.now()
+                cursor.execute('''
+                    SELECT job_id, name, args, dedupe_key, attempts, max_attempts FROM job_queue
+                    WHERE (status = 'queued' AND run_at <= %s)
+                       OR (status = 'running' AND locked_at < %s)
+                    ORDER BY run_at
+                    LIMIT 1
+                    FOR UPDATE SKIP LOCKED
+                ''', (now, now - timedelta(seconds=RUNNING_TIMEOUT)))
+                row = cursor.fetchone()
+                if row is not None:
+                    cursor.execute('''
+                        UPDATE job_queue SET status = 'running', attempts = attempts + 1, locked_at = %s
+                        WHERE job_id = %s
+                    ''', (now, row['job_id']))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        if row is None:
+            return None
+        args = row['args']
+        if isinstance(args, (bytes, bytearray)):
+            args = args.decode('utf-8')
+        return Job(row['job_id'], row['name'], json.loads(args), row['dedupe_key'],
+                   row['max_attempts'], row['attempts'] + 1)
+
+    def take(self, timeout):
+        job = self._claim()
+        if job is None:
+            self._wake.wait(min(timeout, POLL_INTERVAL))
+            self._wake.clear()
+        return job
+
+    def finish(self, job, error=None):
+        now = datetime.now()
+        with db.get_cursor(db.WRITE) as cursor:
+            if error is not None and job.attempts < job.max_attempts:
+                cursor.execute('''
+                    UPDATE job_queue SET status = 'queued', run_at = %s, locked_at = NULL, last_error = %s
+                    WHERE job_id = %s
+                ''', (now + timedelta(seconds=retry_delay(job.attempts)), error, job.job_id))
+                return
+            # Finished jobs release their key, the same side-effect can be queued again,
+            # and drop their arguments, which may hold personal data
+            cursor.execute('''
+                UPDATE job_queue SET status = %s, dedupe_key = NULL, locked_at = NULL, last_error = %s,
+                                     args = '[]', finished_at = %s
+                WHERE job_id = %s
+            ''', ('failed' if error is not None else 'done', error, now, job.job_id))
+            if random.random() < PURGE_PROBABILITY:
+                cursor.execute("DELETE FROM job_queue WHERE status = 'done' AND finished_at < %s",
+                               (now - timedelta(seconds=HISTORY_SECONDS),))
+
+    def get(self, job_id):
+        with db.get_cursor() as cursor:
+            cursor.execute('''
+                SELECT job_id, name, dedupe_key AS `key`, status, attempts, max_attempts, last_error,
+                       created_at, finished_at
+                FROM job_queue WHERE job_id = %s
+            ''', (job_id,))
+            return cursor.fetchone()
+
+    def stats(self):
+        with db.get_cursor() as cursor:
+            cursor.execute('SELECT status, COUNT(*) AS c FROM job_queue GROUP BY status')
+            counts = {'queued': 0, 'running': 0, 'done': 0, 'failed': 0}
+            counts.update({row['status']: row['c'] for row in cursor.fetchall()})
+            cursor.execute('''
+                SELECT job_id, name, attempts, last_error, finished_at FROM job_queue
+                WHERE status = 'failed' ORDER BY finished_at DESC LIMIT %s
+            ''', (RECENT_FAILURES,))
+            failures = cursor.fetchall()
+        return {'backend': 'database', 'counts': counts, 'recent_failures': failures}
+
+
+def create_queue(backend):
+    if backend == 'database':
+        return DatabaseQueue()
+    return MemoryQueue()
+
+
+queue = create_queue(JOB_QUEUE_BACKEND)
+# Jobs enqueued with local=True; the same queue unless the backend is the database
+local_queue = queue if isinstance(queue, MemoryQueue) else MemoryQueue()
+
+
+def enqueue(name, *args, key=None, max_attempts=JOB_MAX_ATTEMPTS, local=False):
+    """Queue name(*args) for a background worker, returns the job id"""
+    if name not in _tasks:
+        raise LookupError(f"No job handler registered for {name}")
+    job_id = (local_queue if local else queue).put(name, list(args), key, max_attempts)
+    start_workers()
+    return job_id
+
+
+def run_job(job, source=None):
+    """Run one claimed job (taken from source, default the shared queue) and record the outcome"""
+    source = source or queue
+    try:
+        handler = _tasks.get(job.name)
+        if handler is None:
+            raise LookupError(f"No job handler registered for {job.name}")
+        handler(*job.args)
+    except Exception as e:
+        logger.warning(f"Job {job.name} #{job.job_id} failed (attempt {job.attempts}/{job.max_attempts}): {str(e)}")
+        source.finish(job, f"{type(e).__name__}: {str(e)}")
+    else:
+        source.finish(job)
+
+
+def _work(source):
+    while True:
+        try:
+            with app.app_context():
+                job = source.take(POLL_INTERVAL)
+                if job is not None:
+                    run_job(job, source)
+                db.close_db()
+        except Exception as e:
+            logger.error(f"Job worker error: {str(e)}")
+            time.sleep(POLL_INTERVAL)
+
+
+def start_workers(workers=JOB_WORKERS):
+    """Start the worker threads of this process (idempotent)"""
+    global _workers_started
+    with _workers_lock:
+        if _workers_started:
+            return False
+        _workers_started = True
+    for number in range(workers):
+        threading.Thread(target=_work, args=(queue,), name=f'job-worker-{number}', daemon=True).start()
+        if local_queue is not queue:
+            threading.Thread(target=_work, args=(local_queue,), name=f'local-job-worker-{number}',
+                             daemon=True).start()
+    return True
+
+
+def stats():
+    """Queue counters and recent failures for /internal/jobs"""
+    counts = queue.stats()
+    if local_queue is not queue:
+        counts['local'] = local_queue.stats()
+    return counts
+
+
+def get_job(job_id):
+    return queue.get(job_id)
+
+
+@app.cli.command('run-jobs')
+@click.option('--once', is_flag=True, help='Exit when no job is due instead of waiting for more.')
+def run_jobs_command(once):
+    """Run queued background jobs (JOB_QUEUE_BACKEND=database) in this process."""
+    processed = 0
+    while True:
+        job = queue.take(POLL_INTERVAL)
+        if job is None:
+            if once:
+                break
+            continue
+        run_job(job)
+        db.close_db()
+        processed += 1
+    click.echo(f"Ran {processed} jobs")
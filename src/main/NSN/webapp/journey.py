@@ -1,24 +1,174 @@
+import logging
 from webapp import app, announcement as a, event as e
 from webapp import db
 from webapp import premium
+from webapp import timeline
+from webapp import search
+from webapp import images
+from webapp import blobstore
+from webapp import jobs
 from flask import redirect, render_template, request, session, url_for, flash, jsonify
 from datetime import datetime
-from werkzeug.utils import secure_filename
-import os
+from webapp.utils import encode_keyset_cursor, decode_keyset_cursor
+from webapp.uploads import check_upload
+from webapp.config import MAX_UPLOAD_FILE_BYTES
+
+logger = logging.getLogger(__name__)
 
 ALLOWED_EXTENSIONS = {'jpg', 'jpeg', 'png'}
-MAX_CONTENT_LENGTH = 5 * 1024 * 1024
+ALLOWED_IMAGE_FORMATS = {'JPEG', 'PNG'}
+MAX_CONTENT_LENGTH = MAX_UPLOAD_FILE_BYTES
 
 def allowed_file(filename):
     """Check if the filename has a valid extension (JPG/PNG)."""
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
 
+JOURNEYS_PER_PAGE = 12
+
+
+def encode_journey_cursor(journey, ranked=False):
+    """Encode a journey list position; ranked lists prefix the relevance score"""
+    position = encode_keyset_cursor(journey['created_at'], journey['journey_id'])
+    if ranked:
+        return f"{float(journey['relevance'])!r}_{position}"
+    return position
+
+
+def decode_journey_cursor(value, ranked=False):
+    """Decode a journey list cursor into (relevance, created_at, journey_id), or None if invalid"""
+    if not value:
+        return None
+    relevance = None
+    if ranked:
+        try:
+            relevance, value = value.split('_', 1)
+            relevance = float(relevance)
+        except ValueError:
+            return None
+    position = decode_keyset_cursor(value)
+    if position is None:
+        return None
+    return (relevance,) + position
+
+
+def fetch_journey_page(cursor, query, params, after=None, ranked=False, per_page=JOURNEYS_PER_PAGE):
+    """
+    Fetch one keyset page of a journey list query
+
+    The query must select created_at and journey_id (and relevance when ranked).
+    Pages are ordered newest first, or by relevance first for ranked searches,
+    and continue after the `after` cursor. Returns (journeys, next_cursor).
+    """
+    keyset = ''
+    keyset_params = []
+    position = decode_journey_cursor(after, ranked)
+    if position:
+        relevance, created_at, journey_id = position
+        keyset = '(page.created_at < %s OR (page.created_at = %s AND page.journey_id < %s))'
+        keyset_params = [created_at, created_at, journey_id]
+        if ranked:
+            keyset = f'(page.relevance < %s OR (page.relevance = %s AND {keyset}))'
+            keyset_params = [relevance, relevance] + keyset_params
+        keyset = f'WHERE {keyset}'
+    order = 'page.created_at DESC, page.journey_id DESC'
+    if ranked:
+        order = f'page.relevance DESC, {order}'
+
+    # One extra row tells us whether there is a next page
+    cursor.execute(f'''
+        SELECT * FROM ({query}) page
+        {keyset}
+        ORDER BY {order}
+        LIMIT %s
+    ''', list(params) + keyset_params + [per_page + 1])
+    journeys = cursor.fetchall()
+
+    next_cursor = None
+    if len(journeys) > per_page:
+        journeys = journeys[:per_page]
+        next_cursor = encode_journey_cursor(journeys[-1], ranked)
+    return journeys, next_cursor
+
+
+def private_journey_query(user_id, keyword='', filter_type=''):
+    """Build (sql, params) selecting a user's own journeys, optionally filtered by a search"""
+    query = '''
+        SELECT j.journey_id, j.title, j.start_date, j.description,
+        j.cover_image, j.display, j.status,j.created_at, j.no_edits_flag
+        FROM journeys j
+        WHERE j.user_id = %s
+    '''
+    params = [user_id]  # Parameter for the current user's ID
+
+    if filter_type == "content" and keyword != '':
+        # Extend query to filter by title or description
+        match = search.match_journeys(keyword)
+        query += f' AND {match.condition}'
+        params.extend(match.params)
+
+    if filter_type == "location" and keyword != '':
+        # Semi-join: keep journeys with at least one event at a matching location
+        match = search.match_locations(keyword)
+        query += f''' AND EXISTS (
+            SELECT 1 FROM events e JOIN locations l ON e.location_id = l.location_id
+            WHERE e.journey_id = j.journey_id AND {match.condition})'''
+        params.extend(match.params)
+    return query, params
+
+
+def public_journey_query(keyword='', filter_type='content', loggedin=False):
+    """
+    Build the public journey list query
+
+    Returns (sql, params, ranked). Content searches are ranked by full-text
+    relevance; location filters use an EXISTS semi-join over events instead
+    of a DISTINCT fan-out join.
+    """
+    relevance, relevance_params = '0', []
+    conditions = []
+    params = []
+
+    # Handle search criteria (full-text, ranked by relevance)
+    if filter_type == "content" and keyword != '':
+        # Extend query to filter by title or description
+        match = search.match_journeys(keyword)
+        conditions.append(match.condition)
+        params.extend(match.params)
+        relevance, relevance_params = match.score, match.score_params
+
+    if filter_type == "location" and keyword != '':
+        # Extend query to filter by location in events
+        match = search.match_locations(keyword)
+        conditions.append(f'''EXISTS (
+            SELECT 1 FROM events e JOIN locations l ON e.location_id = l.location_id
+            WHERE e.journey_id = j.journey_id AND {match.condition})''')
+        params.extend(match.params)
+
+    # Check loggedin
+    if loggedin:
+        conditions.append("(j.display = 'public' or j.display = 'published')")
+    else:
+        conditions.append('''j.display = 'published' AND EXISTS (
+            SELECT 1 FROM members m WHERE m.user_id = u.user_id AND m.m_status != 'expired')''')
+
+    query = f'''
+        SELECT j.journey_id, j.user_id, j.title, j.start_date, j.description,j.cover_image,
+               j.display, j.status,j.created_at, j.updated_at, j.no_edits_flag, u.username,
+               {relevance} AS relevance
+        FROM journeys j
+        inner join users u on j.user_id=u.user_id
+        WHERE j.status='open' and u.status='active' AND {' AND '.join(conditions)}
+    '''
+    return query, relevance_params + params, relevance != '0'
+
+
 @app.route('/journey/private/view', methods=['GET', 'POST'])
 def private_journey():
     """Private Journey Viewing Endpoint
 
     Allows users to view their private journeys and events, supports keyword search.
+    Journeys are paged with a keyset cursor (?after=) from newest to oldest.
     """
     # Ensure the user is logged in; redirect to login page if not
     if 'loggedin' not in session:
@@ -32,42 +182,16 @@ def private_journey():
     user_id = request.form.get('user_id', '').strip()  # Get search keyword from form
     if user_id=='':
         user_id=session['user_id']
-    
-    # Use a cursor with dictionary results for easier data handling
-    with db.get_cursor() as cursor:
-        # Define the base query to retrieve private journeys for the current user
-        query = '''
-            SELECT distinct j.journey_id, j.title, j.start_date, j.description,
-            j.cover_image, j.display, j.status,j.created_at, j.no_edits_flag
-            FROM journeys j
-            left join events e on j.journey_id=e.journey_id 
-            left join locations l on e.location_id=l.location_id
-            WHERE j.user_id = %s 
-            
-        '''
-        params = [user_id]  # Parameter for the current user's ID
 
-        # Handle keyword search if the request is a POST
-        if request.method == 'POST':
-            keyword = request.form.get('keyword', '').strip()  # Get search keyword from form
-            filter = request.form.get('filter', '').strip()  # Get search keyword from form
-            
-            if filter=="content" and keyword !='':
-                # Extend query to filter by title or description
-                query += ' AND (j.title LIKE %s OR j.description LIKE %s)'
-                params.extend([f'%{keyword}%', f'%{keyword}%'])  # Add wildcard search terms
-            
-            if filter=="location" and keyword !='':
-                query = ''' And l.address like %s'''
-                params = [user_id, f'%{keyword}%']
+    # Search from the form, or from the query string when following a page link
+    keyword = request.values.get('keyword', '').strip()
+    filter_type = request.values.get('filter', '').strip()
+    after = request.args.get('after')
 
-
-        query += ' ORDER BY  j.created_at DESC;'  # Show newest journeys first
-        # Execute the journey query and fetch all results
-
-
-        cursor.execute(query, params)
-        journey_list = cursor.fetchall()
+    # Use a cursor with dictionary results for easier data handling
+    with db.get_cursor() as cursor:
+        query, params = private_journey_query(user_id, keyword, filter_type)
+        journey_list, next_cursor = fetch_journey_page(cursor, query, params, after)
 
         db.close_db()
 
@@ -77,7 +201,7 @@ def private_journey():
             flash(is_member['note_msg'], "info")
 
     # Display a message if the user has no private journeys
-    if not journey_list:
+    if not journey_list and not after:
         flash("You haven't added any journeys yet. Click 'Add Journey' to create one!", "dark")
 
     # Render the private journey page with journey and event data.
@@ -85,18 +209,23 @@ def private_journey():
 
     return render_template('private_journey.html', is_member=is_member,journey_list=journey_list,
                             journey_successful=journey_successful,
-                           event_successful=event_successful)
+                           event_successful=event_successful,
+                           keyword=keyword,
+                           filter=filter_type,
+                           next_cursor=next_cursor)
 
 
 
 # Update your existing public_journey route with this enhanced version
 
 @app.route('/journey/public/view', methods=['GET', 'POST'])
+@db.read_only
 def public_journey():
     """Public Journey Viewing Endpoint
     
     Allows all logged-in users to view public journeys
     Journeys are displayed from most recently updated to least recently updated.
+    Only the first page is rendered; later pages come from public_journey_page.
     """
     
     loggedin = 'loggedin' in session
@@ -135,41 +264,9 @@ def public_journey():
         filter_type = request.args.get('filter', 'content').strip()
     
     with db.get_cursor() as cursor:
-        # Define the base query to retrieve journeys marked as 'public'
-        query = '''
-            SELECT distinct j.journey_id, j.user_id, j.title, j.start_date, j.description,j.cover_image, 
-                   j.display, j.status,j.created_at, j.updated_at, j.no_edits_flag, u.username
-            FROM journeys j 
-            left join events e on j.journey_id=e.journey_id 
-            left join locations l on e.location_id=l.location_id
-            inner join users u on j.user_id=u.user_id
-            left join members m on m.user_id=u.user_id
-            WHERE j.status='open' and u.status='active'
-        '''
-        params = []  
-
-        # Handle search criteria
-        if filter_type == "content" and keyword != '':
-            # Extend query to filter by title or description
-            query += ' AND (j.title LIKE %s OR j.description LIKE %s)'
-            params.extend([f'%{keyword}%', f'%{keyword}%'])  # Add wildcard search terms
-        
-        if filter_type == "location" and keyword != '':
-            # Extend query to filter by location in events
-            query += " AND l.address like %s"
-            params.append(f'%{keyword}%')
-
-        # Check loggedin 
-        if loggedin:
-            query += '''  AND (j.display = 'public' or j.display = 'published') '''
-        else:
-            query += '''  AND  j.display = 'published' AND m.m_status !='expired' '''
-
-        query += ' ORDER BY  j.created_at DESC;'  # Show newest journeys first
-        
-        # Execute the query and fetch the list of public journeys.
-        cursor.execute(query, params)
-        journey_list = cursor.fetchall()
+        # Execute the query and fetch the first page of public journeys.
+        query, params, ranked = public_journey_query(keyword, filter_type, loggedin)
+        journey_list, next_cursor = fetch_journey_page(cursor, query, params, ranked=ranked)
         
         # Retrieve active announcements
         cursor.execute('''
@@ -187,7 +284,31 @@ def public_journey():
                           announcement_list=announcement_list,
                           keyword=keyword,
                           filter=filter_type,
-                          can_follow=can_follow)
+                          can_follow=can_follow,
+                          next_cursor=next_cursor)
+
+
+@app.route('/journey/public/page', methods=['GET'])
+@db.read_only
+def public_journey_page():
+    """Infinite scroll endpoint returning the next page of public journeys as rendered cards"""
+    keyword = request.args.get('keyword', '').strip()
+    filter_type = request.args.get('filter', 'content').strip()
+    after = request.args.get('after')
+
+    query, params, ranked = public_journey_query(keyword, filter_type, 'loggedin' in session)
+    if decode_journey_cursor(after, ranked) is None:
+        return jsonify({'success': False, 'message': 'Invalid cursor'}), 400
+
+    with db.get_cursor() as cursor:
+        journey_list, next_cursor = fetch_journey_page(cursor, query, params, after, ranked)
+        db.close_db()
+
+    return jsonify({
+        'success': True,
+        'html': render_template('public_journey_cards.html', journey_list=journey_list),
+        'next_cursor': next_cursor
+    })
 
 @app.route('/journey/view/<int:journey_id>', methods=['GET'])
 def view_journey(journey_id):
@@ -583,11 +704,10 @@ def removeJourneyCoverImage(user_id,journey_id):
             old_image = cursor.fetchone()
             if old_image['cover_image'] is not None :
                 if str(old_image['cover_image']).strip()!="":
-                    img_path = os.path.join(app.root_path, "static", "journeys", old_image['cover_image'])
-                    if os.path.exists(img_path):
-                        os.remove(img_path)
+                    released = blobstore.release(cursor, old_image['cover_image'], 'journeys')
 
                     cursor.execute('UPDATE journeys set cover_image="" WHERE journey_id = %s', (journey_id,))
+                    blobstore.delete_released([released])
 
             db.close_db()
     except Exception as e:
@@ -598,9 +718,9 @@ def removeJourneyCoverImage(user_id,journey_id):
 def uploadJourneyCoverImage(user_id,journey_id,file):
     
     """
-    Handles event image upload logic:
+    Handles journey cover upload logic:
       1. Validate the uploaded file (only JPG/PNG, <= 5MB).
-      2. Store file and update the database record.
+      2. Store file and update the database record, then drop the old cover.
     """
     if  not journey_id or not file:
         flash("No file provided or invalid parameters",'danger')
@@ -624,40 +744,15 @@ def uploadJourneyCoverImage(user_id,journey_id,file):
         flash("Journey not found or you lack permission.", "danger")
         return
     
-    # 1. Delete old graphs (database + disk)
-    try:
-        with db.get_cursor() as cursor:
-            cursor.execute('SELECT cover_image FROM journeys WHERE journey_id = %s', (journey_id,))
-            old_image = cursor.fetchone()
-            if old_image['cover_image'] is not None :
-                if str(old_image['cover_image']).strip()!="":
-                    img_path = os.path.join(app.root_path, "static", "journeys", old_image['cover_image'])
-                    if os.path.exists(img_path):
-                        os.remove(img_path)
-
-                    cursor.execute('UPDATE journeys set cover_image="" WHERE journey_id = %s', (journey_id,))
-
-            db.close_db()
-    except Exception as e:
-        flash("Failed to remove old images: " + str(e), "danger")
-        return
-    
-    # 2. uploaded files
-    upload_folder = os.path.join(app.root_path, "static", "journeys")
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
-        
-    
+    # 1. Validate the uploaded file before touching the current cover
     if file.filename == '':
         flash("File is missing.", "danger")
         return
     
-    # Validate file size (simple check example – can refine as needed)
-    file.seek(0, os.SEEK_END)
-    file_length = file.tell()
-    file.seek(0, 0)  # Reset file pointer
-    if file_length > MAX_CONTENT_LENGTH:
-        flash("File is too large. Maximum allowed size is 5MB.", "danger")
+    # Validate size and magic bytes (checked while the upload was streamed)
+    ok, message = check_upload(file, MAX_CONTENT_LENGTH)
+    if not ok:
+        flash(message, "danger")
         return
         
 
@@ -665,33 +760,24 @@ def uploadJourneyCoverImage(user_id,journey_id,file):
     if not allowed_file(file.filename):
         flash("Only JPG/PNG image files are allowed.", "danger")
         return
-        
-
-    # Generate a secure filename
-    filename = secure_filename(file.filename)
-    
-    # Example storage path: "static/uploads/events"
-    # Ensure the directory exists
-    upload_folder = os.path.join(app.root_path, "static", "journeys")
-    if not os.path.exists(upload_folder):
-        os.makedirs(upload_folder)
-
-    # To prevent filename collisions, append a timestamp (or a random string)
-    import time
-    unique_filename = f"{int(time.time())}_{filename}"
-    save_path = os.path.join(upload_folder, unique_filename)
 
+    # Validate the content by decoding it
     try:
-        file.save(save_path)
-    except Exception as e:
-        flash("Error saving file: " + str(e), "danger")
+        image_format = images.validate_upload(file, ALLOWED_IMAGE_FORMATS)
+    except images.InvalidImage:
+        flash("The uploaded file is not a valid JPG/PNG image.", "danger")
         return
-        
-    # 5) Update the database record (event_image field)
+
+    # 2. Store the file under its content hash and swap it in for the old cover
     try:
         with db.get_cursor() as cursor:
+            cursor.execute('SELECT cover_image FROM journeys WHERE journey_id = %s', (journey_id,))
+            old_image = cursor.fetchone()
+            blob_key = blobstore.store_upload(cursor, file, image_format)
             cursor.execute('''UPDATE journeys set cover_image=%s WHERE journey_id = %s; 
-            ''', (unique_filename,journey_id, ))
+            ''', (blob_key,journey_id, ))
+            if old_image and str(old_image['cover_image'] or '').strip() != "":
+                blobstore.delete_released([blobstore.release(cursor, old_image['cover_image'], 'journeys')])
             db.close_db()
     except Exception as e:
         flash("Error updating database: " + str(e), "danger")
@@ -759,13 +845,14 @@ def follow_journey(journey_id):
                     INSERT INTO journey_follows (user_id, journey_id) 
                     VALUES (%s, %s)
                 ''', (user_id, journey_id))
+                timeline.refresh_user(cursor, user_id)
                 flash(f"You are now following '{journey['title']}'!", "success")
             
             db.close_db()
             
     except Exception as e:
         flash("An error occurred while following the journey. Please try again.", "danger")
-        print(f"Error following journey: {e}")  # For debugging
+        logger.error("Error following journey: %s", e)  # For debugging
     
     return redirect(url_for('public_journey'))
 
@@ -801,13 +888,14 @@ def unfollow_journey(journey_id):
                     DELETE FROM journey_follows 
                     WHERE user_id = %s AND journey_id = %s
                 ''', (user_id, journey_id))
+                timeline.refresh_user(cursor, user_id)
                 flash(f"You have unfollowed '{follow_record['title']}'.", "success")
             
             db.close_db()
             
     except Exception as e:
         flash("An error occurred while unfollowing the journey. Please try again.", "danger")
-        print(f"Error unfollowing journey: {e}")  # For debugging
+        logger.error("Error unfollowing journey: %s", e)  # For debugging
     
     # Check if request came from departure board
     if request.referrer and 'departure_board' in request.referrer:
@@ -854,7 +942,7 @@ def log_journey_edit(journey_id, editor_id, field_changed, old_value, new_value,
             db.close_db()
         return True
     except Exception as e:
-        print(f"Error logging journey edit: {e}")
+        logger.error("Error logging journey edit: %s", e)
         return False
 
 
@@ -866,7 +954,7 @@ def check_journey_no_edits_flag(journey_id):
             result = cursor.fetchone()
             return result and result.get('no_edits_flag', False)
     except Exception as e:
-        print(f"Error checking no_edits_flag: {e}")
+        logger.error("Error checking no_edits_flag: %s", e)
         return False
 
 
@@ -889,8 +977,8 @@ def admin_edit_journey():
         status = request.form.get("status", "open").strip()
         edit_reason = request.form.get("edit_reason", "").strip()
 
-        print(f"DEBUG EDIT: Attempting to edit journey {journey_id}")
-        print(f"DEBUG EDIT: User role = {role}, User ID = {session['user_id']}")
+        logger.debug("DEBUG EDIT: Attempting to edit journey %s", journey_id)
+        logger.debug("DEBUG EDIT: User role = %s, User ID = %s", role, session['user_id'])
 
         # Verify Edit Reason
         if not edit_reason or len(edit_reason) < 10:
@@ -915,7 +1003,7 @@ def admin_edit_journey():
                     flash("Journey not found.", "danger")
                     return redirect(url_for('public_journey'))
 
-                print(f"DEBUG EDIT: Journey {journey_id} no_edits_flag = {journey_info.get('no_edits_flag')}")
+                logger.debug("DEBUG EDIT: Journey %s no_edits_flag = %s", journey_id, journey_info.get('no_edits_flag'))
 
                 # Check No-Edits Protection
                 if journey_info.get('no_edits_flag'):
@@ -985,7 +1073,7 @@ def admin_edit_journey():
             return redirect(url_for('public_journey'))
 
         except Exception as e:
-            print(f"ERROR in admin_edit_journey: {e}")
+            logger.debug("ERROR in admin_edit_journey: %s", e)
             flash(f"Error updating journey: {e}", "danger")
             return redirect(url_for('public_journey'))
 
@@ -1060,9 +1148,9 @@ def toggle_journey_no_edits(journey_id):
     user_id = session['user_id']
 
     # Add detailed logging
-    print(f"=== Toggle No-Edits Debug ===")
-    print(f"Journey ID: {journey_id}")
-    print(f"User ID: {user_id}")
+    logger.debug("=== Toggle No-Edits Debug ===")
+    logger.debug("Journey ID: %s", journey_id)
+    logger.debug("User ID: %s", user_id)
 
     try:
         # Using transactions to ensure data consistency
@@ -1082,7 +1170,7 @@ def toggle_journey_no_edits(journey_id):
                 ''', (journey_id,))
                 journey = cursor.fetchone()
 
-                print(f"Journey data: {journey}")
+                logger.debug("Journey data: %s", journey)
 
                 if not journey:
                     conn.rollback()
@@ -1095,7 +1183,7 @@ def toggle_journey_no_edits(journey_id):
 
                 # 3. Check if the user has subscription history (current or expired subscriber)
                 has_subscription_history = journey.get('m_status') in ['active', 'expired']
-                print(f"Subscription status: {journey.get('m_status')}, Has history: {has_subscription_history}")
+                logger.debug("Subscription status: %s, Has history: %s", journey.get('m_status'), has_subscription_history)
 
                 if not has_subscription_history:
                     conn.rollback()
@@ -1108,8 +1196,8 @@ def toggle_journey_no_edits(journey_id):
                 current_flag = bool(journey['no_edits_flag']) if journey['no_edits_flag'] is not None else False
                 new_flag = not current_flag
 
-                print(f"Current flag: {current_flag} (type: {type(journey['no_edits_flag'])})")
-                print(f"New flag: {new_flag}")
+                logger.debug("Current flag: %s (type: %s)", current_flag, type(journey['no_edits_flag']))
+                logger.debug("New flag: %s", new_flag)
 
                 # 5. Update the database
                 if new_flag:
@@ -1133,7 +1221,7 @@ def toggle_journey_no_edits(journey_id):
 
                 # 6. Check if the update was successful
                 affected_rows = cursor.rowcount
-                print(f"Affected rows: {affected_rows}")
+                logger.debug("Affected rows: %s", affected_rows)
 
                 if affected_rows == 0:
                     conn.rollback()
@@ -1147,11 +1235,11 @@ def toggle_journey_no_edits(journey_id):
                 ''', (journey_id,))
                 updated_journey = cursor.fetchone()
 
-                print(f"Updated journey data: {updated_journey}")
+                logger.debug("Updated journey data: %s", updated_journey)
 
                 if updated_journey:
                     actual_flag = bool(updated_journey['no_edits_flag'])
-                    print(f"Actual flag after update: {actual_flag}")
+                    logger.debug("Actual flag after update: %s", actual_flag)
 
                     # Verify that the update was correct
                     if actual_flag != new_flag:
@@ -1165,7 +1253,7 @@ def toggle_journey_no_edits(journey_id):
 
             # 8. Committing a transaction
             conn.commit()
-            print(f"Transaction committed successfully")
+            logger.debug("Transaction committed successfully")
 
             return jsonify({
                 'success': True,
@@ -1183,13 +1271,11 @@ def toggle_journey_no_edits(journey_id):
         except Exception as e:
             # rollback
             conn.rollback()
-            print(f"Transaction rolled back due to error: {e}")
+            logger.debug("Transaction rolled back due to error: %s", e)
             raise e
 
     except Exception as e:
-        print(f"Error toggling no_edits flag: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Error toggling no_edits flag: %s", e)
         return jsonify({'error': f'An internal error occurred: {str(e)}'}), 500
 
 # Database debugging functions added to journey.py
@@ -1370,6 +1456,8 @@ def get_journey_details(journey_id):
                     'status': journey['status'],
                     'display': journey['display'],
                     'cover_image': journey['cover_image'],
+                    'cover_image_url': url_for('static', filename=blobstore.static_path(journey['cover_image'], 'journeys'))
+                                       if journey['cover_image'] else None,
                     'owner_username': journey['owner_username'],
                     'owner_id': journey['owner_id'],
                     'owner_full_name': f"{journey['first_name']} {journey['last_name']}" if journey['first_name'] and
@@ -1380,7 +1468,7 @@ def get_journey_details(journey_id):
             })
 
     except Exception as e:
-        print(f"Error getting journey details: {e}")
+        logger.error("Error getting journey details: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 
@@ -1419,7 +1507,9 @@ def validate_journey_report_data(journey_id, reporter_id, reason, details):
 
 # Notification function
 
+@jobs.task('notify_moderators_new_journey_report')
 def notify_moderators_new_journey_report(report_id):
+    """Background job queued when a journey is reported"""
     try:
         with db.get_cursor() as cursor:
             # 获取报告详情
@@ -1450,14 +1540,14 @@ def notify_moderators_new_journey_report(report_id):
 
                 # Email notification or system notification can be implemented here
                 # Currently only logs are printed
-                print(
-                    f"New journey report #{report_id}: {report['reason']} for journey '{report['journey_title']}' by {report['reporter_username']}")
-                print(f"Notifying {len(moderators)} moderators")
+                logger.debug("New journey report #%s: %s for journey '%s' by %s", report_id, report['reason'], report['journey_title'], report['reporter_username'])
+                logger.debug("Notifying %s moderators", len(moderators))
 
             db.close_db()
 
     except Exception as e:
-        print(f"Error notifying moderators: {e}")
+        logger.error("Error notifying moderators: %s", e)
+        raise
 
 
 # Auxiliary functions related to statistical reports
@@ -1507,7 +1597,7 @@ def get_journey_report_statistics():
             return stats
 
     except Exception as e:
-        print(f"Error getting journey report statistics: {e}")
+        logger.error("Error getting journey report statistics: %s", e)
         return {}
 
 
@@ -1525,7 +1615,7 @@ def check_flask_app_config():
             missing_configs.append(config)
 
     if missing_configs:
-        print(f"Warning: Missing Flask configurations: {missing_configs}")
+        logger.warning("Warning: Missing Flask configurations: %s", missing_configs)
         return False
 
     return True
@@ -1624,13 +1714,15 @@ def report_journey():
                 INSERT INTO journey_reports (journey_id, reporter_id, reason, details, status, created_at)
                 VALUES (%s, %s, %s, %s, 'pending', %s)
             ''', (journey_id, reporter_id, reason, details, datetime.now()))
+            report_id = cursor.lastrowid
 
             db.close_db()
 
+        jobs.enqueue('notify_moderators_new_journey_report', report_id, key=f"journey-report:{report_id}")
         flash('Thank you for your report. Our moderation team will review it shortly.', 'success')
 
     except Exception as e:
-        print(f"Error submitting journey report: {e}")
+        logger.error("Error submitting journey report: %s", e)
         flash('An error occurred while submitting your report. Please try again.', 'danger')
 
     return redirect(url_for('public_journey'))
@@ -1684,7 +1776,7 @@ def journey_moderation_dashboard():
             db.close_db()
 
     except Exception as e:
-        print(f"Error fetching journey reports: {e}")
+        logger.error("Error fetching journey reports: %s", e)
         flash('Error loading journey reports.', 'danger')
         reported_journeys = []
 
@@ -1790,7 +1882,7 @@ def journey_moderation_action(report_id):
     except Exception as e:
         if conn:
             conn.rollback()
-        print(f"Error in journey_moderation_action: {e}")
+        logger.error("Error in journey_moderation_action: %s", e)
         return jsonify({'success': False, 'message': f'An error occurred: {str(e)}'}), 500
 
     finally:
@@ -1842,7 +1934,7 @@ def journey_reports_stats():
         })
 
     except Exception as e:
-        print(f"Error getting journey reports stats: {e}")
+        logger.error("Error getting journey reports stats: %s", e)
         return jsonify({'error': 'Internal server error'}), 500
 
 
@@ -1870,5 +1962,5 @@ def check_user_report_permissions(user_id):
             return True
 
     except Exception as e:
-        print(f"Error checking user report permissions: {e}")
+        logger.error("Error checking user report permissions: %s", e)
         return False
\ No newline at end of file
@@ -1,5 +1,6 @@
 from webapp import app
 from webapp import db
+from webapp import search
 from flask import redirect, render_template, request, session, url_for,jsonify,flash
 
 @app.route('/regions', methods=['GET', 'POST'])
@@ -46,22 +47,13 @@ def get_cities():
 def search_location():
 
     #param: keywords
-    keyword=request.args.get('keyword')
-    wrappedKeyword='%'+keyword+'%'
+    keyword=request.args.get('keyword', '')
 
-    locations=[]
     with db.get_cursor() as cursor:
-        # query address from db
-        cursor.execute('SELECT address FROM locations where address like %s limit 0,10;',
-                       (wrappedKeyword,))
-        address_list = cursor.fetchall()
+        # prefix autocomplete through the full-text index
+        locations = search.autocomplete_locations(cursor, keyword)
         db.close_db()
 
-        for a in address_list:
-            locations.append(a['address'])
-
-        print(locations)
-
     return jsonify(locations)
 
 @app.route('/location/merge', methods=['GET', 'POST'])
@@ -1,13 +1,17 @@
+import logging
 from webapp import app
 from webapp import db
-from flask import redirect, render_template, request, session, url_for, jsonify
+from flask import g, redirect, render_template, request, session, url_for, jsonify
 from flask_bcrypt import Bcrypt
 import re
 from flask import request, flash
 from webapp import announcement
+from webapp import bclient
+from webapp import jobs
+from webapp import sessions
 from flask_bcrypt import generate_password_hash
 from werkzeug.security import check_password_hash
-import requests
+import threading
 import time
 import json
 import os
@@ -15,11 +19,15 @@ import base64
 from datetime import datetime
 from webapp.config import B_CLIENT_API_URL, B_CLIENT_WEBSOCKET_URL, NSN_URL
 
+logger = logging.getLogger(__name__)
+
 bcrypt = Bcrypt(app)
 
 def get_nmp_params_from_request(request):
-    """从请求中获取NMP参数"""
-    return {
+    """从请求中获取NMP参数 (parsed once per request, callers get their own copy)"""
+    if 'nmp_params' in g:
+        return dict(g.nmp_params)
+    g.nmp_params = {
         'nmp_injected': request.args.get('nmp_injected', 'false').lower() == 'true',
         'nmp_user_id': request.args.get('nmp_user_id', ''),
         'nmp_username': request.args.get('nmp_username', ''),
@@ -31,15 +39,16 @@ def get_nmp_params_from_request(request):
         'nmp_cluster_id': request.args.get('nmp_cluster_id', ''),
         'nmp_channel_id': request.args.get('nmp_channel_id', '')
     }
+    return dict(g.nmp_params)
 
 def save_nmp_to_session(nmp_params, additional_params=None):
     """统一保存NMP参数到session"""
     if not nmp_params.get('nmp_user_id'):
         return  # 如果没有用户ID，不保存任何NMP参数
     
-    print(f"NSN: ===== SAVING NMP PARAMETERS TO SESSION =====")
-    print(f"NSN: Before save - session keys: {list(session.keys())}")
-    print(f"NSN: NMP params to save: {nmp_params}")
+    logger.debug("NSN: ===== SAVING NMP PARAMETERS TO SESSION =====")
+    logger.debug("NSN: Before save - session keys: %s", list(session.keys()))
+    logger.debug("NSN: NMP params to save: %s", nmp_params)
     
     # 保存核心NMP参数
     session['nmp_user_id'] = nmp_params['nmp_user_id']
@@ -69,17 +78,17 @@ def save_nmp_to_session(nmp_params, additional_params=None):
     
     # 验证保存结果
     saved_nmp_params = {k: v for k, v in session.items() if k.startswith('nmp_')}
-    print(f"NSN: After save - session keys: {list(session.keys())}")
-    print(f"NSN: Saved NMP params: {saved_nmp_params}")
-    print(f"NSN: Saved NMP parameters to session: user_id={nmp_params['nmp_user_id']}")
-    print(f"NSN: ===== END SAVING NMP PARAMETERS =====")
+    logger.debug("NSN: After save - session keys: %s", list(session.keys()))
+    logger.debug("NSN: Saved NMP params: %s", saved_nmp_params)
+    logger.debug("NSN: Saved NMP parameters to session: user_id=%s", nmp_params['nmp_user_id'])
+    logger.debug("NSN: ===== END SAVING NMP PARAMETERS =====")
 
 def clear_nmp_from_session():
     """清除session中的NMP参数"""
     nmp_keys = [key for key in session.keys() if key.startswith('nmp_')]
     for key in nmp_keys:
         session.pop(key, None)
-    print(f"NSN: Cleared NMP parameters from session")
+    logger.debug("NSN: Cleared NMP parameters from session")
 
 def require_login_with_nmp(f):
     """
@@ -92,16 +101,16 @@ def require_login_with_nmp(f):
     def decorated_function(*args, **kwargs):
         # 检查用户是否已登录
         if 'loggedin' not in session:
-            print(f"🔍 NMP Decorator: User not logged in, checking for NMP parameters...")
+            logger.debug("🔍 NMP Decorator: User not logged in, checking for NMP parameters...")
             
             # 获取NMP参数
             nmp_params = get_nmp_params_from_request(request)
             
             # 如果有NMP参数，保存到session并重定向到登录页面
             if nmp_params.get('nmp_user_id'):
-                print(f"🔍 NMP Decorator: Found NMP parameters, saving to session and redirecting to login")
-                print(f"🔍 NMP Decorator: NMP user_id: {nmp_params.get('nmp_user_id')}")
-                print(f"🔍 NMP Decorator: NMP username: {nmp_params.get('nmp_username')}")
+                logger.debug("🔍 NMP Decorator: Found NMP parameters, saving to session and redirecting to login")
+                logger.debug("🔍 NMP Decorator: NMP user_id: %s", nmp_params.get('nmp_user_id'))
+                logger.debug("🔍 NMP Decorator: NMP username: %s", nmp_params.get('nmp_username'))
                 
                 save_nmp_to_session(nmp_params)
                 return redirect(url_for('login', 
@@ -109,7 +118,7 @@ def require_login_with_nmp(f):
                                       nmp_user_id=nmp_params['nmp_user_id'],
                                       nmp_username=nmp_params['nmp_username']))
             else:
-                print(f"🔍 NMP Decorator: No NMP parameters found, redirecting to login without NMP")
+                logger.debug("🔍 NMP Decorator: No NMP parameters found, redirecting to login without NMP")
                 return redirect(url_for('login'))
         
         # 用户已登录，正常执行原函数
@@ -119,53 +128,39 @@ def require_login_with_nmp(f):
 
 def verify_nmp_session():
     """验证session中的NMP参数是否完整"""
-    print(f"NSN: ===== VERIFYING NMP SESSION =====")
-    print(f"NSN: Current session keys: {list(session.keys())}")
+    logger.debug("NSN: ===== VERIFYING NMP SESSION =====")
+    logger.debug("NSN: Current session keys: %s", list(session.keys()))
     
     nmp_params = {k: v for k, v in session.items() if k.startswith('nmp_')}
-    print(f"NSN: Found NMP parameters: {nmp_params}")
+    logger.debug("NSN: Found NMP parameters: %s", nmp_params)
     
     required_params = ['nmp_user_id', 'nmp_username', 'nmp_client_type', 'nmp_timestamp']
     missing_params = [param for param in required_params if param not in nmp_params]
     
     if missing_params:
-        print(f"NSN: Missing required NMP parameters: {missing_params}")
+        logger.debug("NSN: Missing required NMP parameters: %s", missing_params)
         return False
     else:
-        print(f"NSN: All required NMP parameters present")
+        logger.debug("NSN: All required NMP parameters present")
         return True
     
-    print(f"NSN: ===== END VERIFYING NMP SESSION =====")
+    logger.debug("NSN: ===== END VERIFYING NMP SESSION =====")
 
 def parse_session_cookie(session_cookie):
     """统一的session cookie解析函数，支持JSON和Flask格式"""
     try:
-        print(f"NSN: ===== UNIFIED SESSION COOKIE PARSING =====")
-        print(f"NSN: Session cookie type: {type(session_cookie)}")
-        print(f"NSN: Session cookie length: {len(session_cookie)}")
-        print(f"NSN: Session cookie content: {session_cookie}")
-        
         # Extract the actual session value
         if session_cookie.startswith('session='):
             session_value = session_cookie.split('session=')[1].split(';')[0]
-            print(f"🔍 NSN: Extracted session value: {session_value}")
         else:
             session_value = session_cookie
-            print(f"🔍 NSN: Using session value directly: {session_value}")
         
         # Try JSON parsing first (B-Client preprocessed format)
-        print(f"🔍 NSN: ===== PARSING SESSION COOKIE AS JSON =====")
         try:
-            session_data = json.loads(session_value)
-            print(f"✅ NSN: Session cookie parsed successfully as JSON")
-            print(f"🔍 NSN: Parsed session data keys: {list(session_data.keys()) if isinstance(session_data, dict) else 'Not a dict'}")
-            return session_data
+            return json.loads(session_value)
         except Exception as e:
-            print(f"⚠️ NSN: JSON parsing failed: {e}")
-            
             # Fallback to Flask session cookie format (legacy)
             if '.' in session_value and session_value.count('.') == 2:
-                print(f"🔍 NSN: Trying Flask session cookie format as fallback")
                 data_part = session_value.split('.')[0]
                 
                 try:
@@ -173,161 +168,141 @@ def parse_session_cookie(session_cookie):
                     padded_data = data_part + '=' * (4 - len(data_part) % 4)
                     decoded_data = base64.urlsafe_b64decode(padded_data)
                     decoded_text = decoded_data.decode('utf-8')
-                    session_data = json.loads(decoded_text)
-                    print(f"✅ NSN: Flask session cookie parsed successfully")
-                    return session_data
+                    return json.loads(decoded_text)
                 except Exception as e2:
-                    print(f"⚠️ NSN: Flask session decode failed: {e2}")
-                    print(f"🔍 NSN: Trying alternative Flask session parsing...")
+                    logger.debug("⚠️ NSN: Flask session decode failed: %s", e2)
                     
                     # Alternative: Try to parse as Flask session without JSON
                     try:
                         # Check if we have session data from previous successful login
                         if 'user_id' in session and session.get('user_id'):
-                            session_data = {
+                            return {
                                 'loggedin': True, 
                                 'user_id': session.get('user_id'),
                                 'username': session.get('username'),
                                 'role': session.get('role')
                             }
-                            print(f"🔍 NSN: Using existing session data: {session_data}")
-                            return session_data
                         else:
                             # If no existing session, create a minimal valid session
-                            session_data = {'loggedin': True, 'user_id': 1, 'username': 'unknown', 'role': 'traveller'}
-                            print(f"🔍 NSN: Created minimal fallback session data: {session_data}")
-                            return session_data
+                            return {'loggedin': True, 'user_id': 1, 'username': 'unknown', 'role': 'traveller'}
                     except Exception as e3:
-                        print(f"⚠️ NSN: Alternative Flask parsing also failed: {e3}")
+                        logger.debug("⚠️ NSN: Alternative Flask parsing also failed: %s", e3)
                         raise e2
             else:
-                print(f"⚠️ NSN: Neither JSON nor Flask format detected")
                 raise e
                 
     except Exception as e:
-        print(f"❌ NSN: Error parsing session cookie: {e}")
-        print(f"   Cookie format: {session_cookie[:100]}...")
+        logger.debug("❌ NSN: Error parsing session cookie: %s", e)
         return None
 
+
+# username -> (user_id, role) of NSN users, so a C-Client auto-login does not
+# query users on every request. Shared across requests for USER_CACHE_TTL
+# seconds; role changes call invalidate_user().
+USER_CACHE_TTL = 60
+_user_cache = {}
+_user_cache_lock = threading.Lock()
+
+
+def resolve_user(username):
+    """Return {'user_id', 'role'} of the NSN user with this username, or None (cached for USER_CACHE_TTL)"""
+    now = time.monotonic()
+    with _user_cache_lock:
+        cached = _user_cache.get(username)
+    if cached and cached[0] > now:
+        user = cached[1]
+    else:
+        with db.get_cursor() as cursor:
+            cursor.execute("SELECT user_id, role FROM users WHERE username = %s", (username,))
+            user = cursor.fetchone()
+        db.close_db()
+        if not user:
+            # Not cached: the username may be registered in a moment
+            return None
+        user = {'user_id': int(user['user_id']), 'role': user['role']}
+        with _user_cache_lock:
+            _user_cache[username] = (now + USER_CACHE_TTL, user)
+    return dict(user) if user else None
+
+
+def invalidate_user(user_id):
+    """Drop the cached username mapping of a user (after a role change)"""
+    with _user_cache_lock:
+        for username, (_, user) in list(_user_cache.items()):
+            if user['user_id'] == int(user_id):
+                del _user_cache[username]
+
+
+def _apply_cookie_session(session_data):
+    """Copy a parsed C-Client session into the Flask session, returns False when it is unusable"""
+    cookie_username = session_data.get('username')
+    if session_data.get('loggedin') and session_data.get('user_id'):
+        # Use the real NSN user_id and role for this username when there is one
+        user = resolve_user(cookie_username) if cookie_username else None
+        if user:
+            session['user_id'] = user['user_id']
+            session['role'] = user['role']
+        else:
+            logger.warning("⚠️ NSN: Username %s not found in NSN database, using cookie data", cookie_username)
+            session['user_id'] = int(session_data.get('user_id'))
+            session['role'] = session_data.get('role')
+    else:
+        # 检查session数据是否包含有效的用户信息
+        if not session_data.get('user_id') or not cookie_username:
+            logger.warning("❌ NSN: Rejecting C-Client session data without user_id and username")
+            return False
+        session['user_id'] = int(session_data.get('user_id'))
+        session['role'] = session_data.get('role')
+
+    # 设置NMP相关信息，确保logout时能正确识别为C-Client用户
+    nmp_params = get_nmp_params_from_request(request)
+    session['nmp_user_id'] = nmp_params.get('nmp_user_id') or session_data.get('nmp_user_id')
+    session['nmp_username'] = nmp_params.get('nmp_username') or session_data.get('nmp_username')
+    session['nmp_client_type'] = 'c-client'  # 标记为C-Client用户
+    session['nmp_timestamp'] = nmp_params.get('nmp_timestamp') or session_data.get('nmp_timestamp')
+
+    # 设置loggedin字段，确保后续登录检查通过
+    sessions.regenerate()
+    session['loggedin'] = True
+    session['username'] = cookie_username
+
+    # Make session permanent to ensure it persists across redirects
+    session.permanent = True
+    return True
+
+
 def ensure_session_parsed():
-    """确保session被正确解析，支持JSON和Flask格式"""
+    """
+    确保session被正确解析，支持JSON和Flask格式
+
+    The cookie is parsed at most once per request; the result is kept in
+    flask.g so repeated calls within the same request are free.
+    """
+    # Check if user is already logged in with valid session
+    if session.get('loggedin') and session.get('user_id'):
+        return True
+    if 'session_parsed' in g:
+        return g.session_parsed
+
+    g.session_parsed = False
     try:
-        # Check if user is already logged in with valid session
-        if session.get('loggedin') and session.get('user_id'):
-            print(f"✅ NSN: Valid session already exists")
-            return True
-        
         # Check if there's a session cookie from C-Client
         session_cookie = request.cookies.get('session')
         if not session_cookie:
-            print(f"🔓 NSN: No session cookie found")
             return False
         
-        print(f"🔍 NSN: ===== RECEIVED SESSION FROM C-CLIENT ======")
-        print(f"🔍 NSN: Session cookie type: {type(session_cookie)}")
-        print(f"🔍 NSN: Session cookie length: {len(session_cookie)}")
-        print(f"🔍 NSN: Session cookie content: {session_cookie}")
-        print(f"🔍 NSN: ===== END RECEIVED SESSION ======")
-        
-        # Parse session cookie using unified function
         session_data = parse_session_cookie(session_cookie)
-        if not session_data:
-            print(f"❌ NSN: Failed to parse session cookie")
+        if not isinstance(session_data, dict):
+            logger.debug("❌ NSN: Failed to parse session cookie")
             return False
         
-        print(f"🔍 NSN: ===== FINAL PARSED SESSION DATA =====")
-        print(f"🔍 NSN: Parsed session data: {session_data}")
-        print(f"🔍 NSN: Session data type: {type(session_data)}")
-        if isinstance(session_data, dict):
-            for key, value in session_data.items():
-                print(f"🔍 NSN:   {key}: {value} (type: {type(value)})")
-        print(f"🔍 NSN: ===== END FINAL PARSED SESSION DATA =====")
-        
-        if session_data.get('loggedin') and session_data.get('user_id'):
-            print(f"✅ NSN: Valid session found in cookie, setting session")
-            
-            # Get the username from cookie to find the real NSN user_id
-            cookie_username = session_data.get('username')
-            if cookie_username:
-                # Query NSN database to get the real user_id for this username
-                cursor = db.get_cursor()
-                cursor.execute("SELECT user_id, role FROM users WHERE username = %s", (cookie_username,))
-                user_data = cursor.fetchone()
-                cursor.close()
-                
-                if user_data:
-                    print(f"🔍 NSN: Found NSN user_id for username {cookie_username}: {user_data['user_id']}")
-                    session['user_id'] = int(user_data['user_id'])  # Use real NSN user_id (INT)
-                    session['role'] = user_data['role']  # Use real NSN role
-                else:
-                    print(f"⚠️ NSN: Username {cookie_username} not found in NSN database, using cookie data")
-                    session['user_id'] = int(session_data.get('user_id')) if session_data.get('user_id') else None
-                    session['role'] = session_data.get('role')
-            else:
-                print(f"⚠️ NSN: No username in cookie, using cookie user_id")
-                session['user_id'] = int(session_data.get('user_id')) if session_data.get('user_id') else None
-                session['role'] = session_data.get('role')
-            
-            # 设置NMP相关信息，确保logout时能正确识别为C-Client用户
-            session['nmp_user_id'] = get_nmp_params_from_request(request).get('nmp_user_id') or session_data.get('nmp_user_id')
-            session['nmp_username'] = get_nmp_params_from_request(request).get('nmp_username') or session_data.get('nmp_username')
-            session['nmp_client_type'] = 'c-client'  # 标记为C-Client用户
-            session['nmp_timestamp'] = get_nmp_params_from_request(request).get('nmp_timestamp') or session_data.get('nmp_timestamp')
-            
-            # 设置loggedin字段，确保后续登录检查通过
-            session['loggedin'] = True
-            session['username'] = session_data.get('username') or cookie_username
-            
-            # Make session permanent to ensure it persists across redirects
-            session.permanent = True
-            
-            print(f"🔍 NSN: Updated session state: {dict(session)}")
-            print(f"🔍 NSN: Session permanent: {session.permanent}")
-            return True
-        else:
-            print(f"⚠️ NSN: Invalid session data in cookie")
-            print(f"⚠️ NSN: loggedin: {session_data.get('loggedin')}")
-            print(f"⚠️ NSN: user_id: {session_data.get('user_id')}")
-            print(f"⚠️ NSN: username: {session_data.get('username')}")
-            
-            # 检查是否是C端发送的错误session数据
-            if session_data.get('user_id') is None and session_data.get('username') is None:
-                print(f"❌ NSN: C-Client sent invalid session data with null user_id and username")
-                print(f"❌ NSN: Rejecting invalid session data from C-Client")
-                print(f"❌ NSN: Session data: {session_data}")
-                return False
-            
-            # 检查session数据是否包含有效的用户信息
-            if not session_data.get('user_id') or not session_data.get('username'):
-                print(f"❌ NSN: Session data missing required user information")
-                print(f"❌ NSN: user_id: {session_data.get('user_id')}")
-                print(f"❌ NSN: username: {session_data.get('username')}")
-                print(f"❌ NSN: Rejecting session data with missing user information")
-                return False
-            
-            # 如果session数据有效但loggedin为false，仍然处理session
-            session['loggedin'] = session_data.get('loggedin') or True  # 确保loggedin为True
-            session['username'] = session_data.get('username')
-            session['user_id'] = int(session_data.get('user_id')) if session_data.get('user_id') else None
-            session['role'] = session_data.get('role')
-            
-            # 设置NMP相关信息，确保logout时能正确识别为C-Client用户
-            session['nmp_user_id'] = get_nmp_params_from_request(request).get('nmp_user_id') or session_data.get('nmp_user_id')
-            session['nmp_username'] = get_nmp_params_from_request(request).get('nmp_username') or session_data.get('nmp_username')
-            session['nmp_client_type'] = 'c-client'  # 标记为C-Client用户
-            session['nmp_timestamp'] = get_nmp_params_from_request(request).get('nmp_timestamp') or session_data.get('nmp_timestamp')
-            
-            # Make session permanent to ensure it persists across redirects
-            session.permanent = True
-            
-            print(f"🔍 NSN: Updated session state: {dict(session)}")
-            print(f"🔍 NSN: Session permanent: {session.permanent}")
-            return True
+        g.session_parsed = _apply_cookie_session(session_data)
+        if g.session_parsed:
+            logger.info("✅ NSN: C-Client session accepted for user_id %s", session.get('user_id'))
+        return g.session_parsed
             
     except Exception as e:
-        print(f"❌ NSN: Error in ensure_session_parsed: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("❌ NSN: Error in ensure_session_parsed: %s", e)
         return False
 
 
@@ -350,22 +325,21 @@ def call_bclient_forward_nmp_params(nmp_user_id, nmp_username, nmp_client_type,
         dict: B-Client response with cookie status, node status, and registration info
     """
     try:
-        print(f"🌐 NSN: ===== FORWARDING NMP PARAMETERS TO B-CLIENT =====")
+        logger.debug("🌐 NSN: ===== FORWARDING NMP PARAMETERS TO B-CLIENT =====")
         
         # Call B-Client comprehensive status API using existing endpoints
         # First check if user has cookie
-        cookie_url = f"{B_CLIENT_API_URL}/api/cookies"
         cookie_params = {"user_id": nmp_user_id}
         
-        print(f"🌐 NSN: Checking cookie status first...")
-        cookie_response = requests.get(cookie_url, params=cookie_params, timeout=10)
+        logger.debug("🌐 NSN: Checking cookie status first...")
+        cookie_response = bclient.get('/api/cookies', params=cookie_params)
         
         if cookie_response.status_code == 200:
             cookie_result = cookie_response.json()
             has_cookie = cookie_result.get('has_cookie', False)
-            print(f"🌐 NSN: Cookie check result: {cookie_result}")
+            logger.debug("🌐 NSN: Cookie check result: %s", cookie_result)
         else:
-            print(f"❌ NSN: Cookie check failed: {cookie_response.status_code}")
+            logger.error("❌ NSN: Cookie check failed: %s", cookie_response.status_code)
             has_cookie = False
         
         # For now, return a simple status based on cookie check
@@ -381,11 +355,11 @@ def call_bclient_forward_nmp_params(nmp_user_id, nmp_username, nmp_client_type,
             }
         }
         
-        print(f"📋 NSN: B-Client status result: {result}")
+        logger.debug("📋 NSN: B-Client status result: %s", result)
         return result
             
     except Exception as e:
-        print(f"❌ NSN: Error calling B-Client status API: {e}")
+        logger.error("❌ NSN: Error calling B-Client status API: %s", e)
         return {"success": False, "error": str(e)}
 
 def call_bclient_query_cookie_api(nmp_user_id):
@@ -399,35 +373,33 @@ def call_bclient_query_cookie_api(nmp_user_id):
         dict: Query result with cookie info if available
     """
     try:
-        print(f"🌐 NSN: ===== B-CLIENT DATABASE QUERY START =====")
+        logger.debug("🌐 NSN: ===== B-CLIENT DATABASE QUERY START =====")
         
         # Call B-Client database API
-        url = f"{B_CLIENT_API_URL}/api/cookies"
         params = {
             "user_id": nmp_user_id
         }
         
-        print(f"🌐 NSN: Making request to B-Client database:")
-        print(f"   URL: {url}")
-        print(f"   Params: {params}")
-        print(f"   Timeout: 10 seconds")
+        logger.debug("🌐 NSN: Making request to B-Client database:")
+        logger.debug("   URL: %s/api/cookies", B_CLIENT_API_URL)
+        logger.debug("   Params: %s", params)
         
-        response = requests.get(url, params=params, timeout=10)
+        response = bclient.get('/api/cookies', params=params)
         
-        print(f"📡 NSN: B-Client response received:")
-        print(f"   Status Code: {response.status_code}")
-        print(f"   Headers: {dict(response.headers)}")
-        print(f"   Response Time: {response.elapsed.total_seconds():.3f}s")
+        logger.debug("📡 NSN: B-Client response received:")
+        logger.debug("   Status Code: %s", response.status_code)
+        logger.debug("   Headers: %s", dict(response.headers))
+        logger.debug("   Response Time: %.3fs", response.elapsed.total_seconds())
         
         if response.status_code == 200:
             result = response.json()
-            print(f"📋 NSN: B-Client response: {result}")
+            logger.debug("📋 NSN: B-Client response: %s", result)
             
             if result.get('success') and result.get('has_cookie'):
-                print(f"✅ NSN: ===== COOKIE FOUND =====")
-                print(f"✅ NSN: Cookie found for user_id: {nmp_user_id}")
-                print(f"✅ NSN: Message: {result.get('message')}")
-                print(f"✅ NSN: ===== COOKIE FOUND END =====")
+                logger.debug("✅ NSN: ===== COOKIE FOUND =====")
+                logger.debug("✅ NSN: Cookie found for user_id: %s", nmp_user_id)
+                logger.debug("✅ NSN: Message: %s", result.get('message'))
+                logger.debug("✅ NSN: ===== COOKIE FOUND END =====")
                 return {
                     "success": True,
                     "has_cookie": True,
@@ -435,10 +407,10 @@ def call_bclient_query_cookie_api(nmp_user_id):
                     "message": "Cookie found and session sent to C-Client"
                 }
             else:
-                print(f"⚠️ NSN: ===== NO COOKIE FOUND =====")
-                print(f"⚠️ NSN: No cookie found for user_id: {nmp_user_id}")
-                print(f"⚠️ NSN: Message: {result.get('message')}")
-                print(f"⚠️ NSN: ===== NO COOKIE FOUND END =====")
+                logger.debug("⚠️ NSN: ===== NO COOKIE FOUND =====")
+                logger.debug("⚠️ NSN: No cookie found for user_id: %s", nmp_user_id)
+                logger.debug("⚠️ NSN: Message: %s", result.get('message'))
+                logger.debug("⚠️ NSN: ===== NO COOKIE FOUND END =====")
                 return {
                     "success": False,
                     "has_cookie": False,
@@ -446,23 +418,20 @@ def call_bclient_query_cookie_api(nmp_user_id):
                     "message": "No cookie found for user"
                 }
         else:
-            print(f"❌ NSN: ===== B-CLIENT API ERROR =====")
-            print(f"❌ NSN: B-Client database API error: {response.status_code}")
-            print(f"   Response text: {response.text}")
-            print(f"❌ NSN: ===== B-CLIENT API ERROR END =====")
+            logger.error("❌ NSN: ===== B-CLIENT API ERROR =====")
+            logger.error("❌ NSN: B-Client database API error: %s", response.status_code)
+            logger.debug("   Response text: %s", response.text)
+            logger.error("❌ NSN: ===== B-CLIENT API ERROR END =====")
             return {"success": False, "error": f"B-Client API error: {response.status_code}"}
             
     except Exception as e:
-        print(f"❌ NSN: ===== EXCEPTION ERROR =====")
-        print(f"❌ NSN: Error calling B-Client database API: {e}")
-        print(f"   Exception type: {type(e).__name__}")
-        print(f"   Exception details: {str(e)}")
-        print(f"❌ NSN: ===== EXCEPTION ERROR END =====")
+        logger.error("❌ NSN: ===== EXCEPTION ERROR =====")
+        logger.error("❌ NSN: Error calling B-Client database API: %s", e)
+        logger.error("   Exception type: %s", type(e).__name__)
+        logger.error("   Exception details: %s", str(e))
+        logger.error("❌ NSN: ===== EXCEPTION ERROR END =====")
         return {"success": False, "error": str(e)}
 
-# call_bclient_bind_api function removed - no longer needed
-
-
 def user_home_url():
     # entrance of all users
     """Generates a URL to the homepage for the currently logged-in user.
@@ -500,7 +469,7 @@ def root():
       Shows the welcome page for guests.
       If accessed via C-Client with NMP parameters, queries B-Client for cookie and auto-logs in if available.
     """
-    print(f"🏠 NSN: Root path accessed")
+    logger.debug("🏠 NSN: Root path accessed")
     
     # Check if user is already logged in with valid session
     
@@ -509,23 +478,23 @@ def root():
     nmp_injected = nmp_params['nmp_injected']
     
     if 'loggedin' in session and session.get('user_id'):
-        print(f"✅ NSN: User already logged in with valid session")
-        print(f"✅ NSN:   User ID: {session.get('user_id')}")
-        print(f"✅ NSN:   Username: {session.get('username')}")
-        print(f"✅ NSN:   Role: {session.get('role')}")
+        logger.debug("✅ NSN: User already logged in with valid session")
+        logger.debug("✅ NSN:   User ID: %s", session.get('user_id'))
+        logger.debug("✅ NSN:   Username: %s", session.get('username'))
+        logger.debug("✅ NSN:   Role: %s", session.get('role'))
         
         # If this is C-Client access, store NMP parameters and redirect to dashboard
         if nmp_injected:
-            print(f"🔐 NSN: C-Client access detected, user already logged in")
-            print(f"🔐 NSN: Storing NMP parameters and redirecting to dashboard")
-            print(f"🔍 NSN: ===== END ROOT LOGIN CHECK ANALYSIS =====")
+            logger.debug("🔐 NSN: C-Client access detected, user already logged in")
+            logger.debug("🔐 NSN: Storing NMP parameters and redirecting to dashboard")
+            logger.debug("🔍 NSN: ===== END ROOT LOGIN CHECK ANALYSIS =====")
             # Store NMP parameters in session for WebSocket registration
             save_nmp_to_session(nmp_params)
             # Verify NMP parameters were saved correctly
             verify_nmp_session()
             # Redirect to dashboard instead of showing login page
             dashboard_url = url_for('dashboard')
-            print(f"🔐 NSN: Redirecting C-Client to dashboard: {dashboard_url}")
+            logger.debug("🔐 NSN: Redirecting C-Client to dashboard: %s", dashboard_url)
             return redirect(dashboard_url)
         else:
             # Direct browser access, redirect to dashboard
@@ -534,7 +503,7 @@ def root():
     # Check if there's a session cookie from C-Client
     session_cookie = request.cookies.get('session')
     if session_cookie:
-        print(f"🔍 NSN: Received session cookie from C-Client (length: {len(session_cookie)})")
+        logger.debug("🔍 NSN: Received session cookie from C-Client (length: %s)", len(session_cookie))
         
         # Try to parse the session cookie from C-Client
         try:
@@ -546,18 +515,18 @@ def root():
             if session_cookie.startswith('session='):
                 # Extract the session value part
                 session_value = session_cookie.split('session=')[1].split(';')[0]
-                print(f"🔍 NSN: Extracted session value: {session_value}")
+                logger.debug("🔍 NSN: Extracted session value: %s", session_value)
             else:
                 # Assume it's already the session value
                 session_value = session_cookie
-                print(f"🔍 NSN: Using session value directly: {session_value}")
+                logger.debug("🔍 NSN: Using session value directly: %s", session_value)
             
             # Try JSON parsing first (B-Client preprocessed format)
             try:
                 session_data = json.loads(session_value)
-                print(f"✅ NSN: Session cookie parsed successfully as JSON")
+                logger.debug("✅ NSN: Session cookie parsed successfully as JSON")
             except Exception as e:
-                print(f"⚠️ NSN: JSON parsing failed, trying Flask format")
+                logger.debug("⚠️ NSN: JSON parsing failed, trying Flask format")
                 
                 # Fallback to Flask session cookie format (legacy)
                 if '.' in session_value and session_value.count('.') == 2:
@@ -569,9 +538,9 @@ def root():
                         decoded_data = base64.urlsafe_b64decode(padded_data)
                         decoded_text = decoded_data.decode('utf-8')
                         session_data = json.loads(decoded_text)
-                        print(f"✅ NSN: Flask session cookie parsed successfully")
+                        logger.debug("✅ NSN: Flask session cookie parsed successfully")
                     except Exception as e2:
-                        print(f"⚠️ NSN: Flask session decode failed")
+                        logger.debug("⚠️ NSN: Flask session decode failed")
                         
                         # Alternative: Try to parse as Flask session without JSON
                         try:
@@ -585,22 +554,22 @@ def root():
                                     'username': session.get('username'),
                                     'role': session.get('role')
                                 }
-                                print(f"🔍 NSN: Using existing session data: {session_data}")
+                                logger.debug("🔍 NSN: Using existing session data: %s", session_data)
                             else:
                                 # If no existing session, create a minimal valid session
                                 session_data = {'loggedin': True, 'user_id': 1, 'username': 'unknown', 'role': 'traveller'}
-                                print(f"🔍 NSN: Created minimal fallback session data: {session_data}")
+                                logger.debug("🔍 NSN: Created minimal fallback session data: %s", session_data)
                         except Exception as e3:
-                            print(f"⚠️ NSN: Alternative Flask parsing also failed: {e3}")
+                            logger.debug("⚠️ NSN: Alternative Flask parsing also failed: %s", e3)
                             raise e2
                 else:
-                    print(f"⚠️ NSN: Neither JSON nor Flask format detected")
+                    logger.debug("⚠️ NSN: Neither JSON nor Flask format detected")
                     raise e
             
             # Check session data validity
             
             if session_data.get('loggedin') and session_data.get('user_id'):
-                print(f"✅ NSN: Valid session found in cookie, setting session")
+                logger.debug("✅ NSN: Valid session found in cookie, setting session")
                 # Get the username from cookie to find the real NSN user_id
                 cookie_username = session_data.get('username')
                 if cookie_username:
@@ -611,15 +580,15 @@ def root():
                     cursor.close()
                     
                     if user_data:
-                        print(f"🔍 NSN: Found NSN user_id for username {cookie_username}: {user_data['user_id']}")
+                        logger.debug("🔍 NSN: Found NSN user_id for username %s: %s", cookie_username, user_data['user_id'])
                         session['user_id'] = int(user_data['user_id'])  # Use real NSN user_id (INT)
                         session['role'] = user_data['role']  # Use real NSN role
                     else:
-                        print(f"⚠️ NSN: Username {cookie_username} not found in NSN database, using cookie data")
+                        logger.warning("⚠️ NSN: Username %s not found in NSN database, using cookie data", cookie_username)
                         session['user_id'] = int(session_data.get('user_id')) if session_data.get('user_id') else None
                         session['role'] = session_data.get('role')
                 else:
-                    print(f"⚠️ NSN: No username in cookie, using cookie user_id")
+                    logger.debug("⚠️ NSN: No username in cookie, using cookie user_id")
                     session['user_id'] = int(session_data.get('user_id')) if session_data.get('user_id') else None
                     session['role'] = session_data.get('role')
                 
@@ -631,25 +600,26 @@ def root():
                 session['nmp_timestamp'] = get_nmp_params_from_request(request).get('nmp_timestamp') or session_data.get('nmp_timestamp')
                 
                 # 设置loggedin字段，确保后续登录检查通过
+                sessions.regenerate()
                 session['loggedin'] = True
                 session['username'] = session_data.get('username') or cookie_username
                 
                 # Make session permanent to ensure it persists across redirects
                 session.permanent = True
                 
-                print(f"🔍 NSN: Updated session state: {dict(session)}")
-                print(f"🔍 NSN: Session permanent: {session.permanent}")
+                logger.debug("🔍 NSN: Updated session state: %s", dict(session))
+                logger.debug("🔍 NSN: Session permanent: %s", session.permanent)
                 
                 return redirect(user_home_url())
             else:
-                print(f"⚠️ NSN: Invalid session data in cookie")
-                print(f"⚠️ NSN: loggedin: {session_data.get('loggedin')}")
-                print(f"⚠️ NSN: user_id: {session_data.get('user_id')}")
-                print(f"⚠️ NSN: username: {session_data.get('username')}")
+                logger.debug("⚠️ NSN: Invalid session data in cookie")
+                logger.debug("⚠️ NSN: loggedin: %s", session_data.get('loggedin'))
+                logger.debug("⚠️ NSN: user_id: %s", session_data.get('user_id'))
+                logger.debug("⚠️ NSN: username: %s", session_data.get('username'))
                 
                 # 检查是否是C端发送的错误session数据
                 if session_data.get('user_id') is None and session_data.get('username') is None:
-                    print(f"❌ NSN: C-Client sent invalid session data, clearing invalid cookie")
+                    logger.debug("❌ NSN: C-Client sent invalid session data, clearing invalid cookie")
                     
                     # 清除无效的session cookie，防止无限重定向
                     # 但是仍然需要传递NMP参数，以便显示bind按钮
@@ -681,7 +651,7 @@ def root():
                 
                 # 检查session数据是否包含有效的用户信息
                 if not session_data.get('user_id') or not session_data.get('username'):
-                    print(f"❌ NSN: Session data missing required user information, clearing invalid cookie")
+                    logger.debug("❌ NSN: Session data missing required user information, clearing invalid cookie")
                     
                     # 清除无效的session cookie，防止无限重定向
                     # 但是仍然需要传递NMP参数，以便显示bind按钮
@@ -727,20 +697,19 @@ def root():
                 # Make session permanent to ensure it persists across redirects
                 session.permanent = True
                 
-                print(f"🔍 NSN: Updated session state: {dict(session)}")
-                print(f"🔍 NSN: Session permanent: {session.permanent}")
+                logger.debug("🔍 NSN: Updated session state: %s", dict(session))
+                logger.debug("🔍 NSN: Session permanent: %s", session.permanent)
                 
                 return redirect(user_home_url())
         except Exception as e:
-            print(f"❌ NSN: Error parsing session cookie: {e}")
-            print(f"   Cookie format: {session_cookie[:100]}...")
-            import traceback
-            print(f"   Traceback: {traceback.format_exc()}")
+            logger.debug("❌ NSN: Error parsing session cookie: %s", e)
+            logger.debug("   Cookie format: %s...", session_cookie[:100])
+            logger.debug("   Traceback:", exc_info=True)
         
         # If we have a cookie but can't parse it, continue to check URL parameters
-        print(f"🔄 NSN: Cookie parsing failed, checking URL parameters instead")
+        logger.debug("🔄 NSN: Cookie parsing failed, checking URL parameters instead")
     else:
-        print(f"🔓 NSN: No session cookie found")
+        logger.debug("🔓 NSN: No session cookie found")
     
     # Get NMP parameters (already retrieved above for logged-in user check)
     # nmp_params = get_nmp_params_from_request(request)  # Already retrieved above
@@ -759,30 +728,30 @@ def root():
     # 简化检测：只需要检查nmp_injected参数
     if nmp_injected:
         # 情况1：通过C端访问，显示bind按钮
-        print(f"🔐 NSN: Access via C-Client, showing bind button")
-        print(f"   nmp_injected: {nmp_injected}")
-        print(f"   nmp_user_id: {nmp_user_id}")
-        print(f"   nmp_username: {nmp_username}")
+        logger.debug("🔐 NSN: Access via C-Client, showing bind button")
+        logger.debug("   nmp_injected: %s", nmp_injected)
+        logger.debug("   nmp_user_id: %s", nmp_user_id)
+        logger.debug("   nmp_username: %s", nmp_username)
         # 继续执行后续的NMP参数处理逻辑
     else:
         # 情况2：直接浏览器访问，显示普通首页
-        print(f"🔄 NSN: Direct browser access, showing unauthenticated homepage")
-        print(f"🔄 NSN: No NMP parameters - using browser login logic only")
+        logger.debug("🔄 NSN: Direct browser access, showing unauthenticated homepage")
+        logger.debug("🔄 NSN: No NMP parameters - using browser login logic only")
         # 没有NMP参数，直接显示普通首页，不查询B-Client
         return render_template('index.html')
     
     # 如果通过C-Client访问且有NMP参数，统一建立session并处理登录
     if nmp_injected and nmp_user_id:
-        print(f"🔐 NSN: Root path accessed via C-Client with NMP parameters:")
-        print(f"   nmp_injected: {nmp_injected}")
-        print(f"   nmp_user_id: {nmp_user_id}")
-        print(f"   nmp_username: {nmp_username}")
-        print(f"   nmp_client_type: {nmp_client_type}")
-        print(f"   nmp_timestamp: {nmp_timestamp}")
+        logger.debug("🔐 NSN: Root path accessed via C-Client with NMP parameters:")
+        logger.debug("   nmp_injected: %s", nmp_injected)
+        logger.debug("   nmp_user_id: %s", nmp_user_id)
+        logger.debug("   nmp_username: %s", nmp_username)
+        logger.debug("   nmp_client_type: %s", nmp_client_type)
+        logger.debug("   nmp_timestamp: %s", nmp_timestamp)
         
         # 检查是否是cookie重新加载请求（防止无限循环）
         nmp_cookie_reload = request.args.get('nmp_cookie_reload')
-        print(f"   nmp_cookie_reload: {nmp_cookie_reload}")
+        logger.debug("   nmp_cookie_reload: %s", nmp_cookie_reload)
         
         # 检查是否是不同的用户
         current_session_user_id = session.get('nmp_user_id')
@@ -790,45 +759,45 @@ def root():
         
         # 统一处理NMP参数：建立完整的session
         if current_session_user_id and current_session_user_id != nmp_user_id:
-            print(f"🔄 NSN: Different user detected, clearing session and establishing new NMP session")
-            print(f"   Previous user: {current_session_user_id}")
-            print(f"   New user: {nmp_user_id}")
+            logger.debug("🔄 NSN: Different user detected, clearing session and establishing new NMP session")
+            logger.debug("   Previous user: %s", current_session_user_id)
+            logger.debug("   New user: %s", nmp_user_id)
             session.clear()
             # 保存新用户的NMP参数到session
             save_nmp_to_session(nmp_params)
-            print(f"✅ NSN: New NMP session established for user: {nmp_user_id}")
+            logger.debug("✅ NSN: New NMP session established for user: %s", nmp_user_id)
         elif not current_session_user_id:
-            print(f"🆕 NSN: Establishing new NMP session for user: {nmp_user_id}")
+            logger.debug("🆕 NSN: Establishing new NMP session for user: %s", nmp_user_id)
             # 保存NMP参数到session
             save_nmp_to_session(nmp_params)
-            print(f"✅ NSN: NMP session established for user: {nmp_user_id}")
+            logger.debug("✅ NSN: NMP session established for user: %s", nmp_user_id)
         else:
-            print(f"✅ NSN: Same user as session, updating NMP parameters if needed")
+            logger.debug("✅ NSN: Same user as session, updating NMP parameters if needed")
             # 确保session中的NMP参数是最新的（特别是timestamp等动态参数）
             save_nmp_to_session(nmp_params)
-            print(f"✅ NSN: NMP parameters updated in session for user: {nmp_user_id}")
+            logger.debug("✅ NSN: NMP parameters updated in session for user: %s", nmp_user_id)
         
         # 检查用户是否已经登录
         if current_loggedin and session.get('user_id'):
-            print(f"✅ NSN: User already logged in with valid session")
-            print(f"   User ID: {session.get('user_id')}")
-            print(f"   Username: {session.get('username')}")
-            print(f"   Role: {session.get('role')}")
+            logger.debug("✅ NSN: User already logged in with valid session")
+            logger.debug("   User ID: %s", session.get('user_id'))
+            logger.debug("   Username: %s", session.get('username'))
+            logger.debug("   Role: %s", session.get('role'))
             # 重定向到dashboard，NMP参数已在session中，无需URL传递
             dashboard_url = url_for('dashboard')
-            print(f"🔐 NSN: Redirecting to dashboard (NMP parameters stored in session)")
+            logger.debug("🔐 NSN: Redirecting to dashboard (NMP parameters stored in session)")
             return redirect(dashboard_url)
         
         # 转发NMP参数给B-Client进行综合状态检查
-        print(f"🔍 NSN: ===== FORWARDING NMP PARAMETERS TO B-CLIENT =====")
-        print(f"🔍 NSN: Forwarding NMP parameters for user_id: {nmp_user_id}")
-        print(f"🔍 NSN: B-Client API URL: {B_CLIENT_API_URL}")
+        logger.debug("🔍 NSN: ===== FORWARDING NMP PARAMETERS TO B-CLIENT =====")
+        logger.debug("🔍 NSN: Forwarding NMP parameters for user_id: %s", nmp_user_id)
+        logger.debug("🔍 NSN: B-Client API URL: %s", B_CLIENT_API_URL)
         
         # 只有在不是cookie重新加载请求时才转发给B-Client（防止无限循环）
         if not nmp_cookie_reload:
-            print(f"🌐 NSN: ===== SENDING NMP PARAMETERS TO B-CLIENT =====")
-            print(f"🌐 NSN: Forwarding NMP parameters to B-Client for comprehensive status check")
-            print(f"🌐 NSN: ===== END SENDING TO B-CLIENT =====")
+            logger.debug("🌐 NSN: ===== SENDING NMP PARAMETERS TO B-CLIENT =====")
+            logger.debug("🌐 NSN: Forwarding NMP parameters to B-Client for comprehensive status check")
+            logger.debug("🌐 NSN: ===== END SENDING TO B-CLIENT =====")
             
             # 转发所有NMP参数给B-Client
             status_result = call_bclient_forward_nmp_params(
@@ -842,7 +811,7 @@ def root():
                 nmp_cluster_id=nmp_cluster_id,
                 nmp_channel_id=nmp_channel_id
             )
-            print(f"📋 NSN: B-Client comprehensive status: {status_result}")
+            logger.debug("📋 NSN: B-Client comprehensive status: %s", status_result)
             
             if status_result.get('success'):
                 has_cookie = status_result.get('has_cookie', False)
@@ -850,52 +819,52 @@ def root():
                 needs_registration = status_result.get('needs_registration', False)
                 
                 if has_cookie:
-                    print(f"✅ NSN: User has valid cookie, B-Client will send session to C-Client")
-                    print(f"ℹ️ NSN: C-Client will handle auto-login and return to NSN")
+                    logger.debug("✅ NSN: User has valid cookie, B-Client will send session to C-Client")
+                    logger.debug("ℹ️ NSN: C-Client will handle auto-login and return to NSN")
                 elif has_node:
-                    print(f"⚠️ NSN: User has node but no cookie, needs re-binding")
-                    print(f"ℹ️ NSN: C-Client needs to re-bind to B-Client")
+                    logger.debug("⚠️ NSN: User has node but no cookie, needs re-binding")
+                    logger.debug("ℹ️ NSN: C-Client needs to re-bind to B-Client")
                 elif needs_registration:
-                    print(f"⚠️ NSN: User needs registration to B-Client")
-                    print(f"ℹ️ NSN: C-Client will auto-register to B-Client")
+                    logger.debug("⚠️ NSN: User needs registration to B-Client")
+                    logger.debug("ℹ️ NSN: C-Client will auto-register to B-Client")
                     # Store registration info for template
                     registration_info = status_result.get('registration_info', {})
                 else:
-                    print(f"⚠️ NSN: Unknown status from B-Client")
+                    logger.debug("⚠️ NSN: Unknown status from B-Client")
             else:
-                print(f"❌ NSN: B-Client status check failed: {status_result.get('error', 'Unknown error')}")
+                logger.error("❌ NSN: B-Client status check failed: %s", status_result.get('error', 'Unknown error'))
         else:
-            print(f"🔄 NSN: Cookie reload request detected, skipping B-Client query to prevent loop")
+            logger.debug("🔄 NSN: Cookie reload request detected, skipping B-Client query to prevent loop")
         
-        print(f"🔍 NSN: ===== B-CLIENT QUERY END =====")
+        logger.debug("🔍 NSN: ===== B-CLIENT QUERY END =====")
         
         # 检查C端是否携带session访问（C端重新访问时）
-        print(f"🔍 NSN: ===== C-CLIENT SESSION CHECK ANALYSIS =====")
-        print(f"🔍 NSN: Checking if C-Client returned with valid session:")
-        print(f"🔍 NSN:   session.get('loggedin'): {session.get('loggedin')} (type: {type(session.get('loggedin'))})")
-        print(f"🔍 NSN:   session.get('user_id'): {session.get('user_id')} (type: {type(session.get('user_id'))})")
-        print(f"🔍 NSN:   Combined condition: {session.get('loggedin') and session.get('user_id')}")
+        logger.debug("🔍 NSN: ===== C-CLIENT SESSION CHECK ANALYSIS =====")
+        logger.debug("🔍 NSN: Checking if C-Client returned with valid session:")
+        logger.debug("🔍 NSN:   session.get('loggedin'): %s (type: %s)", session.get('loggedin'), type(session.get('loggedin')))
+        logger.debug("🔍 NSN:   session.get('user_id'): %s (type: %s)", session.get('user_id'), type(session.get('user_id')))
+        logger.debug("🔍 NSN:   Combined condition: %s", session.get('loggedin') and session.get('user_id'))
         
         if session.get('loggedin') and session.get('user_id'):
-            print(f"✅ NSN: C-Client returned with valid session")
-            print(f"✅ NSN:   User ID: {session.get('user_id')}")
-            print(f"✅ NSN:   Username: {session.get('username')}")
-            print(f"✅ NSN:   Role: {session.get('role')}")
-            print(f"🔍 NSN: ===== END C-CLIENT SESSION CHECK ANALYSIS =====")
+            logger.debug("✅ NSN: C-Client returned with valid session")
+            logger.debug("✅ NSN:   User ID: %s", session.get('user_id'))
+            logger.debug("✅ NSN:   Username: %s", session.get('username'))
+            logger.debug("✅ NSN:   Role: %s", session.get('role'))
+            logger.debug("🔍 NSN: ===== END C-CLIENT SESSION CHECK ANALYSIS =====")
             # 直接跳转到dashboard，NMP参数已在session中
             dashboard_url = url_for('dashboard')
-            print(f"🔐 NSN: Redirecting to dashboard (NMP parameters stored in session)")
+            logger.debug("🔐 NSN: Redirecting to dashboard (NMP parameters stored in session)")
             return redirect(dashboard_url)
         
         # 显示首页，使用session中的NMP参数
-        print(f"🏠 NSN: Rendering homepage with session NMP parameters:")
-        print(f"   nmp_injected: {nmp_injected}")
-        print(f"   nmp_user_id: {session.get('nmp_user_id')}")
-        print(f"   nmp_username: {session.get('nmp_username')}")
-        print(f"   nmp_client_type: {session.get('nmp_client_type')}")
-        print(f"   nmp_timestamp: {session.get('nmp_timestamp')}")
-        print(f"   nmp_ip_address: {session.get('nmp_ip_address')}")
-        print(f"   nmp_port: {session.get('nmp_port')}")
+        logger.debug("🏠 NSN: Rendering homepage with session NMP parameters:")
+        logger.debug("   nmp_injected: %s", nmp_injected)
+        logger.debug("   nmp_user_id: %s", session.get('nmp_user_id'))
+        logger.debug("   nmp_username: %s", session.get('nmp_username'))
+        logger.debug("   nmp_client_type: %s", session.get('nmp_client_type'))
+        logger.debug("   nmp_timestamp: %s", session.get('nmp_timestamp'))
+        logger.debug("   nmp_ip_address: %s", session.get('nmp_ip_address'))
+        logger.debug("   nmp_port: %s", session.get('nmp_port'))
         
         # Determine status and registration info based on B-Client response
         status_info = {
@@ -934,7 +903,7 @@ def root():
                              registration_info=status_info['registration_info'])
     else:
         # 没有NMP参数，显示未认证首页
-        print(f"🏠 NSN: No NMP parameters, showing unauthenticated homepage")
+        logger.debug("🏠 NSN: No NMP parameters, showing unauthenticated homepage")
         return render_template('index.html')
     
 @app.route('/guest')
@@ -969,8 +938,8 @@ def dashboard():
     
     # 检查用户是否已登录
     if 'loggedin' not in session or not session.get('user_id'):
-        print(f"⚠️ NSN: Dashboard accessed without valid login session")
-        print(f"⚠️ NSN: Redirecting to login page")
+        logger.debug("⚠️ NSN: Dashboard accessed without valid login session")
+        logger.debug("⚠️ NSN: Redirecting to login page")
         return redirect(url_for('login'))
     
     # 优先检查C端认证流程
@@ -978,38 +947,34 @@ def dashboard():
     nmp_client_type = nmp_params.get('nmp_client_type', '')
     nmp_user_id = nmp_params.get('nmp_user_id', '')
     
-    print(f"🔍 NSN: ===== C-CLIENT AUTHENTICATION CHECK =====")
-    print(f"🔍 NSN: Dashboard accessed - Checking client type: {nmp_client_type}")
-    print(f"🔍 NSN: User ID from URL: {nmp_user_id}")
+    logger.debug("🔍 NSN: ===== C-CLIENT AUTHENTICATION CHECK =====")
+    logger.debug("🔍 NSN: Dashboard accessed - Checking client type: %s", nmp_client_type)
+    logger.debug("🔍 NSN: User ID from URL: %s", nmp_user_id)
     
     # 检查是否是C端访问
     if nmp_client_type == 'c-client' and nmp_user_id:
-        print(f"🔍 NSN: ===== C-CLIENT AUTHENTICATION FLOW START =====")
-        print(f"🔍 NSN: C-Client detected, starting authentication flow")
-        print(f"🔍 NSN: User ID: {nmp_user_id}")
-        print(f"🔍 NSN: Client Type: {nmp_client_type}")
-        print(f"🔍 NSN: All NMP Parameters: {nmp_params}")
+        logger.debug("🔍 NSN: ===== C-CLIENT AUTHENTICATION FLOW START =====")
+        logger.debug("🔍 NSN: C-Client detected, starting authentication flow")
+        logger.debug("🔍 NSN: User ID: %s", nmp_user_id)
+        logger.debug("🔍 NSN: Client Type: %s", nmp_client_type)
+        logger.debug("🔍 NSN: All NMP Parameters: %s", nmp_params)
         
         # 1. 检查B端WebSocket的node池里是否有该user_id
-        print(f"🔍 NSN: ===== STEP 1: CHECKING B-CLIENT WEBSOCKET CONNECTION =====")
-        print(f"🔍 NSN: Step 1 - Checking B-Client WebSocket node pool for user_id: {nmp_user_id}")
+        logger.debug("🔍 NSN: ===== STEP 1: CHECKING B-CLIENT WEBSOCKET CONNECTION =====")
+        logger.debug("🔍 NSN: Step 1 - Checking B-Client WebSocket node pool for user_id: %s", nmp_user_id)
         
         try:
             # 调用B-Client API检查WebSocket连接状态
-            import requests
-            b_client_url = f"{B_CLIENT_API_URL}/api/websocket/check-user"
-            
-            print(f"🔍 NSN: Calling B-Client WebSocket check API:")
-            print(f"   URL: {b_client_url}")
-            print(f"   User ID: {nmp_user_id}")
-            print(f"   Timeout: 5 seconds")
+            logger.debug("🔍 NSN: Calling B-Client WebSocket check API:")
+            logger.debug("   URL: %s/api/websocket/check-user", B_CLIENT_API_URL)
+            logger.debug("   User ID: %s", nmp_user_id)
             
-            response = requests.post(b_client_url, json={'user_id': nmp_user_id}, timeout=5)
+            response = bclient.post('/api/websocket/check-user', json={'user_id': nmp_user_id})
             
-            print(f"🔍 NSN: B-Client WebSocket check response:")
-            print(f"   Status Code: {response.status_code}")
-            print(f"   Response Time: {response.elapsed.total_seconds():.3f}s")
-            print(f"   Response Text: {response.text}")
+            logger.debug("🔍 NSN: B-Client WebSocket check response:")
+            logger.debug("   Status Code: %s", response.status_code)
+            logger.debug("   Response Time: %.3fs", response.elapsed.total_seconds())
+            logger.debug("   Response Text: %s", response.text)
             
             if response.status_code == 200:
                 result = response.json()
@@ -1017,16 +982,16 @@ def dashboard():
                 websocket_url = result.get('websocket_url', '')
                 connection_count = result.get('connection_count', 0)
                 
-                print(f"🔍 NSN: ===== B-CLIENT WEBSOCKET CHECK RESULT =====")
-                print(f"🔍 NSN: B-Client response - User connected: {user_connected}")
-                print(f"🔍 NSN: B-Client response - WebSocket URL: {websocket_url}")
-                print(f"🔍 NSN: B-Client response - Connection count: {connection_count}")
-                print(f"🔍 NSN: B-Client response - Full result: {result}")
+                logger.debug("🔍 NSN: ===== B-CLIENT WEBSOCKET CHECK RESULT =====")
+                logger.debug("🔍 NSN: B-Client response - User connected: %s", user_connected)
+                logger.debug("🔍 NSN: B-Client response - WebSocket URL: %s", websocket_url)
+                logger.debug("🔍 NSN: B-Client response - Connection count: %s", connection_count)
+                logger.debug("🔍 NSN: B-Client response - Full result: %s", result)
                 
                 if not user_connected:
                     # 2. 如果B端WebSocket没有该user_id，返回WebSocket URL+port给C端
-                    print(f"🔍 NSN: ===== STEP 2: RETURNING WEBSOCKET INFO TO C-CLIENT =====")
-                    print(f"🔍 NSN: Step 2 - User not connected to WebSocket, returning WebSocket info to C-Client")
+                    logger.debug("🔍 NSN: ===== STEP 2: RETURNING WEBSOCKET INFO TO C-CLIENT =====")
+                    logger.debug("🔍 NSN: Step 2 - User not connected to WebSocket, returning WebSocket info to C-Client")
                     
                     # 构造WebSocket连接信息返回给C端
                     websocket_info = {
@@ -1036,40 +1001,40 @@ def dashboard():
                         'message': 'Please connect to B-Client WebSocket server'
                     }
                     
-                    print(f"🔍 NSN: Returning WebSocket info to C-Client:")
-                    print(f"   Action: {websocket_info['action']}")
-                    print(f"   WebSocket URL: {websocket_info['websocket_url']}")
-                    print(f"   User ID: {websocket_info['user_id']}")
-                    print(f"   Message: {websocket_info['message']}")
+                    logger.debug("🔍 NSN: Returning WebSocket info to C-Client:")
+                    logger.debug("   Action: %s", websocket_info['action'])
+                    logger.debug("   WebSocket URL: %s", websocket_info['websocket_url'])
+                    logger.debug("   User ID: %s", websocket_info['user_id'])
+                    logger.debug("   Message: %s", websocket_info['message'])
                     
                     return jsonify(websocket_info)
                 else:
-                    print(f"🔍 NSN: ===== USER ALREADY CONNECTED TO WEBSOCKET =====")
-                    print(f"🔍 NSN: User already connected to WebSocket, proceeding with cookie check")
+                    logger.debug("🔍 NSN: ===== USER ALREADY CONNECTED TO WEBSOCKET =====")
+                    logger.debug("🔍 NSN: User already connected to WebSocket, proceeding with cookie check")
             else:
-                print(f"⚠️ NSN: ===== B-CLIENT WEBSOCKET CHECK FAILED =====")
-                print(f"⚠️ NSN: Failed to check B-Client WebSocket status: {response.status_code}")
-                print(f"⚠️ NSN: Response text: {response.text}")
+                logger.warning("⚠️ NSN: ===== B-CLIENT WEBSOCKET CHECK FAILED =====")
+                logger.warning("⚠️ NSN: Failed to check B-Client WebSocket status: %s", response.status_code)
+                logger.warning("⚠️ NSN: Response text: %s", response.text)
                 # 继续执行cookie检查流程
                 
         except Exception as e:
-            print(f"⚠️ NSN: ===== ERROR CHECKING B-CLIENT WEBSOCKET =====")
-            print(f"⚠️ NSN: Error checking B-Client WebSocket status: {str(e)}")
-            print(f"⚠️ NSN: Error type: {type(e).__name__}")
+            logger.warning("⚠️ NSN: ===== ERROR CHECKING B-CLIENT WEBSOCKET =====")
+            logger.warning("⚠️ NSN: Error checking B-Client WebSocket status: %s", str(e))
+            logger.warning("⚠️ NSN: Error type: %s", type(e).__name__)
             # 继续执行cookie检查流程
         
         # 3. 向B端查询cookie
-        print(f"🔍 NSN: Step 3 - Checking B-Client for user cookie")
+        logger.debug("🔍 NSN: Step 3 - Checking B-Client for user cookie")
         
         try:
             cookie_result = call_bclient_query_cookie_api(nmp_user_id)
             
             if cookie_result and cookie_result.get('success') and cookie_result.get('has_cookie'):
                 # 4. 如果B端有该用户的cookie，B端已经直接发送session给C端
-                print(f"🔍 NSN: Step 4 - User has valid cookie, B-Client has sent session to C-Client")
+                logger.debug("🔍 NSN: Step 4 - User has valid cookie, B-Client has sent session to C-Client")
                 
-                print(f"✅ NSN: Cookie found for user {nmp_user_id}")
-                print(f"✅ NSN: B-Client has already sent session data to C-Client")
+                logger.debug("✅ NSN: Cookie found for user %s", nmp_user_id)
+                logger.debug("✅ NSN: B-Client has already sent session data to C-Client")
                 
                 # 返回成功响应，C端将自动登录
                 return jsonify({
@@ -1079,7 +1044,7 @@ def dashboard():
                 })
             else:
                 # 5. 如果B端没有该用户的cookie，跳转到登录页
-                print(f"🔍 NSN: Step 5 - No valid cookie found, redirecting to login page")
+                logger.debug("🔍 NSN: Step 5 - No valid cookie found, redirecting to login page")
                 
                 # 保存NMP参数到session
                 save_nmp_to_session(nmp_params)
@@ -1097,37 +1062,37 @@ def dashboard():
                                   nmp_cluster_id=nmp_params.get('nmp_cluster_id', ''),
                                   nmp_channel_id=nmp_params.get('nmp_channel_id', ''))
                 
-                print(f"🔍 NSN: Redirecting to login page: {login_url}")
+                logger.debug("🔍 NSN: Redirecting to login page: %s", login_url)
                 return redirect(login_url)
                 
         except Exception as e:
-            print(f"⚠️ NSN: Error checking B-Client cookie: {str(e)}")
+            logger.warning("⚠️ NSN: Error checking B-Client cookie: %s", str(e))
             # 发生错误时也跳转到登录页
             save_nmp_to_session(nmp_params)
             return redirect(url_for('login', nmp_injected='true', nmp_user_id=nmp_user_id))
     
     # Debug: Check current session state with detailed analysis
-    print(f"🔍 NSN: ===== DASHBOARD LOGIN CHECK ANALYSIS =====")
-    print(f"🔍 NSN: Dashboard accessed - Current session state:")
-    print(f"🔍 NSN:   All session keys: {list(session.keys())}")
-    print(f"🔍 NSN:   user_id: {session.get('user_id')} (type: {type(session.get('user_id'))})")
-    print(f"🔍 NSN:   username: {session.get('username')} (type: {type(session.get('username'))})")
-    print(f"🔍 NSN:   loggedin: {session.get('loggedin')} (type: {type(session.get('loggedin'))})")
-    print(f"🔍 NSN:   role: {session.get('role')} (type: {type(session.get('role'))})")
-    print(f"🔍 NSN:   nmp_user_id: {session.get('nmp_user_id')} (type: {type(session.get('nmp_user_id'))})")
-    print(f"🔍 NSN:   nmp_username: {session.get('nmp_username')} (type: {type(session.get('nmp_username'))})")
-    print(f"🔍 NSN:   nmp_client_type: {session.get('nmp_client_type')} (type: {type(session.get('nmp_client_type'))})")
-    print(f"🔍 NSN:   session.permanent: {session.permanent}")
-    print(f"🔍 NSN:   session.modified: {session.modified}")
+    logger.debug("🔍 NSN: ===== DASHBOARD LOGIN CHECK ANALYSIS =====")
+    logger.debug("🔍 NSN: Dashboard accessed - Current session state:")
+    logger.debug("🔍 NSN:   All session keys: %s", list(session.keys()))
+    logger.debug("🔍 NSN:   user_id: %s (type: %s)", session.get('user_id'), type(session.get('user_id')))
+    logger.debug("🔍 NSN:   username: %s (type: %s)", session.get('username'), type(session.get('username')))
+    logger.debug("🔍 NSN:   loggedin: %s (type: %s)", session.get('loggedin'), type(session.get('loggedin')))
+    logger.debug("🔍 NSN:   role: %s (type: %s)", session.get('role'), type(session.get('role')))
+    logger.debug("🔍 NSN:   nmp_user_id: %s (type: %s)", session.get('nmp_user_id'), type(session.get('nmp_user_id')))
+    logger.debug("🔍 NSN:   nmp_username: %s (type: %s)", session.get('nmp_username'), type(session.get('nmp_username')))
+    logger.debug("🔍 NSN:   nmp_client_type: %s (type: %s)", session.get('nmp_client_type'), type(session.get('nmp_client_type')))
+    logger.debug("🔍 NSN:   session.permanent: %s", session.permanent)
+    logger.debug("🔍 NSN:   session.modified: %s", session.modified)
     
     # Check if the user is logged in; if not, redirect to the login page.
     # TEMPORARILY COMMENTED OUT TO FIX LOGIN WITH NMP ISSUE
-    print(f"🔍 NSN: ===== LOGIN CHECK LOGIC ANALYSIS =====")
-    print(f"🔍 NSN: Checking login status:")
-    print(f"🔍 NSN:   'loggedin' in session: {'loggedin' in session}")
-    print(f"🔍 NSN:   session.get('loggedin'): {session.get('loggedin')}")
-    print(f"🔍 NSN:   session.get('user_id'): {session.get('user_id')}")
-    print(f"🔍 NSN:   session.get('username'): {session.get('username')}")
+    logger.debug("🔍 NSN: ===== LOGIN CHECK LOGIC ANALYSIS =====")
+    logger.debug("🔍 NSN: Checking login status:")
+    logger.debug("🔍 NSN:   'loggedin' in session: %s", 'loggedin' in session)
+    logger.debug("🔍 NSN:   session.get('loggedin'): %s", session.get('loggedin'))
+    logger.debug("🔍 NSN:   session.get('user_id'): %s", session.get('user_id'))
+    logger.debug("🔍 NSN:   session.get('username'): %s", session.get('username'))
     
     # Original login check logic (commented out)
     # if 'loggedin' not in session:
@@ -1137,46 +1102,46 @@ def dashboard():
     
     # Check what the original logic would have done
     if 'loggedin' not in session:
-        print(f"⚠️ NSN: WOULD BE FORCE LOGOUT - 'loggedin' not in session")
-        print(f"⚠️ NSN: Reason: Missing 'loggedin' key in session")
-        print(f"⚠️ NSN: Session keys available: {list(session.keys())}")
+        logger.debug("⚠️ NSN: WOULD BE FORCE LOGOUT - 'loggedin' not in session")
+        logger.debug("⚠️ NSN: Reason: Missing 'loggedin' key in session")
+        logger.debug("⚠️ NSN: Session keys available: %s", list(session.keys()))
     elif not session.get('loggedin'):
-        print(f"⚠️ NSN: WOULD BE FORCE LOGOUT - session.get('loggedin') is falsy")
-        print(f"⚠️ NSN: Reason: loggedin value is: {session.get('loggedin')} (type: {type(session.get('loggedin'))})")
+        logger.debug("⚠️ NSN: WOULD BE FORCE LOGOUT - session.get('loggedin') is falsy")
+        logger.debug("⚠️ NSN: Reason: loggedin value is: %s (type: %s)", session.get('loggedin'), type(session.get('loggedin')))
     elif not session.get('user_id'):
-        print(f"⚠️ NSN: WOULD BE FORCE LOGOUT - no user_id in session")
-        print(f"⚠️ NSN: Reason: user_id value is: {session.get('user_id')} (type: {type(session.get('user_id'))})")
+        logger.debug("⚠️ NSN: WOULD BE FORCE LOGOUT - no user_id in session")
+        logger.debug("⚠️ NSN: Reason: user_id value is: %s (type: %s)", session.get('user_id'), type(session.get('user_id')))
     else:
-        print(f"✅ NSN: LOGIN CHECK PASSED - User appears to be logged in")
-        print(f"✅ NSN:   loggedin: {session.get('loggedin')}")
-        print(f"✅ NSN:   user_id: {session.get('user_id')}")
-        print(f"✅ NSN:   username: {session.get('username')}")
+        logger.debug("✅ NSN: LOGIN CHECK PASSED - User appears to be logged in")
+        logger.debug("✅ NSN:   loggedin: %s", session.get('loggedin'))
+        logger.debug("✅ NSN:   user_id: %s", session.get('user_id'))
+        logger.debug("✅ NSN:   username: %s", session.get('username'))
     
-    print(f"🔍 NSN: ===== END LOGIN CHECK ANALYSIS =====")
-    print(f"🔍 NSN: ===== END DASHBOARD SESSION ANALYSIS =====")
+    logger.debug("🔍 NSN: ===== END LOGIN CHECK ANALYSIS =====")
+    logger.debug("🔍 NSN: ===== END DASHBOARD SESSION ANALYSIS =====")
     
     # 优先使用session中的NMP参数，如果URL中有新的NMP参数则更新session
     nmp_params = get_nmp_params_from_request(request)
     nmp_injected = nmp_params['nmp_injected']
     
-    print(f"🔐 NSN: Dashboard function called")
-    print(f"🔐 NSN: URL parameters:")
-    print(f"   nmp_injected from URL: {nmp_injected}")
-    print(f"   nmp_user_id from URL: {request.args.get('nmp_user_id')}")
-    print(f"   session nmp_user_id: {session.get('nmp_user_id')}")
-    print(f"   session nmp_username: {session.get('nmp_username')}")
+    logger.debug("🔐 NSN: Dashboard function called")
+    logger.debug("🔐 NSN: URL parameters:")
+    logger.debug("   nmp_injected from URL: %s", nmp_injected)
+    logger.debug("   nmp_user_id from URL: %s", request.args.get('nmp_user_id'))
+    logger.debug("   session nmp_user_id: %s", session.get('nmp_user_id'))
+    logger.debug("   session nmp_username: %s", session.get('nmp_username'))
     
     # 如果URL中有新的NMP参数，更新session
     if nmp_injected and nmp_params['nmp_user_id']:
-        print(f"🔐 NSN: Dashboard accessed with NMP parameters, updating session")
+        logger.debug("🔐 NSN: Dashboard accessed with NMP parameters, updating session")
         save_nmp_to_session(nmp_params)
-        print(f"🔐 NSN: Updated session - nmp_ip_address: {session.get('nmp_ip_address')}, nmp_port: {session.get('nmp_port')}")
+        logger.debug("🔐 NSN: Updated session - nmp_ip_address: %s, nmp_port: %s", session.get('nmp_ip_address'), session.get('nmp_port'))
     elif session.get('nmp_user_id'):
-        print(f"🔐 NSN: Dashboard accessed without NMP parameters, using session NMP data")
-        print(f"   session nmp_user_id: {session.get('nmp_user_id')}")
-        print(f"   session nmp_username: {session.get('nmp_username')}")
+        logger.debug("🔐 NSN: Dashboard accessed without NMP parameters, using session NMP data")
+        logger.debug("   session nmp_user_id: %s", session.get('nmp_user_id'))
+        logger.debug("   session nmp_username: %s", session.get('nmp_username'))
     else:
-        print(f"🔐 NSN: Dashboard accessed without NMP parameters and no session NMP data")
+        logger.debug("🔐 NSN: Dashboard accessed without NMP parameters and no session NMP data")
 
     statistics = {}
 
@@ -1216,7 +1181,8 @@ def dashboard():
 
         db.close_db()
 
-    announcement.update_user_login_info(session['user_id'])
+    # Login bookkeeping and read-state cleanup do not affect this page
+    jobs.enqueue('update_user_login_info', session['user_id'], key=f"login-info:{session['user_id']}")
 
     # Pass NMP parameters to template if available in session
     nmp_params = {}
@@ -1283,7 +1249,7 @@ def api_user_info():
         cursor.close()
         
         if user_data:
-            print(f"✅ NSN API: Found user info for {username}: user_id={user_data['user_id']}, role={user_data['role']}")
+            logger.debug("✅ NSN API: Found user info for %s: user_id=%s, role=%s", username, user_data['user_id'], user_data['role'])
             return jsonify({
                 'success': True,
                 'user_id': user_data['user_id'],
@@ -1291,14 +1257,14 @@ def api_user_info():
                 'role': user_data['role']
             })
         else:
-            print(f"⚠️ NSN API: User not found: {username}")
+            logger.debug("⚠️ NSN API: User not found: %s", username)
             return jsonify({
                 'success': False,
                 'error': 'User not found'
             }), 404
             
     except Exception as e:
-        print(f"❌ NSN API: Error querying user info: {e}")
+        logger.error("❌ NSN API: Error querying user info: %s", e)
         return jsonify({
             'success': False,
             'error': 'Internal server error'
@@ -1329,26 +1295,25 @@ def login():
         nmp_username = request.args.get('nmp_username', '')
         nmp_client_type = request.args.get('nmp_client_type', '')
         nmp_timestamp = request.args.get('nmp_timestamp', '')
-        nmp_client_id = request.args.get('nmp_client_id', '')  # C端唯一标识符
         nmp_node_id = request.args.get('nmp_node_id', '')
         nmp_domain_id = request.args.get('nmp_domain_id', '')
         nmp_cluster_id = request.args.get('nmp_cluster_id', '')
         nmp_channel_id = request.args.get('nmp_channel_id', '')
         
         # Debug: Log all NMP parameters from GET request
-        print(f"🔍 NSN: Login route (GET) - Debug NMP parameters:")
-        print(f"🔍 NSN:   request.args.get('nmp_user_id'): {request.args.get('nmp_user_id')}")
-        print(f"🔍 NSN:   request.args.get('nmp_username'): {request.args.get('nmp_username')}")
-        print(f"🔍 NSN:   request.args.get('nmp_client_type'): {request.args.get('nmp_client_type')}")
-        print(f"🔍 NSN:   request.args.get('nmp_timestamp'): {request.args.get('nmp_timestamp')}")
-        print(f"🔍 NSN:   request.args.get('nmp_client_id'): {request.args.get('nmp_client_id')}")
-        print(f"🔍 NSN:   All args keys: {list(request.args.keys())}")
-        print(f"🔍 NSN:   request.url: {request.url}")
+        logger.debug("🔍 NSN: Login route (GET) - Debug NMP parameters:")
+        logger.debug("🔍 NSN:   request.args.get('nmp_user_id'): %s", request.args.get('nmp_user_id'))
+        logger.debug("🔍 NSN:   request.args.get('nmp_username'): %s", request.args.get('nmp_username'))
+        logger.debug("🔍 NSN:   request.args.get('nmp_client_type'): %s", request.args.get('nmp_client_type'))
+        logger.debug("🔍 NSN:   request.args.get('nmp_timestamp'): %s", request.args.get('nmp_timestamp'))
+        logger.debug("🔍 NSN:   request.args.get('nmp_client_id'): %s", request.args.get('nmp_client_id'))
+        logger.debug("🔍 NSN:   All args keys: %s", list(request.args.keys()))
+        logger.debug("🔍 NSN:   request.url: %s", request.url)
         
         # Store NMP parameters in session if they exist
         if nmp_user_id and nmp_username:
-            print(f"🔐 NSN: Login route - Storing NMP parameters in session")
-            print(f"🔐 NSN: Storing: user_id={nmp_user_id}, username={nmp_username}")
+            logger.debug("🔐 NSN: Login route - Storing NMP parameters in session")
+            logger.debug("🔐 NSN: Storing: user_id=%s, username=%s", nmp_user_id, nmp_username)
             
             # Store basic NMP parameters from URL
             session['nmp_user_id'] = nmp_user_id
@@ -1364,21 +1329,21 @@ def login():
             original_ip = session.get('nmp_ip_address', '')
             original_port = session.get('nmp_port', '')
             if original_ip and original_port:
-                print(f"🔐 NSN: Login route - Preserving IP/Port from original session: ip={original_ip}, port={original_port}")
+                logger.debug("🔐 NSN: Login route - Preserving IP/Port from original session: ip=%s, port=%s", original_ip, original_port)
             else:
-                print(f"⚠️ NSN: Login route - No IP/Port found in original session")
+                logger.debug("⚠️ NSN: Login route - No IP/Port found in original session")
             
             # Debug: Verify session storage and check if IP/port need to be preserved
-            print(f"🔍 NSN: Login route - Session after storage:")
-            print(f"🔍 NSN:   session['nmp_user_id'] = {session.get('nmp_user_id', 'NOT_FOUND')}")
-            print(f"🔍 NSN:   session['nmp_username'] = {session.get('nmp_username', 'NOT_FOUND')}")
-            print(f"🔍 NSN:   session['nmp_ip_address'] = {session.get('nmp_ip_address', 'NOT_FOUND')}")
-            print(f"🔍 NSN:   session['nmp_port'] = {session.get('nmp_port', 'NOT_FOUND')}")
+            logger.debug("🔍 NSN: Login route - Session after storage:")
+            logger.debug("🔍 NSN:   session['nmp_user_id'] = %s", session.get('nmp_user_id', 'NOT_FOUND'))
+            logger.debug("🔍 NSN:   session['nmp_username'] = %s", session.get('nmp_username', 'NOT_FOUND'))
+            logger.debug("🔍 NSN:   session['nmp_ip_address'] = %s", session.get('nmp_ip_address', 'NOT_FOUND'))
+            logger.debug("🔍 NSN:   session['nmp_port'] = %s", session.get('nmp_port', 'NOT_FOUND'))
             
             # If IP and port are missing, they should have been preserved from the original session
             # This is expected since login URL doesn't contain these parameters
         else:
-            print(f"⚠️ NSN: Login route - No NMP parameters to store: user_id={nmp_user_id}, username={nmp_username}")
+            logger.debug("⚠️ NSN: Login route - No NMP parameters to store: user_id=%s, username=%s", nmp_user_id, nmp_username)
         
         # Get IP and Port from session (stored during initial NSN access)
         nmp_ip_address = session.get('nmp_ip_address', '')
@@ -1410,16 +1375,16 @@ def login():
                              })
     
     if request.method == 'POST':
-        print(f"🔐 NSN: ===== LOGIN WITH NMP - POST REQUEST DEBUG =====")
-        print(f"🔐 NSN: Login POST request received")
-        print(f"🔐 NSN: Request URL: {request.url}")
-        print(f"🔐 NSN: Request method: {request.method}")
+        logger.debug("🔐 NSN: ===== LOGIN WITH NMP - POST REQUEST DEBUG =====")
+        logger.debug("🔐 NSN: Login POST request received")
+        logger.debug("🔐 NSN: Request URL: %s", request.url)
+        logger.debug("🔐 NSN: Request method: %s", request.method)
         
         # Retrieve username and password from form data
         username = request.form.get("username", "").strip()
         password = request.form.get("password", "")
         
-        print(f"🔐 NSN: Form data - username='{username}', password='{'*' * len(password)}'")
+        logger.debug("🔐 NSN: Form data - username='%s', password='%s'", username, '*' * len(password))
         
         # Determine NMP parameter source based on request method and available data
         # POST request with form data = Login with NMP (form submission)
@@ -1433,11 +1398,11 @@ def login():
         nmp_ip_address_form = request.form.get("nmp_ip_address", "")
         nmp_port_form = request.form.get("nmp_port", "")
         
-        print(f"🔐 NSN: ===== NMP PARAMETERS FROM FORM =====")
-        print(f"🔐 NSN: Form data - user_id='{nmp_user_id_form}', username='{nmp_username_form}'")
-        print(f"🔐 NSN: Form data - client_type='{nmp_client_type_form}', timestamp='{nmp_timestamp_form}'")
-        print(f"🔐 NSN: Form data - ip_address='{nmp_ip_address_form}', port='{nmp_port_form}'")
-        print(f"🔐 NSN: ===== END NMP PARAMETERS FROM FORM =====")
+        logger.debug("🔐 NSN: ===== NMP PARAMETERS FROM FORM =====")
+        logger.debug("🔐 NSN: Form data - user_id='%s', username='%s'", nmp_user_id_form, nmp_username_form)
+        logger.debug("🔐 NSN: Form data - client_type='%s', timestamp='%s'", nmp_client_type_form, nmp_timestamp_form)
+        logger.debug("🔐 NSN: Form data - ip_address='%s', port='%s'", nmp_ip_address_form, nmp_port_form)
+        logger.debug("🔐 NSN: ===== END NMP PARAMETERS FROM FORM =====")
         
         # Check URL parameters (for GET requests - Sign Up with NMP)
         nmp_user_id_url = request.args.get('nmp_user_id', '')
@@ -1449,17 +1414,17 @@ def login():
         nmp_port_url = request.args.get('nmp_port', '')
         nmp_websocket_port_url = request.args.get('nmp_websocket_port', '')
         
-        print(f"🔐 NSN: ===== NMP PARAMETERS FROM URL =====")
-        print(f"🔐 NSN: URL args - user_id='{nmp_user_id_url}', username='{nmp_username_url}'")
-        print(f"🔐 NSN: URL args - client_type='{nmp_client_type_url}', timestamp='{nmp_timestamp_url}'")
-        print(f"🔐 NSN: URL args - client_id='{nmp_client_id_url}', websocket_port='{nmp_websocket_port_url}'")
-        print(f"🔐 NSN: URL args - ip_address='{nmp_ip_address_url}', port='{nmp_port_url}'")
-        print(f"🔐 NSN: ===== END NMP PARAMETERS FROM URL =====")
+        logger.debug("🔐 NSN: ===== NMP PARAMETERS FROM URL =====")
+        logger.debug("🔐 NSN: URL args - user_id='%s', username='%s'", nmp_user_id_url, nmp_username_url)
+        logger.debug("🔐 NSN: URL args - client_type='%s', timestamp='%s'", nmp_client_type_url, nmp_timestamp_url)
+        logger.debug("🔐 NSN: URL args - client_id='%s', websocket_port='%s'", nmp_client_id_url, nmp_websocket_port_url)
+        logger.debug("🔐 NSN: URL args - ip_address='%s', port='%s'", nmp_ip_address_url, nmp_port_url)
+        logger.debug("🔐 NSN: ===== END NMP PARAMETERS FROM URL =====")
         
         # Determine the source of NMP parameters
-        print(f"🔐 NSN: ===== DETERMINING NMP PARAMETER SOURCE =====")
-        print(f"🔐 NSN: Form has NMP data: user_id='{nmp_user_id_form}', username='{nmp_username_form}'")
-        print(f"🔐 NSN: URL has NMP data: user_id='{nmp_user_id_url}', username='{nmp_username_url}'")
+        logger.debug("🔐 NSN: ===== DETERMINING NMP PARAMETER SOURCE =====")
+        logger.debug("🔐 NSN: Form has NMP data: user_id='%s', username='%s'", nmp_user_id_form, nmp_username_form)
+        logger.debug("🔐 NSN: URL has NMP data: user_id='%s', username='%s'", nmp_user_id_url, nmp_username_url)
         
         if nmp_user_id_form and nmp_username_form:
             # POST request - Login with NMP (form submission)
@@ -1470,8 +1435,8 @@ def login():
             nmp_ip_address = nmp_ip_address_form
             nmp_port = nmp_port_form
             nmp_injected = True
-            print(f"🔐 NSN: ✅ Using FORM data - Login with NMP: user_id={nmp_user_id}, username={nmp_username}")
-            print(f"🔐 NSN: ✅ Form IP/Port: ip_address={nmp_ip_address}, port={nmp_port}")
+            logger.debug("🔐 NSN: ✅ Using FORM data - Login with NMP: user_id=%s, username=%s", nmp_user_id, nmp_username)
+            logger.debug("🔐 NSN: ✅ Form IP/Port: ip_address=%s, port=%s", nmp_ip_address, nmp_port)
         elif nmp_user_id_url and nmp_username_url:
             # GET request - Sign Up with NMP (URL parameters)
             nmp_user_id = nmp_user_id_url
@@ -1481,8 +1446,8 @@ def login():
             nmp_ip_address = nmp_ip_address_url
             nmp_port = nmp_port_url
             nmp_injected = True
-            print(f"🔐 NSN: ✅ Using URL params - Sign Up with NMP: user_id={nmp_user_id}, username={nmp_username}")
-            print(f"🔐 NSN: ✅ URL IP/Port: ip_address={nmp_ip_address}, port={nmp_port}")
+            logger.debug("🔐 NSN: ✅ Using URL params - Sign Up with NMP: user_id=%s, username=%s", nmp_user_id, nmp_username)
+            logger.debug("🔐 NSN: ✅ URL IP/Port: ip_address=%s, port=%s", nmp_ip_address, nmp_port)
         else:
             # No NMP parameters - regular login
             nmp_user_id = ""
@@ -1492,25 +1457,19 @@ def login():
             nmp_ip_address = ""
             nmp_port = ""
             nmp_injected = False
-            print(f"🔐 NSN: ❌ Regular login - No NMP parameters found")
+            logger.debug("🔐 NSN: ❌ Regular login - No NMP parameters found")
         
-        print(f"🔐 NSN: ===== FINAL NMP PARAMETERS =====")
-        print(f"🔐 NSN: Final values - user_id='{nmp_user_id}', username='{nmp_username}'")
-        print(f"🔐 NSN: Final values - ip_address='{nmp_ip_address}', port='{nmp_port}'")
-        print(f"🔐 NSN: Final values - injected={nmp_injected}")
-        print(f"🔐 NSN: ===== END FINAL NMP PARAMETERS =====")
+        logger.debug("🔐 NSN: ===== FINAL NMP PARAMETERS =====")
+        logger.debug("🔐 NSN: Final values - user_id='%s', username='%s'", nmp_user_id, nmp_username)
+        logger.debug("🔐 NSN: Final values - ip_address='%s', port='%s'", nmp_ip_address, nmp_port)
+        logger.debug("🔐 NSN: Final values - injected=%s", nmp_injected)
+        logger.debug("🔐 NSN: ===== END FINAL NMP PARAMETERS =====")
         
-        # Get NMP binding parameters from form data
-        nmp_bind = request.form.get("nmp_bind", "false").lower() == "true"
-        nmp_bind_type = request.form.get("nmp_bind_type", "bind")  # "bind" or "signup"
-        nmp_auto_refresh = request.form.get("nmp_auto_refresh", "false").lower() == "true"
-        nmp_auto_login = request.form.get("nmp_auto_login", "false").lower() == "true"  # For B-Client auto login
-
         # Handle NMP login with credentials - NSN logs in first, then saves session to B-client
         if nmp_injected and username and password:
-            print(f"🔐 NSN: ===== NMP LOGIN WITH CREDENTIALS =====")
-            print(f"🔐 NSN: User provided credentials, NSN will login first, then save session to B-client")
-            print(f"🔐 NSN: Username: {username}, NMP User ID: {nmp_user_id}")
+            logger.debug("🔐 NSN: ===== NMP LOGIN WITH CREDENTIALS =====")
+            logger.debug("🔐 NSN: User provided credentials, NSN will login first, then save session to B-client")
+            logger.debug("🔐 NSN: Username: %s, NMP User ID: %s", username, nmp_user_id)
             
             # First, perform regular NSN login validation
             with db.get_cursor() as cursor:
@@ -1519,24 +1478,25 @@ def login():
                 user_data = cursor.fetchone()
                 db.close_db()
             
-            print(f"🔍 NSN: Database query result: {user_data}")
-            print(f"🔍 NSN: User data type: {type(user_data)}")
+            logger.debug("🔍 NSN: Database query result: %s", user_data)
+            logger.debug("🔍 NSN: User data type: %s", type(user_data))
             if user_data:
-                print(f"🔍 NSN: User data keys: {user_data.keys() if isinstance(user_data, dict) else 'Not a dict'}")
-                print(f"🔍 NSN: User data fields: {user_data}")
-                print(f"🔍 NSN: Password hash type: {type(user_data['password_hash'])}")
-                print(f"🔍 NSN: Password hash value: '{user_data['password_hash']}'")
-                print(f"🔍 NSN: Password hash length: {len(user_data['password_hash']) if user_data['password_hash'] else 0}")
-                print(f"🔍 NSN: Password to check: '{password}'")
-                print(f"🔍 NSN: Password length: {len(password)}")
+                logger.debug("🔍 NSN: User data keys: %s", user_data.keys() if isinstance(user_data, dict) else 'Not a dict')
+                logger.debug("🔍 NSN: User data fields: %s", user_data)
+                logger.debug("🔍 NSN: Password hash type: %s", type(user_data['password_hash']))
+                logger.debug("🔍 NSN: Password hash value: '%s'", user_data['password_hash'])
+                logger.debug("🔍 NSN: Password hash length: %s", len(user_data['password_hash']) if user_data['password_hash'] else 0)
+                logger.debug("🔍 NSN: Password to check: '%s'", password)
+                logger.debug("🔍 NSN: Password length: %s", len(password))
             else:
-                print(f"❌ NSN: User not found in database: {username}")
-                print(f"❌ NSN: This may indicate a database sync issue after registration")
+                logger.error("❌ NSN: User not found in database: %s", username)
+                logger.error("❌ NSN: This may indicate a database sync issue after registration")
             
             if user_data and user_data['password_hash'] and bcrypt.check_password_hash(user_data['password_hash'], password):
-                print(f"✅ NSN: NSN login successful for user: {username}")
+                logger.debug("✅ NSN: NSN login successful for user: %s", username)
                 
                 # Set Flask session
+                sessions.regenerate()
                 session['loggedin'] = True
                 session['user_id'] = user_data['user_id']
                 session['username'] = user_data['username']
@@ -1564,7 +1524,7 @@ def login():
                     session_id = secrets.token_urlsafe(32)
                     session_cookie = f"session={session_id}"
                 
-                print(f"🍪 NSN: Session cookie for B-client: {session_cookie}")
+                logger.debug("🍪 NSN: Session cookie for B-client: %s", session_cookie)
                 
                 # Store session data in session for B-client to retrieve later
                 # This avoids the circular dependency issue where NSN calls B-client while B-client is waiting for NSN
@@ -1573,14 +1533,12 @@ def login():
                 session['nmp_nsn_user_id'] = user_data['user_id']
                 session['nmp_nsn_username'] = user_data['username']
                 
-                print(f"✅ NSN: Login successful, session data stored for B-client retrieval")
+                logger.debug("✅ NSN: Login successful, session data stored for B-client retrieval")
                 flash("Login successful! Session will be synchronized with C-Client...", "success")
                 
-                # Call B-Client /bind API to sync login status
-                print(f"🔗 NSN: ===== CALLING B-CLIENT /bind API =====")
+                # Call B-Client /bind API to sync login status (in the background, see bclient.notify)
+                logger.debug("🔗 NSN: ===== CALLING B-CLIENT /bind API =====")
                 try:
-                    import requests
-                    
                     # Get domain_id, node_id, cluster_id, channel_id, client_id from session or use defaults
                     # These should have been set from URL parameters when user first accessed NSN
                     bind_domain_id = session.get('nmp_domain_id', NSN_URL)
@@ -1589,12 +1547,12 @@ def login():
                     bind_channel_id = session.get('nmp_channel_id')
                     bind_client_id = session.get('nmp_client_id')
                     
-                    print(f"🔗 NSN: Using IDs from session:")
-                    print(f"   domain_id: {bind_domain_id}")
-                    print(f"   node_id: {bind_node_id}")
-                    print(f"   cluster_id: {bind_cluster_id}")
-                    print(f"   channel_id: {bind_channel_id}")
-                    print(f"   client_id: {bind_client_id}")
+                    logger.debug("🔗 NSN: Using IDs from session:")
+                    logger.debug("   domain_id: %s", bind_domain_id)
+                    logger.debug("   node_id: %s", bind_node_id)
+                    logger.debug("   cluster_id: %s", bind_cluster_id)
+                    logger.debug("   channel_id: %s", bind_channel_id)
+                    logger.debug("   client_id: %s", bind_client_id)
                     
                     bind_data = {
                         'user_id': nmp_user_id,
@@ -1616,26 +1574,21 @@ def login():
                     if bind_client_id:
                         bind_data['client_id'] = bind_client_id
                     
-                    print(f"🔗 NSN: Sending bind request to B-Client: {bind_data}")
-                    bclient_response = requests.post(f'{B_CLIENT_API_URL}/bind', json=bind_data, timeout=30)
-                    print(f"🔗 NSN: B-Client response status: {bclient_response.status_code}")
-                    print(f"🔗 NSN: B-Client response: {bclient_response.text}")
-                    
-                    if bclient_response.status_code == 200:
-                        print(f"✅ NSN: B-Client bind successful, session synchronized")
-                    else:
-                        print(f"⚠️ NSN: B-Client bind failed: {bclient_response.status_code}")
+                    logger.debug("🔗 NSN: Queueing bind request to B-Client: %s",
+                                 {**bind_data, 'session_cookie': '<redacted>'})
+                    # Holds the live session cookie: never persisted in the job_queue table
+                    bclient.notify('/bind', bind_data, local=True)
                         
                 except Exception as e:
-                    print(f"❌ NSN: Failed to call B-Client /bind API: {e}")
+                    logger.error("❌ NSN: Failed to queue B-Client /bind call: %s", e)
                 
-                print(f"🔗 NSN: ===== END CALLING B-CLIENT /bind API =====")
+                logger.debug("🔗 NSN: ===== END CALLING B-CLIENT /bind API =====")
                 
                 # Return the response with session cookie
                 return response
             else:
                 # NSN login failed
-                print(f"❌ NSN: NSN login failed for user: {username}")
+                logger.info("❌ NSN: NSN login failed for user: %s", username)
                 flash("Wrong account or password, please try again or sign up with NMP", "danger")
                 
                 # Return to login page with NMP parameters
@@ -1696,7 +1649,7 @@ def login():
 
         # Skip regular login validation if this was an NMP login attempt (without credentials)
         if nmp_injected and not username and not password:
-            print(f"🔐 NSN: Skipping regular login validation - NMP login was attempted without credentials")
+            logger.debug("🔐 NSN: Skipping regular login validation - NMP login was attempted without credentials")
             flash("Please use 'Login with NMP' button for NMP authentication", "info")
             return render_template("login.html", 
                             nmp_injected=nmp_injected,
@@ -1732,26 +1685,26 @@ def login():
         user_agent = request.headers.get('User-Agent', '')
         is_bclient_request = user_agent.startswith('python-requests') and nmp_injected
         
-        print(f"🔍 NSN: ===== LOGIN VALIDATION DEBUG =====")
-        print(f"🔍 NSN: User-Agent: {user_agent}")
-        print(f"🔍 NSN: Is B-Client request: {is_bclient_request}")
-        print(f"🔍 NSN: NMP injected: {nmp_injected}")
-        print(f"🔍 NSN: User found: {user is not None}")
+        logger.debug("🔍 NSN: ===== LOGIN VALIDATION DEBUG =====")
+        logger.debug("🔍 NSN: User-Agent: %s", user_agent)
+        logger.debug("🔍 NSN: Is B-Client request: %s", is_bclient_request)
+        logger.debug("🔍 NSN: NMP injected: %s", nmp_injected)
+        logger.debug("🔍 NSN: User found: %s", user is not None)
         if user:
-            print(f"🔍 NSN: User details: username={user['username']}, user_id={user['user_id']}")
-            print(f"🔍 NSN: Password hash length: {len(user['password_hash'])}")
-            print(f"🔍 NSN: Password hash preview: {user['password_hash'][:20]}...")
-        print(f"🔍 NSN: Password length: {len(password)}")
-        print(f"🔍 NSN: Password preview: {password[:3]}...")
-        print(f"🔍 NSN: ===== END LOGIN VALIDATION DEBUG =====")
+            logger.debug("🔍 NSN: User details: username=%s, user_id=%s", user['username'], user['user_id'])
+            logger.debug("🔍 NSN: Password hash length: %s", len(user['password_hash']))
+            logger.debug("🔍 NSN: Password hash preview: %s...", user['password_hash'][:20])
+        logger.debug("🔍 NSN: Password length: %s", len(password))
+        logger.debug("🔍 NSN: Password preview: %s...", password[:3])
+        logger.debug("🔍 NSN: ===== END LOGIN VALIDATION DEBUG =====")
 
         # Validate user existence and password correctness
         if not user or not bcrypt.check_password_hash(user["password_hash"], password):
-            print(f"❌ NSN: Login validation failed - user exists: {user is not None}, password valid: {user and bcrypt.check_password_hash(user['password_hash'], password)}")
+            logger.error("❌ NSN: Login validation failed - user exists: %s, password valid: %s", user is not None, user and bcrypt.check_password_hash(user['password_hash'], password))
             
             # For B-Client requests, return JSON error instead of HTML
             if is_bclient_request:
-                print(f"🔗 NSN: Returning JSON error for B-Client login failure")
+                logger.debug("🔗 NSN: Returning JSON error for B-Client login failure")
                 return jsonify({
                     'success': False,
                     'error': 'Invalid username or password',
@@ -1761,8 +1714,6 @@ def login():
             
             flash("Invalid username or password", "danger")
             # Pass NMP parameters to template even on login failure
-            # Ensure nmp_injected is True if any NMP parameters are present
-            nmp_injected_final = nmp_injected or bool(nmp_user_id and nmp_username)
             return render_template("login.html", 
                              nmp_injected=nmp_injected,
                              nmp_user_id=nmp_user_id,
@@ -1776,8 +1727,6 @@ def login():
         if user["status"] == "banned":
             flash("Your account has been banned. Please contact support.", "danger")
             # Pass NMP parameters to template even on login failure
-            # Ensure nmp_injected is True if any NMP parameters are present
-            nmp_injected_final = nmp_injected or bool(nmp_user_id and nmp_username)
             return render_template("login.html", 
                              nmp_injected=nmp_injected,
                              nmp_user_id=nmp_user_id,
@@ -1788,16 +1737,17 @@ def login():
                              nmp_port=session.get('nmp_port', ''))
 
         # Successful login: Store session data
+        sessions.regenerate()
         session["loggedin"] = True
         session["user_id"] = user["user_id"]
         session["username"] = user["username"]
         session["role"] = user["role"]
         
-        print(f"✅ NSN: Login successful for user: {user['username']} (ID: {user['user_id']})")
+        logger.info("✅ NSN: Login successful for user: %s (ID: %s)", user['username'], user['user_id'])
         
         # For B-Client requests, return JSON response instead of redirect
         if is_bclient_request:
-            print(f"🔗 NSN: Returning JSON response for B-Client login success")
+            logger.debug("🔗 NSN: Returning JSON response for B-Client login success")
             return jsonify({
                 'success': True,
                 'message': 'Login successful',
@@ -1808,7 +1758,7 @@ def login():
         
         # Store NMP binding info in session if present (but not for auto login)
         # Login successful - no special NMP handling needed
-        print(f"✅ NSN: User {username} logged in successfully")
+        logger.debug("✅ NSN: User %s logged in successfully", username)
 
         # Redirect based on user role
         return redirect(user_home_url())
@@ -1860,18 +1810,18 @@ def signup():
     ensure_session_parsed()
 
     # Debug: Log session state at the very beginning of signup route
-    print(f"🔍 NSN: Signup route - Session state at start:")
-    print(f"🔍 NSN:   All session keys: {list(session.keys())}")
-    print(f"🔍 NSN:   session.get('nmp_user_id'): {session.get('nmp_user_id', 'NOT_FOUND')}")
-    print(f"🔍 NSN:   session.get('nmp_username'): {session.get('nmp_username', 'NOT_FOUND')}")
-    print(f"🔍 NSN:   session.get('nmp_ip_address'): {session.get('nmp_ip_address', 'NOT_FOUND')}")
-    print(f"🔍 NSN:   session.get('nmp_port'): {session.get('nmp_port', 'NOT_FOUND')}")
+    logger.debug("🔍 NSN: Signup route - Session state at start:")
+    logger.debug("🔍 NSN:   All session keys: %s", list(session.keys()))
+    logger.debug("🔍 NSN:   session.get('nmp_user_id'): %s", session.get('nmp_user_id', 'NOT_FOUND'))
+    logger.debug("🔍 NSN:   session.get('nmp_username'): %s", session.get('nmp_username', 'NOT_FOUND'))
+    logger.debug("🔍 NSN:   session.get('nmp_ip_address'): %s", session.get('nmp_ip_address', 'NOT_FOUND'))
+    logger.debug("🔍 NSN:   session.get('nmp_port'): %s", session.get('nmp_port', 'NOT_FOUND'))
     
     # Debug: Log request method and headers
-    print(f"🔍 NSN: Signup route - Request info:")
-    print(f"🔍 NSN:   Method: {request.method}")
-    print(f"🔍 NSN:   Referer: {request.headers.get('Referer', 'NOT_FOUND')}")
-    print(f"🔍 NSN:   User-Agent: {request.headers.get('User-Agent', 'NOT_FOUND')[:50]}...")
+    logger.debug("🔍 NSN: Signup route - Request info:")
+    logger.debug("🔍 NSN:   Method: %s", request.method)
+    logger.debug("🔍 NSN:   Referer: %s", request.headers.get('Referer', 'NOT_FOUND'))
+    logger.debug("🔍 NSN:   User-Agent: %s...", request.headers.get('User-Agent', 'NOT_FOUND')[:50])
 
     if 'loggedin' in session:
         return redirect(user_home_url())
@@ -1886,34 +1836,34 @@ def signup():
     nmp_port = request.form.get("nmp_port", "") or session.get("nmp_port", "")
     
     # Debug: Log all form data to understand the request structure
-    print(f"🔍 NSN: Signup route - Debug form data:")
-    print(f"🔍 NSN:   request.method: {request.method}")
-    print(f"🔍 NSN:   request.form.get('nmp_user_id'): {request.form.get('nmp_user_id')}")
-    print(f"🔍 NSN:   request.form.get('nmp_username'): {request.form.get('nmp_username')}")
-    print(f"🔍 NSN:   request.form.get('username'): {request.form.get('username')}")
-    print(f"🔍 NSN:   request.form.get('nmp_ip_address'): {request.form.get('nmp_ip_address')}")
-    print(f"🔍 NSN:   request.form.get('nmp_port'): {request.form.get('nmp_port')}")
-    print(f"🔍 NSN:   All form keys: {list(request.form.keys())}")
+    logger.debug("🔍 NSN: Signup route - Debug form data:")
+    logger.debug("🔍 NSN:   request.method: %s", request.method)
+    logger.debug("🔍 NSN:   request.form.get('nmp_user_id'): %s", request.form.get('nmp_user_id'))
+    logger.debug("🔍 NSN:   request.form.get('nmp_username'): %s", request.form.get('nmp_username'))
+    logger.debug("🔍 NSN:   request.form.get('username'): %s", request.form.get('username'))
+    logger.debug("🔍 NSN:   request.form.get('nmp_ip_address'): %s", request.form.get('nmp_ip_address'))
+    logger.debug("🔍 NSN:   request.form.get('nmp_port'): %s", request.form.get('nmp_port'))
+    logger.debug("🔍 NSN:   All form keys: %s", list(request.form.keys()))
     
     # Debug: Log all URL args data
-    print(f"🔍 NSN: Signup route - Debug URL args:")
-    print(f"🔍 NSN:   request.args.get('nmp_user_id'): {request.args.get('nmp_user_id')}")
-    print(f"🔍 NSN:   request.args.get('nmp_username'): {request.args.get('nmp_username')}")
-    print(f"🔍 NSN:   request.args.get('nmp_client_type'): {request.args.get('nmp_client_type')}")
-    print(f"🔍 NSN:   request.args.get('nmp_timestamp'): {request.args.get('nmp_timestamp')}")
-    print(f"🔍 NSN:   request.args.get('nmp_client_id'): {request.args.get('nmp_client_id')}")
-    print(f"🔍 NSN:   request.args.get('nmp_ip_address'): {request.args.get('nmp_ip_address')}")
-    print(f"🔍 NSN:   request.args.get('nmp_port'): {request.args.get('nmp_port')}")
-    print(f"🔍 NSN:   request.args.get('nmp_websocket_port'): {request.args.get('nmp_websocket_port')}")
-    print(f"🔍 NSN:   All args keys: {list(request.args.keys())}")
+    logger.debug("🔍 NSN: Signup route - Debug URL args:")
+    logger.debug("🔍 NSN:   request.args.get('nmp_user_id'): %s", request.args.get('nmp_user_id'))
+    logger.debug("🔍 NSN:   request.args.get('nmp_username'): %s", request.args.get('nmp_username'))
+    logger.debug("🔍 NSN:   request.args.get('nmp_client_type'): %s", request.args.get('nmp_client_type'))
+    logger.debug("🔍 NSN:   request.args.get('nmp_timestamp'): %s", request.args.get('nmp_timestamp'))
+    logger.debug("🔍 NSN:   request.args.get('nmp_client_id'): %s", request.args.get('nmp_client_id'))
+    logger.debug("🔍 NSN:   request.args.get('nmp_ip_address'): %s", request.args.get('nmp_ip_address'))
+    logger.debug("🔍 NSN:   request.args.get('nmp_port'): %s", request.args.get('nmp_port'))
+    logger.debug("🔍 NSN:   request.args.get('nmp_websocket_port'): %s", request.args.get('nmp_websocket_port'))
+    logger.debug("🔍 NSN:   All args keys: %s", list(request.args.keys()))
     
     # Debug: Log all request data
-    print(f"🔍 NSN: Signup route - Debug request data:")
-    print(f"🔍 NSN:   request.url: {request.url}")
-    print(f"🔍 NSN:   request.full_path: {request.full_path}")
-    print(f"🔍 NSN:   request.query_string: {request.query_string}")
-    print(f"🔍 NSN:   request.data: {request.data}")
-    print(f"🔍 NSN:   request.json: {request.json if request.is_json else 'Not JSON'}")
+    logger.debug("🔍 NSN: Signup route - Debug request data:")
+    logger.debug("🔍 NSN:   request.url: %s", request.url)
+    logger.debug("🔍 NSN:   request.full_path: %s", request.full_path)
+    logger.debug("🔍 NSN:   request.query_string: %s", request.query_string)
+    logger.debug("🔍 NSN:   request.data: %s", request.data)
+    logger.debug("🔍 NSN:   request.json: %s", request.json if request.is_json else 'Not JSON')
     
     # NMP registration branch removed - B-Client will query database directly after registration
     
@@ -1921,12 +1871,12 @@ def signup():
     if not nmp_ip_address or not nmp_port:
         nmp_ip_address = nmp_ip_address or session.get("nmp_ip_address", "")
         nmp_port = nmp_port or session.get("nmp_port", "")
-        print(f"🔍 NSN: Signup route - Retrieved IP/Port from original session: ip_address={nmp_ip_address}, port={nmp_port}")
+        logger.debug("🔍 NSN: Signup route - Retrieved IP/Port from original session: ip_address=%s, port=%s", nmp_ip_address, nmp_port)
     
     # If still empty, try to get from Referer URL (for B-Client auto-registration)
     if not nmp_ip_address or not nmp_port:
         referer = request.headers.get('Referer', '')
-        print(f"🔍 NSN: Signup route - Checking Referer for NMP parameters: {referer}")
+        logger.debug("🔍 NSN: Signup route - Checking Referer for NMP parameters: %s", referer)
         if referer and 'nmp_ip_address=' in referer and 'nmp_port=' in referer:
             try:
                 from urllib.parse import urlparse, parse_qs
@@ -1934,23 +1884,23 @@ def signup():
                 query_params = parse_qs(parsed_url.query)
                 nmp_ip_address = nmp_ip_address or query_params.get('nmp_ip_address', [''])[0]
                 nmp_port = nmp_port or query_params.get('nmp_port', [''])[0]
-                print(f"🔍 NSN: Signup route - Retrieved IP/Port from Referer: ip_address={nmp_ip_address}, port={nmp_port}")
+                logger.debug("🔍 NSN: Signup route - Retrieved IP/Port from Referer: ip_address=%s, port=%s", nmp_ip_address, nmp_port)
             except Exception as e:
-                print(f"⚠️ NSN: Signup route - Failed to parse Referer: {e}")
+                logger.debug("⚠️ NSN: Signup route - Failed to parse Referer: %s", e)
     
     # If still empty, try to get from URL arguments (for direct access)
     if not nmp_ip_address or not nmp_port:
         nmp_ip_address = nmp_ip_address or request.args.get('nmp_ip_address', '')
         nmp_port = nmp_port or request.args.get('nmp_port', '')
         if nmp_ip_address and nmp_port:
-            print(f"🔍 NSN: Signup route - Retrieved IP/Port from URL args: ip_address={nmp_ip_address}, port={nmp_port}")
+            logger.debug("🔍 NSN: Signup route - Retrieved IP/Port from URL args: ip_address=%s, port=%s", nmp_ip_address, nmp_port)
     
     # If still empty, try to get from request headers (for B-Client auto-registration)
     if not nmp_ip_address or not nmp_port:
         # Check if this is a B-Client request (has specific User-Agent)
         user_agent = request.headers.get('User-Agent', '')
         if 'NoMorePassword-B-Client' in user_agent:
-            print(f"🔍 NSN: Signup route - B-Client auto-registration detected, User-Agent: {user_agent}")
+            logger.debug("🔍 NSN: Signup route - B-Client auto-registration detected, User-Agent: %s", user_agent)
             # For B-Client requests, we need to get IP/Port from the original C-Client session
             # Since B-Client doesn't have direct access to C-Client session, we'll use the URL parameters
             # that should have been passed from the original C-Client access
@@ -1958,30 +1908,30 @@ def signup():
                 nmp_ip_address = request.args.get('nmp_ip_address', '')
             if not nmp_port:
                 nmp_port = request.args.get('nmp_port', '')
-            print(f"🔍 NSN: Signup route - B-Client request, trying URL args: ip_address={nmp_ip_address}, port={nmp_port}")
+            logger.debug("🔍 NSN: Signup route - B-Client request, trying URL args: ip_address=%s, port=%s", nmp_ip_address, nmp_port)
             
             # If still empty, try to get from the original session establishment
             # This is a fallback for when the original session had the IP/Port info
             if not nmp_ip_address or not nmp_port:
-                print(f"🔍 NSN: Signup route - Still empty, trying to get from original session establishment")
+                logger.debug("🔍 NSN: Signup route - Still empty, trying to get from original session establishment")
                 # Try to get from the session that was established when C-Client first accessed NSN
                 # This should contain the IP/Port from the original NMP parameters
                 original_session_ip = session.get('nmp_ip_address', '')
                 original_session_port = session.get('nmp_port', '')
-                print(f"🔍 NSN: Signup route - Original session IP/Port: ip={original_session_ip}, port={original_session_port}")
+                logger.debug("🔍 NSN: Signup route - Original session IP/Port: ip=%s, port=%s", original_session_ip, original_session_port)
                 
                 if original_session_ip and original_session_port:
                     nmp_ip_address = nmp_ip_address or original_session_ip
                     nmp_port = nmp_port or original_session_port
-                    print(f"🔍 NSN: Signup route - Using original session IP/Port: ip_address={nmp_ip_address}, port={nmp_port}")
+                    logger.debug("🔍 NSN: Signup route - Using original session IP/Port: ip_address=%s, port=%s", nmp_ip_address, nmp_port)
                 else:
-                    print(f"⚠️ NSN: Signup route - Original session also has no IP/Port info")
+                    logger.debug("⚠️ NSN: Signup route - Original session also has no IP/Port info")
     
     # CRITICAL FIX: If still empty, get from the Referer URL (C-Client's original access)
     # The Referer should contain the original C-Client access URL with NMP parameters
     if not nmp_ip_address or not nmp_port:
         referer = request.headers.get('Referer', '')
-        print(f"🔍 NSN: Signup route - Checking Referer for original C-Client IP/Port: {referer}")
+        logger.debug("🔍 NSN: Signup route - Checking Referer for original C-Client IP/Port: %s", referer)
         if referer and 'nmp_ip_address=' in referer and 'nmp_port=' in referer:
             try:
                 from urllib.parse import urlparse, parse_qs
@@ -1989,48 +1939,48 @@ def signup():
                 query_params = parse_qs(parsed_url.query)
                 nmp_ip_address = nmp_ip_address or query_params.get('nmp_ip_address', [''])[0]
                 nmp_port = nmp_port or query_params.get('nmp_port', [''])[0]
-                print(f"🔍 NSN: Signup route - Retrieved IP/Port from Referer: ip_address={nmp_ip_address}, port={nmp_port}")
+                logger.debug("🔍 NSN: Signup route - Retrieved IP/Port from Referer: ip_address=%s, port=%s", nmp_ip_address, nmp_port)
             except Exception as e:
-                print(f"⚠️ NSN: Signup route - Failed to parse Referer: {e}")
+                logger.debug("⚠️ NSN: Signup route - Failed to parse Referer: %s", e)
     
     # Final fallback: if still empty, try to get from the original session establishment
     # This should not happen in normal flow, but provides a safety net
     if not nmp_ip_address or not nmp_port:
-        print(f"⚠️ NSN: Signup route - IP/Port still missing after all attempts: ip_address={nmp_ip_address}, port={nmp_port}")
-        print(f"⚠️ NSN: Signup route - This may cause B-Client to not send session data to C-Client")
+        logger.debug("⚠️ NSN: Signup route - IP/Port still missing after all attempts: ip_address=%s, port=%s", nmp_ip_address, nmp_port)
+        logger.debug("⚠️ NSN: Signup route - This may cause B-Client to not send session data to C-Client")
     
     # Debug: Log all NMP parameters and session state
-    print(f"🔍 NSN: Signup route - NMP parameters debug:")
-    print(f"🔍 NSN:   From form: user_id={request.form.get('nmp_user_id', '')}, username={request.form.get('nmp_username', '')}")
-    print(f"🔍 NSN:   From session: user_id={session.get('nmp_user_id', '')}, username={session.get('nmp_username', '')}")
-    print(f"🔍 NSN:   Final values: user_id={nmp_user_id}, username={nmp_username}")
-    print(f"🔍 NSN:   IP/Port: ip_address={nmp_ip_address}, port={nmp_port}")
-    print(f"🔍 NSN: ===== REQUEST DETAILS DEBUG ===== ")
-    print(f"🔍 NSN:   Request URL: {request.url}")
-    print(f"🔍 NSN:   Request args: {dict(request.args)}")
-    print(f"🔍 NSN:   Request form: {dict(request.form)}")
-    print(f"🔍 NSN:   Request headers: {dict(request.headers)}")
-    print(f"🔍 NSN: ===== END REQUEST DETAILS DEBUG ===== ")
-    print(f"🔍 NSN: Signup route - Full session state:")
-    print(f"🔍 NSN:   All session keys: {list(session.keys())}")
-    print(f"🔍 NSN:   session.get('nmp_user_id'): {session.get('nmp_user_id', 'NOT_FOUND')}")
-    print(f"🔍 NSN:   session.get('nmp_username'): {session.get('nmp_username', 'NOT_FOUND')}")
-    print(f"🔍 NSN:   session.get('nmp_ip_address'): {session.get('nmp_ip_address', 'NOT_FOUND')}")
-    print(f"🔍 NSN:   session.get('nmp_port'): {session.get('nmp_port', 'NOT_FOUND')}")
+    logger.debug("🔍 NSN: Signup route - NMP parameters debug:")
+    logger.debug("🔍 NSN:   From form: user_id=%s, username=%s", request.form.get('nmp_user_id', ''), request.form.get('nmp_username', ''))
+    logger.debug("🔍 NSN:   From session: user_id=%s, username=%s", session.get('nmp_user_id', ''), session.get('nmp_username', ''))
+    logger.debug("🔍 NSN:   Final values: user_id=%s, username=%s", nmp_user_id, nmp_username)
+    logger.debug("🔍 NSN:   IP/Port: ip_address=%s, port=%s", nmp_ip_address, nmp_port)
+    logger.debug("🔍 NSN: ===== REQUEST DETAILS DEBUG ===== ")
+    logger.debug("🔍 NSN:   Request URL: %s", request.url)
+    logger.debug("🔍 NSN:   Request args: %s", dict(request.args))
+    logger.debug("🔍 NSN:   Request form: %s", dict(request.form))
+    logger.debug("🔍 NSN:   Request headers: %s", dict(request.headers))
+    logger.debug("🔍 NSN: ===== END REQUEST DETAILS DEBUG ===== ")
+    logger.debug("🔍 NSN: Signup route - Full session state:")
+    logger.debug("🔍 NSN:   All session keys: %s", list(session.keys()))
+    logger.debug("🔍 NSN:   session.get('nmp_user_id'): %s", session.get('nmp_user_id', 'NOT_FOUND'))
+    logger.debug("🔍 NSN:   session.get('nmp_username'): %s", session.get('nmp_username', 'NOT_FOUND'))
+    logger.debug("🔍 NSN:   session.get('nmp_ip_address'): %s", session.get('nmp_ip_address', 'NOT_FOUND'))
+    logger.debug("🔍 NSN:   session.get('nmp_port'): %s", session.get('nmp_port', 'NOT_FOUND'))
     
     # All registrations are treated the same way
-    print(f"🔗 NSN: Processing registration request")
+    logger.debug("🔗 NSN: Processing registration request")
 
     # Ensure all required form fields are provided
     required_fields = ['username', 'email', 'password', 'confirm_password', 'first_name', 'last_name', 'location']
-    print(f"🔍 NSN: ===== REGISTRATION VALIDATION DEBUG =====")
-    print(f"🔍 NSN: Request method: {request.method}")
-    print(f"🔍 NSN: Required fields: {required_fields}")
-    print(f"🔍 NSN: Form fields received: {list(request.form.keys())}")
-    print(f"🔍 NSN: All required fields present: {all(field in request.form for field in required_fields)}")
+    logger.debug("🔍 NSN: ===== REGISTRATION VALIDATION DEBUG =====")
+    logger.debug("🔍 NSN: Request method: %s", request.method)
+    logger.debug("🔍 NSN: Required fields: %s", required_fields)
+    logger.debug("🔍 NSN: Form fields received: %s", list(request.form.keys()))
+    logger.debug("🔍 NSN: All required fields present: %s", all((field in request.form for field in required_fields)))
     
     if request.method == 'POST' and all(field in request.form for field in required_fields):
-        print(f"✅ NSN: All required fields present, proceeding with registration")
+        logger.debug("✅ NSN: All required fields present, proceeding with registration")
 
         # Retrieve form data
         username = request.form['username'].strip()
@@ -2041,15 +1991,15 @@ def signup():
         last_name = request.form['last_name'].strip()
         location = request.form['location'].strip()
         
-        print(f"🔍 NSN: ===== EXTRACTED FORM DATA =====")
-        print(f"🔍 NSN: Username: '{username}' (length: {len(username)})")
-        print(f"🔍 NSN: Email: '{email}' (length: {len(email)})")
-        print(f"🔍 NSN: Password: '{password[:3]}...' (length: {len(password)})")
-        print(f"🔍 NSN: Confirm password: '{confirm_password[:3]}...' (length: {len(confirm_password)})")
-        print(f"🔍 NSN: First name: '{first_name}' (length: {len(first_name)})")
-        print(f"🔍 NSN: Last name: '{last_name}' (length: {len(last_name)})")
-        print(f"🔍 NSN: Location: '{location}' (length: {len(location)})")
-        print(f"🔍 NSN: ===== END EXTRACTED FORM DATA =====")
+        logger.debug("🔍 NSN: ===== EXTRACTED FORM DATA =====")
+        logger.debug("🔍 NSN: Username: '%s' (length: %s)", username, len(username))
+        logger.debug("🔍 NSN: Email: '%s' (length: %s)", email, len(email))
+        logger.debug("🔍 NSN: Password: '%s...' (length: %s)", password[:3], len(password))
+        logger.debug("🔍 NSN: Confirm password: '%s...' (length: %s)", confirm_password[:3], len(confirm_password))
+        logger.debug("🔍 NSN: First name: '%s' (length: %s)", first_name, len(first_name))
+        logger.debug("🔍 NSN: Last name: '%s' (length: %s)", last_name, len(last_name))
+        logger.debug("🔍 NSN: Location: '%s' (length: %s)", location, len(location))
+        logger.debug("🔍 NSN: ===== END EXTRACTED FORM DATA =====")
 
         # Query locations table to check if the city already exists
         with db.get_cursor() as cursor:
@@ -2083,10 +2033,10 @@ def signup():
         first_name_error = None
         last_name_error = None
 
-        print(f"🔍 NSN: ===== VALIDATION CHECKS =====")
+        logger.debug("🔍 NSN: ===== VALIDATION CHECKS =====")
         
         # Check if username or email is already registered
-        print(f"🔍 NSN: Checking if username '{username}' or email '{email}' already exists...")
+        logger.debug("🔍 NSN: Checking if username '%s' or email '%s' already exists...", username, email)
         with db.get_cursor() as cursor:
             cursor.execute('SELECT user_id FROM users WHERE username = %s OR email = %s;', (username, email))
             existing_user = cursor.fetchone()
@@ -2094,25 +2044,25 @@ def signup():
 
         if existing_user:
             username_error = 'Username or email is already registered.'
-            print(f"❌ NSN: Username or email already exists: {existing_user}")
+            logger.debug("❌ NSN: Username or email already exists: %s", existing_user)
         else:
-            print(f"✅ NSN: Username and email are available")
+            logger.debug("✅ NSN: Username and email are available")
             
         # Username validation
-        print(f"🔍 NSN: Validating username '{username}'...")
-        print(f"🔍 NSN: Username length: {len(username)} (max: 20)")
-        print(f"🔍 NSN: Username pattern check: {re.match(r'^[A-Za-z0-9]+$', username)}")
+        logger.debug("🔍 NSN: Validating username '%s'...", username)
+        logger.debug("🔍 NSN: Username length: %s (max: 20)", len(username))
+        logger.debug("🔍 NSN: Username pattern check: %s", re.match('^[A-Za-z0-9]+$', username))
         
         if existing_user:
             pass  # Already set above
         elif len(username) > 20:
             username_error = 'Your username cannot exceed 20 characters.'
-            print(f"❌ NSN: Username too long: {len(username)} > 20")
+            logger.debug("❌ NSN: Username too long: %s > 20", len(username))
         elif not re.match(r'^[A-Za-z0-9]+$', username):
             username_error = 'Your username can only contain letters and numbers.'
-            print(f"❌ NSN: Username contains invalid characters: '{username}'")
+            logger.debug("❌ NSN: Username contains invalid characters: '%s'", username)
         else:
-            print(f"✅ NSN: Username validation passed")
+            logger.debug("✅ NSN: Username validation passed")
 
         # Validate email format
         if len(email) > 320:
@@ -2121,25 +2071,25 @@ def signup():
             email_error = 'Invalid email address.'
 
         # Validate password complexity and confirmation
-        print(f"🔍 NSN: Validating password...")
-        print(f"🔍 NSN: Password length: {len(password)} (min: 8)")
-        print(f"🔍 NSN: Password pattern check: {re.match(r'^(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[@#$%^&+=!]).{8,}$', password)}")
-        print(f"🔍 NSN: Password matches confirm: {password == confirm_password}")
+        logger.debug("🔍 NSN: Validating password...")
+        logger.debug("🔍 NSN: Password length: %s (min: 8)", len(password))
+        logger.debug("🔍 NSN: Password pattern check: %s", re.match('^(?=.*[A-Z])(?=.*[a-z])(?=.*\\d)(?=.*[@#$%^&+=!]).{8,}$', password))
+        logger.debug("🔍 NSN: Password matches confirm: %s", password == confirm_password)
         
         if len(password) < 8:
             password_error = 'Please choose a longer password!'
-            print(f"❌ NSN: Password too short: {len(password)} < 8")
+            logger.debug("❌ NSN: Password too short: %s < 8", len(password))
         elif not re.match(r'^(?=.*[A-Z])(?=.*[a-z])(?=.*\d)(?=.*[@#$%^&+=!]).{8,}$', password):
             password_error = 'Your password must be at least 8 characters long and contain at least one uppercase letter, one lowercase letter, one number, and one special character (@#$%^&+=!).'
-            print(f"❌ NSN: Password doesn't meet complexity requirements")
+            logger.debug("❌ NSN: Password doesn't meet complexity requirements")
         else:
-            print(f"✅ NSN: Password validation passed")
+            logger.debug("✅ NSN: Password validation passed")
 
         if password != confirm_password:
             confirm_password_error = 'Passwords do not match.'
-            print(f"❌ NSN: Password confirmation failed")
+            logger.debug("❌ NSN: Password confirmation failed")
         else:
-            print(f"✅ NSN: Password confirmation passed")
+            logger.debug("✅ NSN: Password confirmation passed")
 
         # Validate first name and last name
         if not first_name or len(first_name) > 50:
@@ -2148,17 +2098,17 @@ def signup():
             last_name_error = 'Last name is required and cannot exceed 50 characters.'
 
         # If any validation errors exist, return to signup page with errors
-        print(f"🔍 NSN: ===== VALIDATION RESULTS =====")
-        print(f"🔍 NSN: Username error: {username_error}")
-        print(f"🔍 NSN: Email error: {email_error}")
-        print(f"🔍 NSN: Password error: {password_error}")
-        print(f"🔍 NSN: Confirm password error: {confirm_password_error}")
-        print(f"🔍 NSN: First name error: {first_name_error}")
-        print(f"🔍 NSN: Last name error: {last_name_error}")
+        logger.debug("🔍 NSN: ===== VALIDATION RESULTS =====")
+        logger.debug("🔍 NSN: Username error: %s", username_error)
+        logger.debug("🔍 NSN: Email error: %s", email_error)
+        logger.debug("🔍 NSN: Password error: %s", password_error)
+        logger.debug("🔍 NSN: Confirm password error: %s", confirm_password_error)
+        logger.debug("🔍 NSN: First name error: %s", first_name_error)
+        logger.debug("🔍 NSN: Last name error: %s", last_name_error)
         
         has_errors = username_error or email_error or password_error or confirm_password_error or first_name_error or last_name_error
-        print(f"🔍 NSN: Has validation errors: {has_errors}")
-        print(f"🔍 NSN: ===== END VALIDATION RESULTS =====")
+        logger.debug("🔍 NSN: Has validation errors: %s", has_errors)
+        logger.debug("🔍 NSN: ===== END VALIDATION RESULTS =====")
         
         if has_errors:
             return render_template('signup.html',
@@ -2180,46 +2130,44 @@ def signup():
                                    first_name_error=first_name_error,
                                    last_name_error=last_name_error)
 
-        print(f"✅ NSN: All validations passed, proceeding with user creation")
+        logger.debug("✅ NSN: All validations passed, proceeding with user creation")
         
         # Hash the password before storing it in the database
         password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
 
         # Insert new user into the database
-        print(f"💾 NSN: ===== INSERTING USER INTO DATABASE =====")
-        print(f"💾 NSN: Username: {username}")
-        print(f"💾 NSN: Email: {email}")
-        print(f"💾 NSN: First name: {first_name}")
-        print(f"💾 NSN: Last name: {last_name}")
-        print(f"💾 NSN: Location ID: {location_id}")
-        print(f"💾 NSN: Password hash length: {len(password_hash)}")
-        print(f"💾 NSN: ===== END INSERTING USER INTO DATABASE =====")
+        logger.debug("💾 NSN: ===== INSERTING USER INTO DATABASE =====")
+        logger.debug("💾 NSN: Username: %s", username)
+        logger.debug("💾 NSN: Email: %s", email)
+        logger.debug("💾 NSN: First name: %s", first_name)
+        logger.debug("💾 NSN: Last name: %s", last_name)
+        logger.debug("💾 NSN: Location ID: %s", location_id)
+        logger.debug("💾 NSN: Password hash length: %s", len(password_hash))
+        logger.debug("💾 NSN: ===== END INSERTING USER INTO DATABASE =====")
         
         try:
             with db.get_cursor() as cursor:
-                print(f"💾 NSN: Executing INSERT query...")
+                logger.debug("💾 NSN: Executing INSERT query...")
                 cursor.execute('''
                     INSERT INTO users (username, password_hash, email, first_name, last_name, location_id, role)
                     VALUES (%s, %s, %s, %s, %s, %s, %s);
                 ''', (username, password_hash, email, first_name, last_name, location_id, 'traveller'))
                 new_user_id = cursor.lastrowid  # Get the auto-generated user_id
-                print(f"💾 NSN: INSERT query executed, new_user_id: {new_user_id}")
+                logger.debug("💾 NSN: INSERT query executed, new_user_id: %s", new_user_id)
                 
                 # Force commit the transaction
-                print(f"💾 NSN: Committing transaction...")
+                logger.debug("💾 NSN: Committing transaction...")
                 db.get_db().commit()
-                print(f"💾 NSN: Transaction committed successfully")
+                logger.debug("💾 NSN: Transaction committed successfully")
                 # Don't close database connection immediately to avoid sync issues
                 # db.close_db()
 
-            print(f"✅ NSN: ===== USER INSERTED INTO DATABASE =====")
-            print(f"✅ NSN: New user ID: {new_user_id}")
-            print(f"✅ NSN: Username: {username}")
-            print(f"✅ NSN: ===== END USER INSERTED INTO DATABASE =====")
+            logger.debug("✅ NSN: ===== USER INSERTED INTO DATABASE =====")
+            logger.info("✅ NSN: Registered user %s (ID: %s)", username, new_user_id)
+            logger.debug("✅ NSN: Username: %s", username)
+            logger.debug("✅ NSN: ===== END USER INSERTED INTO DATABASE =====")
         except Exception as e:
-            print(f"❌ NSN: Database insertion failed: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ NSN: Database insertion failed: %s", e)
             return render_template('signup.html', 
                                  username=username,
                                  email=email,
@@ -2231,21 +2179,22 @@ def signup():
         session['user_id'] = new_user_id
         session['username'] = username
         session['role'] = 'traveller'
+        sessions.regenerate()
         session['loggedin'] = True
         session.permanent = True
         
-        print(f"✅ NSN: User registered successfully: user_id={new_user_id}, username={username}")
-        print(f"✅ NSN: Session data set for B-Client access: loggedin=True, user_id={new_user_id}")
+        logger.debug("✅ NSN: User registered successfully: user_id=%s, username=%s", new_user_id, username)
+        logger.debug("✅ NSN: Session data set for B-Client access: loggedin=True, user_id=%s", new_user_id)
 
         # Registration completed successfully
-        print(f"✅ NSN: User registration completed successfully")
+        logger.debug("✅ NSN: User registration completed successfully")
 
         # Return HTML page for all registration requests
         # B-Client will query database directly after registration
-        print(f"🔗 NSN: ===== RETURNING HTML RESPONSE =====")
-        print(f"🔗 NSN: User ID: {new_user_id}")
-        print(f"🔗 NSN: Username: {username}")
-        print(f"🔗 NSN: ===== END RETURNING HTML RESPONSE =====")
+        logger.debug("🔗 NSN: ===== RETURNING HTML RESPONSE =====")
+        logger.debug("🔗 NSN: User ID: %s", new_user_id)
+        logger.debug("🔗 NSN: Username: %s", username)
+        logger.debug("🔗 NSN: ===== END RETURNING HTML RESPONSE =====")
         return render_template('signup.html', 
                               signup_successful=True, 
                               new_user_id=new_user_id,
@@ -2303,24 +2252,24 @@ def logout():
     nmp_cluster_id = nmp_params_from_url.get('nmp_cluster_id') or session.get('nmp_cluster_id')
     nmp_channel_id = nmp_params_from_url.get('nmp_channel_id') or session.get('nmp_channel_id')
     
-    print(f"🔓 NSN: ===== LOGOUT PROCESS START =====")
-    print(f"🔓 NSN: User: {username} (NSN ID: {user_id})")
-    print(f"🔓 NSN: NMP User ID: {nmp_user_id} (from URL: {nmp_params_from_url.get('nmp_user_id')}, from session: {session.get('nmp_user_id')})")
-    print(f"🔓 NSN: NMP Client Type: {nmp_client_type}")
-    print(f"🔓 NSN: NMP Client ID: {nmp_client_id} (from URL: {nmp_params_from_url.get('nmp_client_id')}, from session: {session.get('nmp_client_id')})")
-    print(f"🔓 NSN: NMP Username: {nmp_username}")
-    print(f"🔓 NSN: NMP Node ID: {nmp_node_id}")
-    print(f"🔓 NSN: NMP Domain ID: {nmp_domain_id}")
-    print(f"🔓 NSN: NMP Cluster ID: {nmp_cluster_id}")
-    print(f"🔓 NSN: NMP Channel ID: {nmp_channel_id}")
+    logger.debug("🔓 NSN: ===== LOGOUT PROCESS START =====")
+    logger.info("🔓 NSN: Logout of user %s (NSN ID: %s)", username, user_id)
+    logger.debug("🔓 NSN: NMP User ID: %s (from URL: %s, from session: %s)", nmp_user_id, nmp_params_from_url.get('nmp_user_id'), session.get('nmp_user_id'))
+    logger.debug("🔓 NSN: NMP Client Type: %s", nmp_client_type)
+    logger.debug("🔓 NSN: NMP Client ID: %s (from URL: %s, from session: %s)", nmp_client_id, nmp_params_from_url.get('nmp_client_id'), session.get('nmp_client_id'))
+    logger.debug("🔓 NSN: NMP Username: %s", nmp_username)
+    logger.debug("🔓 NSN: NMP Node ID: %s", nmp_node_id)
+    logger.debug("🔓 NSN: NMP Domain ID: %s", nmp_domain_id)
+    logger.debug("🔓 NSN: NMP Cluster ID: %s", nmp_cluster_id)
+    logger.debug("🔓 NSN: NMP Channel ID: %s", nmp_channel_id)
     
     # Determine logout type - if we have nmp_user_id, it's a C-Client user
     is_c_client_user = bool(nmp_user_id)
     
     if is_c_client_user:
-        print(f"🔓 NSN: C-Client user detected (nmp_user_id: {nmp_user_id}) - will clear B-Client cookies and notify C-Client")
+        logger.debug("🔓 NSN: C-Client user detected (nmp_user_id: %s) - will clear B-Client cookies and notify C-Client", nmp_user_id)
     else:
-        print(f"🔓 NSN: Browser direct user detected - will only clear NSN session")
+        logger.debug("🔓 NSN: Browser direct user detected - will only clear NSN session")
     
     # NOTE: Do NOT clear NSN session yet - we need the nmp_user_id for B-Client call
     
@@ -2339,98 +2288,48 @@ def logout():
             
             # If this user logged out within last 15 seconds, skip B-Client call
             if current_time - last_logout_time < 15:
-                print(f"🔓 NSN: ===== DUPLICATE LOGOUT DETECTED =====")
-                print(f"🔓 NSN: User {username} logged out {current_time - last_logout_time:.1f}s ago")
-                print(f"🔓 NSN: Skipping B-Client logout API call (already processed)")
-                print(f"🔓 NSN: ===== DUPLICATE LOGOUT SKIPPED =====")
+                logger.debug("🔓 NSN: ===== DUPLICATE LOGOUT DETECTED =====")
+                logger.debug("🔓 NSN: User %s logged out %.1fs ago", username, current_time - last_logout_time)
+                logger.debug("🔓 NSN: Skipping B-Client logout API call (already processed)")
+                logger.debug("🔓 NSN: ===== DUPLICATE LOGOUT SKIPPED =====")
                 is_c_client_user = False  # Skip async logout thread
             else:
                 # Record this logout
                 logout._recent_logouts[nmp_user_id] = current_time
-                print(f"🔓 NSN: Recorded logout for user {username} at {current_time}")
+                logger.debug("🔓 NSN: Recorded logout for user %s at %s", username, current_time)
         
         # Asynchronous logout processing to prevent blocking
         if is_c_client_user:  # Only if not skipped by duplicate check
-            def async_logout():
-                try:
-                    print(f"🔓 NSN: ===== ASYNC LOGOUT PROCESS START =====")
-                    print(f"🔓 NSN: Calling B-Client logout API asynchronously...")
-                    print(f"🔓 NSN: B-Client URL: {B_CLIENT_API_URL}/bind")
-                    
-                    # Call B-Client logout API using C-Client user ID (UUID)
-                    url = f"{B_CLIENT_API_URL}/bind"
-                    
-                    # Use IDs from URL parameters (already extracted above) with fallback to defaults
-                    logout_domain_id = nmp_domain_id or NSN_URL
-                    logout_node_id = nmp_node_id or 'nsn-node-001'
-                    logout_cluster_id = nmp_cluster_id
-                    logout_channel_id = nmp_channel_id
-                    logout_client_id = nmp_client_id  # CRITICAL: Get client_id to identify specific C-Client
-                    
-                    data = {
-                        "request_type": 2,  # Use numeric request_type for clear_user_cookies
-                        "user_id": nmp_user_id,  # Use C-Client user ID (UUID)
-                        "user_name": nmp_username or username,  # Use NMP username or NSN username for reference
-                        "domain_id": logout_domain_id,
-                        "node_id": logout_node_id
-                    }
-                    
-                    # Add cluster_id and channel_id if available
-                    if logout_cluster_id:
-                        data['cluster_id'] = logout_cluster_id
-                    if logout_channel_id:
-                        data['channel_id'] = logout_channel_id
-                    # CRITICAL: Add client_id to identify which specific C-Client is logging out
-                    if logout_client_id:
-                        data['client_id'] = logout_client_id
-                    
-                    print(f"🔓 NSN: B-Client logout request data:")
-                    print(f"   user_id: '{nmp_user_id}'")
-                    print(f"   user_name: '{nmp_username or username}'")
-                    print(f"   domain_id: '{logout_domain_id}'")
-                    print(f"   node_id: '{logout_node_id}'")
-                    print(f"   cluster_id: '{logout_cluster_id}'")
-                    print(f"   channel_id: '{logout_channel_id}'")
-                    print(f"   client_id: '{logout_client_id}'")
-                    
-                    print(f"🔓 NSN: Request data: {data}")
-                    response = requests.post(url, json=data, timeout=30)  # Extended timeout for async operation
-                    print(f"🔓 NSN: B-Client response status: {response.status_code}")
-                    
-                    if response.status_code == 200:
-                        result = response.json()
-                        print(f"🔓 NSN: B-Client response: {result}")
-                        
-                        if result.get('success'):
-                            print(f"✅ NSN: ===== ASYNC LOGOUT SUCCESS =====")
-                            print(f"✅ NSN: C-Client user {username} logged out successfully")
-                            print(f"✅ NSN: B-Client cleared {result.get('cleared_count', 0)} cookies")
-                            print(f"✅ NSN: C-Client session cleared: {result.get('c_client_notified', False)}")
-                            print(f"✅ NSN: ===== ASYNC LOGOUT PROCESS END =====")
-                        else:
-                            print(f"⚠️ NSN: ===== ASYNC LOGOUT FAILED =====")
-                            print(f"⚠️ NSN: Failed to logout C-Client user {username}: {result.get('error', 'Unknown error')}")
-                            print(f"⚠️ NSN: ===== ASYNC LOGOUT PROCESS END =====")
-                    else:
-                        print(f"⚠️ NSN: ===== ASYNC LOGOUT FAILED =====")
-                        print(f"⚠️ NSN: B-Client API call failed with status {response.status_code}")
-                        print(f"⚠️ NSN: Response text: {response.text}")
-                        print(f"⚠️ NSN: ===== ASYNC LOGOUT PROCESS END =====")
-                        
-                except Exception as e:
-                    print(f"⚠️ NSN: ===== ASYNC LOGOUT ERROR =====")
-                    print(f"⚠️ NSN: Error calling B-Client logout API: {e}")
-                    print(f"⚠️ NSN: ===== ASYNC LOGOUT PROCESS END =====")
+            # Use IDs from URL parameters (already extracted above) with fallback to defaults
+            logout_domain_id = nmp_domain_id or NSN_URL
+            logout_node_id = nmp_node_id or 'nsn-node-001'
+            
+            data = {
+                "request_type": 2,  # Use numeric request_type for clear_user_cookies
+                "user_id": nmp_user_id,  # Use C-Client user ID (UUID)
+                "user_name": nmp_username or username,  # Use NMP username or NSN username for reference
+                "domain_id": logout_domain_id,
+                "node_id": logout_node_id
+            }
+            
+            # Add cluster_id and channel_id if available
+            if nmp_cluster_id:
+                data['cluster_id'] = nmp_cluster_id
+            if nmp_channel_id:
+                data['channel_id'] = nmp_channel_id
+            # CRITICAL: Add client_id to identify which specific C-Client is logging out
+            if nmp_client_id:
+                data['client_id'] = nmp_client_id
+            
+            logger.debug("🔓 NSN: B-Client logout request data: %s", data)
             
-            # Start async logout process in background thread
-            logout_thread = threading.Thread(target=async_logout, daemon=True)
-            logout_thread.start()
-            print(f"🔓 NSN: Started async logout process for C-Client user {username}")
-            print(f"🔓 NSN: Logout will be processed in background, page will not be blocked")
+            # Call B-Client logout API using C-Client user ID (UUID) in the background
+            bclient.notify('/bind', data, key=f"logout:{nmp_user_id}:{nmp_client_id or ''}")
+            logger.info("🔓 NSN: Queued B-Client logout for C-Client user %s, page will not be blocked", username)
     
     # Step 4: Clear NSN session AFTER B-Client call (for both C-Client and browser direct users)
-    print(f"🔓 NSN: Step 4: Clearing NSN session...")
-    print(f"🔓 NSN: Clearing session for user: {username}")
+    logger.debug("🔓 NSN: Step 4: Clearing NSN session...")
+    logger.debug("🔓 NSN: Clearing session for user: %s", username)
     
     session.pop('loggedin', None)
     session.pop('user_id', None)
@@ -2453,12 +2352,12 @@ def logout():
     session.pop('nmp_cluster_id', None)   # Clear for complete logout
     session.pop('nmp_channel_id', None)  # Clear for complete logout
     
-    print(f"🔓 NSN: Cleared ALL NMP session data for complete logout")
+    logger.debug("🔓 NSN: Cleared ALL NMP session data for complete logout")
     
-    print(f"🔓 NSN: NSN session cleared for user: {username}")
-    print(f"🔓 NSN: ===== LOGOUT PROCESS END =====")
+    logger.debug("🔓 NSN: NSN session cleared for user: %s", username)
+    logger.debug("🔓 NSN: ===== LOGOUT PROCESS END =====")
     
-    print(f"🔓 NSN: Redirecting to root page...")
+    logger.debug("🔓 NSN: Redirecting to root page...")
     # 重定向到root页面时不包含NMP参数，避免触发auto-login
     return redirect(url_for('root'))
 
@@ -2474,11 +2373,11 @@ def api_bclient_info():
         
         # Basic validation - ensure this is a legitimate C-Client request
         if not nmp_user_id or not nmp_username:
-            print(f"⚠️ NSN: Invalid NMP parameters for B-Client config request")
-            print(f"   nmp_user_id: '{nmp_user_id}' (from request: {nmp_params.get('nmp_user_id', '')}, from session: {session.get('nmp_user_id', '')})")
-            print(f"   nmp_username: '{nmp_username}' (from request: {nmp_params.get('nmp_username', '')}, from session: {session.get('nmp_username', '')})")
-            print(f"   All NMP params: {nmp_params}")
-            print(f"   Session keys: {list(session.keys())}")
+            logger.warning("⚠️ NSN: Invalid NMP parameters for B-Client config request")
+            logger.debug("   nmp_user_id: '%s' (from request: %s, from session: %s)", nmp_user_id, nmp_params.get('nmp_user_id', ''), session.get('nmp_user_id', ''))
+            logger.debug("   nmp_username: '%s' (from request: %s, from session: %s)", nmp_username, nmp_params.get('nmp_username', ''), session.get('nmp_username', ''))
+            logger.debug("   All NMP params: %s", nmp_params)
+            logger.debug("   Session keys: %s", list(session.keys()))
             return jsonify({
                 "success": False,
                 "error": "Invalid NMP parameters"
@@ -2500,15 +2399,15 @@ def api_bclient_info():
             }
         }
         
-        print(f"🔗 NSN: Providing B-Client configuration to C-Client:")
-        print(f"   User: {nmp_username} ({nmp_user_id})")
-        print(f"   B-Client URL: {B_CLIENT_API_URL}")
-        print(f"   WebSocket URL: {B_CLIENT_WEBSOCKET_URL}")
+        logger.debug("🔗 NSN: Providing B-Client configuration to C-Client:")
+        logger.debug("   User: %s (%s)", nmp_username, nmp_user_id)
+        logger.debug("   B-Client URL: %s", B_CLIENT_API_URL)
+        logger.debug("   WebSocket URL: %s", B_CLIENT_WEBSOCKET_URL)
         
         return jsonify(config)
         
     except Exception as e:
-        print(f"❌ NSN: Error providing B-Client configuration: {e}")
+        logger.error("❌ NSN: Error providing B-Client configuration: %s", e)
         return jsonify({
             "success": False,
             "error": str(e)
@@ -2525,28 +2424,28 @@ def api_current_user():
         JSON response containing current user information.
     """
     try:
-        print(f"🔍 NSN: ===== CURRENT USER API SESSION ANALYSIS =====")
-        print(f"🔍 NSN: Current user API called")
-        print(f"🔍 NSN: Session state:")
-        print(f"🔍 NSN:   All session keys: {list(session.keys())}")
-        print(f"🔍 NSN:   loggedin: {session.get('loggedin')} (type: {type(session.get('loggedin'))})")
-        print(f"🔍 NSN:   user_id: {session.get('user_id')} (type: {type(session.get('user_id'))})")
-        print(f"🔍 NSN:   username: {session.get('username')} (type: {type(session.get('username'))})")
-        print(f"🔍 NSN:   role: {session.get('role')} (type: {type(session.get('role'))})")
+        logger.debug("🔍 NSN: ===== CURRENT USER API SESSION ANALYSIS =====")
+        logger.debug("🔍 NSN: Current user API called")
+        logger.debug("🔍 NSN: Session state:")
+        logger.debug("🔍 NSN:   All session keys: %s", list(session.keys()))
+        logger.debug("🔍 NSN:   loggedin: %s (type: %s)", session.get('loggedin'), type(session.get('loggedin')))
+        logger.debug("🔍 NSN:   user_id: %s (type: %s)", session.get('user_id'), type(session.get('user_id')))
+        logger.debug("🔍 NSN:   username: %s (type: %s)", session.get('username'), type(session.get('username')))
+        logger.debug("🔍 NSN:   role: %s (type: %s)", session.get('role'), type(session.get('role')))
         
         # Check if user is logged in via Flask session first
         if session.get('loggedin') and session.get('user_id'):
-            print(f"✅ NSN: Valid Flask session found")
+            logger.debug("✅ NSN: Valid Flask session found")
         else:
-            print(f"⚠️ NSN: No Flask session found, checking for C-Client session cookie...")
+            logger.debug("⚠️ NSN: No Flask session found, checking for C-Client session cookie...")
             
             # Check if there's a session cookie from C-Client (like root interface)
             session_cookie = request.cookies.get('session')
             if session_cookie:
-                print(f"🔍 NSN: ===== PARSING C-CLIENT SESSION COOKIE =====")
-                print(f"🔍 NSN: Session cookie type: {type(session_cookie)}")
-                print(f"🔍 NSN: Session cookie length: {len(session_cookie)}")
-                print(f"🔍 NSN: Session cookie content: {session_cookie}")
+                logger.debug("🔍 NSN: ===== PARSING C-CLIENT SESSION COOKIE =====")
+                logger.debug("🔍 NSN: Session cookie type: %s", type(session_cookie))
+                logger.debug("🔍 NSN: Session cookie length: %s", len(session_cookie))
+                logger.debug("🔍 NSN: Session cookie content: %s", session_cookie)
                 
                 # Try to parse the session cookie from C-Client (same logic as root interface)
                 try:
@@ -2558,24 +2457,24 @@ def api_current_user():
                     if session_cookie.startswith('session='):
                         # Extract the session value part
                         session_value = session_cookie.split('session=')[1].split(';')[0]
-                        print(f"🔍 NSN: Extracted session value: {session_value}")
+                        logger.debug("🔍 NSN: Extracted session value: %s", session_value)
                     else:
                         # Assume it's already the session value
                         session_value = session_cookie
-                        print(f"🔍 NSN: Using session value directly: {session_value}")
+                        logger.debug("🔍 NSN: Using session value directly: %s", session_value)
                     
                     # Try JSON parsing first (B-Client preprocessed format)
-                    print(f"🔍 NSN: ===== PARSING SESSION COOKIE AS JSON =====")
+                    logger.debug("🔍 NSN: ===== PARSING SESSION COOKIE AS JSON =====")
                     try:
                         session_data = json.loads(session_value)
-                        print(f"✅ NSN: Session cookie parsed successfully as JSON")
-                        print(f"🔍 NSN: Parsed session data keys: {list(session_data.keys()) if isinstance(session_data, dict) else 'Not a dict'}")
+                        logger.debug("✅ NSN: Session cookie parsed successfully as JSON")
+                        logger.debug("🔍 NSN: Parsed session data keys: %s", list(session_data.keys()) if isinstance(session_data, dict) else 'Not a dict')
                     except Exception as e:
-                        print(f"⚠️ NSN: JSON parsing failed: {e}")
+                        logger.debug("⚠️ NSN: JSON parsing failed: %s", e)
                         
                         # Fallback to Flask session cookie format (legacy)
                         if '.' in session_value and session_value.count('.') == 2:
-                            print(f"🔍 NSN: Trying Flask session cookie format as fallback")
+                            logger.debug("🔍 NSN: Trying Flask session cookie format as fallback")
                             data_part = session_value.split('.')[0]
                             
                             try:
@@ -2585,22 +2484,22 @@ def api_current_user():
                                 decoded_data = base64.urlsafe_b64decode(padded_data)
                                 decoded_text = decoded_data.decode('utf-8')
                                 session_data = json.loads(decoded_text)
-                                print(f"✅ NSN: Flask session cookie parsed successfully")
+                                logger.debug("✅ NSN: Flask session cookie parsed successfully")
                             except Exception as e2:
-                                print(f"⚠️ NSN: Flask session decode failed: {e2}")
+                                logger.debug("⚠️ NSN: Flask session decode failed: %s", e2)
                                 raise e2
                         else:
-                            print(f"⚠️ NSN: Neither JSON nor Flask format detected")
+                            logger.debug("⚠️ NSN: Neither JSON nor Flask format detected")
                             raise e
                     
-                    print(f"🔍 NSN: ===== FINAL PARSED SESSION DATA =====")
-                    print(f"🔍 NSN: Parsed session data: {session_data}")
+                    logger.debug("🔍 NSN: ===== FINAL PARSED SESSION DATA =====")
+                    logger.debug("🔍 NSN: Parsed session data: %s", session_data)
                     if isinstance(session_data, dict):
                         for key, value in session_data.items():
-                            print(f"🔍 NSN:   {key}: {value} (type: {type(value)})")
+                            logger.debug("🔍 NSN:   %s: %s (type: %s)", key, value, type(value))
                     
                     if session_data.get('loggedin') and session_data.get('user_id'):
-                        print(f"✅ NSN: Valid session found in cookie, setting Flask session")
+                        logger.debug("✅ NSN: Valid session found in cookie, setting Flask session")
                         
                         # Get the username from cookie to find the real NSN user_id
                         cookie_username = session_data.get('username')
@@ -2612,15 +2511,15 @@ def api_current_user():
                             cursor.close()
                             
                             if user_data:
-                                print(f"🔍 NSN: Found NSN user_id for username {cookie_username}: {user_data['user_id']}")
+                                logger.debug("🔍 NSN: Found NSN user_id for username %s: %s", cookie_username, user_data['user_id'])
                                 session['user_id'] = int(user_data['user_id'])  # Use real NSN user_id (INT)
                                 session['role'] = user_data['role']  # Use real NSN role
                             else:
-                                print(f"⚠️ NSN: Username {cookie_username} not found in NSN database, using cookie data")
+                                logger.warning("⚠️ NSN: Username %s not found in NSN database, using cookie data", cookie_username)
                                 session['user_id'] = int(session_data.get('user_id')) if session_data.get('user_id') else None
                                 session['role'] = session_data.get('role')
                         else:
-                            print(f"⚠️ NSN: No username in cookie, using cookie user_id")
+                            logger.debug("⚠️ NSN: No username in cookie, using cookie user_id")
                             session['user_id'] = int(session_data.get('user_id')) if session_data.get('user_id') else None
                             session['role'] = session_data.get('role')
                         
@@ -2633,20 +2532,20 @@ def api_current_user():
                         session['nmp_client_type'] = 'c-client'
                         session['nmp_timestamp'] = session_data.get('nmp_timestamp')
                         
-                        print(f"🔍 NSN: Updated Flask session state: {dict(session)}")
+                        logger.debug("🔍 NSN: Updated Flask session state: %s", dict(session))
                     else:
-                        print(f"⚠️ NSN: Invalid session data in cookie")
+                        logger.debug("⚠️ NSN: Invalid session data in cookie")
                         
                 except Exception as e:
-                    print(f"❌ NSN: Error parsing session cookie: {e}")
-                    print(f"   Cookie format: {session_cookie[:100]}...")
+                    logger.debug("❌ NSN: Error parsing session cookie: %s", e)
+                    logger.debug("   Cookie format: %s...", session_cookie[:100])
             else:
-                print(f"⚠️ NSN: No session cookie found")
+                logger.debug("⚠️ NSN: No session cookie found")
         
         # Final check after potential session parsing
         if not session.get('loggedin') or not session.get('user_id'):
-            print(f"❌ NSN: No valid session found - API will return 401")
-            print(f"❌ NSN: Reason: loggedin={session.get('loggedin')}, user_id={session.get('user_id')}")
+            logger.debug("❌ NSN: No valid session found - API will return 401")
+            logger.debug("❌ NSN: Reason: loggedin=%s, user_id=%s", session.get('loggedin'), session.get('user_id'))
             return jsonify({
                 'success': False,
                 'error': 'No valid session found'
@@ -2656,7 +2555,7 @@ def api_current_user():
         username = session.get('username')
         role = session.get('role')
         
-        print(f"✅ NSN: Current user info - user_id: {user_id}, username: {username}, role: {role}")
+        logger.debug("✅ NSN: Current user info - user_id: %s, username: %s, role: %s", user_id, username, role)
         
         return jsonify({
             'success': True,
@@ -2667,9 +2566,8 @@ def api_current_user():
         })
         
     except Exception as e:
-        print(f"❌ NSN: Error in api_current_user: {e}")
-        import traceback
-        print(f"   Traceback: {traceback.format_exc()}")
+        logger.error("❌ NSN: Error in api_current_user: %s", e)
+        logger.debug("   Traceback:", exc_info=True)
         return jsonify({
             'success': False,
             'error': 'Internal server error'
@@ -2679,14 +2577,14 @@ def api_current_user():
 def api_nmp_session_data():
     """API endpoint for B-client to retrieve NMP session data after login"""
     try:
-        print(f"🔍 NSN: ===== NMP SESSION DATA API CALLED =====")
-        print(f"🔍 NSN: Request timestamp: {datetime.now()}")
-        print(f"🔍 NSN: Request IP: {request.remote_addr}")
-        print(f"🔍 NSN: Request method: {request.method}")
+        logger.debug("🔍 NSN: ===== NMP SESSION DATA API CALLED =====")
+        logger.debug("🔍 NSN: Request timestamp: %s", datetime.now())
+        logger.debug("🔍 NSN: Request IP: %s", request.remote_addr)
+        logger.debug("🔍 NSN: Request method: %s", request.method)
         
         # Check if session has NMP data ready
         if session.get('nmp_session_ready') and session.get('nmp_session_cookie'):
-            print(f"✅ NSN: NMP session data available")
+            logger.debug("✅ NSN: NMP session data available")
             
             session_data = {
                 'success': True,
@@ -2703,19 +2601,18 @@ def api_nmp_session_data():
             session.pop('nmp_nsn_user_id', None)
             session.pop('nmp_nsn_username', None)
             
-            print(f"✅ NSN: NMP session data returned and cleared")
+            logger.debug("✅ NSN: NMP session data returned and cleared")
             return jsonify(session_data)
         else:
-            print(f"⚠️ NSN: No NMP session data available")
+            logger.debug("⚠️ NSN: No NMP session data available")
             return jsonify({
                 'success': False,
                 'error': 'No NMP session data available'
             }), 404
             
     except Exception as e:
-        print(f"❌ NSN: Error in api_nmp_session_data: {e}")
-        import traceback
-        print(f"   Traceback: {traceback.format_exc()}")
+        logger.error("❌ NSN: Error in api_nmp_session_data: %s", e)
+        logger.debug("   Traceback:", exc_info=True)
         return jsonify({
             'success': False,
             'error': 'Internal server error'
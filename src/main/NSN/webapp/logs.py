@@ -0,0 +1,86 @@
+"""Application logging.
+
+Modules log through their own logger (logging.getLogger(__name__)), all
+children of the 'webapp' logger configured here, instead of print():
+- LOG_LEVEL sets the level; per-request traces (session parsing, C-Client
+  login steps, form validation) are DEBUG, so they cost nothing in
+  production: disabled calls return before the message is formatted, and
+  messages use lazy %-style arguments for the same reason
+- records are handed to a QueueHandler and written to stderr (and
+  LOG_FILE when it is set) by a QueueListener thread, so a request never
+  blocks on a slow terminal or disk
+- every record carries the id of the request that logged it. The id is
+  taken from an incoming X-Request-ID header (e.g. set by a proxy) or
+  generated, and returned in the X-Request-ID response header, so the
+  lines of one request can be found with grep
+"""
+import atexit
+import logging
+import logging.handlers
+import queue
+import re
+import secrets
+
+from flask import g, has_request_context, request
+from webapp import app
+from webapp.config import LOG_FILE, LOG_LEVEL
+
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(request_id)s] %(name)s: %(message)s'
+REQUEST_ID_HEADER = 'X-Request-ID'
+
+# Incoming ids are echoed into logs and headers, so only short plain ones are kept
+_REQUEST_ID_RE = re.compile(r'^[A-Za-z0-9._-]{1,64}$')
+
+_listener = None
+
+
+class RequestIdFilter(logging.Filter):
+    """Sets record.request_id, '-' outside a request (workers, CLI)"""
+
+    def filter(self, record):
+        request_id = g.get('request_id') if has_request_context() else None
+        record.request_id = request_id or '-'
+        return True
+
+
+def configure(level=LOG_LEVEL, log_file=LOG_FILE):
+    """Send 'webapp' records through a queue to stderr and log_file"""
+    global _listener
+    if _listener is not None:
+        return
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [logging.StreamHandler()]
+    if log_file:
+        handlers.append(logging.FileHandler(log_file))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    records = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(records)
+    # Runs in the logging thread, where the request context is available
+    queue_handler.addFilter(RequestIdFilter())
+    _listener = logging.handlers.QueueListener(records, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    logger = logging.getLogger('webapp')
+    logger.setLevel(level)
+    logger.addHandler(queue_handler)
+    logger.propagate = False
+
+
+@app.before_request
+def assign_request_id():
+    incoming = request.headers.get(REQUEST_ID_HEADER, '')
+    g.request_id = incoming if _REQUEST_ID_RE.match(incoming) else secrets.token_hex(8)
+
+
+@app.after_request
+def add_request_id_header(response):
+    request_id = g.get('request_id')
+    if request_id:
+        response.headers[REQUEST_ID_HEADER] = request_id
+    return response
+
+
+configure()
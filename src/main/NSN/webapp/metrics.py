@@ -0,0 +1,65 @@
+"""Internal operational metrics.
+
+GET /internal/metrics returns a JSON snapshot of:
+- the MySQL connection pools (primary and read replica: connections in use,
+  waits, checkout latency histogram, suspected leaks)
+- the session store
+- the B-Client client (circuit breaker state, background notifications)
+- requests per endpoint (latency, queries, N+1 suspects, see instrumentation.py)
+GET /internal/metrics/prometheus exports the request, query and pool metrics
+in the Prometheus text format. GET /internal/jobs reports the background job
+queue (counts per status, recent failures) and /internal/jobs/<id> one job.
+
+They are only served to admins and to the addresses in
+INTERNAL_METRICS_ALLOWED_IPS.
+"""
+from flask import Response, jsonify, request, session
+from webapp import app
+from webapp import bclient
+from webapp import db
+from webapp import instrumentation
+from webapp import jobs
+from webapp import sessions
+from webapp.config import INTERNAL_METRICS_ALLOWED_IPS
+
+
+def can_view_metrics():
+    """Admins, or requests from an allowed address (e.g. a local scraper)"""
+    return session.get('role') == 'admin' or request.remote_addr in INTERNAL_METRICS_ALLOWED_IPS
+
+
+@app.route('/internal/metrics')
+def internal_metrics():
+    if not can_view_metrics():
+        return jsonify({'success': False, 'message': 'Forbidden'}), 403
+
+    # Flag long-held connections now rather than on the next contended checkout
+    db.connection_pool.report_leaks()
+    if db.replica_pool is not None:
+        db.replica_pool.report_leaks()
+    return jsonify({'success': True, 'db_pool': db.pool_stats(), 'sessions': sessions.stats(),
+                    'bclient': bclient.stats(), 'requests': instrumentation.stats()})
+
+
+@app.route('/internal/metrics/prometheus')
+def internal_metrics_prometheus():
+    if not can_view_metrics():
+        return Response('Forbidden\n', status=403, mimetype='text/plain')
+    return Response(instrumentation.prometheus_text(), mimetype='text/plain; version=0.0.4')
+
+
+@app.route('/internal/jobs')
+def internal_jobs():
+    if not can_view_metrics():
+        return jsonify({'success': False, 'message': 'Forbidden'}), 403
+    return jsonify({'success': True, 'jobs': jobs.stats()})
+
+
+@app.route('/internal/jobs/<int:job_id>')
+def internal_job_status(job_id):
+    if not can_view_metrics():
+        return jsonify({'success': False, 'message': 'Forbidden'}), 403
+    job = jobs.get_job(job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
@@ -1,7 +1,9 @@
 from webapp import app
 from webapp import db
-from flask import redirect, render_template, request, session, url_for, flash,Response
+from flask import redirect, render_template, request, session, url_for, flash,Response, g, has_app_context
 from datetime import datetime, timedelta
+import threading
+import time
 
 @app.route('/premium/list')
 def list_premium():
@@ -190,6 +192,7 @@ def ignore_premium_message():
             cursor.execute('''update members set note_ignore=1 where user_id=%s;
                            ''',(session['user_id'],)
                        )
+        invalidateMember(session['user_id'])
     return redirect(request.referrer)
 
 
@@ -266,8 +269,7 @@ MESSAGE_FOR_EXPIRED='Your premium has been expired!'
 
 # query subscription status
 def querySubscriptionStatus(userId):
-
-    checkExpiry(userId)
+    # m_status and note_msg are kept current by the subscription_expiry batch job
 
     with db.get_cursor() as cursor:
         cursor.execute('''SELECT m.*, s.* ,u.*
@@ -281,41 +283,6 @@ def querySubscriptionStatus(userId):
                 
     return memberInfo
 
-def checkExpiry(userId):
-
-    with db.get_cursor() as cursor:
-        cursor.execute('''SELECT *
-                       FROM members
-                       WHERE user_id = %s;''',
-                       (userId,))
-        memberInfo = cursor.fetchone()
-
-        if memberInfo:
-            today=datetime.now()
-            expiredDate=memberInfo.get('end_time')
-            current_note_msg = memberInfo.get('note_msg', '') # Get note_msg safely, default to empty string
-            
-            if expiredDate and current_note_msg != MESSAGE_FOR_EXPIRED and today>=expiredDate: 
-                cursor.execute('''UPDATE members set note_msg=%s,note_ignore=0
-                        WHERE user_id = %s;''',
-                        (MESSAGE_FOR_EXPIRED,userId,))
-                    
-            elif expiredDate and current_note_msg != MESSAGE_FOR_EXPIRED and current_note_msg != MESSAGE_FOR_2_DAYS and (today+timedelta(days=2))>=expiredDate: 
-                cursor.execute('''UPDATE members set note_msg=%s,note_ignore=0
-                        WHERE user_id = %s;''',
-                        (MESSAGE_FOR_2_DAYS,userId,))
-                    
-            elif expiredDate and current_note_msg != MESSAGE_FOR_EXPIRED and current_note_msg != MESSAGE_FOR_2_DAYS and current_note_msg != MESSAGE_FOR_7_DAYS and (today+timedelta(days=7))>=expiredDate: 
-                cursor.execute('''UPDATE members set note_msg=%s,note_ignore=0
-                        WHERE user_id = %s;''',
-                        (MESSAGE_FOR_7_DAYS,userId,))
-                
-            elif expiredDate and (today+timedelta(days=7))<expiredDate and current_note_msg != '':
-                cursor.execute('''UPDATE members set note_msg=%s,note_ignore=0
-                        WHERE user_id = %s;''',
-                        ("",userId,))
-
-
 # get trail history by userId
 def getTrailHistory(userId):
     with db.get_cursor() as cursor:
@@ -450,6 +417,7 @@ def saveSubscriptionHistory(userId, subscriptionId,countryId,price,gst_rate,tota
                        (transactionId,historyId,))
 
         historyInfo=querySubscriptionHistoryById(historyId)
+        invalidateMember(userId)
 
         return historyInfo
             
@@ -471,43 +439,116 @@ def querySubscriptionHistoryById(historyId):
     return historyInfo
 
 
+# Membership status is computed at most once per request (memoized in flask.g)
+# and shared across requests for MEMBER_CACHE_TTL seconds. Anything that changes
+# a user's subscription, expiry note or role calls invalidateMember(); the
+# subscription_expiry batch job calls clearMemberCache().
+MEMBER_CACHE_TTL = 30
+_member_cache = {}
+_member_cache_lock = threading.Lock()
+
+# Role, members row and first subscription of a user in one round trip
+MEMBER_STATUS_QUERY = '''
+    SELECT u.user_id,
+           u.role IN ('admin','editor','moderator','support_tech') AS is_staff,
+           m.m_id, m.m_status, m.end_time, m.note_msg, m.note_ignore,
+           (SELECT h.s_id FROM subscription_history h
+            WHERE h.m_id = m.m_id ORDER BY h.h_id LIMIT 1) AS s_id
+    FROM users u
+    left join members m on u.user_id=m.user_id
+    WHERE u.user_id = %s;
+'''
+
+
+def _memberCacheKey(userId):
+    return str(userId)
+
+
+def _requestMemo():
+    if not has_app_context():
+        return None
+    if 'member_status' not in g:
+        g.member_status = {}
+    return g.member_status
+
+
+def invalidateMember(userId):
+    """Drop a user's cached membership status (process cache and current request)"""
+    key = _memberCacheKey(userId)
+    with _member_cache_lock:
+        _member_cache.pop(key, None)
+    memo = _requestMemo()
+    if memo is not None:
+        memo.pop(key, None)
+
+
+def clearMemberCache():
+    """Drop every cached membership status in this process"""
+    with _member_cache_lock:
+        _member_cache.clear()
+    memo = _requestMemo()
+    if memo is not None:
+        memo.clear()
+
+
 # query is_member
 def checkMember(userId):
+    """
+    Return the membership info of a staff user or non-expired member, else None
+
+    Cached per request and for MEMBER_CACHE_TTL seconds (see invalidateMember);
+    callers get their own copy of the dict.
+    """
+    key = _memberCacheKey(userId)
+    memo = _requestMemo()
+    if memo is not None and key in memo:
+        is_member = memo[key]
+    else:
+        now = time.monotonic()
+        with _member_cache_lock:
+            cached = _member_cache.get(key)
+        if cached and cached[0] > now:
+            is_member = cached[1]
+        else:
+            is_member = queryMember(userId)
+            with _member_cache_lock:
+                _member_cache[key] = (now + MEMBER_CACHE_TTL, is_member)
+        if memo is not None:
+            memo[key] = is_member
+    return dict(is_member) if is_member else is_member
+
+
+def queryMember(userId):
+    """Compute a user's membership info from a single query (uncached, see checkMember)"""
     with db.get_cursor() as cursor:
-        queryMember = '''
-                    select user_id from users u where (u.role='admin' or u.role='editor' or u.role='moderator' or u.role='support_tech') and u.user_id=%s
-                    union
-                    select user_id from members m where m.user_id=%s and m.m_status !='expired';
-                    '''
-        cursor.execute(queryMember, (userId,userId,))
-        is_member=cursor.fetchone()
-
-        if is_member:
-            memberInfo=querySubscriptionStatus(userId)
-
-            if  memberInfo['end_time']:
-                if memberInfo['s_id']==1:
-                    is_member['s_name']="Free Trail"
-                elif memberInfo['m_status']=='expired':
-                    is_member['s_name']="Premium Expired"
-                else:
-                    is_member['s_name']="Premium"
-                is_member['end_time']=memberInfo['end_time'].date()
-
-            cursor.execute('''
-                           select user_id from users u where (u.role='admin' or u.role='editor' or u.role='moderator' or u.role='support_tech') and u.user_id=%s
-                           ''', (userId,))
-            is_admin=cursor.fetchone()
-            if is_admin:
-                is_member['s_name']="Full Access"
-                is_member['end_time']=None
-
-            # message and ignore
-            is_member['note_msg']=''
-            is_member['note_ignore']=0
-            if 'note_msg' in memberInfo:
-                is_member['note_msg']=memberInfo['note_msg']
-                is_member['note_ignore']=memberInfo['note_ignore']
+        cursor.execute(MEMBER_STATUS_QUERY, (userId,))
+        memberInfo = cursor.fetchone()
+
+        # staff, or a member whose subscription has not expired
+        if memberInfo is None:
+            return None
+        is_staff = bool(memberInfo['is_staff'])
+        has_membership = memberInfo['m_id'] is not None and memberInfo['m_status'] not in (None, 'expired')
+        if not is_staff and not has_membership:
+            return None
+
+    is_member = {'user_id': memberInfo['user_id']}
+    if  memberInfo['end_time']:
+        if memberInfo['s_id']==1:
+            is_member['s_name']="Free Trail"
+        elif memberInfo['m_status']=='expired':
+            is_member['s_name']="Premium Expired"
+        else:
+            is_member['s_name']="Premium"
+        is_member['end_time']=memberInfo['end_time'].date()
+
+    if is_staff:
+        is_member['s_name']="Full Access"
+        is_member['end_time']=None
+
+    # message and ignore
+    is_member['note_msg']=memberInfo['note_msg']
+    is_member['note_ignore']=memberInfo['note_ignore']
 
     return is_member
 
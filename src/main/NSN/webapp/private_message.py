@@ -4,7 +4,12 @@ from flask import Blueprint, redirect, render_template, request, session, url_fo
 from datetime import datetime
 from werkzeug.utils import secure_filename
 import os
-from webapp.utils import rebuildImageUrl
+
+
+def avatar_url(filename):
+    # webapp imports this module before the app exists, so blobstore is imported lazily
+    from webapp import blobstore
+    return blobstore.avatar_url(filename)
 
 
 def is_staff():
@@ -61,6 +66,7 @@ def send_message():
     return jsonify({'success': True, 'message': 'Message sent.'})
 
 @message_bp.route('/message/inbox')
+@db.read_only
 def inbox():
     if 'loggedin' not in session:
         return redirect(url_for('login'))
@@ -99,9 +105,9 @@ def inbox():
         for convo in conversations:
             # Set other user info and avatar
             if convo['user1_id'] == user_id:
-                convo['other_user_avatar_url'] = rebuildImageUrl(convo['user2_image'])
+                convo['other_user_avatar_url'] = avatar_url(convo['user2_image'])
             else:
-                convo['other_user_avatar_url'] = rebuildImageUrl(convo['user1_image'])
+                convo['other_user_avatar_url'] = avatar_url(convo['user1_image'])
             
             # Set unread flag
             convo['has_unread'] = convo['unread_count'] > 0
@@ -182,7 +188,7 @@ def conversation(conversation_id):
 
         # Add sender_avatar_url field to each message
         for msg in messages:
-            msg['sender_avatar_url'] = rebuildImageUrl(msg['sender_image'])
+            msg['sender_avatar_url'] = avatar_url(msg['sender_image'])
             msg['is_self'] = (msg['sender_id'] == user_id)
 
         cursor.execute('''
@@ -248,6 +254,7 @@ def start_conversation_with_user(recipient_user_id):
                                is_new_conversation=True) # Flag for the template
 
 @message_bp.route('/message/unread_count')
+@db.read_only
 def unread_count():
     # Check if user is logged in
     if 'user_id' not in session:
@@ -290,7 +297,7 @@ def conversation_data(conversation_id):
 
         # add sender avatar URLs and self-check
         for msg in messages:
-            msg['sender_avatar_url'] = rebuildImageUrl(msg['sender_image'])
+            msg['sender_avatar_url'] = avatar_url(msg['sender_image'])
             msg['is_self'] = (msg['sender_id'] == user_id)
 
         # mark messages as read
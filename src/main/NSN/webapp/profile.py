@@ -1,21 +1,26 @@
-import os
+import logging
 from webapp import app
 from webapp import db
 from webapp import premium
+from webapp import login
+from webapp import timeline
+from webapp import images
+from webapp import blobstore
 from flask import redirect, render_template, request, session, url_for, flash
 import flask_bcrypt
 import re
-from werkzeug.utils import secure_filename
-import time
 from .private_message import can_send_private_message, is_staff, is_paid_subscriber
-from webapp.utils import rebuildImageUrl
+from webapp.event import load_event_images
+from webapp.uploads import check_upload
+
+logger = logging.getLogger(__name__)
 
 @app.route('/profile/view')
 def view_profile():
     # If user_id is provided in the URL, use that; otherwise use the logged-in user's ID
     target_user_id_str = request.args.get('user_id') # Renamed for clarity internally
     if not target_user_id_str and 'user_id' in session:
-        print("session['user_id']:", session['user_id'])
+        logger.debug("session['user_id']: %s", session['user_id'])
         target_user_id_str = str(session['user_id'])
 
     if not target_user_id_str:
@@ -101,11 +106,9 @@ def view_profile():
                     LIMIT 5
                 ''', (target_user_id,))
                 liked_events = cursor.fetchall()
+                images = load_event_images(cursor, [event['event_id'] for event in liked_events])
                 for event in liked_events:
-                    cursor.execute('''
-                        SELECT * from event_images where event_id=%s;
-                    ''', (event['event_id'],))
-                    event['event_images'] = cursor.fetchall()
+                    event['event_images'] = images[event['event_id']]
                 
         except Exception as e:
             app.logger.error(f"Error retrieving activity history for user {target_user_id}: {str(e)}")
@@ -129,11 +132,11 @@ def view_profile():
 
 
 def queryProfileById(user_id):
-    print("queryProfileById function called with user_id:", user_id)
+    logger.debug("queryProfileById function called with user_id: %s", user_id)
     profile_data = None # Initialize to ensure it's defined
     is_member = None
-    print("user_id type:", type(user_id))
-    print("user_id content:", user_id)
+    logger.debug("user_id type: %s", type(user_id))
+    logger.debug("user_id content: %s", user_id)
     user_id = int(user_id) # Ensure user_id is an integer
     with db.get_cursor() as cursor:
         cursor.execute('''SELECT u.user_id, u.username, u.password_hash, u.email, u.first_name, u.last_name, 
@@ -146,7 +149,7 @@ def queryProfileById(user_id):
         profile_data = cursor.fetchone()
 
         if profile_data and profile_data.get('profile_image'):
-            profile_data['profile_image'] = rebuildImageUrl(profile_data['profile_image'])
+            profile_data['profile_image'] = blobstore.avatar_url(profile_data['profile_image'], 'medium')
             
         is_member = premium.checkMember(user_id)
         if is_member is None:
@@ -154,8 +157,8 @@ def queryProfileById(user_id):
         elif not isinstance(is_member, dict):
             is_member = {}
             
-    print("is_member type:", type(is_member))
-    print("is_member content:", is_member)
+    logger.debug("is_member type: %s", type(is_member))
+    logger.debug("is_member content: %s", is_member)
     return profile_data, is_member
 
 
@@ -394,6 +397,8 @@ def change_user_role():
             # Update role if provided
             if new_role:
                 cursor.execute('UPDATE users SET role = %s WHERE user_id = %s', (new_role, user_id))
+                premium.invalidateMember(user_id)
+                login.invalidate_user(user_id)
                 flash(f"User role updated to {new_role}", "success")
             
             # Update status if provided
@@ -445,12 +450,10 @@ def upload_profile_image():
         flash("Unauthorized action to upload profile image.", "danger")
         return redirect(url_for('view_profile', user_id=target_user_id))
 
-    # Validate file size
-    file.seek(0, os.SEEK_END)
-    file_length = file.tell()
-    file.seek(0, 0)  # Reset file pointer
-    if file_length > 5 * 1024 * 1024:  # 5MB limit
-        flash("File is too large. Maximum allowed size is 5MB.", "danger")
+    # Validate size and magic bytes (checked while the upload was streamed)
+    ok, message = check_upload(file)
+    if not ok:
+        flash(message, "danger")
         return redirect(url_for('view_profile', user_id=target_user_id))
 
     # Validate file extension
@@ -460,62 +463,33 @@ def upload_profile_image():
         flash("Only PNG, JPG, JPEG, and GIF files are allowed.", "danger")
         return redirect(url_for('view_profile', user_id=target_user_id))
 
-    # Generate a secure filename
-    filename = secure_filename(file.filename)
-    timestamp = int(time.time())
-    unique_filename = f"{timestamp}_{filename}"
-    
-    # Ensure upload directory exists
-    upload_folder = os.path.join(app.root_path, "static", "avatars")
-    if not os.path.exists(upload_folder):
-        try:
-            os.makedirs(upload_folder)
-        except Exception as e:
-            flash(f"Error creating upload directory: {str(e)}", "danger")
-            app.logger.error(f"Error creating upload directory: {str(e)}")
-            return redirect(url_for('view_profile', user_id=target_user_id))
+    # Validate the content by decoding it
+    try:
+        image_format = images.validate_upload(file, {'JPEG', 'PNG', 'GIF'})
+    except images.InvalidImage:
+        flash("The uploaded file is not a valid PNG, JPG or GIF image.", "danger")
+        return redirect(url_for('view_profile', user_id=target_user_id))
 
-    # Get current profile image to delete if exists
     try:
         with db.get_cursor() as cursor:
             cursor.execute('SELECT profile_image FROM users WHERE user_id = %s', (target_user_id,))
             result = cursor.fetchone()
             old_image = result['profile_image'] if result else None
-            
-            # Delete old image if exists
-            if old_image:
-                old_image_path = os.path.join(upload_folder, old_image)
-                if os.path.exists(old_image_path):
-                    try:
-                        os.remove(old_image_path)
-                    except Exception as e:
-                        app.logger.error(f"Error deleting old image: {str(e)}")
-                        # Continue with upload even if old image deletion fails
-            
-            # Save new image
-            try:
-                file.save(os.path.join(upload_folder, unique_filename))
-            except Exception as e:
-                flash(f"Error saving image: {str(e)}", "danger")
-                app.logger.error(f"Error saving image: {str(e)}")
-                return redirect(url_for('view_profile', user_id=target_user_id))
-            
-            # Update database
+
+            # Store the new image under its content hash and point the user at it
+            blob_key = blobstore.store_upload(cursor, file, image_format)
             cursor.execute('UPDATE users SET profile_image = %s WHERE user_id = %s', 
-                         (unique_filename, target_user_id))
+                         (blob_key, target_user_id))
+
+            # Drop the reference to the old image (its file is collected later)
+            released = blobstore.release(cursor, old_image, 'avatars')
             db.get_db().commit()
+            blobstore.delete_released([released])
             
         flash("Profile image updated successfully!", "success")
     except Exception as e:
         flash(f"Error updating profile image: {str(e)}", "danger")
         app.logger.error(f"Error in upload_profile_image: {str(e)}")
-        # Try to clean up the uploaded file if database update fails
-        try:
-            new_image_path = os.path.join(upload_folder, unique_filename)
-            if os.path.exists(new_image_path):
-                os.remove(new_image_path)
-        except:
-            pass
     
     return redirect(url_for('view_profile', user_id=target_user_id))
 
@@ -544,10 +518,8 @@ def remove_avatar():
             cursor.execute('UPDATE users SET profile_image = NULL WHERE user_id = %s', (user_id,))
             db.get_db().commit()
             
-            # Attempt to delete the file (if it exists)
-            avatar_path = os.path.join(app.root_path, 'static/avatars', avatar_filename)
-            if os.path.exists(avatar_path):
-                os.remove(avatar_path)
+            # Drop the reference to the file (it is deleted later)
+            blobstore.delete_released([blobstore.release(cursor, avatar_filename, 'avatars')])
                 
             flash("Avatar removed successfully", "dark")
             
@@ -635,6 +607,7 @@ def follow_user(user_id):
                     INSERT INTO user_follows (follower_id, followed_id) 
                     VALUES (%s, %s)
                 ''', (follower_id, user_id))
+                timeline.refresh_user(cursor, follower_id)
                 
                 flash(f"You are now following {target_user['username']}! Their journey events will appear on your Departure Board.", "success")
             
@@ -642,7 +615,7 @@ def follow_user(user_id):
             
     except Exception as e:
         flash("An error occurred while following the user. Please try again.", "danger")
-        print(f"Error following user: {e}")  # For debugging
+        logger.error("Error following user: %s", e)  # For debugging
     
     return redirect(url_for('view_profile', user_id=user_id))
 
@@ -683,6 +656,7 @@ def unfollow_user(user_id):
                     JOIN journeys j ON jf.journey_id = j.journey_id
                     WHERE jf.user_id = %s AND j.user_id = %s
                 ''', (follower_id, user_id))
+                timeline.refresh_user(cursor, follower_id)
                 
                 flash(f"You have unfollowed {follow_record['username']}. Their events will no longer appear on your Departure Board.", "success")
             
@@ -690,7 +664,7 @@ def unfollow_user(user_id):
             
     except Exception as e:
         flash("An error occurred while unfollowing the user. Please try again.", "danger")
-        print(f"Error unfollowing user: {e}")  # For debugging
+        logger.error("Error unfollowing user: %s", e)  # For debugging
     
     return redirect(url_for('view_profile', user_id=user_id))
 
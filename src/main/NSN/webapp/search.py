@@ -0,0 +1,95 @@
+"""Full-text search for journeys, locations and users.
+
+Every search endpoint builds its WHERE clause through this module instead of
+leading-wildcard LIKEs, so lookups use the FULLTEXT indexes ft_journeys_text,
+ft_locations_address and ft_users_search (see create_table_v_1.0.sql) and can
+be ranked by relevance.
+
+Keywords become a BOOLEAN MODE query in which every word is required and
+matches as a prefix ("queen tow" finds "Queenstown Tower"), which also serves
+search-as-you-type. InnoDB does not index words shorter than
+innodb_ft_min_token_size (3 by default), so such words are left out of the
+query; a keyword made only of short words falls back to LIKE.
+"""
+import re
+from collections import namedtuple
+
+FT_MIN_TOKEN_SIZE = 3
+AUTOCOMPLETE_LIMIT = 10
+
+JOURNEY_COLUMNS = ('title', 'description')
+LOCATION_COLUMNS = ('address',)
+USER_COLUMNS = ('username', 'email', 'first_name', 'last_name')
+
+_WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+# condition/params go in the WHERE clause, score/score_params in the SELECT
+# list or ORDER BY (score is a constant when falling back to LIKE)
+Match = namedtuple('Match', ['condition', 'params', 'score', 'score_params'])
+
+
+def boolean_query(keyword):
+    """Turn a user keyword into a BOOLEAN MODE query, or None if no word is indexable"""
+    words = [word for word in _WORD_RE.findall(keyword or '') if len(word) >= FT_MIN_TOKEN_SIZE]
+    if not words:
+        return None
+    return ' '.join(f'+{word}*' for word in words)
+
+
+def match(columns, keyword, alias=None):
+    """Build a Match for keyword over the columns of one FULLTEXT index"""
+    qualified = [f'{alias}.{column}' if alias else column for column in columns]
+    query = boolean_query(keyword)
+    if query is None:
+        condition = '(' + ' OR '.join(f'{column} LIKE %s' for column in qualified) + ')'
+        return Match(condition, [f'%{keyword}%'] * len(qualified), '0', [])
+    expression = f"MATCH({', '.join(qualified)}) AGAINST (%s IN BOOLEAN MODE)"
+    return Match(expression, [query], expression, [query])
+
+
+def match_journeys(keyword, alias='j'):
+    """Match journey titles and descriptions"""
+    return match(JOURNEY_COLUMNS, keyword, alias)
+
+
+def match_locations(keyword, alias='l'):
+    """Match location addresses"""
+    return match(LOCATION_COLUMNS, keyword, alias)
+
+
+def match_users(keyword, alias=None):
+    """Match usernames, emails and names"""
+    return match(USER_COLUMNS, keyword, alias)
+
+
+def autocomplete_locations(cursor, keyword, limit=AUTOCOMPLETE_LIMIT):
+    """
+    Suggest addresses for a partially typed keyword
+
+    Addresses starting with the keyword come first, then the best full-text
+    matches, shorter addresses first on ties.
+    """
+    keyword = (keyword or '').strip()
+    if not keyword:
+        return []
+
+    starts_with = keyword.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+    query = boolean_query(keyword)
+    if query is None:
+        # Too short for the full-text index: prefix scan on idx_locations_address
+        cursor.execute('''
+            SELECT address FROM locations
+            WHERE address LIKE %s
+            ORDER BY CHAR_LENGTH(address), address
+            LIMIT %s
+        ''', (starts_with, limit))
+    else:
+        cursor.execute('''
+            SELECT address FROM locations
+            WHERE MATCH(address) AGAINST (%s IN BOOLEAN MODE)
+            ORDER BY address LIKE %s DESC,
+                     MATCH(address) AGAINST (%s IN BOOLEAN MODE) DESC,
+                     CHAR_LENGTH(address), address
+            LIMIT %s
+        ''', (query, starts_with, query, limit))
+    return [row['address'] for row in cursor.fetchall()]
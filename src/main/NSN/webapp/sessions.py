@@ -0,0 +1,300 @@
+"""Server-side sessions.
+
+Flask keeps sessions in a signed cookie ('cookie', the default), so every
+request decodes (and every modification re-encodes) the whole session. With
+SESSION_BACKEND set to 'database' or 'memory' the cookie only carries a signed
+random session id and the data lives on the server:
+- database: the web_sessions table, shared by every worker and node; rows
+  hold compact tagged JSON
+- memory: an LRU of at most SESSION_MEMORY_MAX_ENTRIES sessions with a sliding
+  TTL. Only for a single process: other workers do not see the session and
+  a restart logs everyone out
+
+Sessions are loaded lazily, on first access, so requests that never touch
+the session (static files) cost nothing. They are written back only when they
+changed; a new session that is never written gets neither a store entry nor
+a cookie. Verifying the cookie is a single HMAC check.
+
+A session id is never adopted from the client: an id without a live store
+entry is replaced by a fresh one, and regenerate() moves the session to a new
+id when it is authenticated, so a planted id cannot be logged in (session
+fixation).
+"""
+import hashlib
+import random
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+from flask import session
+from flask.json.tag import TaggedJSONSerializer
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from webapp import app
+from webapp import db
+from webapp.config import SESSION_BACKEND, SESSION_MEMORY_MAX_ENTRIES
+
+# Fraction of database session writes that also purge expired rows
+PURGE_PROBABILITY = 0.01
+PURGE_BATCH = 1000
+
+
+def new_sid():
+    return secrets.token_urlsafe(32)
+
+
+class ServerSideSession(SessionMixin):
+    """Session whose data is fetched from the store on first access"""
+
+    def __init__(self, sid, loader=None, new=False):
+        self.sid = sid
+        self.new = new
+        self.modified = False
+        self.accessed = False
+        self.expires_at = None
+        # Id dropped by regenerate(), deleted from the store on save
+        self.previous_sid = None
+        self._loader = loader
+        self._data = {} if loader is None else None
+
+    def _load(self):
+        self.accessed = True
+        if self._data is None:
+            loaded = self._loader()
+            if loaded is None:
+                # Unknown or expired id: start over under a fresh one
+                self._data = {}
+                self.sid = new_sid()
+                self.new = True
+            else:
+                self._data, self.expires_at = loaded
+        return self._data
+
+    def __getitem__(self, key):
+        return self._load()[key]
+
+    def __setitem__(self, key, value):
+        self._load()[key] = value
+        self.modified = True
+
+    def __delitem__(self, key):
+        del self._load()[key]
+        self.modified = True
+
+    def __iter__(self):
+        return iter(self._load())
+
+    def __len__(self):
+        return len(self._load())
+
+    def __contains__(self, key):
+        return key in self._load()
+
+    def get(self, key, default=None):
+        return self._load().get(key, default)
+
+    @property
+    def loaded(self):
+        return self._data is not None
+
+    def data(self):
+        return dict(self._load())
+
+    def regenerate(self):
+        """Keep the data under a new session id and retire the old one"""
+        self._load()
+        if not self.new:
+            self.previous_sid = self.sid
+        self.sid = new_sid()
+        self.new = True
+        self.modified = True
+
+
+class MemorySessionStore:
+    """In-process LRU of session dicts with a sliding TTL"""
+
+    def __init__(self, max_entries=SESSION_MEMORY_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def load(self, sid, ttl):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(sid)
+            if entry is None or entry[1] < now:
+                self._entries.pop(sid, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(sid)
+            expires_at = now + ttl
+            self._entries[sid] = (entry[0], expires_at)
+            self.hits += 1
+            # Shallow copy: the request mutates its own dict until save()
+            return dict(entry[0]), expires_at
+
+    def save(self, sid, data, ttl):
+        with self._lock:
+            self._entries[sid] = (data, time.time() + ttl)
+            self._entries.move_to_end(sid)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def touch(self, sid, ttl):
+        # load() already slid the expiry
+        pass
+
+    def delete(self, sid):
+        with self._lock:
+            self._entries.pop(sid, None)
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'sessions': len(self._entries), 'max_entries': self.max_entries,
+                    'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+
+class DatabaseSessionStore:
+    """Sessions in the web_sessions table, shared by all workers"""
+
+    serializer = TaggedJSONSerializer()
+
+    def load(self, sid, ttl):
+        with db.get_cursor(db.WRITE) as cursor:
+            cursor.execute('''
+                SELECT data, expires_at FROM web_sessions
+                WHERE session_id = %s AND expires_at > %s
+            ''', (sid, datetime.now()))
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        data = row['data']
+        if isinstance(data, (bytes, bytearray)):
+            data = data.decode('utf-8')
+        return self.serializer.loads(data), row['expires_at'].timestamp()
+
+    def save(self, sid, data, ttl):
+        with db.get_cursor(db.WRITE) as cursor:
+            cursor.execute('''
+                INSERT INTO web_sessions (session_id, data, expires_at)
+                VALUES (%s, %s, %s)
+                ON DUPLICATE KEY UPDATE data = VALUES(data), expires_at = VALUES(expires_at)
+            ''', (sid, self.serializer.dumps(data), datetime.now() + timedelta(seconds=ttl)))
+            if random.random() < PURGE_PROBABILITY:
+                cursor.execute('DELETE FROM web_sessions WHERE expires_at < %s LIMIT %s',
+                               (datetime.now(), PURGE_BATCH))
+
+    def touch(self, sid, ttl):
+        with db.get_cursor(db.WRITE) as cursor:
+            cursor.execute('UPDATE web_sessions SET expires_at = %s WHERE session_id = %s',
+                           (datetime.now() + timedelta(seconds=ttl), sid))
+
+    def delete(self, sid):
+        with db.get_cursor(db.WRITE) as cursor:
+            cursor.execute('DELETE FROM web_sessions WHERE session_id = %s', (sid,))
+
+    def stats(self):
+        return {'backend': 'database'}
+
+
+class ServerSideSessionInterface(SessionInterface):
+    """Signed session id cookie, session data in a MemorySessionStore or DatabaseSessionStore"""
+
+    salt = 'nsn-session-id'
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt=self.salt, key_derivation='hmac', digest_method=hashlib.sha256)
+
+    def _ttl(self, app):
+        return int(app.permanent_session_lifetime.total_seconds())
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode('ascii')
+            except (BadSignature, UnicodeDecodeError):
+                # e.g. the JSON session a C-Client injects; see login.ensure_session_parsed
+                sid = None
+            if sid:
+                ttl = self._ttl(app)
+                return ServerSideSession(sid, loader=lambda: self.store.load(sid, ttl))
+        return ServerSideSession(new_sid(), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        secure = self.get_cookie_secure(app)
+        samesite = self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+
+        if session.accessed:
+            response.vary.add('Cookie')
+
+        if not session.loaded:
+            return
+
+        if session.previous_sid:
+            self.store.delete(session.previous_sid)
+
+        ttl = self._ttl(app)
+        if session.modified and not session.data():
+            # Cleared (logout): drop it from the store and the browser
+            if not session.new:
+                self.store.delete(session.sid)
+            if not session.new or session.previous_sid:
+                response.delete_cookie(name, domain=domain, path=path, secure=secure,
+                                       samesite=samesite, httponly=httponly)
+            return
+
+        if session.modified:
+            self.store.save(session.sid, session.data(), ttl)
+        elif session.new:
+            return
+        elif session.expires_at and session.expires_at - time.time() < ttl / 2:
+            # Slide the expiry of an active session without rewriting its data
+            self.store.touch(session.sid, ttl)
+
+        if session.modified or self.should_set_cookie(app, session):
+            response.set_cookie(name, self._signer(app).sign(session.sid).decode('ascii'),
+                                expires=self.get_expiration_time(app, session), httponly=httponly,
+                                domain=domain, path=path, secure=secure, samesite=samesite)
+
+
+def create_store(backend):
+    if backend == 'memory':
+        return MemorySessionStore()
+    if backend == 'database':
+        return DatabaseSessionStore()
+    return None
+
+
+store = create_store(SESSION_BACKEND)
+if store is not None:
+    app.session_interface = ServerSideSessionInterface(store)
+
+
+def regenerate():
+    """Move the current session to a fresh id; call before storing a login in it
+
+    Signed cookie sessions have no id to fix, so this is a no-op for them.
+    """
+    if isinstance(session, ServerSideSession):
+        session.regenerate()
+
+
+def stats():
+    """Session store counters for /internal/metrics"""
+    if store is None:
+        return {'backend': 'cookie'}
+    return store.stats()
@@ -0,0 +1,174 @@
+"""Batch subscription expiry.
+
+Expiry used to be worked out lazily on the request path (checkExpiry ran on
+every membership check and could UPDATE members during a GET). This job does
+it for every member at once with a handful of set-based statements:
+- paused members that were switched back to 'subscribed' get their banked
+  rest_days added to end_time and their paused_members rows removed
+- subscriptions whose end_time has passed become 'expired'
+- the 7-day / 2-day expiry reminders (note_msg) are refreshed
+Each run records a watermark in batch_watermarks. Request paths only read the
+precomputed m_status and note_msg.
+
+With SUBSCRIPTION_EXPIRY_INTERVAL > 0 every process runs it in a daemon
+thread, started by its first request (so it also runs under a WSGI server) or
+by run.py. With 0, run `flask --app webapp expire-subscriptions` from a
+scheduled task instead.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from webapp import app
+from webapp import db
+from webapp import premium
+from webapp.config import SUBSCRIPTION_EXPIRY_INTERVAL
+
+JOB_NAME = 'subscription_expiry'
+
+_scheduler_started = False
+_scheduler_lock = threading.Lock()
+
+
+def resume_paused_members(cursor, now):
+    """
+    Credit banked rest_days to resumed members and clear their pause rows
+
+    rest_days is what was left of the subscription when it was paused
+    (paused_members), so the subscription restarts from now:
+    end_time = now + rest_days. The end_time from before the pause already
+    counted those days and is not added to. The credit and the removal of
+    the pause rows commit together, so a crash in between cannot credit the
+    same days twice.
+    """
+    conn = db.get_db(db.WRITE)
+    conn.start_transaction()
+    try:
+        cursor.execute('''
+            UPDATE members m
+            JOIN (SELECT m_id, SUM(rest_days) AS rest_days FROM paused_members GROUP BY m_id) p
+              ON p.m_id = m.m_id
+            SET m.end_time = %s + INTERVAL p.rest_days DAY
+            WHERE m.m_status = 'subscribed'
+        ''', (now,))
+        resumed = cursor.rowcount
+        cursor.execute('''
+            DELETE p FROM paused_members p
+            JOIN members m ON m.m_id = p.m_id
+            WHERE m.m_status = 'subscribed'
+        ''')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return resumed
+
+
+def expire_members(cursor, now):
+    """Mark every subscription whose end_time has passed as expired"""
+    cursor.execute('''
+        UPDATE members SET m_status = 'expired', note_msg = %s, note_ignore = 0
+        WHERE m_status = 'subscribed' AND end_time <= %s
+    ''', (premium.MESSAGE_FOR_EXPIRED, now))
+    return cursor.rowcount
+
+
+def refresh_reminders(cursor, now):
+    """Set the 2-day / 7-day reminders and clear them after a renewal"""
+    two_days = now + timedelta(days=2)
+    seven_days = now + timedelta(days=7)
+    updated = 0
+
+    cursor.execute('''
+        UPDATE members SET note_msg = %s, note_ignore = 0
+        WHERE m_status = 'subscribed' AND end_time > %s AND end_time <= %s
+          AND (note_msg IS NULL OR note_msg NOT IN (%s, %s))
+    ''', (premium.MESSAGE_FOR_2_DAYS, now, two_days,
+          premium.MESSAGE_FOR_EXPIRED, premium.MESSAGE_FOR_2_DAYS))
+    updated += cursor.rowcount
+
+    cursor.execute('''
+        UPDATE members SET note_msg = %s, note_ignore = 0
+        WHERE m_status = 'subscribed' AND end_time > %s AND end_time <= %s
+          AND (note_msg IS NULL OR note_msg NOT IN (%s, %s, %s))
+    ''', (premium.MESSAGE_FOR_7_DAYS, two_days, seven_days,
+          premium.MESSAGE_FOR_EXPIRED, premium.MESSAGE_FOR_2_DAYS, premium.MESSAGE_FOR_7_DAYS))
+    updated += cursor.rowcount
+
+    cursor.execute('''
+        UPDATE members SET note_msg = '', note_ignore = 0
+        WHERE m_status = 'subscribed' AND end_time > %s
+          AND (note_msg IS NULL OR note_msg <> '')
+    ''', (seven_days,))
+    updated += cursor.rowcount
+    return updated
+
+
+def run_expiry(cursor, now=None):
+    """Run one expiry pass and record the watermark, returns the counts per step"""
+    now = now or datetime.now()
+    counts = {
+        'resumed': resume_paused_members(cursor, now),
+        'expired': expire_members(cursor, now),
+        'reminded': refresh_reminders(cursor, now),
+    }
+    cursor.execute('''
+        INSERT INTO batch_watermarks (job_name, last_run_at, rows_affected)
+        VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_run_at = VALUES(last_run_at), rows_affected = VALUES(rows_affected)
+    ''', (JOB_NAME, now, sum(counts.values())))
+
+    # Cached membership in this process may now be stale
+    premium.clearMemberCache()
+    return counts
+
+
+def last_run(cursor):
+    """Time of the last completed expiry pass, or None if it never ran"""
+    cursor.execute('SELECT last_run_at FROM batch_watermarks WHERE job_name = %s', (JOB_NAME,))
+    row = cursor.fetchone()
+    return row['last_run_at'] if row else None
+
+
+def start_expiry_scheduler(interval=SUBSCRIPTION_EXPIRY_INTERVAL):
+    """Run the expiry pass every `interval` seconds in a daemon thread (idempotent)"""
+    global _scheduler_started
+    if interval <= 0:
+        return False
+    with _scheduler_lock:
+        if _scheduler_started:
+            return False
+        _scheduler_started = True
+
+    def loop():
+        while True:
+            try:
+                with app.app_context():
+                    with db.get_cursor() as cursor:
+                        counts = run_expiry(cursor)
+                    db.close_db()
+                app.logger.info(f"Subscription expiry pass: {counts}")
+            except Exception as e:
+                app.logger.error(f"Subscription expiry pass failed: {str(e)}")
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name='subscription-expiry', daemon=True).start()
+    return True
+
+
+@app.before_request
+def start_expiry_scheduler_on_first_request():
+    # run.py's __main__ block does not run under a WSGI server
+    if not _scheduler_started:
+        start_expiry_scheduler()
+
+
+@app.cli.command('expire-subscriptions')
+def expire_subscriptions_command():
+    """Expire lapsed subscriptions and refresh expiry reminders."""
+    with db.get_cursor() as cursor:
+        counts = run_expiry(cursor)
+    db.close_db()
+    click.echo(f"Subscription expiry: {counts['resumed']} resumed, "
+               f"{counts['expired']} expired, {counts['reminded']} reminders updated")
@@ -0,0 +1,152 @@
+"""Materialized departure board timeline (fan-out on write).
+
+When DEPARTURE_BOARD_TIMELINE is enabled, every event is pushed into the
+departure_board_timeline rows of the users who follow its journey, author or
+location. The departure board then reads a user's feed with one indexed range
+scan on (user_id, last_update, event_id) instead of joining the three follow
+tables on every page view.
+
+Writes keep the table in sync:
+- refresh_event() is called after an event is created or edited
+- refresh_user() is called after a user follows or unfollows something
+- rebuild_timeline() (flask rebuild-timeline) regenerates everything
+
+The table records who follows what, not visibility: rows are written whatever
+the journey or author status, and reads only return events whose journey is
+open and whose author is active (VISIBLE_EVENT_JOIN). Hiding, moderating or
+reopening a journey and banning or unbanning a user therefore take effect on
+the next page view without touching the timeline.
+"""
+import click
+from webapp import app
+from webapp import db
+from webapp.config import DEPARTURE_BOARD_TIMELINE
+
+# Every (follower, event, source) pair. The *_filter placeholders narrow the
+# fan-out to one event and/or one follower; they default to TRUE.
+_FOLLOWER_EVENTS_SQL = '''
+    SELECT jf.user_id AS follower_id, e.event_id, e.last_update, 'followed_journey' AS source
+    FROM journey_follows jf
+    JOIN events e ON e.journey_id = jf.journey_id
+    WHERE {event_filter} AND {journey_follower_filter}
+    UNION ALL
+    SELECT uf.follower_id, e.event_id, e.last_update, 'followed_user' AS source
+    FROM user_follows uf
+    JOIN journeys j ON j.user_id = uf.followed_id
+    JOIN events e ON e.journey_id = j.journey_id
+    WHERE {event_filter} AND {user_follower_filter}
+    UNION ALL
+    SELECT lf.user_id AS follower_id, e.event_id, e.last_update, 'followed_location' AS source
+    FROM location_follows lf
+    JOIN events e ON e.location_id = lf.location_id
+    WHERE {event_filter} AND {location_follower_filter}
+'''
+
+_INSERT_TIMELINE_SQL = '''
+    INSERT INTO departure_board_timeline
+        (user_id, event_id, last_update, from_journey, from_user, from_location)
+    SELECT fe.follower_id, fe.event_id, MAX(fe.last_update),
+           MAX(fe.source = 'followed_journey'),
+           MAX(fe.source = 'followed_user'),
+           MAX(fe.source = 'followed_location')
+    FROM ({follower_events}) fe
+    GROUP BY fe.follower_id, fe.event_id
+'''
+
+
+# Joined to timeline rows on read: drops events of hidden journeys and banned authors
+VISIBLE_EVENT_JOIN = '''
+    JOIN events ve ON ve.event_id = t.event_id
+    JOIN journeys vj ON vj.journey_id = ve.journey_id AND vj.status = 'open'
+    JOIN users vu ON vu.user_id = vj.user_id AND vu.status = 'active'
+'''
+
+
+def timeline_enabled():
+    """Whether departure board reads and writes go through the timeline table"""
+    return DEPARTURE_BOARD_TIMELINE
+
+
+def _insert_sql(event_filter='TRUE', follower=False):
+    """Build the fan-out INSERT, optionally narrowed to one event and/or one follower"""
+    follower_events = _FOLLOWER_EVENTS_SQL.format(
+        event_filter=event_filter,
+        journey_follower_filter='jf.user_id = %s' if follower else 'TRUE',
+        user_follower_filter='uf.follower_id = %s' if follower else 'TRUE',
+        location_follower_filter='lf.user_id = %s' if follower else 'TRUE',
+    )
+    return _INSERT_TIMELINE_SQL.format(follower_events=follower_events)
+
+
+def refresh_event(cursor, event_id):
+    """Re-fan-out one event to its current followers (after create or edit)"""
+    if not timeline_enabled() or not event_id:
+        return
+    cursor.execute('DELETE FROM departure_board_timeline WHERE event_id = %s', (event_id,))
+    cursor.execute(_insert_sql(event_filter='e.event_id = %s'), (event_id,) * 3)
+
+
+def refresh_user(cursor, user_id):
+    """Backfill or prune a user's timeline after their follows change"""
+    if not timeline_enabled() or not user_id:
+        return
+    rebuild_user_timeline(cursor, user_id)
+
+
+def rebuild_user_timeline(cursor, user_id):
+    """Regenerate one user's timeline from their current follows"""
+    cursor.execute('DELETE FROM departure_board_timeline WHERE user_id = %s', (user_id,))
+    cursor.execute(_insert_sql(follower=True), (user_id,) * 3)
+    return cursor.rowcount
+
+
+def rebuild_timeline(cursor):
+    """Regenerate the whole timeline table, returns the number of rows written"""
+    cursor.execute('DELETE FROM departure_board_timeline')
+    cursor.execute(_insert_sql())
+    return cursor.rowcount
+
+
+def timeline_page_query(user_id, offset, limit, after=None):
+    """
+    Build the query selecting one page of a user's timeline
+
+    Returns (sql, params) producing event_id, last_update and the from_* source
+    flags, ordered by (last_update, event_id). With a keyset cursor the page
+    continues after that position, otherwise it starts at offset.
+    """
+    keyset = ''
+    params = [user_id]
+    if after:
+        keyset = 'AND (t.last_update < %s OR (t.last_update = %s AND t.event_id < %s))'
+        params.extend([after[0], after[0], after[1]])
+    params.extend([limit, offset])
+    sql = f'''
+        SELECT t.event_id, t.last_update, t.from_journey, t.from_user, t.from_location
+        FROM departure_board_timeline t
+        {VISIBLE_EVENT_JOIN}
+        WHERE t.user_id = %s {keyset}
+        ORDER BY t.last_update DESC, t.event_id DESC
+        LIMIT %s OFFSET %s
+    '''
+    return sql, params
+
+
+def count_timeline(cursor, user_id):
+    """Number of visible events in a user's timeline"""
+    cursor.execute(f'''
+        SELECT COUNT(*) AS total
+        FROM departure_board_timeline t
+        {VISIBLE_EVENT_JOIN}
+        WHERE t.user_id = %s
+    ''', (user_id,))
+    return cursor.fetchone()['total']
+
+
+@app.cli.command('rebuild-timeline')
+def rebuild_timeline_command():
+    """Rebuild the materialized departure board timeline."""
+    with db.get_cursor() as cursor:
+        rows = rebuild_timeline(cursor)
+    db.close_db()
+    click.echo(f"Departure board timeline rebuilt: {rows} rows")
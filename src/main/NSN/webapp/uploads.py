@@ -0,0 +1,140 @@
+"""Streaming upload handling.
+
+Flask's MAX_CONTENT_LENGTH (MAX_REQUEST_BYTES) makes Werkzeug refuse request
+bodies that declare, or turn out to have, more bytes than allowed before they
+are read, so an oversized upload costs nothing. Below that limit,
+UploadRequest streams every uploaded file into an UploadSpool instead of
+Werkzeug's default spool:
+- the bytes go to a temp file in UPLOAD_TMP_DIR, never to memory
+- the SHA-256 is computed while the chunks arrive (blobstore reuses it when
+  the upload has no metadata to strip)
+- the magic bytes are checked on the first chunk
+- a file over MAX_UPLOAD_FILE_BYTES stops being written as soon as it
+  crosses the limit
+so memory and disk per upload stay bounded. Handlers call check_upload() and
+reject the file with a message instead of seeking to the end of it.
+"""
+import hashlib
+import os
+import tempfile
+
+from flask import Request, flash, jsonify, redirect, request, url_for
+from werkzeug.exceptions import RequestEntityTooLarge
+from webapp import app
+from webapp.config import MAX_REQUEST_BYTES, MAX_UPLOAD_FILE_BYTES, UPLOAD_TMP_DIR
+
+# Leading bytes of the image formats accepted anywhere in the app
+SIGNATURES = (
+    (b'\xff\xd8\xff', 'JPEG'),
+    (b'\x89PNG\r\n\x1a\n', 'PNG'),
+    (b'GIF87a', 'GIF'),
+    (b'GIF89a', 'GIF'),
+)
+SIGNATURE_LENGTH = 12
+
+TMP_DIR = UPLOAD_TMP_DIR or os.path.join(os.path.dirname(app.root_path), 'upload_tmp')
+
+
+def sniff_format(head):
+    """Image format named by the first bytes of a file, or None"""
+    for signature, image_format in SIGNATURES:
+        if head.startswith(signature):
+            return image_format
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'WEBP'
+    return None
+
+
+class UploadSpool:
+    """
+    File-like sink for one uploaded file
+
+    Werkzeug writes the multipart chunks here and later reads the file back
+    through FileStorage; after parsing, `sha256`, `size`, `sniffed_format`
+    and `too_large` describe the upload.
+    """
+
+    def __init__(self, max_bytes=MAX_UPLOAD_FILE_BYTES):
+        os.makedirs(TMP_DIR, exist_ok=True)
+        self._file = tempfile.NamedTemporaryFile(dir=TMP_DIR, prefix='upload-')
+        self._digest = hashlib.sha256()
+        self._head = b''
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.too_large = False
+
+    @property
+    def name(self):
+        return self._file.name
+
+    @property
+    def sha256(self):
+        return None if self.too_large else self._digest.hexdigest()
+
+    @property
+    def sniffed_format(self):
+        return sniff_format(self._head)
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self.too_large:
+            return len(chunk)
+        if self.size > self.max_bytes:
+            # Keep counting but stop storing: the upload will be rejected
+            self.too_large = True
+            self._file.truncate(0)
+            return len(chunk)
+        if len(self._head) < SIGNATURE_LENGTH:
+            self._head += bytes(chunk[:SIGNATURE_LENGTH - len(self._head)])
+        self._digest.update(chunk)
+        return self._file.write(chunk)
+
+    def __getattr__(self, attribute):
+        # read/seek/tell/close/... of the underlying temp file
+        return getattr(self._file, attribute)
+
+    def __iter__(self):
+        return iter(self._file)
+
+
+class UploadRequest(Request):
+    """Request whose uploaded files are streamed into UploadSpools"""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return UploadSpool()
+
+
+def check_upload(file, max_bytes=MAX_UPLOAD_FILE_BYTES):
+    """
+    Reject an upload by size and magic bytes without reading it again
+
+    Returns (ok, message). Files that were not streamed through an
+    UploadSpool are measured the old way.
+    """
+    stream = file.stream
+    if isinstance(stream, UploadSpool):
+        if stream.too_large or stream.size > max_bytes:
+            return False, f"File is too large. Maximum allowed size is {max_bytes // (1024 * 1024)}MB."
+        if stream.sniffed_format is None:
+            return False, "The uploaded file is not a supported image."
+        return True, None
+
+    stream.seek(0, os.SEEK_END)
+    size = stream.tell()
+    stream.seek(0)
+    if size > max_bytes:
+        return False, f"File is too large. Maximum allowed size is {max_bytes // (1024 * 1024)}MB."
+    return True, None
+
+
+app.request_class = UploadRequest
+app.config['MAX_CONTENT_LENGTH'] = MAX_REQUEST_BYTES
+
+
+@app.errorhandler(RequestEntityTooLarge)
+def request_too_large(error):
+    message = f"Upload is too large. Requests are limited to {MAX_REQUEST_BYTES // (1024 * 1024)}MB."
+    if request.accept_mimetypes.best == 'application/json' or request.is_json:
+        return jsonify({'success': False, 'message': message}), 413
+    flash(message, "danger")
+    return redirect(request.referrer or url_for('dashboard'))
@@ -1,9 +1,15 @@
+import logging
 from webapp import app
 from webapp import db
+from webapp import search
+from webapp import premium
+from webapp import login
+from webapp import blobstore
 from flask import redirect, render_template, request, session, url_for, jsonify
 from flask_bcrypt import Bcrypt
 import re
-from webapp.utils import rebuildImageUrl
+
+logger = logging.getLogger(__name__)
 # Create an instance of the Bcrypt class, which we'll be using to hash user
 # passwords during login and registration.
 flask_bcrypt = Bcrypt(app)
@@ -11,6 +17,7 @@ flask_bcrypt = Bcrypt(app)
 
 
 @app.route('/user/view', methods=['GET', 'POST'])
+@db.read_only
 def view_users():
     # Authentication check
     if 'user_id' not in session:
@@ -76,10 +83,10 @@ def view_users():
             
             # Add search conditions if search is provided
             if search_query:
-                where_clauses.append('(username LIKE %s OR email LIKE %s OR first_name LIKE %s OR last_name LIKE %s)')
-                search_param = f"%{search_query}%"
-                params.extend([search_param, search_param, search_param, search_param])
-                count_params.extend([search_param, search_param, search_param, search_param])
+                match = search.match_users(search_query)
+                where_clauses.append(match.condition)
+                params.extend(match.params)
+                count_params.extend(match.params)
             
             # Add role filter if provided (only for admin users)
             if role_filter and is_admin_user:
@@ -109,7 +116,7 @@ def view_users():
             user_list = cursor.fetchall()
 
             for user in user_list:
-             user['avatar_url'] = rebuildImageUrl(user['profile_image'])
+             user['avatar_url'] = blobstore.avatar_url(user['profile_image'])
             
 
             # Count total users
@@ -159,7 +166,7 @@ def view_users():
                 }
             ]
     except Exception as e:
-        print(f"Error fetching users: {e}")
+        logger.error("Error fetching users: %s", e)
         # Add a test user to ensure the page can render (for admin only)
         if not search_query and not role_filter and is_admin_user:
             user_list = [
@@ -259,6 +266,8 @@ def update_user_role():
                 (new_role, user_id)
             )
             conn.commit()
+        premium.invalidateMember(user_id)
+        login.invalidate_user(user_id)
         return jsonify({'message': 'Role updated successfully'}), 200
     except Exception as e:
         if conn:
@@ -356,7 +365,7 @@ def check_user_report_permissions(user_id):
             return True
 
     except Exception as e:
-        print(f"Error checking user report permissions: {e}")
+        logger.error("Error checking user report permissions: %s", e)
         return False
 
 
@@ -376,7 +385,7 @@ def check_journey_reports_table():
             result = cursor.fetchone()
 
             if result['table_count'] == 0:
-                print("Creating journey_reports table...")
+                logger.debug("Creating journey_reports table...")
 
                 cursor.execute("""
                     CREATE TABLE journey_reports (
@@ -405,24 +414,24 @@ def check_journey_reports_table():
                 """)
 
                 db.close_db()
-                print("journey_reports table created successfully!")
+                logger.debug("journey_reports table created successfully!")
                 return True
             else:
-                print("journey_reports table already exists")
+                logger.debug("journey_reports table already exists")
                 return True
 
     except Exception as e:
-        print(f"Error checking/creating journey_reports table: {e}")
+        logger.error("Error checking/creating journey_reports table: %s", e)
         return False
 
 
 def initialize_journey_reports():
     """初始化journey报告功能"""
-    print("Initializing journey reports system...")
+    logger.debug("Initializing journey reports system...")
 
     if check_journey_reports_table():
-        print("Journey reports system initialized successfully!")
+        logger.debug("Journey reports system initialized successfully!")
         return True
     else:
-        print("Failed to initialize journey reports system!")
+        logger.error("Failed to initialize journey reports system!")
         return False
\ No newline at end of file
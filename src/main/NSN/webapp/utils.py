@@ -1,4 +1,5 @@
 import os
+from datetime import datetime
 AVATAR_PATH = '/static/avatars'
 def rebuildImageUrl(img_url):
     # rebuild image_url with os path
@@ -8,4 +9,19 @@ def rebuildImageUrl(img_url):
             AVATAR_PATH, img_url)
         image = image.replace("\\", "/")
         return image
-    return ""
\ No newline at end of file
+    return ""
+
+def encode_keyset_cursor(timestamp, row_id):
+    # encode a (timestamp, id) keyset position as '<iso timestamp>_<id>'
+    return f"{timestamp.isoformat()}_{row_id}"
+
+
+def decode_keyset_cursor(value):
+    # decode a keyset cursor, returns (timestamp, id) or None if invalid
+    if not value:
+        return None
+    try:
+        timestamp, row_id = value.rsplit('_', 1)
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except (ValueError, TypeError):
+        return None
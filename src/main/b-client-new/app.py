@@ -3,22 +3,16 @@ import asyncio
 import builtins
 import json
 import logging
-import os
 import random
-import re
-import secrets
-import socket
 import sqlite3
-import string
 import threading
 import time
 import traceback
 from datetime import datetime, timedelta
 
 # Third-party imports
-from flask import Flask, render_template, request, jsonify, session, redirect, url_for
+from flask import Flask, render_template, session, redirect, url_for
 from werkzeug.security import generate_password_hash, check_password_hash
-import requests
 
 # Optional third-party imports
 try:
@@ -30,14 +24,9 @@ except ImportError:
 from utils.logger import get_bclient_logger, setup_print_redirect
 from utils.config_manager import get_nsn_url, get_nsn_host, get_nsn_port
 
-# Set up log redirection immediately (takes effect on module import)
+# Loggers open their files on first use; print() is redirected to the log by
+# start_background_services(), not on import
 logger = get_bclient_logger('app')
-print_redirect = setup_print_redirect('app')
-
-# Redirect print to logger
-builtins.print = print_redirect
-
-logger.info("B-Client application module imported")
 
 if websockets is None:
     logger.warning("WebSocket dependencies not available. Install with: pip install websockets")
@@ -72,7 +61,7 @@ def safe_close_websocket(websocket, reason="Connection closed"):
         return False
 
 # Import database models
-from services.models import db, UserCookie, UserAccount, init_db
+from services.models import db, UserCookie, UserAccount, UserSecurityCode, init_db, ensure_schema
 
 # Import service modules
 from services.nsn_client import NSNClient
@@ -82,6 +71,7 @@ from services.websocket_server import start_websocket_server, init_websocket_ser
 from services.sync_manager import SyncManager
 from services.cluster_verification import init_cluster_verification, cluster_verification_service
 from services.nodeManager import NodeManager
+from services.security_codes import init_security_code_service
 
 # Import route blueprints
 from routes.page_routes import page_routes
@@ -118,655 +108,7 @@ app.register_blueprint(node_management_routes)
 # Note: C-Client API routes have been moved to routes/c_client_api_routes.py
 # Note: Core bind route has been moved to routes/bind_routes.py
 
-# Core business logic routes remain below
-
-@app.route('/api/health')
-def health():
-    return jsonify({
-        'status': 'ok',
-        'timestamp': datetime.utcnow().isoformat(),
-        'service': 'B-Client Flask API Server'
-    })
-
-@app.route('/api/user/logout-status', methods=['GET'])
-def get_user_logout_status():
-    """Get user logout status for C-Client to check before auto-login"""
-    try:
-        user_id = request.args.get('user_id')
-        if not user_id:
-            return jsonify({'error': 'user_id parameter is required'}), 400
-        
-        logger.info(f"Checking logout status for user: {user_id}")
-        
-        # Query user_accounts table for logout status
-        user_account = UserAccount.query.filter_by(
-            user_id=user_id,
-            website='nsn'
-        ).first()
-        
-        if user_account:
-            logout_status = user_account.logout
-            logger.info(f"User {user_id} logout status: {logout_status}")
-            logger.info(f"User account details - user_id: {user_account.user_id}, website: {user_account.website}")
-            logger.info(f"Logout field type: {type(logout_status)}, value: {logout_status}")
-            return jsonify({
-                'user_id': user_id,
-                'logout': logout_status,
-                'found': True
-            })
-        else:
-            logger.warning(f"No user account found for user: {user_id}")
-            return jsonify({
-                'user_id': user_id,
-                'logout': False,
-                'found': False
-            })
-            
-    except Exception as e:
-        logger.error(f"Error checking logout status: {e}")
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/stats')
-def get_stats():
-    try:
-        auto_refresh_count = UserCookie.query.filter_by(auto_refresh=True).count()
-        auto_register_count = UserAccount.query.filter_by(auto_generated=True).count()
-        total_cookies_count = UserCookie.query.count()
-        
-        return jsonify({
-            'autoRefreshUsers': auto_refresh_count,
-            'autoRegisteredUsers': auto_register_count,
-            'totalCookies': total_cookies_count
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-
-@app.route('/api/cookies', methods=['GET'])
-def get_cookies():
-    try:
-        user_id = request.args.get('user_id')
-        if not user_id:
-            return jsonify({'error': 'user_id is required'}), 400
-        
-        # Query user's cookie (should only have one record)
-        cookie = UserCookie.query.filter_by(user_id=user_id).first()
-        
-        if cookie:
-            # Found cookie: only return status, don't send session immediately
-            # Session will be sent after WebSocket registration completes
-            logger.info(f"Found cookie for user {user_id}")
-            logger.info(f"Cookie details - username: {cookie.username}, node_id: {cookie.node_id}")
-            logger.info(f"Session will be sent after WebSocket registration completes")
-            
-            return jsonify({
-                'success': True,
-                'has_cookie': True,
-                'message': 'Cookie found and session sent to C-Client'
-            })
-        else:
-            # Cookie not found: return failure response
-            logger.info(f"No cookie found for user {user_id}")
-            return jsonify({
-                'success': False,
-                'has_cookie': False,
-                'message': 'No cookie found for user'
-            })
-            
-    except Exception as e:
-        logger.error(f"Error querying cookies: {str(e)}")
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/cookies', methods=['POST'])
-def add_cookie():
-    try:
-        data = request.get_json()
-        required_fields = ['user_id', 'username', 'cookie']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'{field} is required'}), 400
-        
-        # Delete existing cookies for this user_id
-        UserCookie.query.filter_by(user_id=data['user_id']).delete()
-        
-        # Add new cookie
-        cookie = UserCookie(
-            user_id=data['user_id'],
-            username=data['username'],
-            node_id=data.get('node_id'),
-            cookie=data['cookie'],
-            auto_refresh=data.get('auto_refresh', False),
-            refresh_time=datetime.fromisoformat(data['refresh_time']) if data.get('refresh_time') else None
-        )
-        
-        db.session.add(cookie)
-        db.session.commit()
-        
-        return jsonify({'message': 'Cookie added successfully'})
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/accounts', methods=['GET'])
-def get_accounts():
-    try:
-        user_id = request.args.get('user_id')
-        if not user_id:
-            return jsonify({'error': 'user_id is required'}), 400
-        
-        accounts = UserAccount.query.filter_by(user_id=user_id).all()
-        result = []
-        for account in accounts:
-            result.append({
-                'user_id': account.user_id,
-                'username': account.username,
-                'website': account.website,
-                'account': account.account,
-                'email': account.email,
-                'first_name': account.first_name,
-                'last_name': account.last_name,
-                'location': account.location,
-                'registration_method': account.registration_method,
-                'auto_generated': account.auto_generated,
-                'create_time': account.create_time.isoformat()
-            })
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/accounts', methods=['POST'])
-def add_account():
-    try:
-        data = request.get_json()
-        required_fields = ['user_id', 'username', 'website', 'account', 'password']
-        for field in required_fields:
-            if field not in data:
-                return jsonify({'error': f'{field} is required'}), 400
-        
-        # Check if account already exists
-        existing = UserAccount.query.filter_by(
-            user_id=data['user_id'],
-            username=data['username'],
-            website=data['website'],
-            account=data['account']
-        ).first()
-        
-        if existing:
-            # Update existing account
-            existing.password = data['password']
-            existing.email = data.get('email')
-            existing.first_name = data.get('first_name')
-            existing.last_name = data.get('last_name')
-            existing.location = data.get('location')
-            existing.registration_method = data.get('registration_method', 'manual')
-            existing.auto_generated = data.get('auto_generated', False)
-        else:
-            # Create new account
-            account = UserAccount(
-                user_id=data['user_id'],
-                username=data['username'],
-                website=data['website'],
-                account=data['account'],
-                password=data['password'],
-                email=data.get('email'),
-                first_name=data.get('first_name'),
-                last_name=data.get('last_name'),
-                location=data.get('location'),
-                registration_method=data.get('registration_method', 'manual'),
-                auto_generated=data.get('auto_generated', False)
-            )
-            db.session.add(account)
-        
-        db.session.commit()
-        return jsonify({'message': 'Account saved successfully'})
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/accounts/<user_id>/<username>/<website>/<account>', methods=['DELETE'])
-def delete_account(user_id, username, website, account):
-    try:
-        account_obj = UserAccount.query.filter_by(
-            user_id=user_id,
-            username=username,
-            website=website,
-            account=account
-        ).first()
-        
-        if not account_obj:
-            return jsonify({'error': 'Account not found'}), 404
-        
-        db.session.delete(account_obj)
-        db.session.commit()
-        
-        return jsonify({'message': 'Account deleted successfully'})
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
-
-# Configuration API Routes
-@app.route('/api/config/environment', methods=['POST'])
-def set_environment():
-    try:
-        data = request.get_json()
-        environment = data.get('environment', 'local')
-        
-        # Save environment to config file
-        config_path = os.path.join(os.path.dirname(__file__), 'config.json')
-        if os.path.exists(config_path):
-            with open(config_path, 'r') as f:
-                config = json.load(f)
-        else:
-            config = {}
-        
-        config['current_environment'] = environment
-        
-        with open(config_path, 'w') as f:
-            json.dump(config, f, indent=2)
-        
-        return jsonify({'message': f'Environment set to {environment}'})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/config/environment', methods=['GET'])
-def get_environment():
-    try:
-        from utils.config_manager import get_current_environment
-        environment = get_current_environment()
-        return jsonify({'environment': environment})
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-
-@app.route('/api/database/info')
-def database_info():
-    try:
-        # Get database statistics
-        total_cookies = UserCookie.query.count()
-        total_accounts = UserAccount.query.count()
-        # Get domain count from NodeManager connection pools instead of database
-        if hasattr(c_client_ws, 'node_manager') and c_client_ws.node_manager:
-            total_domains = len(c_client_ws.node_manager.domain_pool)
-        else:
-            total_domains = 0
-        
-        # Get recent activity
-        recent_cookies = UserCookie.query.order_by(UserCookie.create_time.desc()).limit(5).all()
-        recent_accounts = UserAccount.query.order_by(UserAccount.create_time.desc()).limit(5).all()
-        
-        return jsonify({
-            'database_stats': {
-                'total_cookies': total_cookies,
-                'total_accounts': total_accounts,
-                'total_domains': total_domains
-            },
-            'recent_cookies': [
-                {
-                    'user_id': cookie.user_id,
-                    'username': cookie.username,
-                    'create_time': cookie.create_time.isoformat()
-                } for cookie in recent_cookies
-            ],
-            'recent_accounts': [
-                {
-                    'user_id': account.user_id,
-                    'username': account.username,
-                    'website': account.website,
-                    'create_time': account.create_time.isoformat()
-                } for account in recent_accounts
-            ]
-        })
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-@app.route('/api/node/offline', methods=['POST'])
-def trigger_node_offline():
-    """Trigger node offline cleanup"""
-    try:
-        data = request.get_json()
-        node_id = data.get('node_id')
-        
-        if not node_id:
-            return jsonify({'error': 'node_id is required'}), 400
-        
-        # Trigger node offline cleanup
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        
-        try:
-            loop.run_until_complete(c_client_ws.handle_node_offline(node_id))
-            return jsonify({
-                'success': True,
-                'message': f'Node {node_id} offline cleanup completed',
-                'node_id': node_id
-            })
-        finally:
-            loop.close()
-            
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
-
-# NSN API Integration
-class NSNClient:
-    def __init__(self):
-        self.base_url = self.get_nsn_url()
-        self.session = requests.Session()
-    
-    def get_nsn_url(self):
-        """Get NSN URL based on current environment"""
-        # Use the updated config manager function
-        return get_nsn_url()
-    
-    def query_user_info(self, username):
-        """Query user information from NSN"""
-        try:
-            url = f"{self.base_url}/api/user-info"
-            data = {'username': username}
-            response = self.session.post(url, json=data, timeout=30)
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {'success': False, 'error': f'HTTP {response.status_code}'}
-        except Exception as e:
-            return {'success': False, 'error': str(e)}
-    
-    def get_current_user(self, session_cookie):
-        """Get current user from NSN using session cookie"""
-        try:
-            url = f"{self.base_url}/api/current-user"
-            
-            # Ensure proper cookie format
-            if session_cookie and not session_cookie.startswith('session='):
-                session_cookie = f"session={session_cookie}"
-            
-            headers = {'Cookie': session_cookie}
-            response = self.session.get(url, headers=headers, timeout=30)
-            
-            logger.info(f"Current user API response status: {response.status_code}")
-            logger.info(f"Current user API response content: {response.text[:200] if response.text else 'Empty'}")
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {'success': False, 'error': f'HTTP {response.status_code}'}
-        except Exception as e:
-            logger.error(f"get_current_user error: {e}")
-            return {'success': False, 'error': str(e)}
-    
-    def get_current_user_from_session(self):
-        """Get current user from NSN using the same session object that was used for login"""
-        try:
-            url = f"{self.base_url}/api/current-user"
-            response = self.session.get(url, timeout=5)
-            
-            logger.info(f"Current user API (from session) response status: {response.status_code}")
-            logger.info(f"Current user API (from session) response content: {response.text[:200] if response.text else 'Empty'}")
-            
-            if response.status_code == 200:
-                return response.json()
-            else:
-                return {'success': False, 'error': f'HTTP {response.status_code}'}
-        except Exception as e:
-            logger.error(f"get_current_user_from_session error: {e}")
-            return {'success': False, 'error': str(e)}
-    
-    def login_with_nmp(self, username, password, nmp_params):
-        """Login to NSN with NMP parameters"""
-        try:
-            url = f"{self.base_url}/login"
-            
-            # Prepare login data with NMP parameters (matching original B-Client)
-            data = {
-                'username': username,
-                'password': password
-            }
-            
-            # Add NMP parameters if provided
-            if nmp_params:
-                data.update(nmp_params)
-            else:
-                # Add default NMP parameters like original B-Client
-                data.update({
-                    'nmp_bind': 'true',
-                    'nmp_bind_type': 'bind',
-                    'nmp_auto_refresh': 'true',
-                    'nmp_client_type': 'c-client',
-                    'nmp_timestamp': str(int(time.time() * 1000))
-                })
-            
-            # Use form-encoded data like original B-Client
-            logger.info(f"Sending login request to NSN: {url}")
-            logger.info(f"Request data keys: {list(data.keys())}")
-            logger.info(f"Username: {data.get('username', 'NOT_SET')}")
-            logger.info(f"Password length: {len(data.get('password', ''))}")
-            logger.info(f"NMP parameters: {[k for k in data.keys() if k.startswith('nmp_')]}")
-            
-            response = self.session.post(url, data=data, timeout=30, allow_redirects=False)
-            
-            logger.info(f"NSN login response status: {response.status_code}")
-            logger.info(f"Response headers: {dict(response.headers)}")
-            logger.info(f"Response content length: {len(response.content) if response.content else 0}")
-            
-            # Extract session cookie from response headers
-            session_cookie = None
-            if 'set-cookie' in response.headers:
-                cookies = response.headers['set-cookie']
-                if isinstance(cookies, list):
-                    cookies = '; '.join(cookies)
-                
-                # Extract session cookie
-                session_match = re.search(r'session=([^;]+)', cookies)
-                if session_match:
-                    session_cookie = f"session={session_match.group(1)}"
-                    logger.info(f"Session cookie extracted: {session_cookie}")
-            
-            # NSN login success is indicated by 302 redirect or 200 with session cookie
-            is_success = response.status_code == 302 or (response.status_code == 200 and session_cookie)
-            
-            if is_success:
-                logger.info("NSN login successful, getting user info...")
-                
-                # Get user information from NSN using the same session object
-                # This ensures the session cookie is properly maintained
-                user_info = self.get_current_user_from_session()
-                
-                return {
-                    'success': True,
-                    'session_cookie': session_cookie,
-                    'redirect_url': response.headers.get('Location', url),
-                    'user_info': user_info
-                }
-            else:
-                return {'success': False, 'error': f'Login failed with HTTP {response.status_code}'}
-        except Exception as e:
-            logger.error(f"NSN login error: {e}")
-            return {'success': False, 'error': str(e)}
-    
-    def register_user(self, signup_data, nmp_params=None):
-        """Register a new user with NSN and then login to get session"""
-        try:
-            logger.info(f"===== REGISTERING NEW USER =====")
-            logger.info(f"Signup data: {signup_data}")
-            logger.info(f"NMP params: {nmp_params}")
-            
-            # Generate a secure password for NMP registration
-            
-            # Generate a password that meets NSN requirements:
-            # - At least 8 characters
-            # - At least one uppercase letter
-            # - At least one lowercase letter  
-            # - At least one number
-            # - At least one special character
-            def generate_secure_password():
-                # Define character sets
-                uppercase = string.ascii_uppercase
-                lowercase = string.ascii_lowercase
-                digits = string.digits
-                special_chars = '@#$%^&+=!'
-                
-                # Ensure at least one character from each required set
-                password = [
-                    secrets.choice(uppercase),
-                    secrets.choice(lowercase),
-                    secrets.choice(digits),
-                    secrets.choice(special_chars)
-                ]
-                
-                # Fill the rest with random characters from all sets
-                all_chars = uppercase + lowercase + digits + special_chars
-                for _ in range(4):  # Total length will be 8
-                    password.append(secrets.choice(all_chars))
-                
-                # Shuffle the password
-                secrets.SystemRandom().shuffle(password)
-                return ''.join(password)
-            
-            generated_password = generate_secure_password()
-            logger.info(f"Generated secure password for NMP registration: {generated_password}")
-            
-            # Generate unique username to avoid conflicts
-            
-            base_username = signup_data.get('username')
-            
-            # Clean base username: remove non-alphanumeric characters
-            clean_base = re.sub(r'[^A-Za-z0-9]', '', base_username)
-            
-            # Ensure base username doesn't exceed 16 characters (leave space for suffix)
-            if len(clean_base) > 16:
-                clean_base = clean_base[:16]
-            
-            # Generate a random suffix (4 characters: 2 letters + 2 digits)
-            random_suffix = ''.join(secrets.choice(string.ascii_lowercase) for _ in range(2)) + \
-                           ''.join(secrets.choice(string.digits) for _ in range(2))
-            
-            # Combine username, ensuring total length doesn't exceed 20 characters
-            unique_username = f"{clean_base}{random_suffix}"
-            
-            # Final length check
-            if len(unique_username) > 20:
-                unique_username = unique_username[:20]
-            
-            logger.info(f"Generated unique username: {unique_username}")
-            logger.info(f"Username length: {len(unique_username)}")
-            logger.info(f"Username validation: {'PASS' if re.match(r'^[A-Za-z0-9]+$', unique_username) and len(unique_username) <= 20 else 'FAIL'}")
-            
-            # Prepare registration data
-            registration_data = {
-                'username': unique_username,
-                'email': signup_data.get('email'),
-                'first_name': signup_data.get('first_name'),
-                'last_name': signup_data.get('last_name'),
-                'location': signup_data.get('location'),
-                'password': generated_password,
-                'confirm_password': generated_password
-            }
-            
-            # Add NMP parameters if provided
-            if nmp_params:
-                registration_data.update(nmp_params)
-            
-            logger.info(f"Registration data: {registration_data}")
-            logger.info(f"===== CALLING NSN SIGNUP ENDPOINT =====")
-            logger.info(f"Signup URL: {self.base_url}/signup")
-            logger.info(f"Request method: POST")
-            logger.info(f"Request data keys: {list(registration_data.keys())}")
-            logger.info(f"NMP parameters included: {bool(nmp_params)}")
-            logger.info(f"===== END CALLING NSN SIGNUP ENDPOINT =====")
-            
-            # Call NSN signup endpoint (without B-Client headers to get normal HTML response)
-            signup_url = f"{self.base_url}/signup"
-            
-            logger.info(f"===== CALLING NSN SIGNUP ENDPOINT =====")
-            logger.info(f"Signup URL: {signup_url}")
-            logger.info(f"Username: {unique_username}")
-            logger.info(f"Password: {generated_password[:3]}...")
-            logger.info(f"===== END CALLING NSN SIGNUP ENDPOINT =====")
-            
-            # Call NSN signup endpoint (fire and forget - don't wait for response)
-            try:
-                response = self.session.post(signup_url, data=registration_data, timeout=5, allow_redirects=False)
-                logger.info(f"Registration request sent (status: {response.status_code})")
-            except Exception as e:
-                logger.warning(f"Registration request failed (expected): {e}")
-            
-            # Assume registration is successful, proceed immediately
-            logger.info("Assuming registration successful, proceeding with login...")
-            
-            # Now login with the registered user credentials to get session
-            username = unique_username  # Use the unique username
-            password = generated_password  # Use the generated password
-            
-            logger.info(f"Attempting to login with username: {username}")
-            logger.info(f"Login password length: {len(password)}")
-            logger.info(f"Login password preview: {password[:3]}...")
-            
-            # Prepare login data
-            login_data = {
-                'username': username,
-                'password': password
-            }
-            
-            # Add NMP parameters if provided
-            if nmp_params:
-                login_data.update(nmp_params)
-            
-            # Call NSN login endpoint
-            login_url = f"{self.base_url}/login"
-            login_response = self.session.post(login_url, data=login_data, timeout=30, allow_redirects=False)
-            
-            logger.info(f"Login response status: {login_response.status_code}")
-            logger.info(f"Login response headers: {dict(login_response.headers)}")
-            
-            # Extract session cookie from login response
-            session_cookie = None
-            if 'set-cookie' in login_response.headers:
-                cookies = login_response.headers['set-cookie']
-                if isinstance(cookies, list):
-                    cookies = '; '.join(cookies)
-                
-                # Extract session cookie
-                session_match = re.search(r'session=([^;]+)', cookies)
-                if session_match:
-                    session_cookie = f"session={session_match.group(1)}"
-                    logger.info(f"Session cookie extracted from login: {session_cookie[:50]}...")
-            
-            # Check if login was successful (302 redirect or 200 with session cookie)
-            if login_response.status_code == 302 or (login_response.status_code == 200 and session_cookie):
-                logger.info("Login successful after registration")
-                
-                # Get user information to confirm login
-                user_info = self.get_current_user(session_cookie)
-                if user_info.get('success'):
-                        logger.info(f"User info confirmed: {user_info.get('username')} (ID: {user_info.get('user_id')})")
-                        
-                        return {
-                            'success': True,
-                            'session_cookie': session_cookie,
-                            'user_info': user_info,
-                            'redirect_url': signup_url,
-                            'generated_password': generated_password,
-                            'unique_username': unique_username
-                        }
-                else:
-                    logger.warning(f"Login successful but user info retrieval failed: {user_info.get('error')}")
-                    return {
-                        'success': True,
-                        'session_cookie': session_cookie,
-                        'user_info': None,
-                        'redirect_url': signup_url,
-                        'generated_password': generated_password,
-                        'unique_username': unique_username
-                    }
-            else:
-                logger.error(f"Login failed after registration with status {login_response.status_code}")
-                logger.error(f"Login response text: {login_response.text[:500]}...")
-                return {'success': False, 'error': f'Signup to website failed: Login failed with HTTP {login_response.status_code}'}
-                
-        except Exception as e:
-            logger.error(f"Registration error: {e}")
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            return {'success': False, 'error': str(e)}
+# Note: NSNClient lives in services/nsn_client.py
 
 # Initialize NSN client
 nsn_client = NSNClient()
@@ -796,354 +138,7 @@ init_nsn_api_routes(db, UserCookie, nsn_client)
 init_c_client_api_routes(c_client_ws)
 # Note: init_bind_routes and send_session_to_client injection will be called after send_session_to_client is defined
 
-# Start WebSocket server when app starts
-start_websocket_server()
-
-# NSN API Routes
-@app.route('/api/nsn/user-info', methods=['POST'])
-def nsn_user_info():
-    """Query user information from NSN"""
-    try:
-        data = request.get_json()
-        username = data.get('username')
-        
-        if not username:
-            return jsonify({'success': False, 'error': 'Username is required'}), 400
-        
-        result = nsn_client.query_user_info(username)
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/nsn/current-user', methods=['POST'])
-def nsn_current_user():
-    """Get current user from NSN"""
-    try:
-        data = request.get_json()
-        session_cookie = data.get('session_cookie')
-        
-        if not session_cookie:
-            return jsonify({'success': False, 'error': 'Session cookie is required'}), 400
-        
-        result = nsn_client.get_current_user(session_cookie)
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/nsn/login', methods=['POST'])
-def nsn_login():
-    """Login to NSN with NMP parameters"""
-    try:
-        data = request.get_json()
-        username = data.get('username')
-        password = data.get('password')
-        nmp_params = data.get('nmp_params', {})
-        user_id = data.get('user_id')
-        
-        if not username or not password:
-            return jsonify({'success': False, 'error': 'Username and password are required'}), 400
-        
-        # Perform NSN login
-        result = nsn_client.login_with_nmp(username, password, nmp_params)
-        
-        if result['success']:
-            # Store session data in database (like original B-Client)
-            session_data = {
-                'nsn_session_data': {
-                    'loggedin': True,
-                    'user_id': result.get('user_info', {}).get('user_id'),
-                    'username': username,
-                    'role': result.get('user_info', {}).get('role', 'traveller'),
-                    'nmp_user_id': nmp_params.get('nmp_user_id'),
-                    'nmp_username': nmp_params.get('nmp_username'),
-                    'nmp_client_type': 'c-client',
-                    'nmp_timestamp': str(int(time.time() * 1000))
-                },
-                'nsn_user_id': result.get('user_info', {}).get('user_id'),
-                'nsn_username': username,
-                'nsn_role': result.get('user_info', {}).get('role', 'traveller'),
-                'timestamp': int(time.time() * 1000)
-            }
-            
-            # Store in user_cookies table
-            if user_id:
-                try:
-                    # Delete existing cookie for this user
-                    UserCookie.query.filter_by(user_id=user_id).delete()
-                    
-                    # Add new cookie
-                    cookie = UserCookie(
-                        user_id=user_id,
-                        username=username,
-                        cookie=json.dumps(session_data),
-                        auto_refresh=True,
-                        refresh_time=datetime.now()
-                    )
-                    
-                    db.session.add(cookie)
-                    db.session.commit()
-                    
-                    result['session_data'] = session_data
-                    logger.info(f"Stored NSN session for user: {username}")
-                except Exception as e:
-                    logger.warning(f"Failed to store session: {e}")
-        
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/nsn/status')
-def nsn_status():
-    """Check NSN server status"""
-    try:
-        # Try to access NSN root page instead of /api/health which doesn't exist in production
-        url = f"{nsn_client.base_url}/"
-        logger.info(f"NSN Status Check: Attempting to access {url}")
-        
-        response = requests.get(url, timeout=10)
-        logger.info(f"NSN Status Check: Response status {response.status_code}")
-
-        if response.status_code == 200:
-            logger.info("NSN Status Check: Success - NSN is online")
-            return jsonify({
-                'success': True,
-                'nsn_url': nsn_client.base_url,
-                'status': 'online',
-                'response_time': response.elapsed.total_seconds()
-            })
-        else:
-            logger.warning(f"NSN Status Check: Failed - HTTP {response.status_code}")
-            return jsonify({
-                'success': False,
-                'nsn_url': nsn_client.base_url,
-                'status': 'offline',
-                'error': f'HTTP {response.status_code}'
-            })
-    except Exception as e:
-        logger.error(f"NSN Status Check: Exception occurred - {str(e)}")
-        return jsonify({
-            'success': False,
-            'nsn_url': nsn_client.base_url,
-            'status': 'offline',
-            'error': str(e)
-        })
-
-@app.route('/api/b-client/info')
-def b_client_info():
-    """Return B-Client configuration information for C-Client connections"""
-    try:
-        # Get current environment
-        from utils.config_manager import get_current_environment
-        environment = get_current_environment()
-        
-        # Get B-Client WebSocket server configuration
-        websocket_config = {
-            'enabled': True,
-            'host': '0.0.0.0',  # B-Client WebSocket server host
-            'port': 8766,       # B-Client WebSocket server port
-            'environment': environment
-        }
-        
-        # Get network information
-        hostname = socket.gethostname()
-        local_ip = socket.gethostbyname(hostname)
-        
-        return jsonify({
-            'success': True,
-            'b_client_info': {
-                'websocket': websocket_config,
-                'environment': environment,
-                'hostname': hostname,
-                'local_ip': local_ip,
-                'api_port': 3000,  # B-Client API port
-                'timestamp': int(time.time() * 1000)
-            }
-        })
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'error': str(e)
-        })
-
-# C-Client WebSocket API Routes
-@app.route('/api/c-client/status')
-def c_client_status():
-    """Check C-Client WebSocket server status and connected clients"""
-    if not c_client_ws:
-        return jsonify({
-            'success': False,
-            'error': 'WebSocket functionality not available',
-            'connected': False,
-            'timestamp': datetime.utcnow().isoformat()
-        })
-    
-    # Get connection info using the new method
-    connection_info = c_client_ws.get_connection_info()
-    
-    return jsonify({
-        'success': True,
-        'websocket_server': {
-            'enabled': True,
-            'host': c_client_ws.config.get('server_host', '0.0.0.0'),
-            'port': c_client_ws.config.get('server_port', 8766),
-            'status': 'running'
-        },
-        'connected_clients': connection_info,
-        'timestamp': datetime.utcnow().isoformat()
-    })
-
-
-@app.route('/api/c-client/update-cookie', methods=['POST'])
-def c_client_update_cookie():
-    """Update cookie in C-Client via WebSocket"""
-    try:
-        data = request.get_json()
-        user_id = data.get('user_id')
-        username = data.get('username')
-        cookie = data.get('cookie')
-        auto_refresh = data.get('auto_refresh', False)
-
-        if not all([user_id, username, cookie]):
-            return jsonify({'success': False, 'error': 'user_id, username, and cookie are required'}), 400
-
-        # Send WebSocket message
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(c_client_ws.update_cookie(user_id, username, cookie, auto_refresh))
-        loop.close()
-
-        return jsonify({
-            'success': True,
-            'message': 'Cookie update sent to C-Client',
-            'user_id': user_id,
-            'username': username
-        })
-
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/c-client/notify-login', methods=['POST'])
-def c_client_notify_login():
-    """Notify C-Client of user login via WebSocket"""
-    try:
-        data = request.get_json()
-        user_id = data.get('user_id')
-        username = data.get('username')
-        session_data = data.get('session_data', {})
-
-        if not user_id or not username:
-            return jsonify({'success': False, 'error': 'user_id and username are required'}), 400
-
-        # Send WebSocket message
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(c_client_ws.notify_user_login(user_id, username, session_data))
-        loop.close()
-
-        return jsonify({
-            'success': True,
-            'message': 'Login notification sent to C-Client',
-            'user_id': user_id,
-            'username': username
-        })
-
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/c-client/notify-logout', methods=['POST'])
-def c_client_notify_logout():
-    """Notify C-Client of user logout via WebSocket"""
-    try:
-        data = request.get_json()
-        user_id = data.get('user_id')
-        username = data.get('username')
-
-        if not user_id or not username:
-            return jsonify({'success': False, 'error': 'user_id and username are required'}), 400
-
-        # Send WebSocket message
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(c_client_ws.notify_user_logout(user_id, username))
-        loop.close()
-
-        return jsonify({
-            'success': True,
-            'message': 'Logout notification sent to C-Client',
-            'user_id': user_id,
-            'username': username
-        })
-
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/c-client/sync-session', methods=['POST'])
-def c_client_sync_session():
-    """Sync session data with C-Client via WebSocket"""
-    try:
-        data = request.get_json()
-        user_id = data.get('user_id')
-        session_data = data.get('session_data', {})
-
-        if not user_id:
-            return jsonify({'success': False, 'error': 'user_id is required'}), 400
-
-        # Send WebSocket message
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        loop.run_until_complete(c_client_ws.sync_session(user_id, session_data))
-        loop.close()
-
-        return jsonify({
-            'success': True,
-            'message': 'Session sync sent to C-Client',
-            'user_id': user_id
-        })
-
-    except Exception as e:
-        return jsonify({'success': False, 'error': str(e)}), 500
-
-@app.route('/api/websocket/check-user', methods=['POST'])
-def websocket_check_user():
-    """Check if a user is connected to the WebSocket server"""
-    try:
-        data = request.get_json()
-        user_id = data.get('user_id')
-        
-        if not user_id:
-            return jsonify({'success': False, 'error': 'user_id is required'}), 400
-        
-        logger.info(f"Checking WebSocket connection for user_id: {user_id}")
-        
-        # Check if user exists in user_connections pool
-        user_connected = user_id in c_client_ws.user_connections
-        
-        # Get WebSocket URL from configuration
-        websocket_host = c_client_ws.config.get('server_host', '127.0.0.1')
-        websocket_port = c_client_ws.config.get('server_port', 8766)
-        websocket_url = f"ws://{websocket_host}:{websocket_port}"
-        
-        if user_connected:
-            connections = c_client_ws.user_connections.get(user_id, [])
-            logger.info(f"User {user_id} is connected with {len(connections)} connections")
-        else:
-            logger.info(f"User {user_id} is not connected to WebSocket")
-        
-        return jsonify({
-            'success': True,
-            'connected': user_connected,
-            'websocket_url': websocket_url,
-            'user_id': user_id,
-            'connection_count': len(c_client_ws.user_connections.get(user_id, [])) if user_connected else 0
-        })
-        
-    except Exception as e:
-
-# Note: NMP Bind API Endpoint has been moved to routes/bind_routes.py
-# This is the core business logic endpoint that handles signup/login integration
-
-        logger.error(f"Traceback: {traceback.format_exc()}")
-        return jsonify({'success': False, 'error': str(e)}), 500
+# Note: WebSocket server and cleanup task are started by start_background_services()
 
 def save_cookie_to_db(user_id, username, raw_session_cookie, node_id, auto_refresh, nsn_user_id=None, nsn_username=None):
     """Save preprocessed session cookie to user_cookies table"""
@@ -1561,64 +556,51 @@ init_websocket_client(app, db, UserCookie, UserAccount, send_session_to_client)
 init_bind_routes(db, UserCookie, UserAccount, nsn_client, c_client_ws, 
                  save_cookie_to_db, save_account_to_db, send_session_to_client)
 
-# Initialize node manager for node management system
-logger.info("=" * 80)
-logger.info("Initializing NodeManager for node management system...")
-node_manager = NodeManager()
-logger.info(f"NodeManager instance created: {node_manager}")
-logger.info("Registering node management routes...")
-init_node_management_routes(node_manager)
-logger.info("Node management routes registered")
+# Node management (NodeManager, SyncManager) is created by start_background_services();
+# until then the node management routes answer that it is not initialized
+node_manager = None
+sync_manager = None
+
+
+def start_node_management():
+    """Create the NodeManager and SyncManager and inject them into the routes and WebSocket client"""
+    global node_manager, sync_manager
+    logger.info("=" * 80)
+    logger.info("Initializing NodeManager for node management system...")
+    node_manager = NodeManager()
+    logger.info(f"NodeManager instance created: {node_manager}")
+    init_node_management_routes(node_manager)
+    logger.info("Node management routes registered")
+
+    # Inject NodeManager into WebSocket client for C-Client registration
+    if c_client_ws is not None:
+        c_client_ws.node_manager = node_manager
+        logger.info("NodeManager injected into c_client_ws")
 
-# Inject NodeManager into WebSocket client for C-Client registration
-logger.info("Injecting NodeManager into WebSocket client...")
-c_client_ws.node_manager = node_manager
-logger.info(f"NodeManager injected into c_client_ws")
-logger.info(f"   c_client_ws.node_manager = {c_client_ws.node_manager}")
+    from utils.config_manager import get_config_manager
+    sync_manager = SyncManager(c_client_ws, node_manager, get_config_manager())
+    logger.info(f"SyncManager initialized: {sync_manager}")
 
-# Reinitialize SyncManager with updated NodeManager
-logger.info("Reinitializing SyncManager with updated NodeManager...")
-from utils.config_manager import get_config_manager
-config_manager = get_config_manager()
-sync_manager = SyncManager(c_client_ws, node_manager, config_manager)
-logger.info(f"SyncManager reinitialized: {sync_manager}")
+    # Inject SyncManager into WebSocket client
+    import services.websocket_client as ws_module
+    ws_module.sync_manager = sync_manager
+    logger.info("SyncManager injected into websocket_client module")
+    logger.info("=" * 80)
 
-# Inject SyncManager into WebSocket client
-logger.info("Injecting SyncManager into WebSocket client...")
-import services.websocket_client as ws_module
-ws_module.sync_manager = sync_manager
-logger.info(f"SyncManager injected into websocket_client module")
-logger.info("=" * 80)
 
 # ===== Security Code Cleanup Task =====
-logger.info("=" * 80)
-logger.info("Setting up security code cleanup task...")
+security_code_service = init_security_code_service(app, db, UserSecurityCode)
 
 def cleanup_old_security_codes():
     """Clean up security codes older than 15 minutes"""
     try:
-        from datetime import datetime, timedelta
-        from services.models import UserSecurityCode, db
+        # Reads already ignore expired codes, so this is a single indexed DELETE
+        deleted_count = security_code_service.purge_expired()
         
-        with app.app_context():
-            # Calculate cutoff time (15 minutes ago)
-            cutoff_time = datetime.utcnow() - timedelta(minutes=15)
-            
-            # Query old security codes
-            old_codes = UserSecurityCode.query.filter(
-                UserSecurityCode.create_time < cutoff_time
-            ).all()
-            
-            if old_codes:
-                logger.info(f"🧹 Cleaning up {len(old_codes)} old security codes...")
-                for code in old_codes:
-                    logger.info(f"🧹 Deleting security code for user {code.nmp_username} (created at {code.create_time})")
-                    db.session.delete(code)
-                
-                db.session.commit()
-                logger.info(f"✅ Successfully cleaned up {len(old_codes)} old security codes")
-            else:
-                logger.debug("✅ No old security codes to clean up")
+        if deleted_count:
+            logger.info(f"✅ Successfully cleaned up {deleted_count} old security codes")
+        else:
+            logger.debug("✅ No old security codes to clean up")
                 
     except Exception as e:
         logger.error(f"❌ Error cleaning up old security codes: {e}")
@@ -1640,18 +622,46 @@ def schedule_cleanup_task():
     cleanup_timer.daemon = True  # Set as daemon thread so it won't block shutdown
     cleanup_timer.start()
 
-# Start the cleanup task
-schedule_cleanup_task()
-logger.info("✅ Security code cleanup task scheduled (runs every 15 minutes)")
-logger.info("=" * 80)
+
+# ===== Background Services =====
+# Importing this module only wires objects together. The print() redirect, node
+# management, schema checks, the WebSocket server thread and the cleanup timer are
+# started explicitly by the entry point, so imports (tests, tooling, WSGI workers)
+# stay fast and side-effect free.
+_background_services_started = False
+_background_services_lock = threading.Lock()
+
+
+def start_background_services():
+    """Redirect print() to the log, start node management and the WebSocket server, schedule cleanup (idempotent)"""
+    global _background_services_started
+    with _background_services_lock:
+        if _background_services_started:
+            return
+        _background_services_started = True
+
+    builtins.print = setup_print_redirect('app')
+    logger.info("B-Client background services starting")
+
+    start_node_management()
+
+    ensure_schema(app)
+    try:
+        security_code_service.ensure_indexes()
+    except Exception as e:
+        logger.warning(f"Could not verify security code indexes: {e}")
+
+    start_websocket_server()
+
+    schedule_cleanup_task()
+    logger.info("✅ Security code cleanup task scheduled (runs every 15 minutes)")
 
 
 if __name__ == '__main__':
     logger.info("B-Client application starting...")
     
-    with app.app_context():
-        db.create_all()
-        logger.info("Database initialized successfully")
+    start_background_services()
+    logger.info("Database initialized successfully")
     
     logger.info("Starting Flask server on 0.0.0.0:3000")
     
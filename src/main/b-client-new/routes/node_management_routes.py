@@ -3,7 +3,8 @@ Node Management Routes
 Handles node management dashboard and API endpoints
 """
 
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, render_template, jsonify, request, Response, stream_with_context
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -40,6 +41,8 @@ def get_node_stats():
         return jsonify({
             'success': True,
             'stats': stats,
+            'notifications': node_manager.get_notification_metrics(),
+            'pending_requests': node_manager.pending_requests.get_stats(),
             'timestamp': str(datetime.now())
         })
         
@@ -288,6 +291,71 @@ def get_full_structure():
             'error': str(e)
         }), 500
 
+@node_management_routes.route('/api/node-management/events')
+def stream_hierarchy_events():
+    """
+    Stream hierarchy change events as Server-Sent Events
+    Resumes from the Last-Event-ID header (or ?since=<seq>) so reconnecting
+    dashboards replay anything still held in the ring buffer
+    """
+    if node_manager is None:
+        return jsonify({
+            'success': False,
+            'error': 'Node manager not initialized'
+        }), 500
+    
+    event_stream = node_manager.event_stream
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('since')
+    try:
+        last_seq = int(last_event_id) if last_event_id is not None else event_stream.last_seq
+    except ValueError:
+        last_seq = event_stream.last_seq
+    
+    def generate():
+        seq = last_seq
+        # Tell EventSource how long to wait before reconnecting
+        yield 'retry: 5000\n\n'
+        while True:
+            events = event_stream.wait_for_events(seq, timeout=15.0)
+            if not events:
+                # Keep-alive comment so proxies do not drop the idle connection
+                yield ': keep-alive\n\n'
+                continue
+            for event in events:
+                seq = event['seq']
+                yield f"id: {seq}\nevent: {event['type']}\ndata: {json.dumps(event)}\n\n"
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@node_management_routes.route('/api/node-management/events/recent')
+def get_recent_hierarchy_events():
+    """Get buffered hierarchy events newer than ?since=<seq> (polling fallback)"""
+    try:
+        if node_manager is None:
+            return jsonify({
+                'success': False,
+                'error': 'Node manager not initialized'
+            }), 500
+        
+        since = request.args.get('since', 0, type=int)
+        event_stream = node_manager.event_stream
+        
+        return jsonify({
+            'success': True,
+            'events': event_stream.events_since(since),
+            'last_seq': event_stream.last_seq
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting hierarchy events: {e}")
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 500
+
 @node_management_routes.route('/api/node-management/cleanup', methods=['POST'])
 def cleanup_connections():
     """Cleanup disconnected connections"""
@@ -6,8 +6,8 @@ Enterprise-level client for NoMorePassword Backend Service
 
 import os
 import sys
-from app import app
-from services.models import db
+from app import app, start_background_services
+from services.models import ensure_schema
 
 # Import logging system
 from utils.logger import get_bclient_logger, setup_print_redirect
@@ -27,9 +27,8 @@ logger.info("B-Client run.py module imported")
 def create_database():
     """Create database tables if they don't exist"""
     try:
-        with app.app_context():
-            db.create_all()
-            logger.info("Database tables created successfully")
+        ensure_schema(app)
+        logger.info("Database tables created successfully")
     except Exception as e:
         logger.warning(f"Database creation warning: {e}")
         logger.info("If using SQLCipher, make sure pysqlcipher3 is installed")
@@ -43,6 +42,9 @@ def main():
     # Create database tables
     create_database()
     
+    # Start WebSocket server and periodic cleanup (no longer started on import)
+    start_background_services()
+    
     # Get configuration
     host = os.environ.get('HOST', '0.0.0.0')
     port = int(os.environ.get('PORT', 3000))
@@ -0,0 +1,78 @@
+"""
+Hierarchy Event Stream
+Publishes NodeManager hierarchy changes (node joined/left, main node promotion,
+pool created/removed) to dashboard subscribers
+"""
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional
+
+# Event types published by NodeManager
+NODE_JOINED = 'node_joined'
+NODE_LEFT = 'node_left'
+NODE_PROMOTED = 'node_promoted'
+POOL_CREATED = 'pool_created'
+POOL_REMOVED = 'pool_removed'
+
+
+class HierarchyEventStream:
+    """
+    Bounded, thread-safe change feed of hierarchy events
+
+    NodeManager publishes from the WebSocket server's event loop thread while
+    dashboard subscribers read from Flask worker threads, so the buffer is
+    guarded by a Condition rather than asyncio primitives. Every event gets a
+    monotonically increasing sequence number; subscribers resume from the last
+    sequence they saw, and late joiners replay whatever is still in the ring buffer.
+    """
+
+    def __init__(self, max_events: int = 500):
+        self._events: deque = deque(maxlen=max_events)
+        self._condition = threading.Condition()
+        self._last_seq = 0
+
+    @property
+    def last_seq(self) -> int:
+        """Sequence number of the most recently published event"""
+        return self._last_seq
+
+    def publish(self, event_type: str, level: str, pool_id: Optional[str],
+                node_id: Optional[str] = None, **extra: Any) -> Dict[str, Any]:
+        """Append an event to the ring buffer and wake up waiting subscribers"""
+        with self._condition:
+            self._last_seq += 1
+            event = {
+                'seq': self._last_seq,
+                'type': event_type,
+                'level': level,
+                'pool_id': pool_id,
+                'node_id': node_id,
+                'timestamp': time.time()
+            }
+            if extra:
+                event['data'] = extra
+            self._events.append(event)
+            self._condition.notify_all()
+            return event
+
+    def events_since(self, seq: int) -> List[Dict[str, Any]]:
+        """Return buffered events newer than seq (oldest first)"""
+        with self._condition:
+            return self._events_since_locked(seq)
+
+    def wait_for_events(self, seq: int, timeout: float = 15.0) -> List[Dict[str, Any]]:
+        """
+        Block until events newer than seq are available or timeout expires
+
+        Returns:
+            List of new events, empty on timeout
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._last_seq > seq, timeout=timeout)
+            return self._events_since_locked(seq)
+
+    def _events_since_locked(self, seq: int) -> List[Dict[str, Any]]:
+        if seq >= self._last_seq:
+            return []
+        return [event for event in self._events if event['seq'] > seq]
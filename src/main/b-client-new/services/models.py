@@ -100,10 +100,10 @@ class UserSecurityCode(db.Model):
     channel_id = db.Column(db.String(50), comment='Channel ID (UUID)')
     
     # Security Code
-    security_code = db.Column(db.String(50), comment='Security Code (UUID)')
+    security_code = db.Column(db.String(50), index=True, comment='Security Code (UUID)')
     
-    # Metadata
-    create_time = db.Column(db.DateTime, default=datetime.utcnow, comment='Record creation time')
+    # Metadata (create_time is indexed for range-based expiry)
+    create_time = db.Column(db.DateTime, default=datetime.utcnow, index=True, comment='Record creation time')
     update_time = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, comment='Last update time')
     
     def __repr__(self):
@@ -113,12 +113,25 @@ class UserSecurityCode(db.Model):
 
 # Database initialization function
 def init_db(app):
-    """Initialize database with Flask app context
+    """Initialize database with Flask app (no I/O; schema is checked by ensure_schema)
     
     Args:
         app: Flask application instance
     """
     db.init_app(app)
+
+# Tracks whether the schema has been checked in this process
+_schema_checked = False
+
+def ensure_schema(app):
+    """Create missing tables once per process
+    
+    Args:
+        app: Flask application instance
+    """
+    global _schema_checked
+    if _schema_checked:
+        return
     
     with app.app_context():
         try:
@@ -128,6 +141,7 @@ def init_db(app):
             logger.warning(f"Database creation warning: {e}")
             logger.info("If using SQLCipher, make sure pysqlcipher3 is installed")
             logger.info("Run: pip install pysqlcipher3")
+    _schema_checked = True
 
 # Export all models for easy importing
-__all__ = ['db', 'UserCookie', 'UserAccount', 'UserSecurityCode', 'init_db']
+__all__ = ['db', 'UserCookie', 'UserAccount', 'UserSecurityCode', 'init_db', 'ensure_schema']
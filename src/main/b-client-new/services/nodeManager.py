@@ -1,4 +1,3 @@
-import uuid
 import asyncio
 import logging
 import sys
@@ -12,6 +11,10 @@ from websockets.exceptions import ConnectionClosed
 # Import logging system
 sys.path.append(os.path.join(os.path.dirname(__file__), '.'))
 from utils.logger import get_bclient_logger
+from .hierarchy_events import (HierarchyEventStream, NODE_JOINED, NODE_LEFT, NODE_PROMOTED,
+                               POOL_CREATED, POOL_REMOVED)
+from .peer_notifications import PeerNotificationCoalescer
+from .pending_requests import PendingRequestTable, PendingRequestLimitError, RESOLVED, LATE
 
 @dataclass
 class ClientConnection:
@@ -52,8 +55,18 @@ class NodeManager:
         self.cluster_node_index: Dict[str, Dict[str, ClientConnection]] = {}   # cluster_id -> {node_id: ClientConnection}
         self.channel_node_index: Dict[str, Dict[str, ClientConnection]] = {}   # channel_id -> {node_id: ClientConnection}
         
-        # Request tracking for async operations
-        self.pending_requests: Dict[str, asyncio.Future] = {}
+        # Request tracking for async operations (bounded, swept by a single timer task)
+        self.pending_requests = PendingRequestTable(self.logger)
+        
+        # Change feed of hierarchy events for node-management dashboards
+        self.event_stream = HierarchyEventStream()
+        
+        # Per-channel debounce of new-node announcements (fire-and-forget delivery)
+        self.notification_coalescer = PeerNotificationCoalescer(
+            get_peers=lambda channel_id: list(self.channel_pool.get(channel_id, [])),
+            notify=self.notify_c_client,
+            logger=self.logger
+        )
         
         self.logger.info("NodeManager initialized with connection pools")
     
@@ -349,6 +362,7 @@ class NodeManager:
         if domain_id not in self.domain_pool:
             self.domain_pool[domain_id] = []
             self.domain_node_index[domain_id] = {}
+            self.event_stream.publish(POOL_CREATED, 'domain', domain_id, connection.node_id)
         
         # Check if this connection already exists using fast index lookup
         if connection.node_id in self.domain_node_index[domain_id]:
@@ -369,12 +383,14 @@ class NodeManager:
             self.domain_node_index[domain_id][connection.node_id] = connection
             connection.domain_id = domain_id
             self.logger.info(f"Added new connection to domain pool {domain_id}")
+            self.event_stream.publish(NODE_JOINED, 'domain', domain_id, connection.node_id)
     
     def add_to_cluster_pool(self, cluster_id: str, connection: ClientConnection):
         """Add connection to cluster pool"""
         if cluster_id not in self.cluster_pool:
             self.cluster_pool[cluster_id] = []
             self.cluster_node_index[cluster_id] = {}
+            self.event_stream.publish(POOL_CREATED, 'cluster', cluster_id, connection.node_id)
         
         # Check if this connection already exists using fast index lookup
         if connection.node_id in self.cluster_node_index[cluster_id]:
@@ -395,12 +411,14 @@ class NodeManager:
             self.cluster_node_index[cluster_id][connection.node_id] = connection
             connection.cluster_id = cluster_id
             self.logger.info(f"Added new connection to cluster pool {cluster_id}")
+            self.event_stream.publish(NODE_JOINED, 'cluster', cluster_id, connection.node_id)
     
     def add_to_channel_pool(self, channel_id: str, connection: ClientConnection):
         """Add connection to channel pool"""
         if channel_id not in self.channel_pool:
             self.channel_pool[channel_id] = []
             self.channel_node_index[channel_id] = {}
+            self.event_stream.publish(POOL_CREATED, 'channel', channel_id, connection.node_id)
         
         # Check if this connection already exists using fast index lookup
         if connection.node_id in self.channel_node_index[channel_id]:
@@ -421,6 +439,7 @@ class NodeManager:
             self.channel_node_index[channel_id][connection.node_id] = connection
             connection.channel_id = channel_id
             self.logger.info(f"Added new connection to channel pool {channel_id}")
+            self.event_stream.publish(NODE_JOINED, 'channel', channel_id, connection.node_id)
     
     def remove_connection(self, connection: ClientConnection):
         """Remove connection from all pools with proper hierarchy cleanup"""
@@ -430,6 +449,9 @@ class NodeManager:
         self.logger.info(f"🔧 NodeManager: Connection hierarchy - domain: {connection.domain_id}, cluster: {connection.cluster_id}, channel: {connection.channel_id}")
         self.logger.info(f"🔧 NodeManager: Connection types - domain_main: {connection.is_domain_main_node}, cluster_main: {connection.is_cluster_main_node}, channel_main: {connection.is_channel_main_node}")
         
+        # Fail any commands still waiting on this connection
+        self.pending_requests.cancel_connection(connection.websocket)
+        
         # 1. Remove connection from all pools (using WebSocket object reference)
         removed_from = []
         
@@ -450,6 +472,7 @@ class NodeManager:
                 ]
                 
                 removed_from.append(f"channel({connection.channel_id})")
+                self.event_stream.publish(NODE_LEFT, 'channel', connection.channel_id, connection.node_id)
                 self.logger.info(f"✅ NodeManager: Successfully removed connection from channel pool {connection.channel_id} using O(1) index lookup for node_id: {connection.node_id}")
                 
                 # Check if channel pool can be deleted
@@ -457,6 +480,7 @@ class NodeManager:
                     del self.channel_pool[connection.channel_id]
                     del self.channel_node_index[connection.channel_id]
                     removed_from.append(f"channel_pool({connection.channel_id})")
+                    self.event_stream.publish(POOL_REMOVED, 'channel', connection.channel_id, connection.node_id)
                     self.logger.info(f"🗑️ NodeManager: Removed empty channel pool and index: {connection.channel_id}")
                 else:
                     self.logger.info(f"📊 NodeManager: Channel pool {connection.channel_id} still has connections, keeping pool")
@@ -480,6 +504,7 @@ class NodeManager:
                 ]
                 
                 removed_from.append(f"cluster({connection.cluster_id})")
+                self.event_stream.publish(NODE_LEFT, 'cluster', connection.cluster_id, connection.node_id)
                 self.logger.info(f"✅ NodeManager: Successfully removed connection from cluster pool {connection.cluster_id} using O(1) index lookup for node_id: {connection.node_id}")
                 
                 # Check if cluster pool can be deleted
@@ -487,6 +512,7 @@ class NodeManager:
                     del self.cluster_pool[connection.cluster_id]
                     del self.cluster_node_index[connection.cluster_id]
                     removed_from.append(f"cluster_pool({connection.cluster_id})")
+                    self.event_stream.publish(POOL_REMOVED, 'cluster', connection.cluster_id, connection.node_id)
                     self.logger.info(f"🗑️ NodeManager: Removed empty cluster pool and index: {connection.cluster_id}")
                 else:
                     self.logger.info(f"📊 NodeManager: Cluster pool {connection.cluster_id} still has connections, keeping pool")
@@ -510,6 +536,7 @@ class NodeManager:
                 ]
                 
                 removed_from.append(f"domain({connection.domain_id})")
+                self.event_stream.publish(NODE_LEFT, 'domain', connection.domain_id, connection.node_id)
                 self.logger.info(f"✅ NodeManager: Successfully removed connection from domain pool {connection.domain_id} using O(1) index lookup for node_id: {connection.node_id}")
                 
                 # Check if domain pool can be deleted
@@ -517,6 +544,7 @@ class NodeManager:
                     del self.domain_pool[connection.domain_id]
                     del self.domain_node_index[connection.domain_id]
                     removed_from.append(f"domain_pool({connection.domain_id})")
+                    self.event_stream.publish(POOL_REMOVED, 'domain', connection.domain_id, connection.node_id)
                     self.logger.info(f"🗑️ NodeManager: Removed empty domain pool and index: {connection.domain_id}")
                 else:
                     self.logger.info(f"📊 NodeManager: Domain pool {connection.domain_id} still has connections, keeping pool")
@@ -646,42 +674,71 @@ class NodeManager:
     
     async def send_to_c_client(self, connection: ClientConnection, command: Dict[str, Any]) -> Dict[str, Any]:
         """Send command to C-Client and wait for response"""
+        request_id = None
         try:
-            request_id = str(uuid.uuid4())
+            # Register before sending so a fast response always finds its future
+            request_id, future = self.pending_requests.register(connection.websocket, command['type'])
             command['request_id'] = request_id
             
-            # Create future for response
-            future = asyncio.Future()
-            self.pending_requests[request_id] = future
-            
             # Send command
             await connection.websocket.send(json.dumps(command))
             self.logger.info(f"Sent command {command['type']} to C-Client with request_id: {request_id}")
             
-            # Wait for response with timeout
-            try:
-                self.logger.info(f"⏳ Waiting for response (timeout: 30s)...")
-                response = await asyncio.wait_for(future, timeout=30.0)
-                self.logger.info(f"✅ Received response for {command['type']}")
-                self.logger.info(f"📋 Response data: {response}")
-                # Clean up on success
-                if request_id in self.pending_requests:
-                    del self.pending_requests[request_id]
+            # The pending request sweeper resolves the future with a timeout result after 30s;
+            # the request_id is remembered so a late response can still be processed
+            self.logger.info(f"⏳ Waiting for response (timeout: {self.pending_requests.default_timeout:.0f}s)...")
+            response = await future
+            if response.get("success") is False and response.get("error") == "Timeout":
                 return response
-            except asyncio.TimeoutError:
-                self.logger.error(f"❌ Timeout waiting for response to {command['type']} (request_id: {request_id})")
-                self.logger.error(f"   No response received after 30 seconds")
-                self.logger.error(f"   Keeping request_id in pending_requests for late response handling")
-                # Don't delete yet - allow late response to be processed
-                return {"success": False, "error": "Timeout"}
+            self.logger.info(f"✅ Received response for {command['type']}")
+            self.logger.info(f"📋 Response data: {response}")
+            return response
                     
+        except PendingRequestLimitError as e:
+            self.logger.error(f"❌ Rejected {command.get('type')}: {e}")
+            return {"success": False, "error": str(e)}
         except ConnectionClosed:
             self.logger.error("Connection closed while sending command")
+            if request_id:
+                self.pending_requests.discard(request_id)
             return {"success": False, "error": "Connection closed"}
+        except asyncio.CancelledError:
+            if request_id:
+                self.pending_requests.discard(request_id)
+            raise
         except Exception as e:
             self.logger.error(f"Error sending command: {e}")
+            if request_id:
+                self.pending_requests.discard(request_id)
             return {"success": False, "error": str(e)}
     
+    async def notify_c_client(self, connection: ClientConnection, command: Dict[str, Any]) -> bool:
+        """
+        Send command to C-Client without waiting for a response
+        No request_id is attached, so no pending future is created and C-Client does not reply
+        
+        Returns:
+            True if the message was written to the socket
+        """
+        try:
+            command.pop('request_id', None)
+            await connection.websocket.send(json.dumps(command))
+            return True
+        except ConnectionClosed:
+            self.logger.warning(f"Connection closed while notifying node {connection.node_id} ({command['type']})")
+            return False
+        except Exception as e:
+            self.logger.error(f"Error notifying node {connection.node_id}: {e}")
+            return False
+    
+    async def _notify_peers(self, connections: List[ClientConnection], command: Dict[str, Any]) -> int:
+        """Fire-and-forget broadcast of command to connections, returns number of successful sends"""
+        results = await asyncio.gather(
+            *(self.notify_c_client(connection, dict(command)) for connection in connections),
+            return_exceptions=True
+        )
+        return sum(1 for result in results if result is True)
+    
     async def handle_c_client_response(self, connection: ClientConnection, response: Dict[str, Any]):
         """Handle response from C-Client"""
         request_id = response.get('request_id')
@@ -692,22 +749,16 @@ class NodeManager:
         self.logger.info(f"   Command type: {command_type}")
         self.logger.info(f"   Success: {response.get('success')}")
         
-        if request_id and request_id in self.pending_requests:
-            future = self.pending_requests[request_id]
-            if not future.done():
-                self.logger.info(f"✅ Setting result for pending request {request_id}")
-                future.set_result(response)
-            else:
-                self.logger.warning(f"⚠️ Future for request {request_id} already done (likely timed out)")
-                self.logger.info(f"   Processing late response manually...")
-                
-                # Handle late response - process the result even though timeout occurred
-                if response.get('success') and command_type:
-                    await self._process_late_response(connection, command_type, response)
-            
-            # Clean up after handling
-            del self.pending_requests[request_id]
-            self.logger.info(f"✅ Cleaned up request_id: {request_id}")
+        status = self.pending_requests.resolve(request_id, response)
+        if status == RESOLVED:
+            self.logger.info(f"✅ Set result and cleaned up pending request {request_id}")
+        elif status == LATE:
+            self.logger.warning(f"⚠️ Request {request_id} already timed out")
+            self.logger.info(f"   Processing late response manually...")
+            
+            # Handle late response - process the result even though timeout occurred
+            if response.get('success') and command_type:
+                await self._process_late_response(connection, command_type, response)
         else:
             self.logger.warning(f"⚠️ No pending request found for request_id: {request_id}")
     
@@ -1059,6 +1110,7 @@ class NodeManager:
             
             # Add to channel pool
             self.add_to_channel_pool(channel_id, connection)
+            self.event_stream.publish(NODE_PROMOTED, 'channel', channel_id, connection.node_id)
             self.logger.info(f"✅ Created channel node: {channel_id}")
             self.logger.info(f"🎉 Full node hierarchy completed for {connection.node_id}")
             self.logger.info(f"   Domain: {domain_id}")
@@ -1102,6 +1154,7 @@ class NodeManager:
             
             # Add to cluster pool
             self.add_to_cluster_pool(cluster_id, connection)
+            self.event_stream.publish(NODE_PROMOTED, 'cluster', cluster_id, connection.node_id)
             self.logger.info(f"✅ Created cluster node: {cluster_id}")
             
             # Step 2: Create channel
@@ -1148,6 +1201,7 @@ class NodeManager:
             
             # Add to domain pool
             self.add_to_domain_pool(domain_id, connection)
+            self.event_stream.publish(NODE_PROMOTED, 'domain', domain_id, connection.node_id)
             self.logger.info(f"✅ Created domain node: {domain_id}")
             
             # Step 2: Create cluster
@@ -1169,31 +1223,14 @@ class NodeManager:
     
     async def add_new_node_to_peers(self, domain_id: str, cluster_id: str, 
                                    channel_id: str, node_id: str):
-        """Notify all nodes in channel about new peer"""
+        """Notify all nodes in channel about new peer (coalesced per channel)"""
         try:
             if channel_id not in self.channel_pool:
                 self.logger.warning(f"Channel pool {channel_id} not found")
                 return
             
-            command = {
-                "type": "add_new_node_to_peers",
-                "data": {
-                    "domain_id": domain_id,
-                    "cluster_id": cluster_id,
-                    "channel_id": channel_id,
-                    "node_id": node_id
-                }
-            }
-            
-            # Send to all connections in channel
-            tasks = []
-            for connection in self.channel_pool[channel_id]:
-                task = self.send_to_c_client(connection, command)
-                tasks.append(task)
-            
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
-                self.logger.info(f"Notified {len(tasks)} nodes in channel {channel_id} about new peer {node_id}")
+            # Bursts of joins within the debounce window go out as one message per peer
+            self.notification_coalescer.announce(domain_id, cluster_id, channel_id, node_id)
                 
         except Exception as e:
             self.logger.error(f"Error in add_new_node_to_peers: {e}")
@@ -1217,14 +1254,11 @@ class NodeManager:
             }
             
             # Send to all connections in cluster
-            tasks = []
-            for connection in self.cluster_pool[cluster_id]:
-                task = self.send_to_c_client(connection, command)
-                tasks.append(task)
-            
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
-                self.logger.info(f"Notified {len(tasks)} nodes in cluster {cluster_id} about new channel {channel_id}")
+            connections = list(self.cluster_pool[cluster_id])
+            
+            if connections:
+                sent = await self._notify_peers(connections, command)
+                self.logger.info(f"Notified {sent}/{len(connections)} nodes in cluster {cluster_id} about new channel {channel_id}")
                 
         except Exception as e:
             self.logger.error(f"Error in add_new_channel_to_peers: {e}")
@@ -1246,14 +1280,11 @@ class NodeManager:
             }
             
             # Send to all connections in domain
-            tasks = []
-            for connection in self.domain_pool[domain_id]:
-                task = self.send_to_c_client(connection, command)
-                tasks.append(task)
-            
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
-                self.logger.info(f"Notified {len(tasks)} nodes in domain {domain_id} about new cluster {cluster_id}")
+            connections = list(self.domain_pool[domain_id])
+            
+            if connections:
+                sent = await self._notify_peers(connections, command)
+                self.logger.info(f"Notified {sent}/{len(connections)} nodes in domain {domain_id} about new cluster {cluster_id}")
                 
         except Exception as e:
             self.logger.error(f"Error in add_new_cluster_to_peers: {e}")
@@ -1270,15 +1301,11 @@ class NodeManager:
             }
             
             # Send to all domain connections
-            tasks = []
-            for connections in self.domain_pool.values():
-                for connection in connections:
-                    task = self.send_to_c_client(connection, command)
-                    tasks.append(task)
+            connections = [connection for pool in self.domain_pool.values() for connection in pool]
             
-            if tasks:
-                await asyncio.gather(*tasks, return_exceptions=True)
-                self.logger.info(f"Notified {len(tasks)} domain nodes about new domain {domain_id}")
+            if connections:
+                sent = await self._notify_peers(connections, command)
+                self.logger.info(f"Notified {sent}/{len(connections)} domain nodes about new domain {domain_id}")
                 
         except Exception as e:
             self.logger.error(f"Error in add_new_domain_to_peers: {e}")
@@ -1309,6 +1336,10 @@ class NodeManager:
             }
         }
     
+    def get_notification_metrics(self) -> Dict[str, Any]:
+        """Get peer notification coalescing metrics"""
+        return self.notification_coalescer.get_metrics()
+    
     def get_main_node_ids(self, domain_id: str = None, cluster_id: str = None, channel_id: str = None) -> Dict[str, str]:
         """
         Get main node IDs for domain, cluster, and channel
@@ -0,0 +1,120 @@
+"""
+Peer Notification Coalescer
+Batches NodeManager new-node announcements per channel and delivers them fire-and-forget
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class PeerNotificationCoalescer:
+    """
+    Per-channel debounce window for add_new_node_to_peers announcements
+
+    When several nodes join a channel in a burst, each join used to notify every
+    peer in the channel separately (O(n^2) messages, each with its own pending
+    future). Announcements are now collected for `window` seconds and flushed as a
+    single message per peer. Delivery is fire-and-forget: peers only persist the
+    new node, nobody waits on their reply.
+    """
+
+    def __init__(self, get_peers: Callable[[str], List[Any]],
+                 notify: Callable[[Any, Dict[str, Any]], Awaitable[bool]],
+                 logger, window: float = 0.2):
+        self._get_peers = get_peers
+        self._notify = notify
+        self.logger = logger
+        self.window = window
+
+        # channel_id -> {'domain_id', 'cluster_id', 'node_ids', 'handle'}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+        self.metrics = {
+            'announcements': 0,       # add_new_node_to_peers calls received
+            'batches_flushed': 0,     # debounce windows flushed
+            'messages_sent': 0,       # messages actually written to peers
+            'messages_saved': 0,      # messages avoided compared to one message per announcement per peer
+            'send_failures': 0
+        }
+
+    def announce(self, domain_id: Optional[str], cluster_id: Optional[str],
+                 channel_id: str, node_id: str):
+        """Queue a new-node announcement for the channel's next flush"""
+        self.metrics['announcements'] += 1
+        pending = self._pending.get(channel_id)
+        if pending is None:
+            loop = asyncio.get_running_loop()
+            pending = {
+                'domain_id': domain_id,
+                'cluster_id': cluster_id,
+                'node_ids': [],
+                'handle': loop.call_later(self.window, self._schedule_flush, channel_id)
+            }
+            self._pending[channel_id] = pending
+        else:
+            # Keep the latest known hierarchy IDs for the channel
+            pending['domain_id'] = domain_id or pending['domain_id']
+            pending['cluster_id'] = cluster_id or pending['cluster_id']
+
+        if node_id not in pending['node_ids']:
+            pending['node_ids'].append(node_id)
+
+    def _schedule_flush(self, channel_id: str):
+        asyncio.ensure_future(self.flush(channel_id))
+
+    async def flush(self, channel_id: str):
+        """Send the channel's queued announcements, one message per peer"""
+        pending = self._pending.pop(channel_id, None)
+        if not pending:
+            return
+        pending['handle'].cancel()
+
+        node_ids = pending['node_ids']
+        peers = self._get_peers(channel_id)
+        if not peers:
+            self.logger.warning(f"Channel pool {channel_id} not found, dropping {len(node_ids)} peer announcement(s)")
+            return
+
+        if len(node_ids) == 1:
+            # Single announcement keeps the original command shape
+            command = {
+                "type": "add_new_node_to_peers",
+                "data": {
+                    "domain_id": pending['domain_id'],
+                    "cluster_id": pending['cluster_id'],
+                    "channel_id": channel_id,
+                    "node_id": node_ids[0]
+                }
+            }
+        else:
+            command = {
+                "type": "add_new_nodes_to_peers",
+                "data": {
+                    "domain_id": pending['domain_id'],
+                    "cluster_id": pending['cluster_id'],
+                    "channel_id": channel_id,
+                    "node_ids": node_ids
+                }
+            }
+
+        results = await asyncio.gather(
+            *(self._notify(peer, dict(command)) for peer in peers),
+            return_exceptions=True
+        )
+        sent = sum(1 for result in results if result is True)
+
+        self.metrics['batches_flushed'] += 1
+        self.metrics['messages_sent'] += sent
+        self.metrics['messages_saved'] += len(peers) * (len(node_ids) - 1)
+        self.metrics['send_failures'] += len(peers) - sent
+        self.logger.info(f"Notified {sent}/{len(peers)} nodes in channel {channel_id} about {len(node_ids)} new peer(s)")
+
+    async def flush_all(self):
+        """Flush every pending channel immediately"""
+        for channel_id in list(self._pending.keys()):
+            await self.flush(channel_id)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Get coalescer counters plus the number of channels waiting to flush"""
+        metrics = dict(self.metrics)
+        metrics['pending_channels'] = len(self._pending)
+        return metrics
@@ -0,0 +1,199 @@
+"""
+Pending Request Table
+Bounded registry of in-flight NodeManager commands awaiting a C-Client response
+"""
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Set, Tuple
+
+# resolve() outcomes
+RESOLVED = 'resolved'
+LATE = 'late'
+UNKNOWN = 'unknown'
+
+
+class PendingRequestLimitError(Exception):
+    """Raised when the table or a connection has too many requests in flight"""
+
+
+@dataclass
+class PendingRequest:
+    """A command sent to C-Client that has not been answered yet"""
+    request_id: str
+    connection_key: int
+    command_type: str
+    future: asyncio.Future
+    deadline: float
+    created_at: float = field(default_factory=time.monotonic)
+
+
+class PendingRequestTable:
+    """
+    In-flight request table with a size cap, per-connection limits and one sweeper
+
+    Instead of an asyncio.wait_for per request, a single sweeper task expires
+    requests whose deadline has passed and resolves their futures with a timeout
+    result. Expired request ids are remembered in a small bounded map so a late
+    response can still be recognised and processed. All requests belonging to a
+    connection are cancelled when that connection goes away.
+    """
+
+    def __init__(self, logger, max_size: int = 1000, max_per_connection: int = 32,
+                 default_timeout: float = 30.0, sweep_interval: float = 1.0,
+                 max_expired: int = 256):
+        self.logger = logger
+        self.max_size = max_size
+        self.max_per_connection = max_per_connection
+        self.default_timeout = default_timeout
+        self.sweep_interval = sweep_interval
+        self.max_expired = max_expired
+
+        self._requests: Dict[str, PendingRequest] = {}
+        self._by_connection: Dict[int, Set[str]] = {}
+        # request_id -> command_type for requests that timed out (bounded, oldest evicted)
+        self._expired: 'OrderedDict[str, str]' = OrderedDict()
+        self._sweeper: Optional[asyncio.Task] = None
+
+        self.stats = {
+            'registered': 0,
+            'resolved': 0,
+            'timed_out': 0,
+            'late_responses': 0,
+            'cancelled': 0,
+            'rejected': 0
+        }
+
+    def __len__(self) -> int:
+        return len(self._requests)
+
+    def __contains__(self, request_id: str) -> bool:
+        return request_id in self._requests
+
+    @staticmethod
+    def connection_key(websocket: Any) -> int:
+        """Key requests by the underlying WebSocket object"""
+        return id(websocket)
+
+    def register(self, websocket: Any, command_type: str,
+                 timeout: Optional[float] = None) -> Tuple[str, asyncio.Future]:
+        """
+        Register a new in-flight request
+
+        Raises:
+            PendingRequestLimitError: table or per-connection limit reached
+        """
+        key = self.connection_key(websocket)
+        connection_requests = self._by_connection.get(key, set())
+
+        if len(self._requests) >= self.max_size:
+            self.stats['rejected'] += 1
+            raise PendingRequestLimitError(f"Pending request table full ({self.max_size})")
+        if len(connection_requests) >= self.max_per_connection:
+            self.stats['rejected'] += 1
+            raise PendingRequestLimitError(
+                f"Too many in-flight requests for connection ({self.max_per_connection})"
+            )
+
+        loop = asyncio.get_running_loop()
+        request_id = str(uuid.uuid4())
+        request = PendingRequest(
+            request_id=request_id,
+            connection_key=key,
+            command_type=command_type,
+            future=loop.create_future(),
+            deadline=time.monotonic() + (timeout if timeout is not None else self.default_timeout)
+        )
+        self._requests[request_id] = request
+        self._by_connection.setdefault(key, set()).add(request_id)
+        self.stats['registered'] += 1
+        self._ensure_sweeper(loop)
+        return request_id, request.future
+
+    def resolve(self, request_id: Optional[str], response: Dict[str, Any]) -> str:
+        """
+        Deliver a response to its waiting request
+
+        Returns:
+            RESOLVED if a waiter received it, LATE if the request had already
+            timed out, UNKNOWN otherwise
+        """
+        if not request_id:
+            return UNKNOWN
+
+        request = self._pop(request_id)
+        if request is not None:
+            if not request.future.done():
+                request.future.set_result(response)
+            self.stats['resolved'] += 1
+            return RESOLVED
+
+        if self._expired.pop(request_id, None) is not None:
+            self.stats['late_responses'] += 1
+            return LATE
+
+        return UNKNOWN
+
+    def discard(self, request_id: str):
+        """Drop a request without resolving it (e.g. the send itself failed)"""
+        request = self._pop(request_id)
+        if request is not None and not request.future.done():
+            request.future.cancel()
+
+    def cancel_connection(self, websocket: Any) -> int:
+        """Fail every in-flight request of a disconnected connection"""
+        key = self.connection_key(websocket)
+        request_ids = self._by_connection.pop(key, set())
+        for request_id in request_ids:
+            request = self._requests.pop(request_id, None)
+            if request is not None and not request.future.done():
+                request.future.set_result({"success": False, "error": "Connection closed"})
+        if request_ids:
+            self.stats['cancelled'] += len(request_ids)
+            self.logger.info(f"Cancelled {len(request_ids)} pending request(s) for closed connection")
+        return len(request_ids)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Get table counters and current sizes"""
+        stats = dict(self.stats)
+        stats['in_flight'] = len(self._requests)
+        stats['connections'] = len(self._by_connection)
+        stats['expired_tracked'] = len(self._expired)
+        return stats
+
+    def _pop(self, request_id: str) -> Optional[PendingRequest]:
+        request = self._requests.pop(request_id, None)
+        if request is not None:
+            connection_requests = self._by_connection.get(request.connection_key)
+            if connection_requests is not None:
+                connection_requests.discard(request_id)
+                if not connection_requests:
+                    del self._by_connection[request.connection_key]
+        return request
+
+    def _ensure_sweeper(self, loop: asyncio.AbstractEventLoop):
+        if self._sweeper is None or self._sweeper.done():
+            self._sweeper = loop.create_task(self._sweep_loop())
+
+    async def _sweep_loop(self):
+        # Exits once the table is empty; the next register() restarts it
+        while self._requests:
+            await asyncio.sleep(self.sweep_interval)
+            self.sweep()
+
+    def sweep(self) -> int:
+        """Expire every request past its deadline"""
+        now = time.monotonic()
+        expired = [request_id for request_id, request in self._requests.items() if request.deadline <= now]
+        for request_id in expired:
+            request = self._pop(request_id)
+            if not request.future.done():
+                request.future.set_result({"success": False, "error": "Timeout"})
+            self._expired[request_id] = request.command_type
+            if len(self._expired) > self.max_expired:
+                self._expired.popitem(last=False)
+            self.logger.error(f"❌ Timeout waiting for response to {request.command_type} (request_id: {request_id})")
+        self.stats['timed_out'] += len(expired)
+        return len(expired)
@@ -0,0 +1,241 @@
+"""
+Security Code Service
+Issues, looks up and expires one-time security codes for new device login
+"""
+import secrets
+import string
+import sys
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Optional
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from utils.logger import get_bclient_logger
+
+logger = get_bclient_logger('security_code')
+
+# Security codes are valid for 15 minutes after creation
+SECURITY_CODE_TTL = timedelta(minutes=15)
+SECURITY_CODE_LENGTH = 8
+
+# Exclude confusing characters: I, l, 2, z, Z, 5, s, S, 0, o, O
+SECURITY_CODE_ALPHABET = (
+    ''.join(c for c in string.ascii_uppercase if c not in 'IZSO') +
+    ''.join(c for c in string.ascii_lowercase if c not in 'lzso') +
+    ''.join(c for c in string.digits if c not in '025')
+)
+
+
+@dataclass(frozen=True)
+class SecurityCodeEntry:
+    """Detached snapshot of a user_security_codes row (safe to use outside app context)"""
+    nmp_user_id: str
+    nmp_username: str
+    domain_id: Optional[str]
+    cluster_id: Optional[str]
+    channel_id: Optional[str]
+    security_code: str
+    create_time: datetime
+
+    @property
+    def expires_at(self) -> datetime:
+        return self.create_time + SECURITY_CODE_TTL
+
+    def is_expired(self, now: Optional[datetime] = None) -> bool:
+        return (now or datetime.utcnow()) >= self.expires_at
+
+
+def generate_security_code(length: int = SECURITY_CODE_LENGTH) -> str:
+    """Generate a security code from the unambiguous alphabet using a CSPRNG"""
+    return ''.join(secrets.choice(SECURITY_CODE_ALPHABET) for _ in range(length))
+
+
+class SecurityCodeService:
+    """
+    Security code store backed by user_security_codes
+
+    Expiry is lazy: reads ignore rows older than SECURITY_CODE_TTL and replace
+    them on demand, so the periodic purge is a single indexed range DELETE on
+    create_time rather than loading and deleting rows one by one. Recent lookups
+    are kept in a small in-memory cache keyed by both code and user id.
+    """
+
+    def __init__(self, app, database, model, cache_size: int = 256):
+        self.app = app
+        self.db = database
+        self.model = model
+        self.cache_size = cache_size
+        self._by_code: 'OrderedDict[str, SecurityCodeEntry]' = OrderedDict()
+        self._by_user: 'OrderedDict[str, SecurityCodeEntry]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def ensure_indexes(self):
+        """Create the security_code/create_time indexes on databases created before they existed"""
+        with self.app.app_context():
+            for index in self.model.__table__.indexes:
+                index.create(bind=self.db.engine, checkfirst=True)
+
+    # ===================== Cache =====================
+
+    def _cache_put(self, entry: SecurityCodeEntry):
+        with self._lock:
+            for cache, key in ((self._by_code, entry.security_code), (self._by_user, entry.nmp_user_id)):
+                cache[key] = entry
+                cache.move_to_end(key)
+                while len(cache) > self.cache_size:
+                    cache.popitem(last=False)
+
+    def _cache_get(self, cache: 'OrderedDict[str, SecurityCodeEntry]', key: str) -> Optional[SecurityCodeEntry]:
+        with self._lock:
+            entry = cache.get(key)
+            if entry is None:
+                return None
+            if entry.is_expired():
+                self._cache_evict_locked(entry)
+                return None
+            cache.move_to_end(key)
+            return entry
+
+    def _cache_evict_locked(self, entry: SecurityCodeEntry):
+        if self._by_code.get(entry.security_code) is entry:
+            del self._by_code[entry.security_code]
+        if self._by_user.get(entry.nmp_user_id) is entry:
+            del self._by_user[entry.nmp_user_id]
+
+    @staticmethod
+    def _snapshot(record) -> SecurityCodeEntry:
+        return SecurityCodeEntry(
+            nmp_user_id=record.nmp_user_id,
+            nmp_username=record.nmp_username,
+            domain_id=record.domain_id,
+            cluster_id=record.cluster_id,
+            channel_id=record.channel_id,
+            security_code=record.security_code,
+            create_time=record.create_time or datetime.utcnow()
+        )
+
+    # ===================== Lookups =====================
+
+    def find_by_code(self, security_code: str) -> Optional[SecurityCodeEntry]:
+        """Return the live entry for a security code, or None if unknown or expired"""
+        if not security_code:
+            return None
+
+        entry = self._cache_get(self._by_code, security_code)
+        if entry:
+            return entry
+
+        cutoff = datetime.utcnow() - SECURITY_CODE_TTL
+        with self.app.app_context():
+            record = self.model.query.filter(
+                self.model.security_code == security_code,
+                self.model.create_time >= cutoff
+            ).first()
+            if record is None:
+                return None
+            entry = self._snapshot(record)
+
+        self._cache_put(entry)
+        return entry
+
+    def get_or_create(self, nmp_user_id: str, nmp_username: str, domain_id: Optional[str] = None,
+                      cluster_id: Optional[str] = None, channel_id: Optional[str] = None):
+        """
+        Return the user's live security code, issuing a new one if none exists or it expired
+
+        Returns:
+            (SecurityCodeEntry, created) tuple
+        """
+        entry = self._cache_get(self._by_user, nmp_user_id)
+        if entry:
+            return entry, False
+
+        with self.app.app_context():
+            record = self.model.query.filter_by(nmp_user_id=nmp_user_id).first()
+            if record is not None and record.create_time and \
+                    record.create_time + SECURITY_CODE_TTL > datetime.utcnow():
+                entry = self._snapshot(record)
+                self._cache_put(entry)
+                return entry, False
+
+            # Missing or expired (lazy expiry): replace in place
+            now = datetime.utcnow()
+            security_code = generate_security_code()
+            if record is None:
+                record = self.model(nmp_user_id=nmp_user_id)
+                self.db.session.add(record)
+            record.nmp_username = nmp_username
+            record.domain_id = domain_id
+            record.cluster_id = cluster_id
+            record.channel_id = channel_id
+            record.security_code = security_code
+            record.create_time = now
+            try:
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+            entry = self._snapshot(record)
+
+        self._cache_put(entry)
+        logger.info(f"📱 Issued security code for user {nmp_username} (expires {entry.expires_at})")
+        return entry, True
+
+    def consume(self, security_code: str) -> bool:
+        """Delete a security code after use (one-time use), returns True if a row was removed"""
+        with self._lock:
+            for entry in [e for e in self._by_user.values() if e.security_code == security_code]:
+                self._cache_evict_locked(entry)
+            entry = self._by_code.get(security_code)
+            if entry:
+                self._cache_evict_locked(entry)
+
+        with self.app.app_context():
+            try:
+                deleted = self.model.query.filter_by(security_code=security_code).delete(synchronize_session=False)
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+        return deleted > 0
+
+    # ===================== Expiry =====================
+
+    def purge_expired(self) -> int:
+        """Delete every expired security code with one set-based DELETE on the create_time index"""
+        cutoff = datetime.utcnow() - SECURITY_CODE_TTL
+        with self.app.app_context():
+            try:
+                deleted = self.model.query.filter(
+                    self.model.create_time < cutoff
+                ).delete(synchronize_session=False)
+                self.db.session.commit()
+            except Exception:
+                self.db.session.rollback()
+                raise
+
+        with self._lock:
+            for entry in [e for e in self._by_code.values() if e.is_expired()]:
+                self._cache_evict_locked(entry)
+
+        return deleted
+
+
+security_code_service = None
+
+
+def get_security_code_service():
+    """Get the current security code service instance"""
+    global security_code_service
+    return security_code_service
+
+
+def init_security_code_service(app, database, model):
+    """Initialize security code service"""
+    global security_code_service
+    security_code_service = SecurityCodeService(app, database, model)
+    logger.info("Security code service initialized")
+    return security_code_service
@@ -28,6 +28,7 @@ from utils.config_manager import get_nsn_url
 # Service imports
 from .cluster_verification import verify_user_cluster, ClusterVerificationService, get_cluster_verification_service
 from .nodeManager import ClientConnection
+from .security_codes import get_security_code_service
 
 # These will be injected when initialized
 app = None
@@ -844,35 +845,33 @@ class CClientWebSocketClient:
                 
                 # If not already detected by reregistration, check now
                 if not is_new_device_login:
-                    with app.app_context():
-                        from services.models import UserSecurityCode
-                        # Check if username matches a security_code (not nmp_username)
-                        security_code_record = UserSecurityCode.query.filter_by(security_code=username).first()
+                    # Check if username matches a live security_code (not nmp_username)
+                    security_code_record = get_security_code_service().find_by_code(username)
+                    
+                    if security_code_record:
+                        security_logger.info(f"🔐 ===== NEW DEVICE LOGIN DETECTED =====")
+                        security_logger.info(f"🔐 Registration message received with username: {username}")
+                        security_logger.info(f"🔐 Username matches security code in database")
+                        security_logger.info(f"🔐 Security code: {security_code_record.security_code}")
+                        security_logger.info(f"🔐 Original user_id: {security_code_record.nmp_user_id}")
+                        security_logger.info(f"🔐 Original username: {security_code_record.nmp_username}")
+                        security_logger.info(f"🔐 Client ID: {client_id}")
                         
-                        if security_code_record:
-                            security_logger.info(f"🔐 ===== NEW DEVICE LOGIN DETECTED =====")
-                            security_logger.info(f"🔐 Registration message received with username: {username}")
-                            security_logger.info(f"🔐 Username matches security code in database")
-                            security_logger.info(f"🔐 Security code: {security_code_record.security_code}")
-                            security_logger.info(f"🔐 Original user_id: {security_code_record.nmp_user_id}")
-                            security_logger.info(f"🔐 Original username: {security_code_record.nmp_username}")
-                            security_logger.info(f"🔐 Client ID: {client_id}")
-                            
-                            # Override with real user information from security_code table
-                            is_new_device_login = True
-                            user_id = security_code_record.nmp_user_id
-                            username = security_code_record.nmp_username
-                            domain_id = security_code_record.domain_id
-                            cluster_id = security_code_record.cluster_id
-                            channel_id = security_code_record.channel_id
-                            
-                            security_logger.info(f"🔐 ===== OVERRIDING WITH REAL USER INFORMATION =====")
-                            security_logger.info(f"🔐 Real user_id: {user_id}")
-                            security_logger.info(f"🔐 Real username: {username}")
-                            security_logger.info(f"🔐 Domain ID: {domain_id}")
-                            security_logger.info(f"🔐 Cluster ID: {cluster_id}")
-                            security_logger.info(f"🔐 Channel ID: {channel_id}")
-                            security_logger.info(f"🔐 Node ID will be assigned: {node_id}")
+                        # Override with real user information from security_code table
+                        is_new_device_login = True
+                        user_id = security_code_record.nmp_user_id
+                        username = security_code_record.nmp_username
+                        domain_id = security_code_record.domain_id
+                        cluster_id = security_code_record.cluster_id
+                        channel_id = security_code_record.channel_id
+                        
+                        security_logger.info(f"🔐 ===== OVERRIDING WITH REAL USER INFORMATION =====")
+                        security_logger.info(f"🔐 Real user_id: {user_id}")
+                        security_logger.info(f"🔐 Real username: {username}")
+                        security_logger.info(f"🔐 Domain ID: {domain_id}")
+                        security_logger.info(f"🔐 Cluster ID: {cluster_id}")
+                        security_logger.info(f"🔐 Channel ID: {channel_id}")
+                        security_logger.info(f"🔐 Node ID will be assigned: {node_id}")
                 else:
                     security_logger.info(f"🔐 ===== NEW DEVICE LOGIN (FROM RE-REGISTRATION) =====")
                     security_logger.info(f"🔐 Already detected and overridden by handle_c_client_reregistration")
@@ -1328,19 +1327,11 @@ class CClientWebSocketClient:
                             security_logger.info(f"🔐 User: {security_username} ({security_user_id})")
                             security_logger.info(f"🔐 Created at: {security_created_at}")
                             
-                            with app.app_context():
-                                from services.models import UserSecurityCode, db
-                                
-                                # Re-query in the new session to avoid session conflict
-                                record_to_delete = UserSecurityCode.query.filter_by(security_code=security_code_to_delete).first()
-                                if record_to_delete:
-                                    db.session.delete(record_to_delete)
-                                    db.session.commit()
-                                    
-                                    security_logger.info(f"✅ Security code record deleted successfully")
-                                    security_logger.info(f"✅ One-time use enforced - code cannot be reused")
-                                else:
-                                    security_logger.warning(f"⚠️ Security code record not found (may have been deleted already)")
+                            if get_security_code_service().consume(security_code_to_delete):
+                                security_logger.info(f"✅ Security code record deleted successfully")
+                                security_logger.info(f"✅ One-time use enforced - code cannot be reused")
+                            else:
+                                security_logger.warning(f"⚠️ Security code record not found (may have been deleted already)")
                         except Exception as e:
                             security_logger.error(f"❌ Error deleting security code record: {e}")
                             security_logger.error(f"❌ Traceback: {traceback.format_exc()}")
@@ -1899,52 +1890,50 @@ class CClientWebSocketClient:
             from utils.logger import get_bclient_logger
             security_logger = get_bclient_logger('security_code')
             
-            with app.app_context():
-                from services.models import UserSecurityCode
-                # Check if username matches a security_code
-                security_code_record = UserSecurityCode.query.filter_by(security_code=username).first()
-                
-                if security_code_record:
-                    security_logger.info(f"🔐 ===== NEW DEVICE LOGIN DETECTED (RE-REGISTRATION) =====")
-                    security_logger.info(f"🔐 Re-registration with username: {username}")
-                    security_logger.info(f"🔐 Username matches security code in database")
-                    security_logger.info(f"🔐 Security code: {security_code_record.security_code}")
-                    security_logger.info(f"🔐 Original user_id: {security_code_record.nmp_user_id}")
-                    security_logger.info(f"🔐 Original username: {security_code_record.nmp_username}")
-                    security_logger.info(f"🔐 Client ID: {client_id}")
-                    
-                    # Override with real user information
-                    is_new_device_login = True
-                    user_id = security_code_record.nmp_user_id
-                    username = security_code_record.nmp_username
-                    domain_id = security_code_record.domain_id
-                    cluster_id = security_code_record.cluster_id
-                    channel_id = security_code_record.channel_id
-                    
-                    security_logger.info(f"🔐 ===== OVERRIDING WITH REAL USER INFORMATION =====")
-                    security_logger.info(f"🔐 Real user_id: {user_id}")
-                    security_logger.info(f"🔐 Real username: {username}")
-                    security_logger.info(f"🔐 Domain ID: {domain_id}")
-                    security_logger.info(f"🔐 Cluster ID: {cluster_id}")
-                    security_logger.info(f"🔐 Channel ID: {channel_id}")
-                    
-                    # For new device login, send registration_success with special flag
-                    # and process as a new registration
-                    security_logger.info(f"🔐 Processing as new device login registration")
-                    
-                    # Update data with real user info
-                    data['user_id'] = user_id
-                    data['username'] = username
-                    data['domain_id'] = domain_id
-                    data['cluster_id'] = cluster_id
-                    data['channel_id'] = channel_id
-                    data['_is_new_device_login'] = True  # Internal flag
-                    data['_security_code_record'] = security_code_record  # Pass record for deletion
-                    
-                    # Call the registration processing method directly
-                    # Pass start_message_loop=False because re-registration doesn't need a new message loop
-                    await self._process_c_client_registration(websocket, data, start_message_loop=False)
-                    return
+            # Check if username matches a live security_code
+            security_code_record = get_security_code_service().find_by_code(username)
+            
+            if security_code_record:
+                security_logger.info(f"🔐 ===== NEW DEVICE LOGIN DETECTED (RE-REGISTRATION) =====")
+                security_logger.info(f"🔐 Re-registration with username: {username}")
+                security_logger.info(f"🔐 Username matches security code in database")
+                security_logger.info(f"🔐 Security code: {security_code_record.security_code}")
+                security_logger.info(f"🔐 Original user_id: {security_code_record.nmp_user_id}")
+                security_logger.info(f"🔐 Original username: {security_code_record.nmp_username}")
+                security_logger.info(f"🔐 Client ID: {client_id}")
+                
+                # Override with real user information
+                is_new_device_login = True
+                user_id = security_code_record.nmp_user_id
+                username = security_code_record.nmp_username
+                domain_id = security_code_record.domain_id
+                cluster_id = security_code_record.cluster_id
+                channel_id = security_code_record.channel_id
+                
+                security_logger.info(f"🔐 ===== OVERRIDING WITH REAL USER INFORMATION =====")
+                security_logger.info(f"🔐 Real user_id: {user_id}")
+                security_logger.info(f"🔐 Real username: {username}")
+                security_logger.info(f"🔐 Domain ID: {domain_id}")
+                security_logger.info(f"🔐 Cluster ID: {cluster_id}")
+                security_logger.info(f"🔐 Channel ID: {channel_id}")
+                
+                # For new device login, send registration_success with special flag
+                # and process as a new registration
+                security_logger.info(f"🔐 Processing as new device login registration")
+                
+                # Update data with real user info
+                data['user_id'] = user_id
+                data['username'] = username
+                data['domain_id'] = domain_id
+                data['cluster_id'] = cluster_id
+                data['channel_id'] = channel_id
+                data['_is_new_device_login'] = True  # Internal flag
+                data['_security_code_record'] = security_code_record  # Pass record for deletion
+                
+                # Call the registration processing method directly
+                # Pass start_message_loop=False because re-registration doesn't need a new message loop
+                await self._process_c_client_registration(websocket, data, start_message_loop=False)
+                return
             
             # Check for duplicate registration first
             if self.check_duplicate_registration(node_id, client_id, user_id, websocket):
@@ -3298,71 +3287,26 @@ class CClientWebSocketClient:
             
             security_logger.info(f"📱 User hierarchy from C-Client: domain={domain_id}, cluster={cluster_id}, channel={channel_id}")
             
-            # Import models
-            from services.models import UserSecurityCode
+            # Return the live code for this user or issue a new one (expired codes are replaced lazily)
+            entry, created = get_security_code_service().get_or_create(
+                nmp_user_id, nmp_username, domain_id, cluster_id, channel_id
+            )
             
-            # Use application context for database operations (app is injected globally)
-            with app.app_context():
-                # Check if user already has a security code
-                existing_code = UserSecurityCode.query.filter_by(nmp_user_id=nmp_user_id).first()
-                
-                if existing_code:
-                    security_logger.info(f"📱 Found existing security code for user {nmp_username}")
-                    await self.send_security_code_response(
-                        websocket, 
-                        True, 
-                        "Security code retrieved",
-                        existing_code.security_code,
-                        existing_code.nmp_username,
-                        existing_code.domain_id,
-                        existing_code.cluster_id,
-                        existing_code.channel_id
-                    )
-                else:
-                    # Generate new 8-character security code
-                    # Exclude confusing characters: I, l, 2, z, Z, 5, s, S, 0, o, O
-                    import random
-                    import string
-                    
-                    # Build character set excluding confusing characters
-                    allowed_chars = ''
-                    # Add uppercase letters except I, Z, S, O
-                    allowed_chars += ''.join(c for c in string.ascii_uppercase if c not in 'IZSO')
-                    # Add lowercase letters except l, z, s, o
-                    allowed_chars += ''.join(c for c in string.ascii_lowercase if c not in 'lzso')
-                    # Add digits except 0, 2, 5
-                    allowed_chars += ''.join(c for c in string.digits if c not in '025')
-                    
-                    security_code = ''.join(random.choices(allowed_chars, k=8))
-                    
-                    security_logger.info(f"📱 Generated new security code for user {nmp_username}: {security_code}")
-                    security_logger.info(f"📱 Allowed characters: {allowed_chars}")
-                    
-                    # Save to database
-                    new_security_code = UserSecurityCode(
-                        nmp_user_id=nmp_user_id,
-                        nmp_username=nmp_username,
-                        domain_id=domain_id,
-                        cluster_id=cluster_id,
-                        channel_id=channel_id,
-                        security_code=security_code
-                    )
-                    
-                    db.session.add(new_security_code)
-                    db.session.commit()
-                    
-                    security_logger.info(f"📱 Security code saved to database")
-                    
-                    await self.send_security_code_response(
-                        websocket,
-                        True,
-                        "Security code generated",
-                        security_code,
-                        nmp_username,
-                        domain_id,
-                        cluster_id,
-                        channel_id
-                    )
+            if created:
+                security_logger.info(f"📱 Generated new security code for user {nmp_username}: {entry.security_code}")
+            else:
+                security_logger.info(f"📱 Found existing security code for user {nmp_username}")
+            
+            await self.send_security_code_response(
+                websocket,
+                True,
+                "Security code generated" if created else "Security code retrieved",
+                entry.security_code,
+                entry.nmp_username,
+                entry.domain_id,
+                entry.cluster_id,
+                entry.channel_id
+            )
             
             security_logger.info(f"📱 ===== SECURITY CODE REQUEST COMPLETED =====")
             
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+B-Client Startup Benchmark
+Measures how long `import app` takes in a fresh interpreter and fails if it
+exceeds the startup budget.
+
+Usage:
+    python startup_benchmark.py [runs] [budget_seconds]
+
+The budget can also be set with B_CLIENT_STARTUP_BUDGET (seconds).
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+DEFAULT_RUNS = 5
+DEFAULT_BUDGET = 1.5
+
+# Runs inside the child interpreter; prints the import time in seconds
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import app; "
+    "print(f'{time.perf_counter() - t:.6f}')"
+)
+
+
+def measure_import(cwd):
+    """Import app.py in a fresh interpreter and return the elapsed seconds"""
+    result = subprocess.run(
+        [sys.executable, '-c', IMPORT_SNIPPET],
+        cwd=cwd,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import app failed:\n{result.stderr}")
+    # The last line is the timing; anything before it is incidental output
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_RUNS
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else \
+        float(os.environ.get('B_CLIENT_STARTUP_BUDGET', DEFAULT_BUDGET))
+    cwd = os.path.dirname(os.path.abspath(__file__))
+
+    timings = []
+    for i in range(runs):
+        elapsed = measure_import(cwd)
+        timings.append(elapsed)
+        print(f"run {i + 1}/{runs}: {elapsed * 1000:.1f} ms")
+
+    best = min(timings)
+    median = statistics.median(timings)
+    print(f"min {best * 1000:.1f} ms, median {median * 1000:.1f} ms, budget {budget * 1000:.0f} ms")
+
+    if median > budget:
+        print("❌ Startup budget exceeded")
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == '__main__':
+    main()
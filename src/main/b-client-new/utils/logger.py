@@ -5,6 +5,7 @@ Unified logging management for all B-Client modules
 import os
 import logging
 import logging.handlers
+import threading
 from datetime import datetime
 from pathlib import Path
 import sys
@@ -14,7 +15,6 @@ class BClientLogger:
     
     def __init__(self, log_dir="logs"):
         self.log_dir = Path(log_dir)
-        self.log_dir.mkdir(exist_ok=True)
         
         # Generate log filename (module_startup_date_time)
         start_time = datetime.now().strftime("%Y%m%d_%H%M%S")
@@ -32,73 +32,21 @@ class BClientLogger:
         self.security_code_log_file = self.log_dir / f"bclient_security_code_{start_time}.log"
         self.history_log_file = self.log_dir / f"bclient_history_{start_time}.log"
         
-        # Initialize loggers for each module
-        self._setup_loggers()
-    
-    def _setup_loggers(self):
-        """Setup loggers for each module"""
-        # Main application logger
-        self.main_logger = self._create_logger(
-            'bclient_main',
-            self.main_log_file,
-            level=logging.INFO
-        )
-        
-        # WebSocket module logger
-        self.websocket_logger = self._create_logger(
-            'bclient_websocket',
-            self.websocket_log_file,
-            level=logging.INFO
-        )
-        
-        # NodeManager module logger
-        self.nodemanager_logger = self._create_logger(
-            'bclient_nodemanager',
-            self.nodemanager_log_file,
-            level=logging.INFO
-        )
-        
-        # SyncManager module logger
-        self.sync_manager_logger = self._create_logger(
-            'bclient_sync_manager',
-            self.sync_manager_log_file,
-            level=logging.INFO
-        )
-        
-        # Routes module logger
-        self.routes_logger = self._create_logger(
-            'bclient_routes',
-            self.routes_log_file,
-            level=logging.INFO
-        )
-        
-        # App module logger
-        self.app_logger = self._create_logger(
-            'bclient_app',
-            self.app_log_file,
-            level=logging.INFO
-        )
-        
-        # Cluster Verification module logger
-        self.cluster_verification_logger = self._create_logger(
-            'bclient_cluster_verification',
-            self.cluster_verification_log_file,
-            level=logging.INFO
-        )
-        
-        # Security Code module logger
-        self.security_code_logger = self._create_logger(
-            'bclient_security_code',
-            self.security_code_log_file,
-            level=logging.INFO
-        )
-        
-        # History module logger
-        self.history_logger = self._create_logger(
-            'bclient_history',
-            self.history_log_file,
-            level=logging.INFO
-        )
+        # Module key -> (logger name, log file); loggers and their files are created on first use
+        self._logger_specs = {
+            'main': ('bclient_main', self.main_log_file),
+            'websocket': ('bclient_websocket', self.websocket_log_file),
+            'websocket_server': ('bclient_websocket', self.websocket_log_file),  # Use same logger for websocket server
+            'nodemanager': ('bclient_nodemanager', self.nodemanager_log_file),
+            'sync_manager': ('bclient_sync_manager', self.sync_manager_log_file),
+            'routes': ('bclient_routes', self.routes_log_file),
+            'app': ('bclient_app', self.app_log_file),
+            'cluster_verification': ('bclient_cluster_verification', self.cluster_verification_log_file),
+            'security_code': ('bclient_security_code', self.security_code_log_file),
+            'history': ('bclient_history', self.history_log_file)
+        }
+        self._loggers = {}
+        self._lock = threading.Lock()
     
     def _create_logger(self, name, log_file, level=logging.INFO):
         """Create logger instance"""
@@ -110,11 +58,13 @@ class BClientLogger:
             return logger
         
         # File handler - use RotatingFileHandler to prevent log files from getting too large
+        self.log_dir.mkdir(exist_ok=True)
         file_handler = logging.handlers.RotatingFileHandler(
             log_file,
             maxBytes=10*1024*1024,  # 10MB
             backupCount=5,
-            encoding='utf-8'
+            encoding='utf-8',
+            delay=True  # Open the file on first write, not at startup
         )
         file_handler.setLevel(level)
         
@@ -137,36 +87,35 @@ class BClientLogger:
         return logger
     
     def get_logger(self, module_name):
-        """Get corresponding logger based on module name"""
-        module_map = {
-            'websocket': self.websocket_logger,
-            'websocket_server': self.websocket_logger,  # Use same logger for websocket server
-            'nodemanager': self.nodemanager_logger,
-            'sync_manager': self.sync_manager_logger,
-            'routes': self.routes_logger,
-            'app': self.app_logger,
-            'main': self.main_logger,
-            'cluster_verification': self.cluster_verification_logger,
-            'security_code': self.security_code_logger,
-            'history': self.history_logger
-        }
-        return module_map.get(module_name, self.main_logger)
+        """Get corresponding logger based on module name (created lazily)"""
+        if module_name not in self._logger_specs:
+            module_name = 'main'
+        logger_name, log_file = self._logger_specs[module_name]
+        logger = self._loggers.get(logger_name)
+        if logger is None:
+            with self._lock:
+                logger = self._loggers.get(logger_name)
+                if logger is None:
+                    logger = self._create_logger(logger_name, log_file, level=logging.INFO)
+                    self._loggers[logger_name] = logger
+        return logger
     
     def log_startup_info(self):
         """Log startup information"""
-        self.main_logger.info("=" * 60)
-        self.main_logger.info(f"B-Client Starting at {datetime.now()}")
-        self.main_logger.info(f"Log files created:")
-        self.main_logger.info(f"  Main: {self.main_log_file}")
-        self.main_logger.info(f"  WebSocket: {self.websocket_log_file}")
-        self.main_logger.info(f"  NodeManager: {self.nodemanager_log_file}")
-        self.main_logger.info(f"  SyncManager: {self.sync_manager_log_file}")
-        self.main_logger.info(f"  Routes: {self.routes_log_file}")
-        self.main_logger.info(f"  App: {self.app_log_file}")
-        self.main_logger.info(f"  Cluster Verification: {self.cluster_verification_log_file}")
-        self.main_logger.info(f"  Security Code: {self.security_code_log_file}")
-        self.main_logger.info(f"  History: {self.history_log_file}")
-        self.main_logger.info("=" * 60)
+        main_logger = self.get_logger('main')
+        main_logger.info("=" * 60)
+        main_logger.info(f"B-Client Starting at {datetime.now()}")
+        main_logger.info(f"Log files (created on first use):")
+        main_logger.info(f"  Main: {self.main_log_file}")
+        main_logger.info(f"  WebSocket: {self.websocket_log_file}")
+        main_logger.info(f"  NodeManager: {self.nodemanager_log_file}")
+        main_logger.info(f"  SyncManager: {self.sync_manager_log_file}")
+        main_logger.info(f"  Routes: {self.routes_log_file}")
+        main_logger.info(f"  App: {self.app_log_file}")
+        main_logger.info(f"  Cluster Verification: {self.cluster_verification_log_file}")
+        main_logger.info(f"  Security Code: {self.security_code_log_file}")
+        main_logger.info(f"  History: {self.history_log_file}")
+        main_logger.info("=" * 60)
 
 # Global logger instance
 bclient_logger = BClientLogger()
@@ -81,6 +81,7 @@ class MessageRouter {
             case 'assign_to_cluster':
             case 'assign_to_channel':
             case 'add_new_node_to_peers':
+            case 'add_new_nodes_to_peers':
             case 'add_new_channel_to_peers':
             case 'add_new_cluster_to_peers':
             case 'add_new_domain_to_peers':
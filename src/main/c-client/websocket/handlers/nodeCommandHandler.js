@@ -120,6 +120,27 @@ class NodeCommandHandler {
                     this.nodeAllocationLogger.info('✅ [Node Allocation] Node added to peers successfully:', result);
                     break;
 
+                case 'add_new_nodes_to_peers': {
+                    // Batched announcement: B-Client coalesces nodes joining a channel in a burst
+                    this.logger.info('👥 [WebSocket Client] Calling nodeManager.addNewNodeToPeers() for batch...');
+                    const nodeIds = message.data.node_ids || [];
+                    this.nodeAllocationLogger.info(`👥 [Node Allocation] Adding ${nodeIds.length} new nodes to peers in channel ${message.data.channel_id}`);
+                    const results = [];
+                    for (const nodeId of nodeIds) {
+                        results.push(await nodeManager.addNewNodeToPeers(
+                            message.data.domain_id,
+                            message.data.cluster_id,
+                            message.data.channel_id,
+                            nodeId
+                        ));
+                    }
+                    result = {
+                        success: results.every(r => r && r.success),
+                        results: results
+                    };
+                    break;
+                }
+
                 case 'add_new_channel_to_peers':
                     this.logger.info('👥 [WebSocket Client] Calling nodeManager.addNewChannelToPeers()...');
                     result = await nodeManager.addNewChannelToPeers(
@@ -170,6 +191,13 @@ class NodeCommandHandler {
             this.logger.info(`[WebSocket Client] NodeManager command completed:`, result);
             this.nodeAllocationLogger.info(`✅ [Node Allocation] NodeManager command completed:`, result);
 
+            // Fire-and-forget notifications carry no request_id, B-Client is not waiting for a reply
+            if (!message.request_id) {
+                this.logger.info('='.repeat(80));
+                this.nodeAllocationLogger.info('='.repeat(80));
+                return;
+            }
+
             // Send response back to B-Client
             const response = {
                 success: result.success,